@@ -0,0 +1,44 @@
+"""Marketplace listings: create the table if a deployment is missing it
+
+Replaces the CREATE TABLE IF NOT EXISTS that main.py ran at every SQLite
+start (db_manager.create_marketplace_table). The table is created with the
+columns get_marketplace_listings reads; databases that already have it are
+left alone.
+
+Revision ID: 9c1e5b7d3a42
+Revises: b8d4f0c2a6e9
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1e5b7d3a42'
+down_revision: Union[str, Sequence[str], None] = 'b8d4f0c2a6e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'marketplace_listings' not in tables:
+        op.create_table('marketplace_listings',
+        sa.Column('listing_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('seller_id', sa.String(), nullable=False),
+        sa.Column('card_id', sa.String(), nullable=False),
+        sa.Column('price', sa.Integer(), nullable=False),
+        sa.Column('listed_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('listing_id')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Earlier revisions and the old startup code also create this table, nothing to undo
+    pass
@@ -0,0 +1,71 @@
+"""Battle history store: indexed battle_history and battle_daily_stats rollups
+
+Revision ID: a3c9e1f04b27
+Revises: d74802d31b7e
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1f04b27'
+down_revision: Union[str, Sequence[str], None] = 'd74802d31b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    # Older deployments already have battle_history (created by record_battle)
+    if 'battle_history' not in tables:
+        op.create_table('battle_history',
+        sa.Column('battle_id', sa.String(), nullable=False),
+        sa.Column('player1_id', sa.String(), nullable=False),
+        sa.Column('player2_id', sa.String(), nullable=False),
+        sa.Column('player1_card_id', sa.String(), nullable=True),
+        sa.Column('player2_card_id', sa.String(), nullable=True),
+        sa.Column('winner', sa.Integer(), nullable=True),
+        sa.Column('player1_power', sa.Integer(), nullable=True),
+        sa.Column('player2_power', sa.Integer(), nullable=True),
+        sa.Column('player1_critical', sa.Boolean(), nullable=True),
+        sa.Column('player2_critical', sa.Boolean(), nullable=True),
+        sa.Column('wager_tier', sa.String(), nullable=True),
+        sa.Column('wager_amount', sa.Integer(), nullable=True),
+        sa.Column('player1_gold_reward', sa.Integer(), nullable=True),
+        sa.Column('player2_gold_reward', sa.Integer(), nullable=True),
+        sa.Column('player1_xp_reward', sa.Integer(), nullable=True),
+        sa.Column('player2_xp_reward', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('battle_id')
+        )
+    existing = {ix['name'] for ix in inspector.get_indexes('battle_history')} if 'battle_history' in tables else set()
+    if 'idx_battle_history_p1_created' not in existing:
+        op.create_index('idx_battle_history_p1_created', 'battle_history', ['player1_id', 'created_at'])
+    if 'idx_battle_history_p2_created' not in existing:
+        op.create_index('idx_battle_history_p2_created', 'battle_history', ['player2_id', 'created_at'])
+
+    if 'battle_daily_stats' not in tables:
+        op.create_table('battle_daily_stats',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('day', sa.String(), nullable=False),
+        sa.Column('wins', sa.Integer(), nullable=True),
+        sa.Column('losses', sa.Integer(), nullable=True),
+        sa.Column('ties', sa.Integer(), nullable=True),
+        sa.Column('gold_earned', sa.Integer(), nullable=True),
+        sa.Column('xp_earned', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('battle_daily_stats')
+    op.drop_index('idx_battle_history_p2_created', table_name='battle_history')
+    op.drop_index('idx_battle_history_p1_created', table_name='battle_history')
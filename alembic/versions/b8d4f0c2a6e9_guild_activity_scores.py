@@ -0,0 +1,37 @@
+"""Guild activity scores: one decayed row per guild for activity drops
+
+Revision ID: b8d4f0c2a6e9
+Revises: f2a7c4e9b1d6
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f0c2a6e9'
+down_revision: Union[str, Sequence[str], None] = 'f2a7c4e9b1d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'guild_activity' not in tables:
+        op.create_table('guild_activity',
+        sa.Column('server_id', sa.String(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('channel_id', sa.String(), nullable=True),
+        sa.Column('messages', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('server_id')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('guild_activity')
@@ -0,0 +1,60 @@
+"""Normalize cards.rarity/tier and creator_packs.pack_tier/status; index them
+
+Revision ID: c5d2e8a1f7b3
+Revises: a3c9e1f04b27
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d2e8a1f7b3'
+down_revision: Union[str, Sequence[str], None] = 'a3c9e1f04b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Canonical values: rarity/tier lowercase, pack_tier lowercase with NULL as
+    # 'community', status uppercase ('LIVE' is what the raw SQL compares with)
+    op.execute("UPDATE cards SET rarity = LOWER(TRIM(rarity)) WHERE rarity <> LOWER(TRIM(rarity))")
+    op.execute("UPDATE cards SET tier = LOWER(TRIM(tier)) WHERE tier <> LOWER(TRIM(tier))")
+    op.execute(
+        "UPDATE creator_packs SET pack_tier = COALESCE(NULLIF(LOWER(TRIM(pack_tier)), ''), 'community') "
+        "WHERE pack_tier IS NULL OR pack_tier <> LOWER(TRIM(pack_tier)) OR TRIM(pack_tier) = ''"
+    )
+
+    existing = {ix['name'] for ix in inspector.get_indexes('cards')}
+    if 'idx_cards_rarity' not in existing:
+        op.create_index('idx_cards_rarity', 'cards', ['rarity'])
+    if 'idx_cards_tier' not in existing:
+        op.create_index('idx_cards_tier', 'cards', ['tier'])
+
+    existing = {ix['name'] for ix in inspector.get_indexes('creator_packs')}
+    if 'idx_creator_packs_public_tier' not in existing:
+        op.create_index('idx_creator_packs_public_tier', 'creator_packs', ['is_public', 'pack_tier'])
+
+    # status only exists on creator_packs created by the raw-SQL seeders
+    if 'status' in {col['name'] for col in inspector.get_columns('creator_packs')}:
+        op.execute("UPDATE creator_packs SET status = UPPER(TRIM(status)) WHERE status <> UPPER(TRIM(status))")
+        if 'idx_creator_packs_status_tier' not in existing:
+            op.create_index('idx_creator_packs_status_tier', 'creator_packs', ['status', 'pack_tier'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    existing = {ix['name'] for ix in inspector.get_indexes('creator_packs')}
+    if 'idx_creator_packs_status_tier' in existing:
+        op.drop_index('idx_creator_packs_status_tier', table_name='creator_packs')
+    op.drop_index('idx_creator_packs_public_tier', table_name='creator_packs')
+    op.drop_index('idx_cards_tier', table_name='cards')
+    op.drop_index('idx_cards_rarity', table_name='cards')
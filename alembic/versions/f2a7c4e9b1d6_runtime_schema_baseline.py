@@ -0,0 +1,900 @@
+"""Runtime schema baseline: raw-SQL tables, legacy columns and indexes
+
+Everything the app used to create at import / startup (Database
+_create_tables_if_not_exists, SeasonManager, ServerRevenueManager,
+DuplicateManager, SeasonSupply, NFTEntitlementManager, seed_packs and the
+battle pass cog). Idempotent, so it is safe on deployments that already ran
+that code.
+
+The DDL is frozen here as it stood at this revision; later schema changes
+get their own revisions instead of editing models or services/schema.py
+under this one.
+
+Revision ID: f2a7c4e9b1d6
+Revises: c5d2e8a1f7b3
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c4e9b1d6'
+down_revision: Union[str, Sequence[str], None] = 'c5d2e8a1f7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# models.UUIDType / models.JSONType as of this revision
+_UUID = sa.CHAR(36).with_variant(postgresql.UUID(), 'postgresql')
+_JSON = sa.Text().with_variant(postgresql.JSONB(), 'postgresql')
+
+
+def _model_tables(metadata: sa.MetaData) -> None:
+    """The ORM tables (models/__init__.py) as of this revision"""
+    sa.Table('audit_logs', metadata,
+        sa.Column('id', _UUID, nullable=False),
+        sa.Column('event', sa.String(length=40), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=True),
+        sa.Column('target_id', sa.String(length=64), nullable=True),
+        sa.Column('payload', _JSON, nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    sa.Table('battle_daily_stats', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('day', sa.String(), nullable=False),
+        sa.Column('wins', sa.Integer(), nullable=True),
+        sa.Column('losses', sa.Integer(), nullable=True),
+        sa.Column('ties', sa.Integer(), nullable=True),
+        sa.Column('gold_earned', sa.Integer(), nullable=True),
+        sa.Column('xp_earned', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    sa.Table('battle_history', metadata,
+        sa.Column('battle_id', sa.String(), nullable=False),
+        sa.Column('player1_id', sa.String(), nullable=False),
+        sa.Column('player2_id', sa.String(), nullable=False),
+        sa.Column('player1_card_id', sa.String(), nullable=True),
+        sa.Column('player2_card_id', sa.String(), nullable=True),
+        sa.Column('winner', sa.Integer(), nullable=True),
+        sa.Column('player1_power', sa.Integer(), nullable=True),
+        sa.Column('player2_power', sa.Integer(), nullable=True),
+        sa.Column('player1_critical', sa.Boolean(), nullable=True),
+        sa.Column('player2_critical', sa.Boolean(), nullable=True),
+        sa.Column('wager_tier', sa.String(), nullable=True),
+        sa.Column('wager_amount', sa.Integer(), nullable=True),
+        sa.Column('player1_gold_reward', sa.Integer(), nullable=True),
+        sa.Column('player2_gold_reward', sa.Integer(), nullable=True),
+        sa.Column('player1_xp_reward', sa.Integer(), nullable=True),
+        sa.Column('player2_xp_reward', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('battle_id'),
+        sa.Index('idx_battle_history_p1_created', 'player1_id', 'created_at'),
+        sa.Index('idx_battle_history_p2_created', 'player2_id', 'created_at'),
+    )
+    sa.Table('battle_log', metadata,
+        sa.Column('battle_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('player1_id', sa.String(), nullable=False),
+        sa.Column('player2_id', sa.String(), nullable=False),
+        sa.Column('winner_id', sa.String(), nullable=True),
+        sa.Column('battle_data', sa.Text(), nullable=True),
+        sa.Column('battle_timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('battle_id')
+    )
+    sa.Table('card_cosmetics', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('card_id', sa.String(), nullable=False),
+        sa.Column('cosmetic_id', sa.String(), nullable=False),
+        sa.Column('equipped_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'card_id', 'cosmetic_id')
+    )
+    sa.Table('cosmetics_catalog', metadata,
+        sa.Column('cosmetic_id', sa.String(), nullable=False),
+        sa.Column('cosmetic_type', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('rarity', sa.String(), nullable=True),
+        sa.Column('unlock_method', sa.String(), nullable=True),
+        sa.Column('price_gold', sa.Integer(), nullable=True),
+        sa.Column('price_tickets', sa.Integer(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('cosmetic_id')
+    )
+    sa.Table('creator_pack_limits', metadata,
+        sa.Column('creator_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('creator_id')
+    )
+    sa.Table('daily_claims', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('last_claim_date', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    sa.Table('dev_pack_supply', metadata,
+        sa.Column('pack_id', sa.String(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('pack_id')
+    )
+    sa.Table('drops', metadata,
+        sa.Column('id', _UUID, nullable=False),
+        sa.Column('owner_id', sa.BigInteger(), nullable=True),
+        sa.Column('card_ids', _JSON, nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('resolved', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    sa.Table('marketplace_listings', metadata,
+        sa.Column('listing_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('seller_id', sa.String(), nullable=False),
+        sa.Column('card_id', sa.String(), nullable=False),
+        sa.Column('price', sa.Integer(), nullable=False),
+        sa.Column('listed_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('listing_id')
+    )
+    sa.Table('pack_definitions', metadata,
+        sa.Column('pack_id', sa.String(), nullable=False),
+        sa.Column('pack_name', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price_gold', sa.Integer(), nullable=True),
+        sa.Column('price_tickets', sa.Integer(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('card_count', sa.Integer(), nullable=True),
+        sa.Column('rarity_distribution', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('pack_id')
+    )
+    sa.Table('purchases', metadata,
+        sa.Column('id', _UUID, nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('pack_type', sa.String(length=50), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key')
+    )
+    sa.Table('revenue_events', metadata,
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('stripe_session_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('product_type', sa.String(), nullable=False),
+        sa.Column('gross_cents', sa.Integer(), nullable=True),
+        sa.Column('platform_cents', sa.Integer(), nullable=True),
+        sa.Column('host_cents', sa.Integer(), nullable=True),
+        sa.Column('creator_cents', sa.Integer(), nullable=True),
+        sa.Column('host_token', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stripe_session_id')
+    )
+    sa.Table('season_progress', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('season_id', sa.String(), nullable=False),
+        sa.Column('xp', sa.Integer(), nullable=True),
+        sa.Column('current_tier', sa.Integer(), nullable=True),
+        sa.Column('has_premium', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'season_id')
+    )
+    sa.Table('server_activity', metadata,
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('server_id', sa.Integer(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    sa.Table('telegram_hosts', metadata,
+        sa.Column('host_token', sa.String(), nullable=False),
+        sa.Column('owner_telegram_id', sa.BigInteger(), nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=True),
+        sa.Column('label', sa.String(), nullable=True),
+        sa.Column('share_bps', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('stripe_connect_account_id', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('host_token')
+    )
+    sa.Table('trade_history', metadata,
+        sa.Column('trade_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id_1', sa.String(), nullable=False),
+        sa.Column('user_id_2', sa.String(), nullable=False),
+        sa.Column('card_id_1', sa.String(), nullable=False),
+        sa.Column('card_id_2', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('trade_id')
+    )
+    sa.Table('trades', metadata,
+        sa.Column('id', _UUID, nullable=False),
+        sa.Column('trade_id', sa.Integer(), nullable=False),
+        sa.Column('user_a', sa.BigInteger(), nullable=False),
+        sa.Column('user_b', sa.BigInteger(), nullable=False),
+        sa.Column('cards_a', _JSON, nullable=True),
+        sa.Column('cards_b', _JSON, nullable=True),
+        sa.Column('gold_a', sa.Integer(), nullable=True),
+        sa.Column('gold_b', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    sa.Table('transaction_audit_log', metadata,
+        sa.Column('log_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('transaction_id', sa.String(), nullable=True),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('log_id')
+    )
+    sa.Table('user_balances', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('gold', sa.Integer(), nullable=True),
+        sa.Column('tickets', sa.Integer(), nullable=True),
+        sa.Column('dust', sa.Integer(), nullable=True),
+        sa.Column('gems', sa.Integer(), nullable=True),
+        sa.Column('xp', sa.Integer(), nullable=True),
+        sa.Column('level', sa.Integer(), nullable=True),
+        sa.Column('last_daily_claim', sa.DateTime(), nullable=True),
+        sa.Column('daily_streak', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    sa.Table('user_cosmetics', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('cosmetic_id', sa.String(), nullable=False),
+        sa.Column('cosmetic_type', sa.String(), nullable=False),
+        sa.Column('unlocked_at', sa.DateTime(), nullable=True),
+        sa.Column('source', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'cosmetic_id')
+    )
+    sa.Table('users', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('is_dev', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('discord_tag', sa.String(), nullable=True),
+        sa.Column('last_active', sa.DateTime(), nullable=True),
+        sa.Column('total_battles', sa.Integer(), nullable=True),
+        sa.Column('wins', sa.Integer(), nullable=True),
+        sa.Column('losses', sa.Integer(), nullable=True),
+        sa.Column('packs_opened', sa.Integer(), nullable=True),
+        sa.Column('victory_tokens', sa.Integer(), nullable=True),
+        sa.Column('referrer_host_token', sa.String(), nullable=True),
+        sa.Column('referrer_set_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    sa.Table('vip_status', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('is_vip', sa.Boolean(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('subscription_id', sa.String(), nullable=True),
+        sa.Column('activity_type', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    sa.Table('youtube_videos', metadata,
+        sa.Column('video_id', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('thumbnail_url', sa.String(), nullable=True),
+        sa.Column('view_count', sa.Integer(), nullable=True),
+        sa.Column('like_count', sa.Integer(), nullable=True),
+        sa.Column('channel_title', sa.String(), nullable=True),
+        sa.Column('channel_id', sa.String(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('video_id')
+    )
+    sa.Table('card_definitions', metadata,
+        sa.Column('card_def_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('source_video_id', sa.String(), nullable=True),
+        sa.Column('card_name', sa.String(), nullable=False),
+        sa.Column('rarity', sa.String(), nullable=True),
+        sa.Column('power', sa.Integer(), nullable=True),
+        sa.Column('attributes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['source_video_id'], ['youtube_videos.video_id'], ),
+        sa.PrimaryKeyConstraint('card_def_id')
+    )
+    sa.Table('creator_packs', metadata,
+        sa.Column('pack_id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('creator_id', sa.String(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price', sa.Integer(), nullable=True),
+        sa.Column('card_count', sa.Integer(), nullable=True),
+        sa.Column('cards_data', _JSON, nullable=True),
+        sa.Column('pack_tier', sa.String(), nullable=True),
+        sa.Column('genre', sa.String(), nullable=True),
+        sa.Column('cover_image_url', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['creator_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('pack_id'),
+        sa.Index('idx_creator_packs_public_tier', 'is_public', 'pack_tier'),
+    )
+    sa.Table('pending_tma_battles', metadata,
+        sa.Column('battle_id', sa.String(), nullable=False),
+        sa.Column('challenger_id', sa.String(), nullable=False),
+        sa.Column('opponent_id', sa.String(), nullable=True),
+        sa.Column('challenger_pack', sa.Text(), nullable=False),
+        sa.Column('opponent_pack', sa.Text(), nullable=True),
+        sa.Column('wager_tier', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('result_json', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['challenger_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['opponent_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('battle_id')
+    )
+    sa.Table('tma_link_codes', metadata,
+        sa.Column('code', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('code')
+    )
+    sa.Table('user_battle_stats', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('wins', sa.Integer(), nullable=True),
+        sa.Column('losses', sa.Integer(), nullable=True),
+        sa.Column('draws', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    sa.Table('card_instances', metadata,
+        sa.Column('instance_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('card_def_id', sa.Integer(), nullable=True),
+        sa.Column('owner_user_id', sa.String(), nullable=True),
+        sa.Column('serial_number', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['card_def_id'], ['card_definitions.card_def_id'], ),
+        sa.ForeignKeyConstraint(['owner_user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('instance_id')
+    )
+    sa.Table('cards', metadata,
+        sa.Column('card_id', sa.String(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('artist_name', sa.String(), nullable=True),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        sa.Column('youtube_url', sa.String(), nullable=True),
+        sa.Column('rarity', sa.String(), nullable=False),
+        sa.Column('tier', sa.String(), nullable=True),
+        sa.Column('variant', sa.String(), nullable=True),
+        sa.Column('era', sa.String(), nullable=True),
+        sa.Column('impact', sa.Integer(), nullable=True),
+        sa.Column('skill', sa.Integer(), nullable=True),
+        sa.Column('longevity', sa.Integer(), nullable=True),
+        sa.Column('culture', sa.Integer(), nullable=True),
+        sa.Column('hype', sa.Integer(), nullable=True),
+        sa.Column('power', sa.Integer(), nullable=True),
+        sa.Column('serial_number', sa.String(), nullable=True),
+        sa.Column('print_number', sa.Integer(), nullable=True),
+        sa.Column('quality', sa.String(), nullable=True),
+        sa.Column('effect_type', sa.String(), nullable=True),
+        sa.Column('effect_value', sa.String(), nullable=True),
+        sa.Column('pack_id', sa.String(), nullable=True),
+        sa.Column('created_by_user_id', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by_user_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['pack_id'], ['creator_packs.pack_id'], ),
+        sa.PrimaryKeyConstraint('card_id'),
+        sa.Index('idx_cards_rarity', 'rarity'),
+        sa.Index('idx_cards_tier', 'tier'),
+    )
+    sa.Table('pack_purchases', metadata,
+        sa.Column('purchase_id', _UUID, nullable=False),
+        sa.Column('buyer_id', sa.String(), nullable=False),
+        sa.Column('pack_id', sa.String(), nullable=False),
+        sa.Column('purchased_at', sa.DateTime(), nullable=True),
+        sa.Column('cards_received', _JSON, nullable=True),
+        sa.ForeignKeyConstraint(['buyer_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['pack_id'], ['creator_packs.pack_id'], ),
+        sa.PrimaryKeyConstraint('purchase_id')
+    )
+    sa.Table('creator_pack_cards', metadata,
+        sa.Column('pack_id', sa.String(), nullable=False),
+        sa.Column('card_id', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['card_id'], ['cards.card_id'], ),
+        sa.ForeignKeyConstraint(['pack_id'], ['creator_packs.pack_id'], ),
+        sa.PrimaryKeyConstraint('pack_id', 'card_id')
+    )
+    sa.Table('packs', metadata,
+        sa.Column('pack_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('creator_id', sa.String(), nullable=True),
+        sa.Column('main_hero_instance_id', sa.Integer(), nullable=True),
+        sa.Column('pack_type', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['creator_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['main_hero_instance_id'], ['card_instances.instance_id'], ),
+        sa.PrimaryKeyConstraint('pack_id')
+    )
+    sa.Table('user_cards', metadata,
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('card_id', sa.String(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('acquired_from', sa.String(), nullable=True),
+        sa.Column('acquired_at', sa.DateTime(), nullable=True),
+        sa.Column('is_favorite', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['card_id'], ['cards.card_id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'card_id')
+    )
+    sa.Table('marketplace_items', metadata,
+        sa.Column('item_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('pack_id', sa.Integer(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('listed_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('stock', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['pack_id'], ['packs.pack_id'], ),
+        sa.PrimaryKeyConstraint('item_id')
+    )
+    sa.Table('pack_contents', metadata,
+        sa.Column('pack_id', sa.Integer(), nullable=False),
+        sa.Column('instance_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['instance_id'], ['card_instances.instance_id'], ),
+        sa.ForeignKeyConstraint(['pack_id'], ['packs.pack_id'], ),
+        sa.PrimaryKeyConstraint('pack_id', 'instance_id')
+    )
+    sa.Table('transactions', metadata,
+        sa.Column('tx_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=True),
+        sa.Column('buyer_id', sa.String(), nullable=True),
+        sa.Column('seller_id', sa.String(), nullable=True),
+        sa.Column('tx_date', sa.DateTime(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['buyer_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['item_id'], ['marketplace_items.item_id'], ),
+        sa.ForeignKeyConstraint(['seller_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('tx_id')
+    )
+
+
+# Scalar column defaults, used when a column is added to an existing table
+_COLUMN_DEFAULTS = {
+    ('battle_daily_stats', 'wins'): 'DEFAULT 0',
+    ('battle_daily_stats', 'losses'): 'DEFAULT 0',
+    ('battle_daily_stats', 'ties'): 'DEFAULT 0',
+    ('battle_daily_stats', 'gold_earned'): 'DEFAULT 0',
+    ('battle_daily_stats', 'xp_earned'): 'DEFAULT 0',
+    ('battle_history', 'player1_critical'): 'DEFAULT FALSE',
+    ('battle_history', 'player2_critical'): 'DEFAULT FALSE',
+    ('battle_history', 'wager_amount'): 'DEFAULT 0',
+    ('battle_history', 'player1_gold_reward'): 'DEFAULT 0',
+    ('battle_history', 'player2_gold_reward'): 'DEFAULT 0',
+    ('battle_history', 'player1_xp_reward'): 'DEFAULT 0',
+    ('battle_history', 'player2_xp_reward'): 'DEFAULT 0',
+    ('dev_pack_supply', 'quantity'): 'DEFAULT 0',
+    ('drops', 'resolved'): 'DEFAULT FALSE',
+    ('marketplace_listings', 'is_active'): 'DEFAULT TRUE',
+    ('pack_definitions', 'card_count'): 'DEFAULT 5',
+    ('purchases', 'status'): "DEFAULT 'pending'",
+    ('revenue_events', 'gross_cents'): 'DEFAULT 0',
+    ('revenue_events', 'platform_cents'): 'DEFAULT 0',
+    ('revenue_events', 'host_cents'): 'DEFAULT 0',
+    ('revenue_events', 'creator_cents'): 'DEFAULT 0',
+    ('season_progress', 'xp'): 'DEFAULT 0',
+    ('season_progress', 'current_tier'): 'DEFAULT 0',
+    ('season_progress', 'has_premium'): 'DEFAULT FALSE',
+    ('telegram_hosts', 'share_bps'): 'DEFAULT 1000',
+    ('trade_history', 'status'): "DEFAULT 'completed'",
+    ('trades', 'gold_a'): 'DEFAULT 0',
+    ('trades', 'gold_b'): 'DEFAULT 0',
+    ('trades', 'status'): "DEFAULT 'pending'",
+    ('user_balances', 'gold'): 'DEFAULT 0',
+    ('user_balances', 'tickets'): 'DEFAULT 0',
+    ('user_balances', 'dust'): 'DEFAULT 0',
+    ('user_balances', 'gems'): 'DEFAULT 0',
+    ('user_balances', 'xp'): 'DEFAULT 0',
+    ('user_balances', 'level'): 'DEFAULT 1',
+    ('user_balances', 'daily_streak'): 'DEFAULT 0',
+    ('users', 'is_dev'): 'DEFAULT FALSE',
+    ('users', 'total_battles'): 'DEFAULT 0',
+    ('users', 'wins'): 'DEFAULT 0',
+    ('users', 'losses'): 'DEFAULT 0',
+    ('users', 'packs_opened'): 'DEFAULT 0',
+    ('users', 'victory_tokens'): 'DEFAULT 0',
+    ('vip_status', 'is_vip'): 'DEFAULT FALSE',
+    ('vip_status', 'activity_type'): "DEFAULT 'message'",
+    ('youtube_videos', 'view_count'): 'DEFAULT 0',
+    ('youtube_videos', 'like_count'): 'DEFAULT 0',
+    ('card_definitions', 'rarity'): "DEFAULT 'Common'",
+    ('card_definitions', 'power'): 'DEFAULT 50',
+    ('creator_packs', 'price'): 'DEFAULT 0',
+    ('creator_packs', 'card_count'): 'DEFAULT 0',
+    ('creator_packs', 'pack_tier'): "DEFAULT 'community'",
+    ('creator_packs', 'is_public'): 'DEFAULT FALSE',
+    ('pending_tma_battles', 'wager_tier'): "DEFAULT 'casual'",
+    ('pending_tma_battles', 'status'): "DEFAULT 'waiting'",
+    ('user_battle_stats', 'wins'): 'DEFAULT 0',
+    ('user_battle_stats', 'losses'): 'DEFAULT 0',
+    ('user_battle_stats', 'draws'): 'DEFAULT 0',
+    ('cards', 'type'): "DEFAULT 'artist'",
+    ('cards', 'variant'): "DEFAULT 'Classic'",
+    ('cards', 'print_number'): 'DEFAULT 1',
+    ('cards', 'quality'): "DEFAULT 'standard'",
+    ('packs', 'pack_type'): "DEFAULT 'gold'",
+    ('packs', 'status'): "DEFAULT 'pending'",
+    ('user_cards', 'quantity'): 'DEFAULT 1',
+    ('user_cards', 'is_favorite'): 'DEFAULT FALSE',
+    ('marketplace_items', 'price'): 'DEFAULT 9.99',
+    ('marketplace_items', 'is_active'): 'DEFAULT TRUE',
+    ('marketplace_items', 'stock'): "DEFAULT 'unlimited'",
+}
+
+# Tables used through raw SQL only. {serial} is the dialect's auto-increment key.
+RAW_TABLES = [
+    """CREATE TABLE IF NOT EXISTS active_battles (
+        match_id TEXT PRIMARY KEY,
+        player1_id TEXT NOT NULL,
+        player2_id TEXT NOT NULL,
+        wager_amount INTEGER NOT NULL DEFAULT 0,
+        tier_key TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Legacy economy table still used by several Discord cogs
+    """CREATE TABLE IF NOT EXISTS user_inventory (
+        user_id TEXT PRIMARY KEY,
+        gold INTEGER DEFAULT 0,
+        dust INTEGER DEFAULT 0,
+        tickets INTEGER DEFAULT 0,
+        gems INTEGER DEFAULT 0,
+        xp INTEGER DEFAULT 0,
+        level INTEGER DEFAULT 1,
+        total_cards INTEGER DEFAULT 0,
+        last_daily_claim TIMESTAMP,
+        daily_streak INTEGER DEFAULT 0,
+        last_daily TEXT,
+        premium_expires TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS battle_registry (
+        user_id TEXT PRIMARY KEY,
+        telegram_id BIGINT UNIQUE NOT NULL,
+        username TEXT,
+        is_active BOOLEAN DEFAULT TRUE,
+        registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        team_power INTEGER DEFAULT 0
+    )""",
+    # season_system.SeasonManager
+    """CREATE TABLE IF NOT EXISTS seasons (
+        season_id {serial},
+        season_name TEXT NOT NULL,
+        season_number INTEGER NOT NULL,
+        start_date TIMESTAMP NOT NULL,
+        end_date TIMESTAMP NOT NULL,
+        is_active BOOLEAN DEFAULT FALSE,
+        theme TEXT,
+        special_cards TEXT,
+        season_stats TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS season_card_caps (
+        cap_id {serial},
+        season_id INTEGER,
+        artist_name TEXT NOT NULL,
+        tier TEXT NOT NULL,
+        max_prints INTEGER NOT NULL,
+        current_prints INTEGER DEFAULT 0,
+        is_hard_cap BOOLEAN DEFAULT FALSE,
+        FOREIGN KEY (season_id) REFERENCES seasons(season_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS player_season_progress (
+        progress_id {serial},
+        user_id INTEGER NOT NULL,
+        season_id INTEGER NOT NULL,
+        season_level INTEGER DEFAULT 1,
+        season_xp INTEGER DEFAULT 0,
+        cards_collected INTEGER DEFAULT 0,
+        unique_artists INTEGER DEFAULT 0,
+        battles_won INTEGER DEFAULT 0,
+        trades_completed INTEGER DEFAULT 0,
+        season_rank TEXT DEFAULT 'Bronze',
+        rewards_claimed TEXT DEFAULT '[]',
+        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (season_id) REFERENCES seasons(season_id),
+        UNIQUE(user_id, season_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS season_rewards (
+        reward_id TEXT PRIMARY KEY,
+        season_id INTEGER,
+        reward_type TEXT NOT NULL,
+        reward_name TEXT NOT NULL,
+        reward_data TEXT,
+        required_level INTEGER,
+        required_xp INTEGER,
+        required_cards INTEGER,
+        required_rank TEXT,
+        is_claimable BOOLEAN DEFAULT TRUE,
+        is_limited BOOLEAN DEFAULT FALSE,
+        total_claims INTEGER DEFAULT 0,
+        max_claims INTEGER,
+        FOREIGN KEY (season_id) REFERENCES seasons(season_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS card_prestige (
+        prestige_id {serial},
+        card_id TEXT NOT NULL,
+        original_season_id INTEGER,
+        seasons_active INTEGER DEFAULT 1,
+        prestige_score INTEGER DEFAULT 0,
+        ownership_history TEXT,
+        notable_events TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (original_season_id) REFERENCES seasons(season_id),
+        FOREIGN KEY (card_id) REFERENCES cards(card_id)
+    )""",
+    # season_supply.SeasonSupply
+    """CREATE TABLE IF NOT EXISTS season_supply (
+        season INTEGER,
+        tier TEXT,
+        minted INTEGER DEFAULT 0,
+        cap INTEGER,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (season, tier)
+    )""",
+    """CREATE TABLE IF NOT EXISTS artist_supply (
+        season INTEGER,
+        artist_id TEXT,
+        tier TEXT,
+        minted INTEGER DEFAULT 0,
+        cap INTEGER,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (season, artist_id, tier)
+    )""",
+    # server_revenue.ServerRevenueManager
+    """CREATE TABLE IF NOT EXISTS server_owners (
+        server_id INTEGER PRIMARY KEY,
+        owner_user_id INTEGER NOT NULL,
+        owner_discord_tag TEXT,
+        stripe_connect_account_id TEXT,
+        stripe_connect_status TEXT DEFAULT 'not_connected',
+        nft_count INTEGER DEFAULT 0,
+        revenue_share_percentage REAL DEFAULT 0.10,
+        total_earned_cents INTEGER DEFAULT 0,
+        pending_payout_cents INTEGER DEFAULT 0,
+        last_payout_date TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS server_nft_holdings (
+        id {serial},
+        server_id INTEGER NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        nft_collection TEXT NOT NULL,
+        nft_token_id TEXT NOT NULL,
+        wallet_address TEXT NOT NULL,
+        verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        verification_status TEXT DEFAULT 'verified',
+        FOREIGN KEY (server_id) REFERENCES server_owners(server_id),
+        UNIQUE(nft_collection, nft_token_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS server_revenue_transactions (
+        transaction_id TEXT PRIMARY KEY,
+        server_id INTEGER NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        purchase_type TEXT NOT NULL,
+        total_amount_cents INTEGER NOT NULL,
+        server_share_cents INTEGER NOT NULL,
+        platform_share_cents INTEGER NOT NULL,
+        revenue_share_percentage REAL NOT NULL,
+        nft_boost_applied INTEGER DEFAULT 0,
+        stripe_payment_intent_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        payout_status TEXT DEFAULT 'pending',
+        payout_date TIMESTAMP,
+        FOREIGN KEY (server_id) REFERENCES server_owners(server_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS server_payouts (
+        payout_id TEXT PRIMARY KEY,
+        server_id INTEGER NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        stripe_transfer_id TEXT,
+        payout_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'completed',
+        transaction_ids TEXT,
+        FOREIGN KEY (server_id) REFERENCES server_owners(server_id)
+    )""",
+    # services/duplicate_manager.DuplicateManager
+    """CREATE TABLE IF NOT EXISTS user_dust (
+        user_id INTEGER PRIMARY KEY,
+        dust_amount INTEGER DEFAULT 0,
+        total_dust_earned INTEGER DEFAULT 0,
+        total_dust_spent INTEGER DEFAULT 0,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS dust_transactions (
+        id {serial},
+        user_id INTEGER,
+        amount INTEGER,
+        transaction_type TEXT,
+        card_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # nft_entitlement.NFTEntitlementManager
+    """CREATE TABLE IF NOT EXISTS wallet_links (
+        discord_user_id INTEGER PRIMARY KEY,
+        wallet_address TEXT NOT NULL UNIQUE,
+        signature TEXT NOT NULL,
+        nonce TEXT NOT NULL,
+        verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'active'
+    )""",
+    """CREATE TABLE IF NOT EXISTS nft_snapshots (
+        snapshot_id {serial},
+        discord_user_id INTEGER NOT NULL,
+        wallet_address TEXT NOT NULL,
+        collection_key TEXT NOT NULL,
+        nft_count INTEGER DEFAULT 0,
+        snapshot_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        verification_method TEXT,
+        FOREIGN KEY (discord_user_id) REFERENCES wallet_links(discord_user_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS entitlement_cache (
+        discord_user_id INTEGER PRIMARY KEY,
+        wallet_address TEXT NOT NULL,
+        eligible_nfts INTEGER DEFAULT 0,
+        revenue_share_percent REAL DEFAULT 0.10,
+        last_verified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        verification_status TEXT DEFAULT 'active',
+        freeze_reason TEXT,
+        FOREIGN KEY (discord_user_id) REFERENCES wallet_links(discord_user_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS snapshot_refresh_log (
+        refresh_id {serial},
+        refresh_type TEXT NOT NULL,
+        discord_user_id INTEGER,
+        success BOOLEAN,
+        nfts_found INTEGER,
+        error_message TEXT,
+        refresh_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+]
+
+# Columns older deployments (or model-created tables) lack but raw SQL uses
+LEGACY_COLUMNS = {
+    "active_battles": [("tier_key", "TEXT")],
+    "battle_registry": [("team_power", "INTEGER DEFAULT 0")],
+    "user_inventory": [("last_daily", "TEXT"), ("premium_expires", "TEXT")],
+    "user_cards": [("first_acquired_at", "TIMESTAMP")],
+    # cogs/battlepass_commands keeps claimed tiers and quests next to the pass
+    "season_progress": [
+        ("claimed_tiers", "TEXT DEFAULT '[]'"),
+        ("quest_progress", "TEXT DEFAULT '{}'"),
+        ("last_quest_reset", "TEXT"),
+    ],
+    # Marketplace / seed packs columns (services/seed_packs, cogs/marketplace)
+    "creator_packs": [
+        ("pack_type", "TEXT DEFAULT 'creator'"),
+        ("pack_size", "INTEGER DEFAULT 10"),
+        ("status", "TEXT DEFAULT 'DRAFT'"),
+        ("published_at", "TIMESTAMP"),
+        ("stripe_payment_id", "TEXT"),
+        ("price_cents", "INTEGER DEFAULT 500"),
+        ("price_gold", "INTEGER DEFAULT 500"),
+        ("total_purchases", "INTEGER DEFAULT 0"),
+    ],
+}
+
+RAW_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_battle_registry_active_seen ON battle_registry(is_active, last_seen DESC)",
+    # Username prefix search (matchmaking, trade partners) runs as a range scan
+    "CREATE INDEX IF NOT EXISTS idx_battle_registry_username_lower ON battle_registry(lower(username))",
+    "CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username))",
+    # Legacy Discord trades are looked up by their numeric trade_id
+    "CREATE INDEX IF NOT EXISTS idx_trades_trade_id ON trades(trade_id)",
+    "CREATE INDEX IF NOT EXISTS idx_user_cards_user_acquired ON user_cards(user_id, acquired_at)",
+    "CREATE INDEX IF NOT EXISTS idx_creator_packs_status_tier ON creator_packs(status, pack_tier)",
+]
+
+# models.card_power_sql() as of this revision
+_CARD_POWER_SQL = (
+    "(coalesce(nullif(cards.impact, 0), 50) + coalesce(nullif(cards.skill, 0), 50)"
+    " + coalesce(nullif(cards.longevity, 0), 50) + coalesce(nullif(cards.culture, 0), 50)"
+    " + coalesce(nullif(cards.hype, 0), 50)) / 5"
+    " + CASE lower(cards.rarity) WHEN 'common' THEN 0 WHEN 'rare' THEN 5 WHEN 'epic' THEN 10"
+    " WHEN 'legendary' THEN 20 WHEN 'mythic' THEN 35 ELSE 0 END"
+)
+
+
+def _add_missing_columns(conn, metadata: sa.MetaData) -> None:
+    inspector = sa.inspect(conn)
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing:
+                continue
+            col_type = col.type.compile(dialect=conn.dialect)
+            default = _COLUMN_DEFAULTS.get((table.name, col.name))
+            default = f" {default}" if default else ""
+            conn.execute(sa.text(f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}{default}'))
+            logger.info(f"[MIGRATE] Added column {table.name}.{col.name}")
+
+
+def _user_id_to_varchar(conn):
+    """PostgreSQL: convert users.user_id (and the FKs referencing it) from
+    BIGINT to VARCHAR on deployments created before ids became strings."""
+    row = conn.execute(sa.text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name='users' AND column_name='user_id' AND table_schema='public'"
+    )).fetchone()
+    if not row or row[0] != "bigint":
+        return
+    logger.info("[MIGRATE] users.user_id is BIGINT — migrating to VARCHAR...")
+
+    fk_rows = conn.execute(sa.text("""
+        SELECT kcu.constraint_name, kcu.table_name AS fk_table, kcu.column_name AS fk_col
+        FROM information_schema.key_column_usage kcu
+        JOIN information_schema.referential_constraints rc
+             ON kcu.constraint_name = rc.constraint_name
+        JOIN information_schema.key_column_usage kcu2
+             ON rc.unique_constraint_name = kcu2.constraint_name
+        WHERE kcu2.table_name = 'users' AND kcu2.column_name = 'user_id'
+    """)).fetchall()
+
+    for fk_name, fk_table, fk_col in fk_rows:
+        conn.execute(sa.text(f'ALTER TABLE "{fk_table}" DROP CONSTRAINT IF EXISTS "{fk_name}"'))
+    for fk_name, fk_table, fk_col in fk_rows:
+        conn.execute(sa.text(
+            f'ALTER TABLE "{fk_table}" ALTER COLUMN "{fk_col}" TYPE VARCHAR USING "{fk_col}"::text'
+        ))
+    conn.execute(sa.text("ALTER TABLE users ALTER COLUMN user_id TYPE VARCHAR USING user_id::text"))
+    for fk_name, fk_table, fk_col in fk_rows:
+        conn.execute(sa.text(
+            f'ALTER TABLE "{fk_table}" ADD CONSTRAINT "{fk_name}" '
+            f'FOREIGN KEY ("{fk_col}") REFERENCES users(user_id)'
+        ))
+    logger.info(f"[MIGRATE] users.user_id → VARCHAR ({len(fk_rows)} foreign keys updated)")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        _user_id_to_varchar(conn)
+
+    metadata = sa.MetaData()
+    _model_tables(metadata)
+    metadata.create_all(conn)
+    _add_missing_columns(conn, metadata)
+    # create_all skips the indexes of tables that already existed
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+    serial = "SERIAL PRIMARY KEY" if dialect == "postgresql" else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    for ddl in RAW_TABLES:
+        conn.execute(sa.text(ddl.format(serial=serial)))
+
+    inspector = sa.inspect(conn)
+    for table, columns in LEGACY_COLUMNS.items():
+        existing = {col["name"] for col in inspector.get_columns(table)}
+        for name, definition in columns:
+            if name not in existing:
+                conn.execute(sa.text(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {definition}'))
+                logger.info(f"[MIGRATE] Added column {table}.{name}")
+
+    for ddl in RAW_INDEXES:
+        conn.execute(sa.text(ddl))
+
+    # Data fix-ups the old runtime bootstrap applied on every start
+    conn.execute(sa.text("UPDATE user_cards SET quantity = 1 WHERE quantity IS NULL"))
+    conn.execute(sa.text(f"UPDATE cards SET power = {_CARD_POWER_SQL} WHERE power IS NULL"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Baseline: the tables predate versioning and hold live data, nothing to undo
+    pass
@@ -3,8 +3,9 @@ Missing Battle Classes
 PlayerState, MatchState, BattleCard, and wager configuration
 """
 
+import os
 from typing import Optional, Dict, List
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from discord_cards import ArtistCard
 
@@ -97,6 +98,9 @@ class BattleCard:
     Adds battle state to ArtistCard
     """
     
+    __slots__ = ("card", "owner_id", "owner_name", "base_power", "final_power",
+                 "critical_hit", "power_modifier")
+    
     def __init__(
         self,
         artist_card: ArtistCard,
@@ -151,6 +155,16 @@ class BattleCard:
         """Create BattleCard from ArtistCard"""
         return cls(artist_card, owner_id, owner_name)
     
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BattleCard':
+        """Create BattleCard from to_dict() output"""
+        battle_card = cls(ArtistCard.from_dict(data["card"]), data["owner_id"], data["owner_name"])
+        battle_card.base_power = data.get("base_power", battle_card.base_power)
+        battle_card.final_power = data.get("final_power", battle_card.final_power)
+        battle_card.critical_hit = data.get("critical_hit", False)
+        battle_card.power_modifier = data.get("power_modifier", 1.0)
+        return battle_card
+    
     def __repr__(self):
         crit_tag = " [CRIT]" if self.critical_hit else ""
         return f"<BattleCard: {self.card.artist} - {self.card.song} ({self.final_power} PWR{crit_tag})>"
@@ -165,6 +179,9 @@ class PlayerState:
     Represents a player's state in a battle
     """
     
+    __slots__ = ("user_id", "username", "card", "is_ready", "has_accepted",
+                 "gold_wagered", "gold_reward", "xp_reward", "won")
+    
     def __init__(
         self,
         user_id: str,
@@ -215,6 +232,19 @@ class PlayerState:
             "won": self.won,
         }
     
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PlayerState':
+        """Create PlayerState from to_dict() output"""
+        card = BattleCard.from_dict(data["card"]) if data.get("card") else None
+        player = cls(data["user_id"], data["username"], card)
+        player.is_ready = data.get("is_ready", False)
+        player.has_accepted = data.get("has_accepted", False)
+        player.gold_wagered = data.get("gold_wagered", 0)
+        player.gold_reward = data.get("gold_reward", 0)
+        player.xp_reward = data.get("xp_reward", 0)
+        player.won = data.get("won", False)
+        return player
+    
     def __repr__(self):
         ready_tag = "✓" if self.is_ready else "✗"
         return f"<PlayerState: {self.username} [{ready_tag}]>"
@@ -239,6 +269,10 @@ class MatchState:
     Represents the complete state of a battle match
     """
     
+    __slots__ = ("match_id", "player1", "player2", "wager_tier", "status", "created_at",
+                 "started_at", "completed_at", "winner_id", "is_tie", "power_difference",
+                 "wager_config")
+    
     def __init__(
         self,
         match_id: str,
@@ -403,6 +437,27 @@ class MatchState:
             "power_difference": self.power_difference,
         }
     
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MatchState':
+        """Create MatchState from to_dict() output"""
+        def parse(value):
+            return datetime.fromisoformat(value) if value else None
+        
+        match = cls(
+            data["match_id"],
+            PlayerState.from_dict(data["player1"]),
+            PlayerState.from_dict(data["player2"]),
+            data.get("wager_tier", "casual"),
+        )
+        match.status = BattleStatus(data.get("status", BattleStatus.PENDING.value))
+        match.created_at = parse(data.get("created_at")) or match.created_at
+        match.started_at = parse(data.get("started_at"))
+        match.completed_at = parse(data.get("completed_at"))
+        match.winner_id = data.get("winner_id")
+        match.is_tie = data.get("is_tie", False)
+        match.power_difference = data.get("power_difference", 0)
+        return match
+    
     def __repr__(self):
         return f"<MatchState: {self.player1.username} vs {self.player2.username} ({self.status.value})>"
 
@@ -414,11 +469,31 @@ class MatchState:
 class BattleManager:
     """
     Helper class to manage active battles
+
+    Matches live in a battle state store (services.battle_store): in-process
+    by default, or Redis (BATTLE_STORE=redis) so every bot shard sees the
+    same battles. owner identifies this shard for restart recovery.
     """
     
-    def __init__(self):
-        self.active_matches: Dict[str, MatchState] = {}
-        self.user_to_match: Dict[str, str] = {}  # user_id -> match_id
+    def __init__(self, store=None, owner: Optional[str] = None):
+        if store is None:
+            from services.battle_store import create_battle_store
+            store = create_battle_store()
+        self.store = store
+        if owner is None:
+            from services.sharding import process_name
+            owner = os.environ.get("BATTLE_SHARD_ID") or process_name()
+        self.owner = owner
+    
+    @property
+    def durable(self) -> bool:
+        """True when matches survive a restart of this process"""
+        return self.store.durable
+    
+    @property
+    def active_matches(self) -> Dict[str, MatchState]:
+        """Matches owned by this shard, by match_id"""
+        return {m.match_id: m for m in self.store.list_owned(self.owner)}
     
     def create_match(
         self,
@@ -428,52 +503,93 @@ class BattleManager:
         player2_id: str,
         player2_name: str,
         wager_tier: str = "casual"
-    ) -> MatchState:
-        """Create a new battle match"""
+    ) -> Optional[MatchState]:
+        """Create a new battle match; None if either player is already in one"""
         
         player1 = PlayerState(player1_id, player1_name)
         player2 = PlayerState(player2_id, player2_name)
         
         match = MatchState(match_id, player1, player2, wager_tier)
         
-        # Store match
-        self.active_matches[match_id] = match
-        self.user_to_match[player1_id] = match_id
-        self.user_to_match[player2_id] = match_id
+        # Claims both players atomically
+        if not self.store.create(match, self.owner):
+            return None
         
         return match
     
     def get_match(self, match_id: str) -> Optional[MatchState]:
         """Get match by ID"""
-        return self.active_matches.get(match_id)
+        return self.store.get(match_id)
     
     def get_user_match(self, user_id: str) -> Optional[MatchState]:
         """Get user's current match"""
-        match_id = self.user_to_match.get(user_id)
+        match_id = self.store.get_user_match_id(user_id)
         if match_id:
-            return self.active_matches.get(match_id)
+            return self.store.get(match_id)
         return None
     
     def is_user_in_battle(self, user_id: str) -> bool:
         """Check if user is in a battle"""
-        return user_id in self.user_to_match
+        return self.store.get_user_match_id(user_id) is not None
+    
+    def accept_battle(self, match_id: str, user_id: str) -> bool:
+        """Player accepts battle. Returns True once both players have accepted"""
+        match = self.store.get(match_id)
+        if not match:
+            return False
+        return bool(self.store.accept(match_id, user_id, match.wager_config["wager_cost"]))
+    
+    def set_player_card(self, match_id: str, user_id: str, card: BattleCard) -> bool:
+        """Set player's card. Returns True once both players are ready"""
+        return bool(self.store.set_card(match_id, user_id, card))
+    
+    def save_match(self, match: MatchState):
+        """Persist changes made directly on a MatchState (results, cancel)"""
+        self.store.save(match)
     
-    def complete_match(self, match_id: str):
+    def complete_match(self, match_id: str) -> Optional[MatchState]:
         """Clean up completed match"""
-        match = self.active_matches.get(match_id)
-        if match:
-            # Remove user mappings
-            if match.player1.user_id in self.user_to_match:
-                del self.user_to_match[match.player1.user_id]
-            if match.player2.user_id in self.user_to_match:
-                del self.user_to_match[match.player2.user_id]
-            
-            # Remove match
-            del self.active_matches[match_id]
+        return self.store.remove(match_id)
+    
+    def expire_stale(self, now: Optional[float] = None) -> List[MatchState]:
+        """Remove matches past their TTL, this shard's own included.
+
+        Returned matches have had MatchState.expire() applied; each is handed
+        to exactly one caller, which must refund the wager to both players.
+        """
+        return self.store.pop_expired(now)
+    
+    def recover(self) -> List[Dict]:
+        """Take back this shard's matches after a restart, for wager refunds.
+
+        Returns the same shape as Database.get_all_active_battles().
+        """
+        recovered = []
+        for match in self.store.list_owned(self.owner) + self.store.pop_expired():
+            if match.status != BattleStatus.EXPIRED and not self.store.remove(match.match_id):
+                continue  # another shard got to it first
+            recovered.append({
+                "match_id": match.match_id,
+                "player1_id": match.player1.user_id,
+                "player2_id": match.player2.user_id,
+                "wager_amount": match.wager_config["wager_cost"],
+            })
+        return recovered
     
     def get_active_count(self) -> int:
         """Get count of active matches"""
-        return len(self.active_matches)
+        return self.store.count()
+
+
+_battle_manager: Optional[BattleManager] = None
+
+
+def get_battle_manager() -> BattleManager:
+    """Process-wide BattleManager"""
+    global _battle_manager
+    if _battle_manager is None:
+        _battle_manager = BattleManager()
+    return _battle_manager
 
 
 # ============================================
@@ -696,12 +812,26 @@ class BattleEngine:
 class BattleHistory:
     """Track battle history for a user"""
     
+    RESULT_EMOJI = {"win": "🏆", "loss": "💀", "tie": "🤝"}
+
     def __init__(self, user_id: str):
         self.user_id = user_id
         self.battles = []
+        self.recent = []  # latest persisted battles, see load()
         self.wins = 0
         self.losses = 0
         self.ties = 0
+        self.total = 0
+
+    @classmethod
+    def load(cls, db, user_id, recent: int = 5) -> "BattleHistory":
+        """Build from the persisted battle history: lifetime record plus the latest battles"""
+        history = cls(str(user_id))
+        record = db.get_battle_record(user_id)
+        history.wins, history.losses, history.ties = record["wins"], record["losses"], record["ties"]
+        history.total = record["total"]
+        history.recent = db.get_battle_history(user_id, limit=recent)["battles"] if recent else []
+        return history
     
     def add_battle(self, result: Dict, was_player1: bool):
         """Add battle to history"""
@@ -710,6 +840,7 @@ class BattleHistory:
             "was_player1": was_player1,
             "timestamp": discord.utils.utcnow(),
         })
+        self.total += 1
         
         # Update stats
         if result["winner"] == 0:
@@ -728,7 +859,21 @@ class BattleHistory:
     
     def total_battles(self) -> int:
         """Get total battle count"""
-        return len(self.battles)
+        return self.total
+
+    def recent_lines(self) -> List[str]:
+        """One line per recent persisted battle, newest first"""
+        lines = []
+        for battle in self.recent:
+            line = (f"{self.RESULT_EMOJI.get(battle['result'], '⚔️')} "
+                    f"**{battle['power']}** vs {battle['opponent_power']}"
+                    f"{' 💥' if battle['critical'] else ''} · {battle['wager_tier'] or 'casual'}"
+                    f" · +{battle['gold_reward']}g")
+            if battle["created_at"]:
+                at = datetime.fromisoformat(battle["created_at"]).replace(tzinfo=timezone.utc)
+                line += f" · <t:{int(at.timestamp())}:R>"
+            lines.append(line)
+        return lines
     
     def get_stats_embed(self, username: str) -> discord.Embed:
         """Create embed showing battle stats"""
@@ -754,6 +899,9 @@ class BattleHistory:
             value=f"**{self.total_battles()}**",
             inline=True
         )
+
+        if self.recent:
+            embed.add_field(name="🕑 Recent Battles", value="\n".join(self.recent_lines()), inline=False)
         
         return embed
 
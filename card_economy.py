@@ -5,7 +5,6 @@ Handles gold, tickets, daily claims, rewards
 
 import sqlite3
 import uuid
-import time as _time
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 import discord
@@ -471,8 +470,6 @@ class CardEconomyManager:
         self.db_path = db_path
         self._database_url = settings.DATABASE_URL
         self.transactions = []
-        self._drop_cooldowns: Dict[int, float] = {}   # server_id -> last drop timestamp
-        self._active_drops: Dict[int, dict] = {}       # channel_id -> drop data
 
     def _get_connection(self):
         """Get database connection - PostgreSQL if DATABASE_URL set, else SQLite."""
@@ -486,30 +483,6 @@ class CardEconomyManager:
         else:
             return sqlite3.connect(self.db_path), "sqlite", "?"
 
-    # ------------------------------------------------------------------
-    # Table bootstrap (called once on cog init)
-    # ------------------------------------------------------------------
-    def initialize_economy_tables(self):
-        """Ensure user_inventory and related tables exist"""
-        with self._get_connection()[0] as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_inventory (
-                    user_id INTEGER PRIMARY KEY,
-                    gold INTEGER DEFAULT 500,
-                    dust INTEGER DEFAULT 0,
-                    tickets INTEGER DEFAULT 0,
-                    gems INTEGER DEFAULT 0,
-                    xp INTEGER DEFAULT 0,
-                    level INTEGER DEFAULT 1,
-                    daily_streak INTEGER DEFAULT 0,
-                    last_daily TEXT,
-                    last_daily_claim TEXT,
-                    premium_expires TEXT
-                )
-            """)
-            conn.commit()
-
     # ------------------------------------------------------------------
     # Balance helpers
     # ------------------------------------------------------------------
@@ -532,11 +505,13 @@ class CardEconomyManager:
     # Drop system
     # ------------------------------------------------------------------
     def _can_drop(self, server_id: int) -> bool:
-        last = self._drop_cooldowns.get(server_id, 0)
-        return (_time.time() - last) >= self.DROP_COOLDOWN
+        from services.drop_engine import get_drop_engine
+        return not get_drop_engine().on_cooldown(server_id)
 
     def create_drop(self, channel_id: int, server_id: int, user_id: int) -> dict:
         """Create a card drop in a channel. Returns drop data or error."""
+        from services.drop_engine import get_drop_engine
+        engine = get_drop_engine()
         if not self._can_drop(server_id):
             return {'success': False, 'error': 'Drop is on cooldown for this server.'}
 
@@ -573,48 +548,42 @@ class CardEconomyManager:
                 'image_url': row[4] or '',
             })
 
-        drop_id = f"drop_{uuid.uuid4().hex[:8]}"
-        expires_at = _time.time() + 300  # 5 minutes
-
-        self._drop_cooldowns[server_id] = _time.time()
-        self._active_drops[channel_id] = {
-            'drop_id': drop_id,
-            'cards': cards,
-            'expires_at': expires_at,
-            'claimed': set(),
-        }
+        # One claimable slot per card; starting the cooldown is atomic, so a
+        # concurrent drop in the same server loses here
+        drop = engine.spawn(server_id, channel_id, {'cards': cards}, slots=len(cards),
+                            cooldown=self.DROP_COOLDOWN)
+        if drop is None:
+            return {'success': False, 'error': 'Drop is on cooldown for this server.'}
 
         return {
             'success': True,
-            'drop_id': drop_id,
+            'drop_id': drop['drop_id'],
             'cards': cards,
-            'expires_at': expires_at,
+            'expires_at': drop['expires_at'],
         }
 
     def claim_drop(self, channel_id: int, user_id: int, card_number: int) -> dict:
         """Claim a card from an active drop."""
-        drop = self._active_drops.get(channel_id)
+        from services.drop_engine import get_drop_engine
+        engine = get_drop_engine()
+        drop = engine.channel_drop(channel_id)
         if not drop:
             return {'success': False, 'error': 'No active drop in this channel.'}
-        if _time.time() > drop['expires_at']:
-            del self._active_drops[channel_id]
-            return {'success': False, 'error': 'This drop has expired.'}
 
+        # Compare-and-set on the drop record: exactly one claimer gets each card
         idx = card_number - 1
-        if idx < 0 or idx >= len(drop['cards']):
-            return {'success': False, 'error': 'Invalid card number.'}
-        if idx in drop['claimed']:
-            return {'success': False, 'error': 'That card has already been claimed.'}
-
-        card = drop['cards'][idx]
-        drop['claimed'].add(idx)
+        result = engine.claim(drop['drop_id'], user_id, slot=idx)
+        if not result['success']:
+            if result['reason'] == 'taken':
+                return {'success': False, 'error': 'That card has already been claimed.'}
+            return {'success': False, 'error': result['error']}
 
-        # Award card to user
-        self._award_card_to_user(user_id, card['card_id'])
-
-        # If all cards claimed, remove drop
-        if len(drop['claimed']) >= len(drop['cards']):
-            del self._active_drops[channel_id]
+        card = drop['payload']['cards'][idx]
+        try:
+            self._award_card_to_user(user_id, card['card_id'])
+        except Exception:
+            engine.release(drop['drop_id'], user_id, slot=idx)
+            raise
 
         return {'success': True, 'card': card}
 
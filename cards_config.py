@@ -26,6 +26,28 @@ TIER_EMOJI = {
 }
 
 
+# Stored values are canonical: cards.rarity / cards.tier / creator_packs.pack_tier
+# lowercase, creator_packs.status uppercase ('LIVE', as raw SQL compares it), so
+# lookups are plain indexed equality instead of LOWER(...) scans.
+
+def normalize_rarity(value, default: str = "common") -> str:
+    """'Legendary ' -> 'legendary'. Unknown rarities are kept, lowercased."""
+    rarity = (value or "").strip().lower()
+    return rarity or default
+
+
+def normalize_tier(value):
+    """Card tier, lowercased; None stays None."""
+    tier = (value or "").strip().lower()
+    return tier or None
+
+
+def normalize_pack_tier(value, default: str = "community") -> str:
+    """Creator pack tier, lowercased; NULL/empty becomes the default tier."""
+    tier = (value or "").strip().lower()
+    return tier or default
+
+
 def compute_card_power(card: dict) -> int:
     """Compute battle power directly from card DB stats.
     Formula: average of 5 stats (0-100 each) + rarity bonus -> range 0-135."""
@@ -9,6 +9,7 @@ import discord
 from discord.ext import commands
 from discord import Interaction, app_commands
 from database import DatabaseManager, get_db
+from cards_config import normalize_pack_tier
 import json
 import uuid
 from typing import List, Dict, Optional
@@ -305,6 +306,7 @@ class AdminBulkImportCog(commands.Cog):
         description = pack_data.get('description', f"Imported pack - {name}")
         pack_size = len(pack_data['cards'])
         price_cents = pack_data.get('price_cents', 699)
+        pack_tier = normalize_pack_tier(pack_data.get('pack_tier'))
 
         # Stat ranges by rarity (for auto-generation when not provided)
         RARITY_STAT_RANGES = {
@@ -345,9 +347,9 @@ class AdminBulkImportCog(commands.Cog):
             cursor.execute("""
                 INSERT INTO creator_packs
                 (pack_id, creator_id, name, description, pack_size, status, cards_data,
-                 published_at, price_cents, stripe_payment_id)
-                VALUES (?, ?, ?, ?, ?, 'LIVE', ?, CURRENT_TIMESTAMP, ?, 'ADMIN_IMPORT')
-            """, (pack_id, creator_id, name, description, pack_size, cards_json, price_cents))
+                 published_at, price_cents, pack_tier, stripe_payment_id)
+                VALUES (?, ?, ?, ?, ?, 'LIVE', ?, CURRENT_TIMESTAMP, ?, ?, 'ADMIN_IMPORT')
+            """, (pack_id, creator_id, name, description, pack_size, cards_json, price_cents, pack_tier))
 
             # Add cards to master card list
             for card_data in pack_data['cards']:
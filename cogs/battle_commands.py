@@ -13,7 +13,7 @@ from discord.ext import commands
 from discord import Interaction, app_commands, ui
 from typing import Optional
 
-from battle_engine import BattleManager, BattleEngine, BattleWagerConfig
+from battle_engine import BattleEngine, BattleHistory, BattleWagerConfig, get_battle_manager
 from discord_cards import ArtistCard
 from database import get_db
 from config.economy import BATTLE_WAGERS, calculate_battle_rewards
@@ -21,8 +21,11 @@ from cards_config import RARITY_EMOJI as CARD_RARITY_EMOJI, RARITY_BONUS, comput
 from ui.brand import GOLD, PURPLE, BLUE, PINK, GREEN, LOGO_URL
 
 
-# Shared battle manager (per-bot instance)
-_battle_manager = BattleManager()
+# Shared battle manager (per-process; shared across shards with BATTLE_STORE=redis)
+_battle_manager = get_battle_manager()
+
+# Seconds between sweeps for battles that outlived their TTL
+EXPIRY_SWEEP_INTERVAL = 60
 
 
 class WagerSelect(ui.Select):
@@ -187,6 +190,29 @@ class BattleCommands(commands.Cog):
         self.bot = bot
         self.db = get_db()
         self.manager = _battle_manager
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    async def cog_load(self):
+        # Only a shared store keeps battles (and their claims on both players) past their TTL
+        if self.manager.durable:
+            self._sweep_task = asyncio.create_task(self._expiry_sweep_loop())
+
+    async def cog_unload(self):
+        if self._sweep_task:
+            self._sweep_task.cancel()
+
+    async def _expiry_sweep_loop(self):
+        """Refund wagers of battles that outlived their TTL, on any shard"""
+        while True:
+            await asyncio.sleep(EXPIRY_SWEEP_INTERVAL)
+            try:
+                for match in self.manager.expire_stale():
+                    wager = match.wager_config["wager_cost"]
+                    self._add_gold(int(match.player1.user_id), wager)
+                    self._add_gold(int(match.player2.user_id), wager)
+                    print(f"[BATTLE] Expired {match.match_id} — refunded {wager}g to both players")
+            except Exception as e:
+                print(f"[BATTLE] Expiry sweep failed: {e}")
 
     # ------------------------------------------------------------------
     # Helpers
@@ -424,8 +450,9 @@ class BattleCommands(commands.Cog):
             await interaction.followup.send(f"{opponent.display_name} doesn't have enough gold — battle cancelled.")
             return
 
-        # Register both players in the battle manager so is_user_in_battle() works
-        self.manager.create_match(
+        # Register both players in the battle manager so is_user_in_battle() works.
+        # The claim is atomic, so a battle started meanwhile (e.g. on another shard) wins.
+        match = self.manager.create_match(
             match_id=match_id,
             player1_id=str(interaction.user.id),
             player1_name=interaction.user.display_name,
@@ -433,11 +460,17 @@ class BattleCommands(commands.Cog):
             player2_name=opponent.display_name,
             wager_tier=tier_key,
         )
-        # Persist to DB — if bot restarts before this battle completes,
-        # on_ready will refund both wagers automatically.
-        self.db.persist_active_battle(
-            match_id, interaction.user.id, opponent.id, wager_cost, tier_key
-        )
+        if match is None:
+            self._add_gold(interaction.user.id, wager_cost)
+            self._add_gold(opponent.id, wager_cost)
+            await interaction.followup.send("One of you is already in another battle — wagers refunded.")
+            return
+        # A shared store is itself the crash-recovery record; otherwise persist to DB
+        # so on_ready refunds both wagers if the bot restarts mid-battle.
+        if not self.manager.durable:
+            self.db.persist_active_battle(
+                match_id, interaction.user.id, opponent.id, wager_cost, tier_key
+            )
 
         rewards_distributed = False
         try:
@@ -452,8 +485,9 @@ class BattleCommands(commands.Cog):
             if not rewards_distributed:
                 self._add_gold(interaction.user.id, wager_cost)
                 self._add_gold(opponent.id, wager_cost)
-                # Clear DB row BEFORE raise — prevents double refund if bot dies
-                # between here and the finally block.
+                # Clear the recovery record BEFORE raise — prevents double refund
+                # if bot dies between here and the finally block.
+                self.manager.complete_match(match_id)
                 self.db.clear_active_battle(match_id)
                 try:
                     await interaction.followup.send(
@@ -930,6 +964,12 @@ class BattleCommands(commands.Cog):
         embed.add_field(name="💀 Losses", value=str(losses), inline=True)
         embed.add_field(name="🎮 Total", value=str(total), inline=True)
         embed.add_field(name="📈 Win Rate", value=f"{win_rate:.1f}%", inline=True)
+        try:
+            history = BattleHistory.load(self.db, target.id)
+            if history.recent:
+                embed.add_field(name="🕑 Recent Battles", value="\n".join(history.recent_lines()), inline=False)
+        except Exception as e:
+            print(f"[BATTLE] Could not load battle history: {e}")
         embed.set_footer(text="🎵 Music Legends")
 
         await interaction.response.send_message(embed=embed)
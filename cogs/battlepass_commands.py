@@ -82,26 +82,12 @@ class BattlePassCommands(commands.Cog):
             """, (user_id, json.dumps(claimed), json.dumps(claimed)))
             conn.commit()
 
-    def _ensure_season_table(self):
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS season_progress (
-                    user_id INTEGER PRIMARY KEY,
-                    claimed_tiers TEXT DEFAULT '[]',
-                    quest_progress TEXT DEFAULT '{}',
-                    last_quest_reset TEXT
-                )
-            """)
-            conn.commit()
-
     # ------------------------------------------------------------------
     # /battlepass
     # ------------------------------------------------------------------
 
     @app_commands.command(name="battlepass", description="View your Battle Pass progress and rewards")
     async def battlepass_command(self, interaction: Interaction):
-        self._ensure_season_table()
         data = self._get_user_bp_data(interaction.user.id)
         xp = data['xp']
         has_premium = data['has_premium']
@@ -172,7 +158,6 @@ class BattlePassCommands(commands.Cog):
     @app_commands.command(name="claim_bp", description="Claim a Battle Pass tier reward")
     @app_commands.describe(tier="The tier number to claim")
     async def claim_bp_command(self, interaction: Interaction, tier: int):
-        self._ensure_season_table()
         data = self._get_user_bp_data(interaction.user.id)
         current_tier = self.bp.calculate_tier_from_xp(data['xp'])
 
@@ -6,8 +6,6 @@ from discord.ext.commands import Cog
 from discord import Interaction, app_commands, ui
 from database import DatabaseManager, get_db
 from card_data import CardDataManager
-import stripe
-from stripe_payments import stripe_manager
 import random
 import uuid
 from typing import List, Dict
@@ -458,15 +456,8 @@ class CardGameCog(Cog):
             
             # Update pack status to LIVE and add cards data
             print(f"🔥 DEBUG: Updating pack {pack_id} status to LIVE with {len(cards_created)} cards")
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE creator_packs 
-                    SET status = 'LIVE', published_at = CURRENT_TIMESTAMP, cards_data = ?
-                    WHERE pack_id = ?
-                """, (json.dumps(cards_created), pack_id))
-                conn.commit()
-                print(f"🔥 DEBUG: Pack status updated to LIVE successfully")
+            self.db.mark_pack_live(pack_id, cards_data=cards_created)
+            print(f"🔥 DEBUG: Pack status updated to LIVE successfully")
             self.db.add_to_dev_supply(pack_id)
             
             # Trigger backup after pack is published to marketplace
@@ -620,6 +611,8 @@ class CardGameCog(Cog):
         
         # Create Stripe Checkout for subscription
         try:
+            import stripe
+            import stripe_payments  # configures stripe.api_key
             checkout_session = stripe.checkout.Session.create(
                 payment_method_types=['card'],
                 mode='subscription',
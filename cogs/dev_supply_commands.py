@@ -7,6 +7,11 @@ from database import get_db
 from cards_config import RARITY_EMOJI, RARITY_BONUS, compute_card_power, compute_team_power
 
 from config import settings
+from services.query_metrics import get_query_metrics, query_metrics
+from services.sharding import shard_metrics
+from services.drop_engine import get_drop_engine
+from services.drop_spawner import get_drop_spawner
+from services.send_queue import send_queue
 
 
 def _is_dev(user_id: int) -> bool:
@@ -339,6 +344,102 @@ class DevSupplyCog(commands.Cog):
         embed.set_footer(text="TEST ONLY — no gold or XP was actually awarded")
         await interaction.followup.send(embed=embed)
 
+    @app_commands.command(name="dev_db_metrics", description="[DEV] Query counts and latency by DB method and command")
+    @app_commands.describe(top="Rows per table (default 10)", reset="Reset counters after showing them")
+    async def dev_db_metrics(self, interaction: Interaction, top: int = 10, reset: bool = False):
+        if not _is_dev(interaction.user.id):
+            await interaction.response.send_message("❌ Unauthorized.", ephemeral=True)
+            return
+
+        top = max(1, min(top, 20))
+        metrics = get_query_metrics(top)
+        if reset:
+            query_metrics.reset()
+
+        totals = metrics["totals"]
+        embed = discord.Embed(
+            title="🗄️ DB Query Metrics",
+            description=(
+                f"Since {metrics['since'][:19]} UTC\n"
+                f"**{totals['statements']:,}** statements, **{totals['sql_ms']:,.0f} ms** in SQL"
+            ),
+            color=discord.Color.blue(),
+        )
+        method_lines = [
+            f"`{m['name'].split('.', 1)[-1]}` {m['calls']}× · {m['avg_statements']} q/call · "
+            f"max {m['max_statements']} · {m['avg_wall_ms']} ms"
+            for m in metrics["methods"]
+        ]
+        scope_lines = [
+            f"`{s['name']}` {s['count']}× · {s['avg_statements']} q · max {s['max_statements']}"
+            + (f" · ⚠️ N+1 ×{s['n_plus_one']}" if s["n_plus_one"] else "")
+            for s in metrics["scopes"]
+        ]
+        slow_lines = [f"{q['ms']} ms `{q['method'] or q['scope'] or '?'}`" for q in metrics["slow_queries"][-5:]]
+        embed.add_field(name="By method (statements)", value="\n".join(method_lines)[:1024] or "—", inline=False)
+        embed.add_field(name="By command / route", value="\n".join(scope_lines)[:1024] or "—", inline=False)
+        embed.add_field(name=f"Slow (≥{metrics['slow_query_ms']:.0f} ms)", value="\n".join(slow_lines)[:1024] or "—", inline=False)
+        if reset:
+            embed.set_footer(text="Counters reset")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="dev_shards", description="[DEV] Gateway latency, events, leadership and drops per shard")
+    async def dev_shards(self, interaction: Interaction):
+        if not _is_dev(interaction.user.id):
+            await interaction.response.send_message("❌ Unauthorized.", ephemeral=True)
+            return
+
+        metrics = shard_metrics.snapshot(self.bot)
+        leadership = getattr(self.bot, "leadership", None)
+        status = leadership.status() if leadership else {}
+        embed = discord.Embed(
+            title="🛰️ Shards",
+            description=(
+                f"Process `{metrics['process']}` · up {metrics['uptime_s'] / 60:.0f} min\n"
+                f"**{metrics['gateway_events']:,}** gateway events ({metrics['gateway_events_per_min']}/min)\n"
+                f"Leader: **{'yes' if status.get('is_leader') else 'no'}** "
+                f"({status.get('backend', '?')}, holder `{status.get('holder') or status.get('identity', '?')}`)"
+            ),
+            color=discord.Color.blue(),
+        )
+        shard_lines = [
+            f"`#{s['shard_id']}` {s['latency_ms'] if s['latency_ms'] is not None else '—'} ms · "
+            f"{s['events']:,} events ({s['events_per_min']}/min) · "
+            f"{s['disconnects']} disc · {s['resumes']} resumes"
+            for s in metrics["shards"]
+        ]
+        embed.add_field(name="Shards in this process", value="\n".join(shard_lines)[:1024] or "—", inline=False)
+        drops = get_drop_engine().status()
+        spawner = get_drop_spawner().status()
+        embed.add_field(
+            name=f"Drops ({drops['backend']} store)",
+            value=(
+                f"{drops['active']} open · {drops['spawned_last_min']} spawned / "
+                f"{drops['claimed_last_min']} claimed last min\n"
+                f"{drops['spawned']:,} spawned ({drops['spawned_per_min']}/min) · "
+                f"{drops['claimed']:,} claimed ({drops['claimed_per_min']}/min) · "
+                f"{drops['expired']:,} expired · {drops['contended']:,} lost races\n"
+                f"Activity: {spawner['guilds']:,} guilds scored · {spawner['spawned']:,} spawned "
+                f"(budget {spawner['budget']}/tick)"
+            ),
+            inline=False,
+        )
+        queue = send_queue.status()
+        lanes = ", ".join(f"{lane} {depth}" for lane, depth in queue["lanes"].items() if depth) or "empty"
+        embed.add_field(
+            name="Send queue",
+            value=(
+                f"{queue['depth']} queued ({lanes}) · "
+                f"{queue['in_flight']}/{queue['concurrency']} in flight\n"
+                f"{queue['sent']:,} sent · {queue['failed']:,} failed · **{queue['rate_limited']:,}** 429s "
+                f"({queue['retries']:,} retried, {queue['buckets_limited']} buckets waiting)\n"
+                f"{queue['coalesced']:,} alerts folded into {queue['digests']:,} digests · "
+                f"wait avg {queue['wait_avg_ms']} ms / max {queue['wait_max_ms']} ms"
+            ),
+            inline=False,
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(DevSupplyCog(bot))
@@ -346,14 +346,7 @@ class DevWebhookCommandsCog(commands.Cog):
                     continue
             
             # Publish pack
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE creator_packs 
-                    SET status = 'LIVE', published_at = CURRENT_TIMESTAMP
-                    WHERE pack_id = ?
-                """, (pack_id,))
-                conn.commit()
+            self.db.mark_pack_live(pack_id)
             self.db.add_to_dev_supply(pack_id)
             
             # Trigger backup
@@ -1,7 +1,7 @@
 # cogs/dust_commands.py
 """
 Dust Economy Commands
-/dust, /craft, /boost, /reroll, /buy_pack_dust
+/dust, /dust_duplicates, /craft, /boost, /reroll, /buy_pack_dust
 """
 
 import discord
@@ -10,6 +10,7 @@ from discord.ext import commands
 from typing import Optional
 from services.dust_economy import dust_economy
 from services.duplicate_manager import duplicate_manager
+from database import get_db
 
 
 class DustCommandsCog(commands.Cog):
@@ -69,6 +70,45 @@ class DustCommandsCog(commands.Cog):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
+    @app_commands.command(name="dust_duplicates", description="Dust every duplicate copy above the number you keep")
+    @app_commands.describe(keep="Copies of each card to keep (default 1)")
+    async def dust_duplicates(self, interaction: Interaction, keep: Optional[int] = 1):
+        """Dust all duplicates in one batch"""
+        
+        await interaction.response.defer(ephemeral=True)
+        keep = max(1, keep or 1)
+        result = get_db().dust_cards_batch(str(interaction.user.id), keep=keep, ledger="user_dust")
+        
+        if not result["success"]:
+            embed = discord.Embed(
+                title="❌ Nothing Dusted",
+                description=result["error"],
+                color=discord.Color.red()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title="💎 Duplicates Dusted",
+            description=f"Converted **{result['cards_dusted']}** card(s) into "
+                        f"**{result['total_dust']:,}** dust\n"
+                        f"**Balance:** {result['dust_balance']:,} dust",
+            color=discord.Color.gold()
+        )
+        
+        top = sorted(result["breakdown"], key=lambda item: item["dust"], reverse=True)[:10]
+        lines = [
+            f"**{item['name'] or item['card_id']}** ({item['rarity'].title()}) "
+            f"×{item['quantity']} → {item['dust']} dust"
+            for item in top
+        ]
+        if len(result["breakdown"]) > len(top):
+            lines.append(f"...and {len(result['breakdown']) - len(top)} more")
+        embed.add_field(name="🎴 Breakdown", value="\n".join(lines), inline=False)
+        embed.set_footer(text=f"Kept {keep} cop{'y' if keep == 1 else 'ies'} of each card")
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
     @app_commands.command(name="craft", description="Craft a specific card using dust")
     @app_commands.describe(
         artist="Artist name",
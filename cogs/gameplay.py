@@ -1,10 +1,13 @@
 # cogs/gameplay.py
+import asyncio
 import discord
 from discord.ext import commands
 from discord import Interaction, app_commands, ui
 import random
 from card_economy import CardEconomyManager
 from database import DatabaseManager, get_db
+from services.drop_engine import get_drop_engine
+from services.drop_spawner import get_drop_spawner
 from ui.brand import GOLD, PURPLE, BLUE, PINK, GREEN, NAVY, LOGO_URL, BANNER_URL, power_tier
 from cards_config import compute_card_power
 
@@ -14,7 +17,11 @@ from config import settings
 
 
 class CardDropView(discord.ui.View):
-    """Button view for pack drops — first click claims the full pack."""
+    """Button view for pack drops — first click claims the full pack.
+
+    The drop lives in the drop engine: a claim is a compare-and-set on its
+    record, and the engine's expiry sweep (not a per-view timer) expires it.
+    """
 
     TIER_COLORS = {
         "community": discord.Color.light_gray(),
@@ -23,17 +30,24 @@ class CardDropView(discord.ui.View):
     }
     TIER_EMOJI = {"community": "⚪", "gold": "🟡", "platinum": "🟣"}
 
-    def __init__(self, pack: dict, db, timeout: int = 300):
-        super().__init__(timeout=timeout)
+    def __init__(self, pack: dict, db, timeout: int = 300, server_id=None, channel_id=None):
+        super().__init__(timeout=None)
         self.pack = pack
         self.db = db
         self.claimed_by = None
         self.message = None
+        self.engine = get_drop_engine()
+        # Explicit dev / welcome drops don't start the server's drop cooldown
+        self.drop = self.engine.spawn(server_id, channel_id, {"pack_id": pack["pack_id"]},
+                                      ttl=timeout, cooldown=0)
+        self.engine.on_expire(self.drop["drop_id"], self.on_expire)
 
     @discord.ui.button(label="🎁 Claim Pack!", style=discord.ButtonStyle.success)
     async def claim_button(self, interaction: Interaction, button: discord.ui.Button):
-        if self.claimed_by is not None:
-            await interaction.response.send_message("Already claimed!", ephemeral=True)
+        claim = self.engine.claim(self.drop["drop_id"], interaction.user.id)
+        if not claim["success"]:
+            message = "Already claimed!" if claim["reason"] == "taken" else "⏰ This drop has expired."
+            await interaction.response.send_message(message, ephemeral=True)
             return
 
         self.claimed_by = interaction.user.id
@@ -52,7 +66,8 @@ class CardDropView(discord.ui.View):
             )
             embed.set_footer(text="Check /collection for your new cards!")
         else:
-            # Reset claim so another user can try, and report the error
+            # Release the claim so another user can try, and report the error
+            self.engine.release(self.drop["drop_id"], interaction.user.id)
             self.claimed_by = None
             button.disabled = False
             button.label = "🎁 Claim Pack!"
@@ -86,8 +101,10 @@ class CardDropView(discord.ui.View):
 
         self.stop()
 
-    async def on_timeout(self):
-        if self.claimed_by is None and self.message:
+    async def on_expire(self, drop: dict):
+        """Called by the drop engine's expiry sweep when nobody claimed the pack"""
+        self.stop()
+        if self.message:
             for child in self.children:
                 child.disabled = True
                 child.label = "Expired"
@@ -360,7 +377,38 @@ class GameplayCommands(commands.Cog):
         self.bot = bot
         self.db = get_db()
         self.economy = CardEconomyManager()
-        self.economy.initialize_economy_tables()
+
+    async def cog_load(self):
+        # One sweep on the cron scheduler expires every unclaimed drop view
+        await get_drop_engine().start_expiry()
+        # Activity drops: message counts feed the spawner, which calls back here
+        spawner = get_drop_spawner()
+        spawner.attach(self.bot, self._spawn_activity_drop)
+        await spawner.start()
+
+    async def _spawn_activity_drop(self, guild_id: str, channel_id: str) -> bool:
+        """Send a community pack drop to an active channel (run by the send queue)"""
+        channel = self.bot.get_channel(int(channel_id))
+        if channel is None:
+            return False
+        pack = await asyncio.to_thread(self.db.get_random_live_pack_by_tier, "community")
+        if not pack:
+            return False
+
+        embed = discord.Embed(
+            title="⚪ ACTIVITY DROP! ⚪",
+            description=f"**{pack['name']}**\nThis server's been busy — first to click claims all {pack['pack_size']} cards!",
+            color=BLUE,
+        )
+        embed.set_author(name="Music Legends", icon_url=LOGO_URL)
+        if pack.get("genre"):
+            embed.add_field(name="🎵 Genre", value=pack["genre"], inline=True)
+        embed.add_field(name="🎴 Cards", value=str(pack["pack_size"]), inline=True)
+        embed.set_footer(text="🎵 Music Legends • Activity drop • Expires in 5 min")
+
+        view = CardDropView(pack=pack, db=self.db, timeout=300, server_id=guild_id, channel_id=channel_id)
+        view.message = await channel.send(embed=embed, view=view)
+        return True
         
     def _get_power_tier(self, power: int) -> str:
         """Get power tier description based on power level"""
@@ -450,7 +498,8 @@ class GameplayCommands(commands.Cog):
         drop_embed.add_field(name="🎴 Cards", value=str(pack["pack_size"]), inline=True)
         drop_embed.set_footer(text=f"🎵 Music Legends • Dropped by {interaction.user.display_name} • Expires in 5 min")
 
-        view = CardDropView(pack=pack, db=self.db, timeout=300)
+        view = CardDropView(pack=pack, db=self.db, timeout=300,
+                            server_id=interaction.guild_id, channel_id=interaction.channel_id)
         await msg.edit(embed=drop_embed, view=view)
         view.message = msg
 
@@ -1195,7 +1244,7 @@ class CardUpgradeView(ui.View):
                     SELECT c.card_id, c.name, c.rarity
                     FROM cards c
                     JOIN user_cards uc ON c.card_id = uc.card_id
-                    WHERE uc.user_id = ? AND LOWER(c.rarity) = ?
+                    WHERE uc.user_id = ? AND c.rarity = ?
                 """, (self.user_id, self.source_rarity))
                 cols = [d[0] for d in cursor.description]
                 return [dict(zip(cols, r)) for r in cursor.fetchall()]
@@ -1224,7 +1273,7 @@ class CardUpgradeView(ui.View):
 
             # Award one card of the target rarity (random from DB)
             cursor.execute(
-                "SELECT card_id, name FROM cards WHERE LOWER(rarity) = ? ORDER BY RANDOM() LIMIT 1",
+                "SELECT card_id, name FROM cards WHERE rarity = ? ORDER BY RANDOM() LIMIT 1",
                 (self.target_rarity,))
             new_card = cursor.fetchone()
             if new_card:
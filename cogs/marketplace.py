@@ -7,6 +7,7 @@ import json
 import uuid
 import math
 from database import DatabaseManager, get_db
+from services.pack_cache import pack_cache, pack_detail_key
 
 # Genre metadata
 GENRE_EMOJI = {
@@ -28,51 +29,65 @@ PACKS_PER_PAGE = 5
 # ─── Helper: fetch packs for a genre (or all) with pagination ───────────────
 
 def _fetch_packs(db, genre: str | None, offset: int, limit: int):
-    """Return (packs_list, total_count) for the given genre filter."""
+    """Return (packs_list, total_count) for the given genre filter.
+
+    Rows are (pack_id, name, description, card_count, genre); the page and
+    the total come back from a single query."""
+    where = "WHERE status = 'LIVE'" + (" AND genre = ?" if genre else "")
+    params = ((genre,) if genre else ()) + (limit, offset)
     with db._get_connection() as conn:
         cursor = conn.cursor()
-        if genre:
-            cursor.execute(
-                "SELECT COUNT(*) FROM creator_packs WHERE status = 'LIVE' AND genre = ?",
-                (genre,),
-            )
-            total = cursor.fetchone()[0]
-            cursor.execute("""
-                SELECT pack_id, name, description, cards_data, genre
-                FROM creator_packs
-                WHERE status = 'LIVE' AND genre = ?
-                ORDER BY name
-                LIMIT ? OFFSET ?
-            """, (genre, limit, offset))
+        cursor.execute(f"""
+            SELECT pack_id, name, description, cards_data, genre,
+                   COUNT(*) OVER () AS total
+            FROM creator_packs
+            {where}
+            ORDER BY name
+            LIMIT ? OFFSET ?
+        """, params)
+        rows = cursor.fetchall()
+        if rows:
+            total = rows[0][5]
         else:
-            cursor.execute(
-                "SELECT COUNT(*) FROM creator_packs WHERE status = 'LIVE'"
-            )
+            cursor.execute(f"SELECT COUNT(*) FROM creator_packs {where}", (genre,) if genre else ())
             total = cursor.fetchone()[0]
-            cursor.execute("""
-                SELECT pack_id, name, description, cards_data, genre
-                FROM creator_packs
-                WHERE status = 'LIVE'
-                ORDER BY name
-                LIMIT ? OFFSET ?
-            """, (limit, offset))
-        packs = cursor.fetchall()
+    # Decode cards_data once here instead of in every embed/view builder
+    packs = [
+        (pack_id, name, description, len(json.loads(cards_data)) if cards_data else 0, pack_genre)
+        for pack_id, name, description, cards_data, pack_genre, _ in rows
+    ]
     return packs, total
 
 
 def _fetch_pack_detail(db, pack_id: str):
-    """Return a single pack row or None."""
+    """Return a single LIVE pack row or None. The pack's content (name,
+    description, cards, genre) comes from the pack cache; price and tier can be
+    changed without a pack event, so they are read fresh."""
+    def load():
+        with db._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT pack_id, name, description, cards_data, genre
+                FROM creator_packs
+                WHERE pack_id = ? AND status = 'LIVE'
+            """, (pack_id,))
+            row = cursor.fetchone()
+            return list(row) if row else None
+
+    content = pack_cache.get(pack_detail_key(pack_id), load)
+    if not content:
+        return None
     with db._get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT pack_id, name, description, cards_data, genre,
-                   COALESCE(price_cents, 299) AS price_cents,
+            SELECT COALESCE(price_cents, 299) AS price_cents,
                    COALESCE(price_gold, 500) AS price_gold,
                    COALESCE(pack_tier, 'community') AS pack_tier
             FROM creator_packs
             WHERE pack_id = ? AND status = 'LIVE'
         """, (pack_id,))
-        return cursor.fetchone()
+        pricing = cursor.fetchone()
+    return tuple(content) + tuple(pricing) if pricing else None
 
 
 # ─── Helper: build embed for pack list page ─────────────────────────────────
@@ -87,13 +102,12 @@ def _build_pack_list_embed(packs, genre, page, total_pages, total_count):
         color=discord.Color.gold(),
     )
 
-    for pack_id, name, description, cards_data, pack_genre in packs:
-        cards = json.loads(cards_data) if cards_data else []
+    for pack_id, name, description, card_count, pack_genre in packs:
         pack_emoji = GENRE_EMOJI.get(pack_genre, "📦")
         desc_short = (description[:80] + "...") if description and len(description) > 80 else (description or "No description")
         embed.add_field(
             name=f"{pack_emoji} {name}",
-            value=f"{len(cards)} cards | {desc_short}",
+            value=f"{card_count} cards | {desc_short}",
             inline=False,
         )
 
@@ -221,13 +235,12 @@ class PackBrowserView(discord.ui.View):
         # Pack select dropdown (row 0)
         if self.packs:
             options = []
-            for pack_id, name, desc, cards_data, genre in self.packs:
-                cards = json.loads(cards_data) if cards_data else []
+            for pack_id, name, desc, card_count, genre in self.packs:
                 label = name[:100] if name else "Unknown Pack"
                 options.append(discord.SelectOption(
                     label=label,
                     value=pack_id,
-                    description=f"{len(cards)} cards",
+                    description=f"{card_count} cards",
                     emoji=GENRE_EMOJI.get(genre, "📦"),
                 ))
 
@@ -155,14 +155,7 @@ async def finalize_pack_with_cards(
                 continue
         
         # Publish pack
-        with db._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE creator_packs 
-                SET status = 'LIVE', published_at = CURRENT_TIMESTAMP
-                WHERE pack_id = ?
-            """, (pack_id,))
-            conn.commit()
+        db.mark_pack_live(pack_id)
         db.add_to_dev_supply(pack_id)
         
         # Trigger backup after pack is published to marketplace
@@ -20,6 +20,8 @@ import threading
 from collections import deque
 import discord
 
+from services.send_queue import ALERT, route_for, send_queue
+
 
 # ==========================================
 # EVENT SEVERITY LEVELS
@@ -387,6 +389,63 @@ class SecurityEventLogger:
 # DISCORD ALERT HANDLER
 # ==========================================
 
+def _security_alert_embed(entries: List[Dict], severity: EventSeverity) -> discord.Embed:
+    """Alert embed for the latest entry; a digest of repeats when there are several"""
+    log_entry = entries[-1]
+    color_map = {
+        EventSeverity.WARNING: discord.Color.yellow(),
+        EventSeverity.CRITICAL: discord.Color.red(),
+        EventSeverity.EMERGENCY: discord.Color.dark_red()
+    }
+    
+    title = f"🚨 Security Alert - {severity.value}"
+    if len(entries) > 1:
+        title += f" (×{len(entries)})"
+    embed = discord.Embed(
+        title=title,
+        description=f"**Event:** {log_entry.get('event_type', 'Unknown')}",
+        color=color_map.get(severity, discord.Color.orange()),
+        timestamp=datetime.fromisoformat(log_entry.get('timestamp', ''))
+    )
+    
+    if len(entries) > 1:
+        users = sorted({e['user_id'] for e in entries if e.get('user_id')})
+        embed.add_field(
+            name="Occurrences",
+            value=f"{len(entries)} since {entries[0].get('timestamp', '')[11:19]}"
+                  + (f"\nUsers: {', '.join(f'<@{u}>' for u in users[:10])}" if users else ""),
+            inline=False
+        )
+    elif log_entry.get('user_id'):
+        embed.add_field(
+            name="User",
+            value=f"<@{log_entry.get('user_id')}>",
+            inline=True
+        )
+    
+    if log_entry.get('ip_address'):
+        embed.add_field(
+            name="IP Address",
+            value=f"`{log_entry.get('ip_address')}`",
+            inline=True
+        )
+    
+    # Add details
+    details = log_entry.get('details', {})
+    if details:
+        details_str = "\n".join([
+            f"• **{k}:** {v}" for k, v in list(details.items())[:5]
+        ])
+        embed.add_field(
+            name="Details",
+            value=details_str or "No additional details",
+            inline=False
+        )
+    
+    embed.set_footer(text=f"Event ID: {log_entry.get('timestamp')[:10]}")
+    return embed
+
+
 async def discord_security_alert_handler(
     log_entry: Dict,
     severity: EventSeverity,
@@ -395,49 +454,11 @@ async def discord_security_alert_handler(
     """Send security alerts to Discord channel"""
     
     try:
-        color_map = {
-            EventSeverity.WARNING: discord.Color.yellow(),
-            EventSeverity.CRITICAL: discord.Color.red(),
-            EventSeverity.EMERGENCY: discord.Color.dark_red()
-        }
-        
-        embed = discord.Embed(
-            title=f"🚨 Security Alert - {severity.value}",
-            description=f"**Event:** {log_entry.get('event_type', 'Unknown')}",
-            color=color_map.get(severity, discord.Color.orange()),
-            timestamp=datetime.fromisoformat(log_entry.get('timestamp', ''))
+        await send_queue.submit(
+            lambda: alert_channel.send(embed=_security_alert_embed([log_entry], severity)),
+            priority=ALERT, route=route_for(alert_channel)
         )
         
-        if log_entry.get('user_id'):
-            embed.add_field(
-                name="User",
-                value=f"<@{log_entry.get('user_id')}>",
-                inline=True
-            )
-        
-        if log_entry.get('ip_address'):
-            embed.add_field(
-                name="IP Address",
-                value=f"`{log_entry.get('ip_address')}`",
-                inline=True
-            )
-        
-        # Add details
-        details = log_entry.get('details', {})
-        if details:
-            details_str = "\n".join([
-                f"• **{k}:** {v}" for k, v in list(details.items())[:5]
-            ])
-            embed.add_field(
-                name="Details",
-                value=details_str or "No additional details",
-                inline=False
-            )
-        
-        embed.set_footer(text=f"Event ID: {log_entry.get('timestamp')[:10]}")
-        
-        await alert_channel.send(embed=embed)
-        
     except Exception as e:
         print(f"❌ [ALERT] Failed to send Discord alert: {e}")
 
@@ -468,9 +489,16 @@ def setup_discord_alerts(bot: discord.Client, alert_channel_name: str = "securit
                 if channel.name == alert_channel_name:
                     print(f"✅ [SECURITY] Discord alerts enabled in #{channel.name}")
                     
-                    # Create async handler
-                    async def handler(log_entry, severity):
-                        await discord_security_alert_handler(log_entry, severity, channel)
+                    # Handlers run on the logger's alert thread: hand each alert to the
+                    # send queue on the bot's loop, folding repeats into one digest
+                    send_queue.bind()
+                    
+                    def handler(log_entry, severity):
+                        send_queue.post_digest(
+                            (channel.id, log_entry.get('event_type'), severity.value), log_entry,
+                            lambda entries: channel.send(embed=_security_alert_embed(entries, severity)),
+                            priority=ALERT, route=route_for(channel)
+                        )
                     
                     security_logger.register_alert_handler(handler)
                     return
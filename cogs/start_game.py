@@ -170,7 +170,8 @@ class StartGameCog(commands.Cog):
                     drop_embed.add_field(name="Genre", value=pack["genre"], inline=True)
                 drop_embed.set_footer(text="Welcome drop! • Expires in 5 min")
 
-                view = CardDropView(pack=pack, db=self.db, timeout=300)
+                view = CardDropView(pack=pack, db=self.db, timeout=300,
+                                    server_id=interaction.guild_id, channel_id=interaction.channel_id)
                 msg = await interaction.followup.send(embed=drop_embed, view=view)
                 view.message = msg
         except Exception as e:
@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     DISCORD_TOKEN: Optional[str] = Field(None, validation_alias=AliasChoices('DISCORD_TOKEN', 'BOT_TOKEN'))
     DISCORD_APPLICATION_ID: Optional[int] = None
     TEST_SERVER_ID: Optional[int] = None
+    # Sharding: unset runs every shard in this process; SHARD_IDS runs a slice of SHARD_COUNT
+    SHARD_COUNT: Optional[int] = None
+    SHARD_IDS: Optional[List[int]] = []
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
 
@@ -72,13 +75,13 @@ class Settings(BaseSettings):
     LOGS_CHANNEL: Optional[int] = None
 
     @validator('TEST_SERVER_ID', 'DISCORD_APPLICATION_ID', 'DEV_CHANNEL_ID',
-               'ADMIN_CHANNEL_ID', 'LOGS_CHANNEL', pre=True)
+               'ADMIN_CHANNEL_ID', 'LOGS_CHANNEL', 'SHARD_COUNT', pre=True)
     def _parse_optional_int(cls, v: Any) -> Optional[int]:
         if v == '' or v is None:
             return None
         return int(v)
 
-    @validator('DEV_USER_IDS', pre=True)
+    @validator('DEV_USER_IDS', 'SHARD_IDS', pre=True)
     def _parse_dev_user_ids(cls, v: Any) -> list[int]:
         if isinstance(v, (int, float)):
             return [int(v)]
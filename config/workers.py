@@ -0,0 +1,32 @@
+# config/workers.py
+
+# Worker pools run by rq_queue.supervisor. Each pool gets its own worker
+# processes; queues inside a pool are listed in priority order (RQ drains
+# the first queue before looking at the next). Keeping trades out of the
+# pack pool means a slow pack opening never delays a trade finalization.
+WORKER_POOLS = {
+    "trade": {
+        "queues": ["trade", "burn"],
+        "min": 1,
+        "max": 3,
+    },
+    "pack": {
+        "queues": ["pack"],
+        "min": 1,
+        "max": 4,
+    },
+    "background": {
+        "queues": ["drop", "event"],
+        "min": 1,
+        "max": 2,
+    },
+}
+
+AUTOSCALE = {
+    "CHECK_INTERVAL": 10,         # seconds between queue depth checks
+    "JOBS_PER_WORKER": 10,        # queued jobs one worker is expected to absorb
+    "SCALE_DOWN_AFTER": 6,        # consecutive low checks before removing a worker
+    "DRAIN_TIMEOUT": 60,          # seconds to let in-flight jobs finish on shutdown
+    "LATENCY_SAMPLE": 50,         # finished jobs sampled per queue for latency stats
+    "REPORT_INTERVAL": 60,        # seconds between stats log lines
+}
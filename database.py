@@ -1,7 +1,9 @@
+import base64
 import json
 import logging
 import os
 import sqlite3
+import threading
 import time
 import uuid
 from datetime import datetime, timedelta
@@ -9,6 +11,7 @@ from typing import Dict, List, Optional, Tuple, Union
 
 from sqlalchemy import (
     Boolean,
+    case,
     Column,
     create_engine,
     DateTime,
@@ -16,6 +19,7 @@ from sqlalchemy import (
     ForeignKey,
     Integer,
     String,
+    or_,
     text,
 )
 from sqlalchemy.orm import sessionmaker, Session
@@ -24,14 +28,20 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.sql import exists
 
 from models import (
-    Base,
     User, UserBalances, PackPurchase, CreatorPacks, Card, UserCard,
     DevPackSupply, CardInstance, CreatorPackLimits, TradeHistory,
     UserBattleStats, CosmeticCatalog, UserCosmetic, CardCosmetic, BattleLog,
     TmaLinkCode, MarketplaceListings, VipStatus, PendingTmaBattle,
-    CreatorPackCards, TelegramHost, RevenueEvent,
+    CreatorPackCards, TelegramHost, RevenueEvent, GuildActivity, card_power_sql,
 )
 from models.trade import Trade
+from cards_config import normalize_pack_tier, normalize_rarity, normalize_tier
+from services.pack_cache import DAILY_POOL_KEY, PackCache, pack_cache, pack_key, card_key
+from services.matchmaking import MatchmakingIndex, team_power_from_cards
+from services.query_metrics import query_metrics
+from services.battle_history import BattleHistoryStore
+from services.write_behind import WriteBehindBuffer
+from services.schema import create_runtime_schema, ensure_schema
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -72,8 +82,9 @@ class Database:
         return self._Session
 
     def init_database(self):
-        """Alias for _create_tables_if_not_exists (used by test fixtures)."""
-        self._create_tables_if_not_exists()
+        """(Re)create any missing tables in place (used by test fixtures)."""
+        with self._engine.begin() as conn:
+            create_runtime_schema(conn)
 
     def _initialize(self, database_url: str):
         if self._engine is not None:
@@ -103,152 +114,34 @@ class Database:
             self._db_type = "postgresql"
             self._engine = create_engine(database_url)
 
+        query_metrics.attach(self._engine)
         self._Session = sessionmaker(bind=self._engine)
-        self._create_tables_if_not_exists()
-
-    def _migrate_user_id_to_varchar(self, conn, sa_text):
-        """One-time migration: convert users.user_id from BIGINT → VARCHAR on Railway.
-        Handles FK constraints automatically."""
-        try:
-            row = conn.execute(sa_text(
-                "SELECT data_type FROM information_schema.columns "
-                "WHERE table_name='users' AND column_name='user_id' AND table_schema='public'"
-            )).fetchone()
-            if not row or row[0] != 'bigint':
-                return  # Already VARCHAR or not PostgreSQL
-            logger.info("[MIGRATE] users.user_id is BIGINT — migrating to VARCHAR...")
-
-            # Find FK constraints referencing users.user_id
-            fk_rows = conn.execute(sa_text("""
-                SELECT kcu.constraint_name, kcu.table_name AS fk_table, kcu.column_name AS fk_col
-                FROM information_schema.key_column_usage kcu
-                JOIN information_schema.referential_constraints rc
-                     ON kcu.constraint_name = rc.constraint_name
-                JOIN information_schema.key_column_usage kcu2
-                     ON rc.unique_constraint_name = kcu2.constraint_name
-                WHERE kcu2.table_name = 'users' AND kcu2.column_name = 'user_id'
-            """)).fetchall()
-
-            # Drop FK constraints
-            for fk_name, fk_table, fk_col in fk_rows:
-                conn.execute(sa_text(f'ALTER TABLE "{fk_table}" DROP CONSTRAINT IF EXISTS "{fk_name}"'))
-                logger.info(f"[MIGRATE] Dropped FK {fk_name} on {fk_table}.{fk_col}")
-
-            # Alter FK columns in referencing tables to VARCHAR
-            for fk_name, fk_table, fk_col in fk_rows:
-                conn.execute(sa_text(
-                    f'ALTER TABLE "{fk_table}" ALTER COLUMN "{fk_col}" TYPE VARCHAR USING "{fk_col}"::text'
-                ))
-                logger.info(f"[MIGRATE] Altered {fk_table}.{fk_col} → VARCHAR")
-
-            # Alter users.user_id itself
-            conn.execute(sa_text('ALTER TABLE users ALTER COLUMN user_id TYPE VARCHAR USING user_id::text'))
-            logger.info("[MIGRATE] Altered users.user_id → VARCHAR")
-
-            # Re-add FK constraints
-            for fk_name, fk_table, fk_col in fk_rows:
-                conn.execute(sa_text(
-                    f'ALTER TABLE "{fk_table}" ADD CONSTRAINT "{fk_name}" '
-                    f'FOREIGN KEY ("{fk_col}") REFERENCES users(user_id)'
-                ))
-                logger.info(f"[MIGRATE] Re-added FK {fk_name}")
-
-            conn.commit()
-            logger.info("[MIGRATE] users.user_id → VARCHAR migration complete")
-        except Exception as e:
-            conn.rollback()
-            logger.warning(f"[MIGRATE] user_id type migration failed (may already be VARCHAR): {e}")
-
-    def _create_tables_if_not_exists(self):
-        """Create tables that don't exist, then add any missing columns to existing tables."""
-        from sqlalchemy import inspect, text as sa_text
-        Base.metadata.create_all(self._engine)
-        # Auto-migrate: add columns present in models but missing from the DB
-        inspector = inspect(self._engine)
-        with self._engine.connect() as conn:
-            # Create active_battles table (not in ORM models, managed via raw SQL)
-            conn.execute(sa_text("""
-                CREATE TABLE IF NOT EXISTS active_battles (
-                    match_id TEXT PRIMARY KEY,
-                    player1_id TEXT NOT NULL,
-                    player2_id TEXT NOT NULL,
-                    wager_amount INTEGER NOT NULL DEFAULT 0,
-                    tier_key TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            # Backward-compat: older deployments may have active_battles without tier_key.
-            try:
-                active_cols = {col["name"] for col in inspector.get_columns("active_battles")}
-                if "tier_key" not in active_cols:
-                    conn.execute(sa_text('ALTER TABLE active_battles ADD COLUMN tier_key TEXT'))
-                    conn.commit()
-                    logger.info("[MIGRATE] Added column active_battles.tier_key")
-            except Exception as e:
-                conn.rollback()
-                logger.warning(f"[MIGRATE] Skipped active_battles.tier_key migration: {e}")
-            # Legacy economy table still used by several Discord cogs via raw SQL.
-            conn.execute(sa_text("""
-                CREATE TABLE IF NOT EXISTS user_inventory (
-                    user_id TEXT PRIMARY KEY,
-                    gold INTEGER DEFAULT 0,
-                    dust INTEGER DEFAULT 0,
-                    tickets INTEGER DEFAULT 0,
-                    gems INTEGER DEFAULT 0,
-                    xp INTEGER DEFAULT 0,
-                    level INTEGER DEFAULT 1,
-                    total_cards INTEGER DEFAULT 0,
-                    last_daily_claim TIMESTAMP,
-                    daily_streak INTEGER DEFAULT 0
-                )
-            """))
-            conn.execute(sa_text("""
-                CREATE TABLE IF NOT EXISTS battle_registry (
-                    user_id TEXT PRIMARY KEY,
-                    telegram_id BIGINT UNIQUE NOT NULL,
-                    username TEXT,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """))
-            conn.execute(sa_text(
-                "CREATE INDEX IF NOT EXISTS idx_battle_registry_active_seen "
-                "ON battle_registry(is_active, last_seen DESC)"
+        self._init_identity_cache()
+        # The shared pack/card cache belongs to the app database; test instances get their own
+        self._pack_cache = pack_cache if Database._instance is self else PackCache(use_redis=False)
+        self._matchmaking = MatchmakingIndex()
+        self._matchmaking_synced_at: Optional[datetime] = None
+        self._matchmaking_lock = threading.Lock()
+        self._battle_history = BattleHistoryStore(self.get_session, self._db_type)
+        # Schema is created by `python migrate.py`; this only checks it is at head
+        ensure_schema(self._engine)
+
+    def backfill_catalog(self) -> None:
+        """Canonical rarity/tier/pack_tier values and stored power for catalog
+        rows written with raw SQL (seeders), which bypass the ORM listeners."""
+        from sqlalchemy import update as sa_update
+        with self._engine.begin() as conn:
+            conn.execute(sa_update(Card).where(Card.power.is_(None)).values(power=card_power_sql()))
+            conn.execute(text(
+                "UPDATE cards SET rarity = LOWER(TRIM(rarity)) WHERE rarity <> LOWER(TRIM(rarity))"
+            ))
+            conn.execute(text(
+                "UPDATE cards SET tier = LOWER(TRIM(tier)) WHERE tier <> LOWER(TRIM(tier))"
+            ))
+            conn.execute(text(
+                "UPDATE creator_packs SET pack_tier = COALESCE(NULLIF(LOWER(TRIM(pack_tier)), ''), 'community') "
+                "WHERE pack_tier IS NULL OR pack_tier <> LOWER(TRIM(pack_tier)) OR TRIM(pack_tier) = ''"
             ))
-            conn.commit()
-            # PostgreSQL only: fix users.user_id type from BIGINT → VARCHAR
-            if self._engine.dialect.name == 'postgresql':
-                self._migrate_user_id_to_varchar(conn, sa_text)
-
-            for table in Base.metadata.sorted_tables:
-                if not inspector.has_table(table.name):
-                    continue
-                existing = {col["name"] for col in inspector.get_columns(table.name)}
-                for col in table.columns:
-                    if col.name in existing:
-                        continue
-                    # Build ADD COLUMN statement
-                    col_type = col.type.compile(dialect=self._engine.dialect)
-                    nullable = "" if col.nullable else " NOT NULL"
-                    default = ""
-                    if col.default is not None and col.default.is_scalar:
-                        val = col.default.arg
-                        if isinstance(val, bool):
-                            default = " DEFAULT TRUE" if val else " DEFAULT FALSE"
-                        elif isinstance(val, (int, float)):
-                            default = f" DEFAULT {val}"
-                        elif isinstance(val, str):
-                            default = f" DEFAULT '{val}'"
-                    try:
-                        conn.execute(sa_text(
-                            f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}{default}'
-                        ))
-                        conn.commit()
-                        logger.info(f"[MIGRATE] Added column {table.name}.{col.name}")
-                    except Exception as e:
-                        conn.rollback()
-                        logger.warning(f"[MIGRATE] Skipped {table.name}.{col.name}: {e}")
 
     def get_session(self) -> Session:
         """Returns a new SQLAlchemy session."""
@@ -806,15 +699,16 @@ class Database:
         finally:
             session.close()
 
-    def get_battle_logs_for_user(self, user_id: str) -> List[BattleLog]:
+    def get_battle_logs_for_user(self, user_id: str, limit: int = 50) -> List[BattleLog]:
         session = self.get_session()
         try:
             return (
                 session.query(BattleLog)
                 .filter(
-                    (BattleLog.player_a_id == user_id) | (BattleLog.player_b_id == user_id)
+                    (BattleLog.player1_id == str(user_id)) | (BattleLog.player2_id == str(user_id))
                 )
-                .order_by(desc(BattleLog.completed_at))
+                .order_by(desc(BattleLog.battle_timestamp))
+                .limit(limit)
                 .all()
             )
         finally:
@@ -846,37 +740,12 @@ class Database:
                 session.close()
 
     def get_match_history(self, player_id: str, limit: int = 10) -> List[Dict]:
-        """Retrieves match history for a given player."""
-        session = self.get_session()
+        """Retrieves the latest battles for a given player (see get_battle_history)."""
         try:
-            matches = (
-                session.query(BattleLog)
-                .filter(
-                    (BattleLog.player_a_id == player_id) | (BattleLog.player_b_id == player_id)
-                )
-                .order_by(desc(BattleLog.completed_at))
-                .limit(limit)
-                .all()
-            )
-
-            history = []
-            for match in matches:
-                history.append({
-                    "match_id": match.match_id,
-                    "player_a_id": match.player_a_id,
-                    "player_b_id": match.player_b_id,
-                    "winner_id": match.winner_id,
-                    "final_score_a": match.final_score_a,
-                    "final_score_b": match.final_score_b,
-                    "completed_at": match.completed_at.isoformat() if match.completed_at else None,
-                    "match_type": match.match_type,
-                })
-            return history
+            return self.get_battle_history(player_id, limit=limit)["battles"]
         except Exception as e:
             logger.error(f"Error retrieving match history for player {player_id}: {e}")
             return []
-        finally:
-            session.close()
 
     def get_leaderboard(self, limit: int = 10) -> List[Dict]:
         """Retrieves top players based on battle statistics."""
@@ -1140,15 +1009,96 @@ class Database:
     # Offset added to Telegram IDs so they never collide with Discord snowflakes
     _TG_OFFSET = 9_000_000_000
 
+    # Telegram identity cache + write-behind presence updates.
+    # Resolved telegram_id -> user_id mappings are cached per process, and the
+    # username/last_active refresh that used to commit on every request is
+    # buffered and flushed in bulk every _PRESENCE_FLUSH_SECONDS.
+    _TG_IDENTITY_TTL = int(os.environ.get("TMA_IDENTITY_CACHE_SECONDS", "600"))
+    _PRESENCE_FLUSH_SECONDS = float(os.environ.get("TMA_PRESENCE_FLUSH_SECONDS", "15"))
+
+    def _init_identity_cache(self):
+        from cachetools import TTLCache
+        self._tg_identity_cache = TTLCache(maxsize=100_000, ttl=self._TG_IDENTITY_TTL)
+        self._tg_identity_lock = threading.Lock()
+        self._presence_buffer = WriteBehindBuffer(
+            "tg-presence", self._write_telegram_presence, self._PRESENCE_FLUSH_SECONDS
+        )
+        self._inventory_sync_buffer = WriteBehindBuffer(
+            "inventory-sync", self._write_inventory_sync, self._INVENTORY_SYNC_SECONDS,
+            merge=self._merge_inventory_sync,
+        )
+
+    def _remember_tg_identity(self, telegram_id: int, user_id: str, username: str):
+        with self._tg_identity_lock:
+            self._tg_identity_cache[telegram_id] = {"user_id": user_id, "username": username}
+
+    def forget_tg_identity(self, telegram_id: int):
+        """Drop a cached identity (e.g. after an account merge)."""
+        with self._tg_identity_lock:
+            self._tg_identity_cache.pop(telegram_id, None)
+
+    def _forget_tg_link(self, user_id: str, discord_tag: Optional[str]):
+        """Forget the cached identity of the Telegram user a row belonged to,
+        from its telegram:<id> tag or its offset user_id."""
+        tag = discord_tag or ""
+        if tag.startswith("telegram:") and tag[len("telegram:"):].isdigit():
+            self.forget_tg_identity(int(tag[len("telegram:"):]))
+        if str(user_id).isdigit() and int(user_id) > self._TG_OFFSET:
+            self.forget_tg_identity(int(user_id) - self._TG_OFFSET)
+
+    def _queue_presence(self, user_id: str, username: str, discord_tag: Optional[str] = None):
+        """Buffer a username/last_active refresh for the next flush."""
+        def fold(entry):
+            entry = entry or {"user_id": user_id}
+            entry["username"] = username
+            entry["last_active"] = datetime.utcnow()
+            if discord_tag:
+                entry["discord_tag"] = discord_tag
+            return entry
+
+        self._presence_buffer.update(user_id, fold)
+
+    def flush_telegram_presence(self) -> int:
+        """Write buffered presence updates with one bulk UPDATE. Returns rows written."""
+        return self._presence_buffer.flush()
+
+    def _write_telegram_presence(self, pending: Dict[str, dict]) -> int:
+        from sqlalchemy import update as sa_update
+
+        rows = list(pending.values())
+        session = self.get_session()
+        try:
+            session.execute(sa_update(User), rows)
+            session.commit()
+            return len(rows)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
     def get_or_create_telegram_user(
         self, telegram_id: int, telegram_username: str = "", first_name: str = ""
     ) -> dict:
         """Return (or create) the internal user for a Telegram user.
         user_id = str(9_000_000_000 + telegram_id) — pure digits, fits BIGINT.
-        Returns dict: user_id, username, telegram_id, is_new."""
+        Returns dict: user_id, username, telegram_id, is_new.
+
+        Known users are served from the identity cache without touching the
+        database; their username/last_active refresh is written behind."""
         offset_user_id = str(self._TG_OFFSET + telegram_id)
         legacy_user_id = str(telegram_id)
         username = telegram_username or first_name or f"user_{telegram_id}"
+
+        with self._tg_identity_lock:
+            cached = self._tg_identity_cache.get(telegram_id)
+        if cached:
+            self._queue_presence(cached["user_id"], username)
+            if cached["username"] != username:
+                self._remember_tg_identity(telegram_id, cached["user_id"], username)
+            return {"user_id": cached["user_id"], "username": username,
+                    "telegram_id": telegram_id, "is_new": False}
+
         session = self.get_session()
         try:
             # Prefer offset ID, but support legacy telegram-id rows for backward compatibility.
@@ -1162,14 +1112,13 @@ class Database:
 
             if user:
                 # Keep Telegram identity fresh so partner search can prioritize active players.
-                if username:
-                    user.username = username
+                fix_tag = None
                 if not (user.discord_tag or "").startswith("telegram:"):
-                    user.discord_tag = f"telegram:{telegram_id}"
-                user.last_active = datetime.utcnow()
-                session.commit()
+                    fix_tag = f"telegram:{telegram_id}"
+                self._queue_presence(resolved_user_id, username, discord_tag=fix_tag)
+                self._remember_tg_identity(telegram_id, resolved_user_id, username)
                 # Use pre-computed user_id string (not user.user_id which may be int if DB column is BIGINT)
-                return {"user_id": resolved_user_id, "username": user.username,
+                return {"user_id": resolved_user_id, "username": username,
                         "telegram_id": telegram_id, "is_new": False}
             # Create user + balance row
             user = User(user_id=offset_user_id, username=username, discord_tag=f"telegram:{telegram_id}")
@@ -1178,6 +1127,7 @@ class Database:
             balances = UserBalances(user_id=offset_user_id)
             session.add(balances)
             session.commit()
+            self._remember_tg_identity(telegram_id, offset_user_id, username)
             return {"user_id": offset_user_id, "username": username,
                     "telegram_id": telegram_id, "is_new": True}
         except IntegrityError:
@@ -1203,6 +1153,33 @@ class Database:
         finally:
             session.close()
 
+    def telegram_id_of(self, user: Optional[User]) -> Optional[int]:
+        """Best-effort Telegram ID of a users row across legacy/new schemas."""
+        if not user:
+            return None
+
+        tag = (user.discord_tag or "").strip()
+        if tag.startswith("telegram:"):
+            try:
+                return int(tag.split(":", 1)[1])
+            except Exception:
+                return None
+
+        try:
+            uid = int(str(user.user_id))
+        except Exception:
+            return None
+
+        # New schema: offset id.
+        if uid >= self._TG_OFFSET:
+            return uid - self._TG_OFFSET
+
+        # Legacy Telegram IDs are much smaller than Discord snowflakes.
+        if 1_000_000 <= uid <= 9_999_999_999:
+            return uid
+
+        return None
+
     def get_telegram_user_by_id(self, telegram_id: int) -> Optional[dict]:
         """Look up an internal user by their Telegram ID."""
         offset_user_id = str(self._TG_OFFSET + telegram_id)
@@ -1225,28 +1202,220 @@ class Database:
         user = self.get_or_create_telegram_user(telegram_id, username, first_name)
         uname = user.get("username") or username or first_name or f"user_{telegram_id}"
         now = datetime.utcnow()
+        team_power = self.get_team_power(user["user_id"])
         with self._engine.connect() as conn:
             conn.execute(text(
                 """
-                INSERT INTO battle_registry (user_id, telegram_id, username, is_active, registered_at, last_seen)
-                VALUES (:uid, :tid, :uname, TRUE, :now, :now)
+                INSERT INTO battle_registry (user_id, telegram_id, username, is_active, registered_at, last_seen, team_power)
+                VALUES (:uid, :tid, :uname, TRUE, :now, :now, :power)
                 ON CONFLICT (telegram_id)
                 DO UPDATE SET
                     user_id = excluded.user_id,
                     username = excluded.username,
                     is_active = TRUE,
-                    last_seen = excluded.last_seen
+                    last_seen = excluded.last_seen,
+                    team_power = excluded.team_power
                 """
-            ), {"uid": str(user["user_id"]), "tid": int(telegram_id), "uname": uname, "now": now})
+            ), {"uid": str(user["user_id"]), "tid": int(telegram_id), "uname": uname,
+                "now": now, "power": team_power})
             conn.commit()
+        self._matchmaking.upsert(telegram_id, user["user_id"], uname, team_power, now)
         return {
             "success": True,
             "user_id": str(user["user_id"]),
             "telegram_id": int(telegram_id),
             "username": uname,
+            "team_power": team_power,
             "registered_at": now.isoformat(),
         }
 
+    def get_team_power(self, user_id) -> int:
+        """Team power of the strongest squad in a user's collection."""
+        cards = self.query_user_collection(user_id, limit=5, fields=["card_id"])["cards"]
+        return team_power_from_cards(c["power"] for c in cards)
+
+    # Other processes register players too; pull their rows at most this often
+    _MATCHMAKING_REFRESH_SECONDS = 15
+
+    def _sync_matchmaking(self):
+        """Load (first call) or incrementally refresh the matchmaking index from battle_registry."""
+        now = datetime.utcnow()
+        with self._matchmaking_lock:
+            synced_at = self._matchmaking_synced_at
+            if synced_at and (now - synced_at).total_seconds() < self._MATCHMAKING_REFRESH_SECONDS:
+                return
+            self._matchmaking_synced_at = now
+        # Overlap the window slightly so rows committed during the last sync aren't missed
+        since = (synced_at - timedelta(seconds=5)) if synced_at else now - self._matchmaking.active_window
+        try:
+            with self._engine.connect() as conn:
+                rows = conn.execute(text(
+                    "SELECT user_id, telegram_id, username, team_power, last_seen "
+                    "FROM battle_registry WHERE is_active = TRUE AND last_seen >= :since"
+                ), {"since": since}).fetchall()
+        except Exception as e:
+            logger.error(f"[TMA] matchmaking sync error: {e}")
+            return
+        for r in rows:
+            last_seen = r[4]
+            if isinstance(last_seen, str):
+                last_seen = datetime.fromisoformat(last_seen)
+            self._matchmaking.upsert(int(r[1]), str(r[0]), r[2], r[3] or 0, last_seen)
+        self._matchmaking.prune(now)
+
+    def find_battle_opponents(self, telegram_id: int, limit: int = 10) -> List[dict]:
+        """Recently active registered players closest to the caller's team power."""
+        self._sync_matchmaking()
+        me = self._matchmaking.get(telegram_id)
+        if me:
+            power = me["power"]
+        else:
+            # Read-only: get_or_create would queue a presence write of the placeholder username
+            user = self.get_telegram_user_by_id(telegram_id)
+            power = self.get_team_power(user["user_id"]) if user else 0
+        return self._matchmaking.nearest(power, limit, exclude=[telegram_id])
+
+    @staticmethod
+    def _prefix_range(term: str) -> Tuple[str, str]:
+        """[lo, hi) bounds matching every string that starts with term."""
+        return term, term + "\uffff"
+
+    @staticmethod
+    def _contains_pattern(term: str) -> str:
+        """LIKE pattern matching term anywhere, with %, _ and \\ escaped (escape='\\')."""
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{escaped}%"
+
+    def search_battle_players(self, term: str, exclude_telegram_id: Optional[int] = None,
+                              limit: int = 50, substring: bool = False) -> List[dict]:
+        """Search registered players: exact id/username, then username prefix
+        (index, then database), then username/id substring among recently active
+        players (index). substring=True also scans battle_registry for
+        username/id substrings, which can't use an index."""
+        term = (term or "").strip().lower().lstrip("@")
+        if not term:
+            return self.list_registered_battle_players(exclude_telegram_id, limit=limit)
+        self._sync_matchmaking()
+        exclude = [exclude_telegram_id] if exclude_telegram_id is not None else []
+
+        results: Dict[int, dict] = {}
+        if term.isdigit():
+            hit = self._matchmaking.get(int(term)) or self.get_registered_battle_player(int(term))
+            if hit and int(hit["telegram_id"]) not in exclude:
+                results[int(hit["telegram_id"])] = hit
+
+        for p in self._matchmaking.prefix_search(term, limit, exclude):
+            results.setdefault(p["telegram_id"], p)
+        if len(results) < limit:
+            lo, hi = self._prefix_range(term)
+            query = (
+                "SELECT user_id, telegram_id, username, team_power, last_seen "
+                "FROM battle_registry WHERE is_active = TRUE "
+                "AND lower(username) >= :lo AND lower(username) < :hi "
+            )
+            params: Dict[str, Union[int, str]] = {"lo": lo, "hi": hi, "lim": int(limit)}
+            if exclude_telegram_id is not None:
+                query += "AND telegram_id != :exclude_tid "
+                params["exclude_tid"] = int(exclude_telegram_id)
+            query += "ORDER BY last_seen DESC LIMIT :lim"
+            with self._engine.connect() as conn:
+                rows = conn.execute(text(query), params).fetchall()
+            for r in rows:
+                results.setdefault(int(r[1]), {
+                    "user_id": str(r[0]),
+                    "telegram_id": int(r[1]),
+                    "username": r[2] or f"user_{r[1]}",
+                    "power": r[3] or 0,
+                    "last_seen": r[4].isoformat() if hasattr(r[4], "isoformat") else r[4],
+                })
+        if len(results) < limit:
+            for p in self._matchmaking.substring_search(term, limit, exclude):
+                results.setdefault(p["telegram_id"], p)
+        if substring and len(results) < limit:
+            # Registered players who have not been seen inside the index's window
+            query = (
+                "SELECT user_id, telegram_id, username, team_power, last_seen "
+                "FROM battle_registry WHERE is_active = TRUE "
+                "AND (lower(username) LIKE :pattern ESCAPE '\\' "
+                "OR CAST(telegram_id AS TEXT) LIKE :pattern ESCAPE '\\') "
+            )
+            params = {"pattern": self._contains_pattern(term), "lim": int(limit)}
+            if exclude_telegram_id is not None:
+                query += "AND telegram_id != :exclude_tid "
+                params["exclude_tid"] = int(exclude_telegram_id)
+            query += "ORDER BY last_seen DESC LIMIT :lim"
+            with self._engine.connect() as conn:
+                rows = conn.execute(text(query), params).fetchall()
+            for r in rows:
+                results.setdefault(int(r[1]), {
+                    "user_id": str(r[0]),
+                    "telegram_id": int(r[1]),
+                    "username": r[2] or f"user_{r[1]}",
+                    "power": r[3] or 0,
+                    "last_seen": r[4].isoformat() if hasattr(r[4], "isoformat") else r[4],
+                })
+
+        ranked = sorted(
+            results.values(),
+            key=lambda p: (
+                0 if (str(p.get("username") or "").lower() == term or str(p["telegram_id"]) == term)
+                else 1 if str(p.get("username") or "").lower().startswith(term) else 2
+            ),
+        )
+        return ranked[:limit]
+
+    def search_players(self, term: str, limit: int = 50, exclude_user_id: Optional[str] = None,
+                       substring: bool = False) -> List[User]:
+        """Search all users by exact Telegram id or username prefix, most recently
+        active first within each group. substring=True also matches Telegram id and
+        username substrings; those scan the users table."""
+        term = (term or "").strip().lower().lstrip("@")
+        session = self.get_session()
+        try:
+            base = session.query(User)
+            if exclude_user_id is not None:
+                base = base.filter(User.user_id != str(exclude_user_id))
+            if not term:
+                return base.order_by(desc(User.last_active)).limit(limit).all()
+
+            found: Dict[str, User] = {}
+            pattern = self._contains_pattern(term)
+            if term.isdigit():
+                tid = int(term)
+                for u in base.filter(
+                    (User.discord_tag == f"telegram:{tid}")
+                    | User.user_id.in_([str(self._TG_OFFSET + tid), str(tid)])
+                ).limit(limit):
+                    found[str(u.user_id)] = u
+            if term.isdigit() and substring:
+                # Telegram ids containing the term; the candidate filter is loose
+                # for offset user_ids, so each row's id is checked
+                candidates = (
+                    base.filter(User.discord_tag.like(f"telegram:{pattern}", escape="\\")
+                                | User.user_id.like(pattern, escape="\\"))
+                    .order_by(desc(User.last_active)).limit(limit * 10)
+                )
+                for u in candidates:
+                    if len(found) >= limit:
+                        break
+                    if term in str(self.telegram_id_of(u) or ""):
+                        found.setdefault(str(u.user_id), u)
+            lo, hi = self._prefix_range(term)
+            lowered = func.lower(User.username)
+            for u in (base.filter(lowered >= lo, lowered < hi)
+                      .order_by(desc(User.last_active)).limit(limit)):
+                found.setdefault(str(u.user_id), u)
+            if substring and len(found) < limit:
+                for u in (base.filter(lowered.like(pattern, escape="\\"))
+                          .order_by(desc(User.last_active)).limit(limit)):
+                    found.setdefault(str(u.user_id), u)
+            return list(found.values())[:limit]
+        except Exception as e:
+            logger.error(f"[TMA] search_players error: {e}")
+            return []
+        finally:
+            session.close()
+
     def get_registered_battle_player(self, telegram_id: int) -> Optional[dict]:
         with self._engine.connect() as conn:
             row = conn.execute(text(
@@ -1311,10 +1480,10 @@ class Database:
             card_ids: List[str] = []
             out: List[Dict] = []
             for _ in range(n):
-                target = random.choice(rarity_pool).lower()
+                target = random.choice(rarity_pool)
                 rows = (
                     session.query(Card)
-                    .filter(func.lower(Card.rarity) == target)
+                    .filter(Card.rarity == target)
                     .limit(300)
                     .all()
                 )
@@ -1451,10 +1620,12 @@ class Database:
             user_id = row.user_id
             # Store discord link on the user row
             user = session.query(User).filter_by(user_id=user_id).first()
+            previous_tag = user.discord_tag if user else None
             if user:
                 user.discord_tag = f"discord:{discord_id}"
             session.delete(row)
             session.commit()
+            self._forget_tg_link(user_id, previous_tag)
             return {"success": True, "user_id": user_id, "discord_id": discord_id}
         except Exception as e:
             session.rollback()
@@ -1463,85 +1634,299 @@ class Database:
         finally:
             session.close()
 
+    # Fields a collection query can project; card_id and power are always returned.
+    COLLECTION_FIELDS = (
+        "card_id", "name", "artist_name", "title", "image_url", "youtube_url",
+        "rarity", "tier", "variant", "era", "impact", "skill", "longevity",
+        "culture", "hype", "power", "quantity", "is_favorite", "acquired_at",
+    )
+    COLLECTION_SORTS = ("power", "rarity", "acquired_at", "name")
+    _STAT_FIELDS = ("impact", "skill", "longevity", "culture", "hype")
+
+    @staticmethod
+    def _collection_columns() -> dict:
+        columns = {
+            name: getattr(Card, name)
+            for name in ("card_id", "name", "artist_name", "title", "image_url", "youtube_url",
+                         "rarity", "tier", "variant", "era", "impact", "skill", "longevity",
+                         "culture", "hype")
+        }
+        columns["quantity"] = UserCard.quantity
+        columns["is_favorite"] = UserCard.is_favorite
+        columns["acquired_at"] = UserCard.acquired_at
+        # Stored power, falling back to the SQL formula for rows not yet backfilled
+        columns["power"] = func.coalesce(Card.power, card_power_sql())
+        return columns
+
+    @staticmethod
+    def _collection_sort_key(sort: str, columns: dict):
+        from cards_config import RARITY_BONUS
+        if sort == "power":
+            return columns["power"]
+        if sort == "rarity":
+            return case(
+                {rarity: rank for rank, rarity in enumerate(RARITY_BONUS)},
+                value=Card.rarity,
+                else_=0,
+            )
+        if sort == "acquired_at":
+            return func.coalesce(UserCard.acquired_at, datetime(1970, 1, 1))
+        if sort == "name":
+            return Card.name
+        raise ValueError(f"Unknown sort '{sort}'")
+
+    @staticmethod
+    def _encode_collection_cursor(sort: str, value, card_id: str) -> str:
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        raw = json.dumps([sort, value, card_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_collection_cursor(cursor: str, sort: str):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_sort, value, card_id = json.loads(raw)
+        except Exception:
+            raise ValueError("Invalid cursor")
+        if cursor_sort != sort:
+            raise ValueError("Cursor does not match sort")
+        if sort == "acquired_at":
+            value = datetime.fromisoformat(value)
+        return value, card_id
+
+    def _collection_row(self, row, names) -> dict:
+        card = dict(zip(names, row))
+        for stat in self._STAT_FIELDS:
+            if stat in card:
+                card[stat] = card[stat] or 50
+        if card.get("acquired_at") is not None:
+            card["acquired_at"] = card["acquired_at"].isoformat()
+        return card
+
+    def query_user_collection(
+        self,
+        user_id,
+        sort: str = "power",
+        descending: bool = True,
+        rarity: Optional[Union[str, List[str]]] = None,
+        tier: Optional[str] = None,
+        search: Optional[str] = None,
+        favorites_only: bool = False,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """Page through a user's collection with sorting done in the database.
+
+        Results are ordered by ``sort`` then card_id. ``cursor`` is the
+        ``next_cursor`` of the previous page (keyset pagination, so deep pages
+        cost the same as the first). ``fields`` limits the columns fetched.
+        ``total`` is only counted for the first page.
+
+        Returns {"cards": [...], "next_cursor": str | None, "total": int | None}.
+        Raises ValueError for an unknown sort, field or a malformed cursor."""
+        from sqlalchemy import and_, or_
+
+        if sort not in self.COLLECTION_SORTS:
+            raise ValueError(f"Unknown sort '{sort}'")
+        columns = self._collection_columns()
+        if fields:
+            unknown = set(fields) - set(columns)
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+            names = ["card_id", "power"] + [f for f in dict.fromkeys(fields) if f not in ("card_id", "power")]
+        else:
+            names = list(self.COLLECTION_FIELDS)
+        sort_key = self._collection_sort_key(sort, columns)
+        after = self._decode_collection_cursor(cursor, sort) if cursor else None
+
+        session = self.get_session()
+        try:
+            filters = [UserCard.user_id.in_(self._user_id_variants(user_id))]
+            if rarity:
+                rarities = [rarity] if isinstance(rarity, str) else list(rarity)
+                filters.append(Card.rarity.in_([normalize_rarity(r) for r in rarities]))
+            if tier:
+                filters.append(Card.tier == normalize_tier(tier))
+            if search:
+                pattern = f"%{search}%"
+                filters.append(or_(Card.name.ilike(pattern), Card.artist_name.ilike(pattern),
+                                   Card.title.ilike(pattern)))
+            if favorites_only:
+                filters.append(UserCard.is_favorite.is_(True))
+
+            total = None
+            if after is None:
+                total = (
+                    session.query(func.count())
+                    .select_from(UserCard)
+                    .join(Card, UserCard.card_id == Card.card_id)
+                    .filter(*filters)
+                    .scalar()
+                )
+
+            query = (
+                session.query(*[columns[name] for name in names], sort_key)
+                .select_from(UserCard)
+                .join(Card, UserCard.card_id == Card.card_id)
+                .filter(*filters)
+            )
+            if after is not None:
+                value, card_id = after
+                if descending:
+                    query = query.filter(or_(sort_key < value,
+                                             and_(sort_key == value, Card.card_id < card_id)))
+                else:
+                    query = query.filter(or_(sort_key > value,
+                                             and_(sort_key == value, Card.card_id > card_id)))
+            if descending:
+                query = query.order_by(sort_key.desc(), Card.card_id.desc())
+            else:
+                query = query.order_by(sort_key.asc(), Card.card_id.asc())
+
+            if limit is not None:
+                rows = query.limit(limit + 1).all()
+            else:
+                rows = query.all()
+
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = self._encode_collection_cursor(sort, last[-1], last[0])
+
+            cards = [self._collection_row(row[:-1], names) for row in rows]
+            return {"cards": cards, "next_cursor": next_cursor, "total": total}
+        except Exception as e:
+            logger.error(f"[TMA] query_user_collection error: {e}")
+            return {"cards": [], "next_cursor": None, "total": 0}
+        finally:
+            session.close()
+
     def get_user_collection(self, user_id) -> List[dict]:
-        """Return all cards owned by a user as enrichable dicts."""
-        user_ids = self._user_id_variants(user_id)
+        """Return all cards owned by a user as enrichable dicts, strongest first."""
+        return self.query_user_collection(user_id)["cards"]
+
+    def get_user_card(self, user_id, card_id: str) -> Optional[dict]:
+        """Return one owned card (primary-key lookup), or None."""
+        columns = self._collection_columns()
+        names = list(self.COLLECTION_FIELDS)
         session = self.get_session()
         try:
-            rows = (
-                session.query(UserCard, Card)
+            row = (
+                session.query(*[columns[name] for name in names])
+                .select_from(UserCard)
                 .join(Card, UserCard.card_id == Card.card_id)
-                .filter(UserCard.user_id.in_(user_ids))
-                .all()
+                .filter(UserCard.user_id.in_(self._user_id_variants(user_id)),
+                        UserCard.card_id == card_id)
+                .first()
             )
-            return [
-                {
-                    "card_id":     c.card_id,
-                    "name":        c.name,
-                    "artist_name": c.artist_name,
-                    "title":       c.title,
-                    "image_url":   c.image_url,
-                    "youtube_url": c.youtube_url,
-                    "rarity":      c.rarity,
-                    "tier":        c.tier,
-                    "variant":     c.variant,
-                    "era":         c.era,
-                    "impact":      c.impact or 50,
-                    "skill":       c.skill or 50,
-                    "longevity":   c.longevity or 50,
-                    "culture":     c.culture or 50,
-                    "hype":        c.hype or 50,
-                    "quantity":    uc.quantity,
-                    "is_favorite": uc.is_favorite,
-                    "acquired_at": uc.acquired_at.isoformat() if uc.acquired_at else None,
-                }
-                for uc, c in rows
-            ]
+            return self._collection_row(row, names) if row else None
         except Exception as e:
-            logger.error(f"[TMA] get_user_collection error: {e}")
-            return []
+            logger.error(f"[TMA] get_user_card error: {e}")
+            return None
         finally:
             session.close()
 
-    def _pack_to_dict(self, pack: CreatorPacks, session) -> dict:
-        """Convert a CreatorPacks ORM object into a dict including its card list."""
-        # Get cards via CreatorPackCards join
+    @staticmethod
+    def _pack_card_dict(c: Card) -> dict:
+        return {
+            "card_id":     c.card_id,
+            "name":        c.name,
+            "artist_name": c.artist_name,
+            "title":       c.title,
+            "image_url":   c.image_url,
+            "youtube_url": c.youtube_url,
+            "rarity":      c.rarity,
+            "tier":        c.tier,
+            "impact":      c.impact or 50,
+            "skill":       c.skill or 50,
+            "longevity":   c.longevity or 50,
+            "culture":     c.culture or 50,
+            "hype":        c.hype or 50,
+        }
+
+    def _query_pack_cards(self, session, pack_ids: List[str]) -> Tuple[Dict[str, List[str]], Dict[str, dict]]:
+        """One CreatorPackCards JOIN Card query: ({pack_id: [card_id]}, {card_key: card dict})."""
+        ids_by_pack = {pid: [] for pid in pack_ids}
+        card_entries = {}
         rows = (
-            session.query(Card)
-            .join(CreatorPackCards, Card.card_id == CreatorPackCards.card_id)
-            .filter(CreatorPackCards.pack_id == pack.pack_id)
+            session.query(CreatorPackCards.pack_id, Card)
+            .join(Card, Card.card_id == CreatorPackCards.card_id)
+            .filter(CreatorPackCards.pack_id.in_(pack_ids))
             .all()
         )
-        cards = [
-            {
-                "card_id":     c.card_id,
-                "name":        c.name,
-                "artist_name": c.artist_name,
-                "title":       c.title,
-                "image_url":   c.image_url,
-                "youtube_url": c.youtube_url,
-                "rarity":      c.rarity,
-                "tier":        c.tier,
-                "impact":      c.impact or 50,
-                "skill":       c.skill or 50,
-                "longevity":   c.longevity or 50,
-                "culture":     c.culture or 50,
-                "hype":        c.hype or 50,
+        for pack_id, c in rows:
+            ids_by_pack[pack_id].append(c.card_id)
+            card_entries[card_key(c.card_id)] = self._pack_card_dict(c)
+        return ids_by_pack, card_entries
+
+    def _load_pack_cards(self, session, pack_ids: List[str], cache: bool = True) -> Dict[str, List[dict]]:
+        """Return {pack_id: [card dict]} through the pack/card cache.
+
+        A cold read is one CreatorPackCards JOIN Card query for all missing
+        packs; it also primes the per-card entries. Packs without cards are not
+        cached (their cards may still be backfilled). Pass cache=False to read
+        through a session with uncommitted writes without priming the cache."""
+        if not cache:
+            ids_by_pack, card_entries = self._query_pack_cards(session, pack_ids)
+            return {pid: [card_entries[card_key(cid)] for cid in ids] for pid, ids in ids_by_pack.items()}
+
+        def load(missing_keys):
+            ids_by_pack, card_entries = self._query_pack_cards(
+                session, [key.split(":", 1)[1] for key in missing_keys]
+            )
+            self._pack_cache.set_many(card_entries)
+            return {pack_key(pid): ids for pid, ids in ids_by_pack.items() if ids}
+
+        def load_cards(missing_keys):
+            rows = (
+                session.query(Card)
+                .filter(Card.card_id.in_([key.split(":", 1)[1] for key in missing_keys]))
+                .all()
+            )
+            return {card_key(c.card_id): self._pack_card_dict(c) for c in rows}
+
+        card_ids_by_pack = self._pack_cache.get_many([pack_key(pid) for pid in pack_ids], load)
+        all_card_keys = [card_key(cid) for ids in card_ids_by_pack.values() for cid in ids]
+        cards = self._pack_cache.get_many(all_card_keys, load_cards)
+        result = {}
+        for pid in pack_ids:
+            ids = card_ids_by_pack.get(pack_key(pid), [])
+            result[pid] = [cards[card_key(cid)] for cid in ids if card_key(cid) in cards]
+        return result
+
+    def _packs_to_dicts(self, packs: List[CreatorPacks], session, include_cards: bool = True) -> List[dict]:
+        """Convert CreatorPacks rows into dicts; card lists come from the pack cache
+        (one batched query for whatever isn't cached).
+
+        With include_cards=False only the per-pack card counts are returned."""
+        cards_by_pack = self._load_pack_cards(session, list({p.pack_id for p in packs}))
+
+        result = []
+        for pack in packs:
+            d = {
+                "pack_id":         pack.pack_id,
+                "name":            pack.name,
+                "description":     pack.description,
+                "cover_image_url": pack.cover_image_url,
+                "pack_tier":       pack.pack_tier,
+                "genre":           pack.genre,
             }
-            for c in rows
-        ]
-        return {
-            "pack_id":         pack.pack_id,
-            "name":            pack.name,
-            "description":     pack.description,
-            "cover_image_url": pack.cover_image_url,
-            "pack_tier":       pack.pack_tier,
-            "genre":           pack.genre,
-            "cards":           cards,
-            "card_count":      len(cards),
-        }
+            cards = cards_by_pack.get(pack.pack_id, [])
+            if include_cards:
+                # Copy so packs repeated across purchases don't share card dicts
+                d["cards"] = [dict(c) for c in cards]
+            d["card_count"] = len(cards)
+            result.append(d)
+        return result
 
-    def get_user_purchased_packs(self, user_id, limit: int = 50) -> List[dict]:
+    def _pack_to_dict(self, pack: CreatorPacks, session) -> dict:
+        """Convert a CreatorPacks ORM object into a dict including its card list."""
+        return self._packs_to_dicts([pack], session)[0]
+
+    def get_user_purchased_packs(self, user_id, limit: int = 50, include_cards: bool = True) -> List[dict]:
         """Return packs the user has purchased (opened and unopened)."""
         user_ids = self._user_id_variants(user_id)
         session = self.get_session()
@@ -1554,18 +1939,32 @@ class Database:
                 .limit(limit)
                 .all()
             )
-            result = []
-            for purchase, pack in purchases:
-                d = self._pack_to_dict(pack, session)
+            dicts = self._packs_to_dicts([pack for _, pack in purchases], session, include_cards)
+            for (purchase, _), d in zip(purchases, dicts):
                 d["purchase_id"] = str(purchase.purchase_id)
-                result.append(d)
-            return result
+            return dicts
         except Exception as e:
             logger.error(f"[TMA] get_user_purchased_packs error: {e}")
             return []
         finally:
             session.close()
 
+    def user_owns_pack(self, user_id, pack_id: str) -> bool:
+        """True if the user has a purchase row for pack_id."""
+        session = self.get_session()
+        try:
+            return session.query(
+                exists().where(
+                    PackPurchase.buyer_id.in_(self._user_id_variants(user_id)),
+                    PackPurchase.pack_id == pack_id,
+                )
+            ).scalar()
+        except Exception as e:
+            logger.error(f"[TMA] user_owns_pack error: {e}")
+            return False
+        finally:
+            session.close()
+
     # --- Compatibility helpers for Discord cogs / legacy flows ---
 
     def get_or_create_user(self, user_id, username: str = "", discord_tag: str = "") -> dict:
@@ -1576,6 +1975,7 @@ class Database:
         try:
             user = session.query(User).filter_by(user_id=user_id).first()
             created = False
+            relinked_from = None
             if not user:
                 user = User(user_id=user_id, username=username, discord_tag=discord_tag)
                 session.add(user)
@@ -1583,7 +1983,8 @@ class Database:
             else:
                 if username:
                     user.username = username
-                if discord_tag:
+                if discord_tag and discord_tag != user.discord_tag:
+                    relinked_from = user.discord_tag
                     user.discord_tag = discord_tag
 
             balances = session.query(UserBalances).filter_by(user_id=user_id).first()
@@ -1592,6 +1993,8 @@ class Database:
                 created = True
 
             session.commit()
+            if relinked_from:
+                self._forget_tg_link(user_id, relinked_from)
             return {"user_id": user_id, "username": user.username, "created": created}
         except Exception as e:
             session.rollback()
@@ -1625,13 +2028,14 @@ class Database:
                 creator_id=str(creator_id),
                 description=description,
                 card_count=pack_size,
-                pack_tier=pack_tier,
+                pack_tier=normalize_pack_tier(pack_tier),
                 genre=genre,
                 cover_image_url=cover_image_url,
                 is_public=True,
             )
             session.add(pack)
             session.commit()
+            self._pack_cache.invalidate_pack(pack_id)
             return pack_id
         except Exception as e:
             session.rollback()
@@ -1664,8 +2068,8 @@ class Database:
                 card.image_url = new_image
             if new_yt:
                 card.youtube_url = new_yt
-            card.rarity = (card_data.get("rarity") or card.rarity or "common")
-            card.tier = card_data.get("tier") or card.tier
+            card.rarity = normalize_rarity(card_data.get("rarity") or card.rarity)
+            card.tier = normalize_tier(card_data.get("tier") or card.tier)
             card.variant = card_data.get("variant") or card.variant or "Classic"
             card.era = card_data.get("era") or card.era
             card.impact = card_data.get("impact", card.impact)
@@ -1677,6 +2081,7 @@ class Database:
             card.created_by_user_id = str(card_data.get("created_by_user_id") or card.created_by_user_id or "")
 
             session.commit()
+            self._pack_cache.invalidate_cards([card_id])
             return True
         except Exception as e:
             session.rollback()
@@ -1704,6 +2109,7 @@ class Database:
                 pack.card_count = count + (0 if link else 1)
 
             session.commit()
+            self._pack_cache.invalidate_pack(pack_id)
             return True
         except Exception as e:
             session.rollback()
@@ -1712,6 +2118,25 @@ class Database:
         finally:
             session.close()
 
+    def mark_pack_live(self, pack_id: str, cards_data: Optional[list] = None):
+        """Publish a pack to the marketplace and drop its cached definition."""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            if cards_data is None:
+                cursor.execute("""
+                    UPDATE creator_packs
+                    SET status = 'LIVE', published_at = CURRENT_TIMESTAMP
+                    WHERE pack_id = ?
+                """, (pack_id,))
+            else:
+                cursor.execute("""
+                    UPDATE creator_packs
+                    SET status = 'LIVE', published_at = CURRENT_TIMESTAMP, cards_data = ?
+                    WHERE pack_id = ?
+                """, (json.dumps(cards_data), pack_id))
+            conn.commit()
+        self._pack_cache.invalidate_pack(pack_id)
+
     def add_to_dev_supply(self, pack_id: str, quantity: int = 1) -> bool:
         """Increment dev supply for a pack."""
         session = self.get_session()
@@ -1730,33 +2155,38 @@ class Database:
         finally:
             session.close()
 
+    @staticmethod
+    def _pack_tier_is(column, tier: str):
+        """column == tier; a NULL pack_tier (raw INSERTs that skip the column) counts as community"""
+        if tier == "community":
+            return or_(column == tier, column.is_(None))
+        return column == tier
+
     def get_random_live_pack_by_tier(self, tier: str = "community") -> Optional[dict]:
         """Return a random public pack for a tier in drop/start-game format."""
-        tier = (tier or "community").lower()
+        tier = normalize_pack_tier(tier)
         session = self.get_session()
         try:
             # Preferred modern path (ORM fields).
             pack = (
                 session.query(CreatorPacks)
                 .filter(CreatorPacks.is_public == True)
-                .filter(func.lower(func.coalesce(CreatorPacks.pack_tier, "community")) == tier)
+                .filter(self._pack_tier_is(CreatorPacks.pack_tier, tier))
                 .order_by(func.random())
                 .first()
             )
             # Fallback for legacy schemas where "live" is represented by status='LIVE'
-            # and/or pack_tier is NULL.
+            # (status is normalized at startup).
             if not pack:
+                tier_sql = "(pack_tier = :tier OR pack_tier IS NULL)" if tier == "community" else "pack_tier = :tier"
                 with self._engine.connect() as conn:
-                    row = conn.execute(text("""
-                        SELECT pack_id, name, COALESCE(pack_tier, :tier) AS pack_tier,
+                    row = conn.execute(text(f"""
+                        SELECT pack_id, name, pack_tier,
                                COALESCE(pack_size, card_count, 0) AS pack_size,
                                COALESCE(genre, 'music') AS genre
                         FROM creator_packs
-                        WHERE (LOWER(COALESCE(pack_tier, :tier)) = :tier)
-                          AND (
-                                COALESCE(is_public, 0) = 1
-                                OR UPPER(COALESCE(status, '')) = 'LIVE'
-                              )
+                        WHERE {tier_sql}
+                          AND (is_public = TRUE OR status = 'LIVE')
                         ORDER BY RANDOM()
                         LIMIT 1
                     """), {"tier": tier}).fetchone()
@@ -1817,68 +2247,32 @@ class Database:
         return cards[:limit]
 
     def record_battle(self, battle_data: Dict) -> bool:
-        """Persist battle history row (best-effort; table auto-created if missing)."""
+        """Queue a battle_history row; written in bulk by the battle history store."""
         try:
-            with self._engine.connect() as conn:
-                conn.execute(text("""
-                    CREATE TABLE IF NOT EXISTS battle_history (
-                        battle_id TEXT PRIMARY KEY,
-                        player1_id TEXT NOT NULL,
-                        player2_id TEXT NOT NULL,
-                        player1_card_id TEXT,
-                        player2_card_id TEXT,
-                        winner INTEGER,
-                        player1_power INTEGER,
-                        player2_power INTEGER,
-                        player1_critical BOOLEAN DEFAULT FALSE,
-                        player2_critical BOOLEAN DEFAULT FALSE,
-                        wager_tier TEXT,
-                        wager_amount INTEGER DEFAULT 0,
-                        player1_gold_reward INTEGER DEFAULT 0,
-                        player2_gold_reward INTEGER DEFAULT 0,
-                        player1_xp_reward INTEGER DEFAULT 0,
-                        player2_xp_reward INTEGER DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """))
-                conn.execute(text("""
-                    INSERT INTO battle_history (
-                        battle_id, player1_id, player2_id, player1_card_id, player2_card_id,
-                        winner, player1_power, player2_power, player1_critical, player2_critical,
-                        wager_tier, wager_amount, player1_gold_reward, player2_gold_reward,
-                        player1_xp_reward, player2_xp_reward
-                    ) VALUES (
-                        :battle_id, :player1_id, :player2_id, :player1_card_id, :player2_card_id,
-                        :winner, :player1_power, :player2_power, :player1_critical, :player2_critical,
-                        :wager_tier, :wager_amount, :player1_gold_reward, :player2_gold_reward,
-                        :player1_xp_reward, :player2_xp_reward
-                    )
-                """), {
-                    "battle_id": battle_data.get("battle_id"),
-                    "player1_id": str(battle_data.get("player1_id", "")),
-                    "player2_id": str(battle_data.get("player2_id", "")),
-                    "player1_card_id": battle_data.get("player1_card_id"),
-                    "player2_card_id": battle_data.get("player2_card_id"),
-                    "winner": battle_data.get("winner"),
-                    "player1_power": battle_data.get("player1_power"),
-                    "player2_power": battle_data.get("player2_power"),
-                    "player1_critical": bool(battle_data.get("player1_critical", False)),
-                    "player2_critical": bool(battle_data.get("player2_critical", False)),
-                    "wager_tier": battle_data.get("wager_tier"),
-                    "wager_amount": battle_data.get("wager_amount", 0),
-                    "player1_gold_reward": battle_data.get("player1_gold_reward", 0),
-                    "player2_gold_reward": battle_data.get("player2_gold_reward", 0),
-                    "player1_xp_reward": battle_data.get("player1_xp_reward", 0),
-                    "player2_xp_reward": battle_data.get("player2_xp_reward", 0),
-                })
-                conn.commit()
-            return True
+            return self._battle_history.record(battle_data)
         except Exception as e:
             logger.error(f"[DB] record_battle error: {e}")
             return False
 
-    def get_live_packs(self, limit: int = 20) -> List[dict]:
-        """Return packs available in Telegram store.
+    def get_battle_history(self, user_id, limit: int = 10, before: Optional[str] = None) -> Dict:
+        """Newest-first battles for a user from their side: {"battles", "next_cursor"}.
+        Pass next_cursor back as `before` for the following page."""
+        return self._battle_history.page(user_id, limit=limit, before=before)
+
+    def get_battle_record(self, user_id) -> Dict:
+        """Lifetime wins/losses/ties/total/win_rate/gold_earned/xp_earned from battle history."""
+        return self._battle_history.record_for(user_id)
+
+    def flush_battle_history(self) -> int:
+        """Write buffered battle history now. Returns rows written."""
+        return self._battle_history.flush()
+
+    def compact_battle_history(self, older_than_days: Optional[int] = None) -> int:
+        """Roll battles past the retention window into daily per-user totals."""
+        return self._battle_history.compact(older_than_days)
+
+    def get_live_packs(self, limit: int = 20, offset: int = 0, include_cards: bool = True) -> List[dict]:
+        """Return packs available in Telegram store, newest first.
 
         Includes public packs plus legacy Discord-created packs that have cards.
         """
@@ -1890,17 +2284,29 @@ class Database:
                     (CreatorPacks.is_public == True) |  # noqa: E712
                     (CreatorPacks.card_count > 0)
                 )
-                .order_by(desc(CreatorPacks.created_at))
+                .order_by(desc(CreatorPacks.created_at), CreatorPacks.pack_id)
+                .offset(offset)
                 .limit(limit)
                 .all()
             )
-            return [self._pack_to_dict(p, session) for p in packs]
+            return self._packs_to_dicts(packs, session, include_cards)
         except Exception as e:
             logger.error(f"[TMA] get_live_packs error: {e}")
             return []
         finally:
             session.close()
 
+    def get_live_packs_cached(self, limit: int = 20, offset: int = 0, include_cards: bool = True) -> List[dict]:
+        """get_live_packs behind the short-lived store cache (cleared on any pack change)."""
+        return self._pack_cache.get_store(
+            f"live:{limit}:{offset}:{int(include_cards)}",
+            lambda: self.get_live_packs(limit=limit, offset=offset, include_cards=include_cards),
+        )
+
+    def get_pack_cache_stats(self) -> dict:
+        """Hit-rate metrics of the pack/card read-through cache."""
+        return self._pack_cache.get_stats()
+
     def purchase_live_pack(self, user_id: str, pack_id: str) -> dict:
         """Purchase a store pack with gold and add it to owned purchases."""
         session = self.get_session()
@@ -1968,16 +2374,12 @@ class Database:
             pack = session.query(CreatorPacks).filter_by(pack_id=pack_id).first()
             if not pack:
                 return {"success": False, "error": "Pack definition not found"}
+            backfilled = False
 
-            # Get cards in this pack (normalized link table first).
-            card_rows = (
-                session.query(Card)
-                .join(CreatorPackCards, Card.card_id == CreatorPackCards.card_id)
-                .filter(CreatorPackCards.pack_id == pack_id)
-                .all()
-            )
+            # Get cards in this pack (normalized link table first, via the pack cache).
+            pack_cards = self._load_pack_cards(session, [pack_id])[pack_id]
             # Fallback: older packs may store cards only in creator_packs.cards_data JSON.
-            if not card_rows and pack.cards_data:
+            if not pack_cards and pack.cards_data:
                 cards_data = pack.cards_data
                 if isinstance(cards_data, str):
                     try:
@@ -1998,38 +2400,41 @@ class Database:
                         if not session.query(CreatorPackCards).filter_by(pack_id=pack_id, card_id=card_id).first():
                             session.add(CreatorPackCards(pack_id=pack_id, card_id=card_id))
                     session.flush()
-                    card_rows = (
-                        session.query(Card)
-                        .join(CreatorPackCards, Card.card_id == CreatorPackCards.card_id)
-                        .filter(CreatorPackCards.pack_id == pack_id)
-                        .all()
-                    )
+                    # Uncommitted links: read them without priming the cache
+                    pack_cards = self._load_pack_cards(session, [pack_id], cache=False)[pack_id]
+                    backfilled = True
+
+            card_ids = [c["card_id"] for c in pack_cards]
+            owned = {
+                uc.card_id: uc
+                for uc in session.query(UserCard).filter(
+                    UserCard.user_id == user_id_str, UserCard.card_id.in_(card_ids)
+                )
+            } if card_ids else {}
             cards_out = []
-            for c in card_rows:
+            for c in pack_cards:
                 # Add to user collection
-                existing = session.query(UserCard).filter_by(
-                    user_id=user_id_str, card_id=c.card_id
-                ).first()
+                existing = owned.get(c["card_id"])
                 if existing:
                     existing.quantity += 1
                 else:
                     session.add(UserCard(
-                        user_id=user_id_str, card_id=c.card_id,
+                        user_id=user_id_str, card_id=c["card_id"],
                         quantity=1, acquired_from="pack_open",
                         acquired_at=datetime.utcnow(),
                     ))
                 cards_out.append({
-                    "card_id":   c.card_id,
-                    "name":      c.name,
-                    "title":     c.title,
-                    "image_url": c.image_url,
-                    "rarity":    c.rarity,
-                    "tier":      c.tier,
-                    "impact":    c.impact or 50,
-                    "skill":     c.skill or 50,
-                    "longevity": c.longevity or 50,
-                    "culture":   c.culture or 50,
-                    "hype":      c.hype or 50,
+                    "card_id":   c["card_id"],
+                    "name":      c["name"],
+                    "title":     c["title"],
+                    "image_url": c["image_url"],
+                    "rarity":    c["rarity"],
+                    "tier":      c["tier"],
+                    "impact":    c["impact"],
+                    "skill":     c["skill"],
+                    "longevity": c["longevity"],
+                    "culture":   c["culture"],
+                    "hype":      c["hype"],
                 })
 
             # Mark pack as opened if this came from purchases.
@@ -2045,6 +2450,9 @@ class Database:
                     cards_received=received_ids,
                 ))
             session.commit()
+            if backfilled:
+                self._pack_cache.invalidate_pack(pack_id)
+                self._load_pack_cards(session, [pack_id])
             return {"success": True, "cards": cards_out}
         except Exception as e:
             session.rollback()
@@ -2127,12 +2535,55 @@ class Database:
         finally:
             session.close()
 
+    # Daily rewards. Gold by streak length; 1-3 cards sampled from a cached pool
+    # of common/rare card ids that is dropped whenever a card is invalidated in
+    # the pack cache.
+    _DAILY_GOLD = {0: 100, 3: 150, 7: 300, 14: 600, 30: 1100}
+    _DAILY_POOL_RARITIES = ("common", "rare")
+    _DAILY_POOL_MAX = 1000
+
+    # Legacy user_inventory mirror of daily claims, written behind in bulk.
+    # Set LEGACY_INVENTORY_SYNC=0 once nothing reads user_inventory any more.
+    _INVENTORY_SYNC = os.environ.get("LEGACY_INVENTORY_SYNC", "1").lower() not in ("0", "false", "no")
+    _INVENTORY_SYNC_SECONDS = float(os.environ.get("LEGACY_INVENTORY_SYNC_SECONDS", "15"))
+
+    def _daily_reward_cards(self, session, count: int) -> List[dict]:
+        """Sample up to count card dicts from the cached daily reward pool."""
+        import random
+
+        def load_pool():
+            rows = (
+                session.query(Card)
+                .filter(Card.rarity.in_(self._DAILY_POOL_RARITIES))
+                .order_by(Card.card_id)
+                .limit(self._DAILY_POOL_MAX)
+                .all()
+            )
+            # Prime card entries so sampling from a fresh pool costs no extra query
+            self._pack_cache.set_many({card_key(c.card_id): self._pack_card_dict(c) for c in rows})
+            return [c.card_id for c in rows]
+
+        def load_cards(missing_keys):
+            rows = (
+                session.query(Card)
+                .filter(Card.card_id.in_([key.split(":", 1)[1] for key in missing_keys]))
+                .all()
+            )
+            return {card_key(c.card_id): self._pack_card_dict(c) for c in rows}
+
+        card_ids = self._pack_cache.get(DAILY_POOL_KEY, load_pool) or []
+        picked = random.sample(card_ids, min(count, len(card_ids)))
+        cards = self._pack_cache.get_many([card_key(cid) for cid in picked], load_cards)
+        return [cards[card_key(cid)] for cid in picked if card_key(cid) in cards]
+
     def claim_daily_reward(self, user_id) -> dict:
-        """Claim the daily reward. Returns success/failure with gold and cards."""
+        """Claim the daily reward. Returns success/failure with gold and cards.
+
+        The awarded cards are written with one batched upsert and the balance
+        with one conditional UPDATE, which also rejects a concurrent second claim."""
         user_id = str(user_id)
         import random
-        from datetime import timedelta
-        _DAILY_GOLD = {0: 100, 3: 150, 7: 300, 14: 600, 30: 1100}
+        from sqlalchemy import update as sa_update
 
         session = self.get_session()
         try:
@@ -2164,15 +2615,7 @@ class Database:
                 )
                 hours_since = (now - effective_last_claim).total_seconds() / 3600
                 if hours_since < 24:
-                    next_claim = effective_last_claim + timedelta(hours=24)
-                    remaining_seconds = max(0, int((24 - hours_since) * 3600))
-                    return {
-                        "success": False,
-                        "message": "Already claimed today",
-                        "error": "Already claimed today",
-                        "next_claim_at": next_claim.isoformat(),
-                        "time_until": remaining_seconds,
-                    }
+                    return self._daily_already_claimed(effective_last_claim, hours_since)
 
             streak = b.daily_streak or 0
             if last_claim_at and (now - last_claim_at).total_seconds() / 3600 < 48:
@@ -2181,62 +2624,39 @@ class Database:
                 streak = 1
 
             # Gold reward based on streak
-            gold = next((v for k, v in sorted(_DAILY_GOLD.items(), reverse=True) if streak >= k), 100)
-
-            # Random common/rare cards (1-3)
-            all_cards = session.query(Card).filter(
-                Card.rarity.in_(["common", "Common", "rare", "Rare"])
-            ).limit(50).all()
-            awarded_cards = []
-            if all_cards:
-                sample = random.sample(all_cards, min(random.randint(1, 3), len(all_cards)))
-                for c in sample:
-                    existing = session.query(UserCard).filter_by(
-                        user_id=user_id, card_id=c.card_id
-                    ).first()
-                    if existing:
-                        existing.quantity += 1
-                    else:
-                        session.add(UserCard(
-                            user_id=user_id, card_id=c.card_id,
-                            quantity=1, acquired_from="daily",
-                            acquired_at=now,
-                        ))
-                    awarded_cards.append({
-                        "card_id":   c.card_id,
-                        "name":      c.name,
-                        "title":     c.title,
-                        "image_url": c.image_url,
-                        "rarity":    c.rarity,
-                    })
-
-            # Update balance and claim record
-            b.gold = (b.gold or 0) + gold
-            b.daily_streak = streak
-            b.last_daily_claim = now
+            gold = next((v for k, v in sorted(self._DAILY_GOLD.items(), reverse=True) if streak >= k), 100)
+
+            # Claim first: only one of two concurrent claims matches last_daily_claim
+            claimed = session.execute(
+                sa_update(UserBalances)
+                .where(
+                    UserBalances.user_id == user_id,
+                    UserBalances.last_daily_claim.is_(None) if last_claim_at is None
+                    else UserBalances.last_daily_claim == last_claim_at,
+                )
+                .values(gold=func.coalesce(UserBalances.gold, 0) + gold,
+                        daily_streak=streak, last_daily_claim=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                session.rollback()
+                return self._daily_already_claimed(now, 0)
 
-            # Legacy compatibility: keep old user_inventory table in sync when present.
-            try:
+            # Random common/rare cards (1-3) from the cached pool, one batched upsert
+            cards = self._daily_reward_cards(session, random.randint(1, 3))
+            if cards:
                 session.execute(text("""
-                    INSERT INTO user_inventory (user_id, gold, tickets, last_daily_claim, daily_streak)
-                    VALUES (:uid, :gold, :tickets, :last_claim, :streak)
-                    ON CONFLICT(user_id) DO UPDATE SET
-                        gold = COALESCE(user_inventory.gold, 0) + :gold,
-                        tickets = COALESCE(user_inventory.tickets, 0) + :tickets,
-                        last_daily_claim = :last_claim,
-                        daily_streak = :streak
-                """), {
-                    "uid": user_id,
-                    "gold": gold,
-                    "tickets": 0,
-                    "last_claim": now,
-                    "streak": streak,
-                })
-            except Exception:
-                # Some environments no longer maintain user_inventory.
-                pass
+                    INSERT INTO user_cards (user_id, card_id, quantity, acquired_from, acquired_at, is_favorite)
+                    VALUES (:uid, :cid, 1, 'daily', :now, FALSE)
+                    ON CONFLICT (user_id, card_id) DO UPDATE SET
+                        quantity = COALESCE(user_cards.quantity, 0) + 1
+                """), [{"uid": user_id, "cid": c["card_id"], "now": now} for c in cards])
+            awarded_cards = [
+                {k: c[k] for k in ("card_id", "name", "title", "image_url", "rarity")} for c in cards
+            ]
 
             session.commit()
+            self._queue_inventory_sync(user_id, gold, now, streak)
             return {
                 "success": True,
                 "gold": gold,
@@ -2251,6 +2671,131 @@ class Database:
         finally:
             session.close()
 
+    @staticmethod
+    def _daily_already_claimed(last_claim_at: datetime, hours_since: float) -> dict:
+        next_claim = last_claim_at + timedelta(hours=24)
+        remaining_seconds = max(0, int((24 - hours_since) * 3600))
+        return {
+            "success": False,
+            "message": "Already claimed today",
+            "error": "Already claimed today",
+            "next_claim_at": next_claim.isoformat(),
+            "time_until": remaining_seconds,
+        }
+
+    def _queue_inventory_sync(self, user_id: str, gold: int, claimed_at: datetime, streak: int):
+        """Buffer the legacy user_inventory mirror of a daily claim."""
+        if not self._INVENTORY_SYNC:
+            return
+
+        def fold(entry):
+            entry = entry or {"uid": user_id, "gold": 0, "tickets": 0}
+            entry["gold"] += gold
+            entry["last_claim"] = claimed_at
+            entry["streak"] = streak
+            return entry
+
+        self._inventory_sync_buffer.update(user_id, fold)
+
+    @staticmethod
+    def _merge_inventory_sync(older: dict, newer: dict) -> dict:
+        # Gold/tickets are deltas; the claim time and streak are the latest
+        return {**newer, "gold": older["gold"] + newer["gold"], "tickets": older["tickets"] + newer["tickets"]}
+
+    def flush_inventory_sync(self) -> int:
+        """Write buffered daily claims to the legacy user_inventory table. Returns rows written."""
+        return self._inventory_sync_buffer.flush()
+
+    def _write_inventory_sync(self, pending: Dict[str, dict]) -> int:
+        rows = list(pending.values())
+        session = self.get_session()
+        try:
+            session.execute(text("""
+                INSERT INTO user_inventory (user_id, gold, tickets, last_daily_claim, daily_streak)
+                VALUES (:uid, :gold, :tickets, :last_claim, :streak)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    gold = COALESCE(user_inventory.gold, 0) + excluded.gold,
+                    tickets = COALESCE(user_inventory.tickets, 0) + excluded.tickets,
+                    last_daily_claim = excluded.last_daily_claim,
+                    daily_streak = excluded.daily_streak
+            """), rows)
+            session.commit()
+            return len(rows)
+        except Exception as e:
+            # Some environments no longer maintain user_inventory.
+            session.rollback()
+            logger.debug(f"[DB] user_inventory sync skipped ({len(rows)} rows): {e}")
+            return 0
+        finally:
+            session.close()
+
+    def reset_daily_rewards(self, now: Optional[datetime] = None) -> int:
+        """Daily reset job: one set-based UPDATE over user_balances dropping the
+        streak of every user who missed their 48h claim window. Returns rows updated."""
+        from sqlalchemy import or_, update as sa_update
+
+        now = now or datetime.utcnow()
+        session = self.get_session()
+        try:
+            updated = session.execute(
+                sa_update(UserBalances)
+                .where(
+                    UserBalances.daily_streak > 0,
+                    or_(UserBalances.last_daily_claim.is_(None),
+                        UserBalances.last_daily_claim < now - timedelta(hours=48)),
+                )
+                .values(daily_streak=0)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            session.commit()
+            logger.info(f"[DB] daily reset cleared {updated} streaks")
+            return updated
+        except Exception as e:
+            session.rollback()
+            logger.error(f"[DB] reset_daily_rewards error: {e}")
+            raise
+        finally:
+            session.close()
+
+    def save_guild_activity(self, rows: List[Dict]) -> int:
+        """Upsert guild activity scores (server_id, score, channel_id, messages,
+        updated_at) in one statement. Returns rows written."""
+        if not rows:
+            return 0
+        if self._db_type == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(GuildActivity)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GuildActivity.server_id],
+            set_={col: getattr(stmt.excluded, col) for col in ("score", "channel_id", "messages", "updated_at")},
+        )
+        session = self.get_session()
+        try:
+            session.execute(stmt, rows)
+            session.commit()
+            return len(rows)
+        except Exception as e:
+            session.rollback()
+            logger.error(f"[DB] save_guild_activity error: {e}")
+            raise
+        finally:
+            session.close()
+
+    def load_guild_activity(self, min_score: float = 0.0) -> List[Dict]:
+        """Stored guild activity scores (as of their updated_at)"""
+        session = self.get_session()
+        try:
+            rows = session.query(GuildActivity).filter(GuildActivity.score > min_score).all()
+            return [
+                {"server_id": r.server_id, "score": r.score or 0.0, "channel_id": r.channel_id,
+                 "messages": r.messages or 0, "updated_at": r.updated_at}
+                for r in rows
+            ]
+        finally:
+            session.close()
+
     def get_user_stats(self, user_id) -> dict:
         """Return battle stats for a user."""
         user_id = str(user_id)
@@ -2435,6 +2980,174 @@ class Database:
         except (ValueError, TypeError):
             return 0
 
+    # Settlement latency, shared across Database instances
+    _settlement_stats = {"count": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0, "cards": 0}
+
+    def _find_pending_trade(self, session, raw_trade_id, lock: bool = False):
+        """Find a pending trade by UUID, legacy string id or numeric trade_id.
+
+        Every format resolves through an indexed column (trades.id primary key
+        or trades.trade_id) instead of scanning recent pending rows.
+        """
+        tid = str(raw_trade_id).strip()
+        query = session.query(Trade).filter(Trade.status == "pending")
+        if lock:
+            query = query.with_for_update()
+        try:
+            return query.filter(Trade.id == uuid.UUID(tid)).first()
+        except (ValueError, TypeError, AttributeError):
+            pass
+        # Legacy non-UUID ids only exist where trades.id is a CHAR column
+        if self._db_type != "postgresql":
+            trade = query.filter(Trade.id == tid).first()
+            if trade:
+                return trade
+        if tid.isdigit():
+            return query.filter(Trade.trade_id == int(tid)).first()
+        return None
+
+    def _settle_trade(
+        self,
+        session,
+        initiator_id: str,
+        receiver_id: str,
+        cards_a: List[str],
+        cards_b: List[str],
+        gold_a: int = 0,
+        gold_b: int = 0,
+        check_gold: bool = True,
+    ) -> Tuple[bool, Optional[str]]:
+        """Swap cards and gold between two users in a constant number of statements.
+
+        Locks both users' affected user_cards rows and both balance rows with
+        ordered SELECT ... FOR UPDATE (a no-op on SQLite), validates ownership,
+        then applies every transfer with bulk UPDATE/DELETE/INSERT. The caller
+        owns the transaction and commits on success.
+        """
+        from collections import Counter
+        from sqlalchemy import delete as sa_delete, insert as sa_insert, update as sa_update
+
+        started = time.perf_counter()
+        initiator_id, receiver_id = str(initiator_id), str(receiver_id)
+        gold_a, gold_b = int(gold_a or 0), int(gold_b or 0)
+        out_a, out_b = Counter(cards_a or []), Counter(cards_b or [])
+
+        def _done(ok: bool, error: Optional[str] = None):
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats = Database._settlement_stats
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            if ok:
+                stats["cards"] += sum(out_a.values()) + sum(out_b.values())
+            else:
+                stats["failed"] += 1
+            logger.info(
+                f"[TRADE] settlement {'ok' if ok else 'rejected'} "
+                f"{initiator_id}<->{receiver_id} cards={sum(out_a.values())}+{sum(out_b.values())} "
+                f"in {elapsed_ms:.1f}ms"
+            )
+            return ok, error
+
+        card_ids = sorted(set(out_a) | set(out_b))
+        owned: Dict[Tuple[str, str], UserCard] = {}
+        if card_ids:
+            rows = (
+                session.query(UserCard)
+                .filter(
+                    UserCard.user_id.in_([initiator_id, receiver_id]),
+                    UserCard.card_id.in_(card_ids),
+                )
+                .order_by(UserCard.user_id, UserCard.card_id)
+                .with_for_update()
+                .all()
+            )
+            owned = {(row.user_id, row.card_id): row for row in rows}
+
+        balances = {
+            b.user_id: b
+            for b in (
+                session.query(UserBalances)
+                .filter(UserBalances.user_id.in_([initiator_id, receiver_id]))
+                .order_by(UserBalances.user_id)
+                .with_for_update()
+                .all()
+            )
+        }
+        missing = [uid for uid in (initiator_id, receiver_id) if uid not in balances]
+        if missing:
+            session.execute(sa_insert(UserBalances), [{"user_id": uid, "gold": 0} for uid in missing])
+            for uid in missing:
+                balances[uid] = session.get(UserBalances, uid)
+        bal_a, bal_b = balances[initiator_id], balances[receiver_id]
+
+        if check_gold:
+            if gold_a > int(bal_a.gold or 0):
+                return _done(False, "Initiator no longer has enough gold")
+            if gold_b > int(bal_b.gold or 0):
+                return _done(False, "Receiver no longer has enough gold")
+
+        for owner, outgoing, label in ((initiator_id, out_a, "Initiator"), (receiver_id, out_b, "Receiver")):
+            for card_id, count in outgoing.items():
+                row = owned.get((owner, card_id))
+                if not row or int(row.quantity or 1) < count:
+                    return _done(False, f"{label} no longer owns {card_id}")
+
+        # Net quantity change per (user, card)
+        deltas: Counter = Counter()
+        for card_id, count in out_a.items():
+            deltas[(initiator_id, card_id)] -= count
+            deltas[(receiver_id, card_id)] += count
+        for card_id, count in out_b.items():
+            deltas[(receiver_id, card_id)] -= count
+            deltas[(initiator_id, card_id)] += count
+
+        now = datetime.utcnow()
+        updates, deletes, inserts = [], {}, []
+        for (owner, card_id), delta in deltas.items():
+            row = owned.get((owner, card_id))
+            if row is None:
+                if delta > 0:
+                    inserts.append({
+                        "user_id": owner, "card_id": card_id, "quantity": delta,
+                        "acquired_from": "trade", "acquired_at": now,
+                    })
+                continue
+            if delta == 0:
+                continue
+            quantity = int(row.quantity or 1) + delta
+            if quantity <= 0:
+                deletes.setdefault(owner, []).append(card_id)
+            else:
+                updates.append({"user_id": owner, "card_id": card_id, "quantity": quantity})
+
+        # Rows are applied with Core statements; keep the identity map from
+        # flushing stale quantities over them.
+        for row in owned.values():
+            session.expunge(row)
+        if updates:
+            session.execute(sa_update(UserCard), updates)
+        for owner, ids in deletes.items():
+            session.execute(
+                sa_delete(UserCard).where(UserCard.user_id == owner, UserCard.card_id.in_(ids))
+            )
+        if inserts:
+            session.execute(sa_insert(UserCard), inserts)
+
+        if gold_a or gold_b:
+            bal_a.gold = max(0, int(bal_a.gold or 0) - gold_a + gold_b)
+            bal_b.gold = max(0, int(bal_b.gold or 0) - gold_b + gold_a)
+
+        return _done(True)
+
+    def get_settlement_stats(self) -> dict:
+        """Trade settlement latency summary for ops dashboards."""
+        stats = dict(Database._settlement_stats)
+        settled = stats["count"] - stats["failed"]
+        stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 2) if stats["count"] else 0.0
+        stats["avg_cards"] = round(stats["cards"] / settled, 2) if settled else 0.0
+        return stats
+
     def create_trade(
         self,
         initiator_id: str = None,
@@ -2518,32 +3231,9 @@ class Database:
 
     def complete_trade(self, trade_id: str) -> bool:
         """Legacy Discord trade finalize path (atomic swap + gold exchange)."""
-        import uuid as _uuid
-
-        def _find_pending_trade(session, raw_trade_id: str):
-            """Find pending trade across legacy id formats safely."""
-            tid = str(raw_trade_id)
-            # Fast path for UUID-shaped ids.
-            try:
-                return session.query(Trade).filter_by(id=_uuid.UUID(tid), status="pending").first()
-            except (ValueError, TypeError, AttributeError):
-                pass
-            # Compatibility path: scan pending rows and compare normalized string ids.
-            pending_rows = (
-                session.query(Trade)
-                .filter_by(status="pending")
-                .order_by(desc(Trade.created_at))
-                .limit(500)
-                .all()
-            )
-            for row in pending_rows:
-                if str(row.id) == tid:
-                    return row
-            return None
-
         session = self.get_session()
         try:
-            trade = _find_pending_trade(session, trade_id)
+            trade = self._find_pending_trade(session, trade_id, lock=True)
             if not trade:
                 return False
             if trade.is_expired():
@@ -2551,50 +3241,16 @@ class Database:
                 session.commit()
                 return False
 
-            initiator_id = str(trade.user_a)
-            receiver_id = str(trade.user_b)
-
-            # Verify ownership before mutating
-            for card_id in (trade.cards_a or []):
-                if not session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first():
-                    return False
-            for card_id in (trade.cards_b or []):
-                if not session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first():
-                    return False
-
-            # Swap A -> B
-            for card_id in (trade.cards_a or []):
-                uc = session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first()
-                uc.quantity = (uc.quantity or 1) - 1
-                if uc.quantity <= 0:
-                    session.delete(uc)
-                ex = session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first()
-                if ex:
-                    ex.quantity = (ex.quantity or 0) + 1
-                else:
-                    session.add(UserCard(
-                        user_id=receiver_id, card_id=card_id, quantity=1,
-                        acquired_from="trade", acquired_at=datetime.utcnow(),
-                    ))
-
-            # Swap B -> A
-            for card_id in (trade.cards_b or []):
-                uc = session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first()
-                uc.quantity = (uc.quantity or 1) - 1
-                if uc.quantity <= 0:
-                    session.delete(uc)
-                ex = session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first()
-                if ex:
-                    ex.quantity = (ex.quantity or 0) + 1
-                else:
-                    session.add(UserCard(
-                        user_id=initiator_id, card_id=card_id, quantity=1,
-                        acquired_from="trade", acquired_at=datetime.utcnow(),
-                    ))
-
-            if trade.gold_a or trade.gold_b:
-                self.update_user_economy(initiator_id, gold_change=-(trade.gold_a or 0) + (trade.gold_b or 0))
-                self.update_user_economy(receiver_id,  gold_change=-(trade.gold_b or 0) + (trade.gold_a or 0))
+            ok, _ = self._settle_trade(
+                session,
+                str(trade.user_a), str(trade.user_b),
+                trade.cards_a or [], trade.cards_b or [],
+                trade.gold_a or 0, trade.gold_b or 0,
+                check_gold=False,
+            )
+            if not ok:
+                session.rollback()
+                return False
 
             trade.status = "completed"
             session.commit()
@@ -2625,69 +3281,12 @@ class Database:
             gold_a = int(gold_from_initiator or 0)
             gold_b = int(gold_from_receiver or 0)
 
-            # Verify ownership before any mutations.
-            for card_id in cards_a:
-                if not session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first():
-                    return {"success": False, "error": f"Initiator no longer owns {card_id}"}
-            for card_id in cards_b:
-                if not session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first():
-                    return {"success": False, "error": f"Receiver no longer owns {card_id}"}
-
-            bal_a = session.query(UserBalances).filter_by(user_id=initiator_id).first()
-            bal_b = session.query(UserBalances).filter_by(user_id=receiver_id).first()
-            if not bal_a:
-                bal_a = UserBalances(user_id=initiator_id)
-                session.add(bal_a)
-                session.flush()
-            if not bal_b:
-                bal_b = UserBalances(user_id=receiver_id)
-                session.add(bal_b)
-                session.flush()
-
-            if gold_a > (bal_a.gold or 0):
-                return {"success": False, "error": "Initiator no longer has enough gold"}
-            if gold_b > (bal_b.gold or 0):
-                return {"success": False, "error": "Receiver no longer has enough gold"}
-
-            # Swap A -> B
-            for card_id in cards_a:
-                uc = session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first()
-                uc.quantity = (uc.quantity or 1) - 1
-                if uc.quantity <= 0:
-                    session.delete(uc)
-                ex = session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first()
-                if ex:
-                    ex.quantity = (ex.quantity or 0) + 1
-                else:
-                    session.add(UserCard(
-                        user_id=receiver_id,
-                        card_id=card_id,
-                        quantity=1,
-                        acquired_from="trade",
-                        acquired_at=datetime.utcnow(),
-                    ))
-
-            # Swap B -> A
-            for card_id in cards_b:
-                uc = session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first()
-                uc.quantity = (uc.quantity or 1) - 1
-                if uc.quantity <= 0:
-                    session.delete(uc)
-                ex = session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first()
-                if ex:
-                    ex.quantity = (ex.quantity or 0) + 1
-                else:
-                    session.add(UserCard(
-                        user_id=initiator_id,
-                        card_id=card_id,
-                        quantity=1,
-                        acquired_from="trade",
-                        acquired_at=datetime.utcnow(),
-                    ))
-
-            # Gold swap (same transaction for atomicity)
-            bal_a.gold = max(0, (bal_a.gold or 0) - gold_a + gold_b)
-            bal_b.gold = max(0, (bal_b.gold or 0) - gold_b + gold_a)
+            ok, error = self._settle_trade(
+                session, initiator_id, receiver_id, cards_a, cards_b, gold_a, gold_b,
+            )
+            if not ok:
+                session.rollback()
+                return {"success": False, "error": error}
 
             session.commit()
             # Best-effort history logging in a separate transaction so legacy
@@ -2721,29 +3320,9 @@ class Database:
 
     def accept_trade(self, trade_id: str, user_id: str) -> dict:
         """Accept a trade: swap cards and gold atomically."""
-        import uuid as _uuid
-
-        def _find_pending_trade(session, raw_trade_id: str):
-            tid = str(raw_trade_id)
-            try:
-                return session.query(Trade).filter_by(id=_uuid.UUID(tid), status="pending").first()
-            except (ValueError, TypeError, AttributeError):
-                pass
-            pending_rows = (
-                session.query(Trade)
-                .filter_by(status="pending")
-                .order_by(desc(Trade.created_at))
-                .limit(500)
-                .all()
-            )
-            for row in pending_rows:
-                if str(row.id) == tid:
-                    return row
-            return None
-
         session = self.get_session()
         try:
-            trade = _find_pending_trade(session, trade_id)
+            trade = self._find_pending_trade(session, trade_id, lock=True)
             if not trade:
                 return {"success": False, "error": "Trade not found or already closed"}
 
@@ -2755,57 +3334,18 @@ class Database:
                 session.commit()
                 return {"success": False, "error": "Trade has expired"}
 
-            initiator_id = str(trade.user_a)
-            receiver_id = str(trade.user_b)
-            bal_a = session.query(UserBalances).filter_by(user_id=initiator_id).first()
-            bal_b = session.query(UserBalances).filter_by(user_id=receiver_id).first()
-            if not bal_a:
-                bal_a = UserBalances(user_id=initiator_id)
-                session.add(bal_a)
-                session.flush()
-            if not bal_b:
-                bal_b = UserBalances(user_id=receiver_id)
-                session.add(bal_b)
-                session.flush()
-            if int(trade.gold_a or 0) > int(bal_a.gold or 0):
-                return {"success": False, "error": "Initiator no longer has enough gold"}
-            if int(trade.gold_b or 0) > int(bal_b.gold or 0):
-                return {"success": False, "error": "You no longer have enough gold"}
-
-            # Swap cards A → B
-            for card_id in (trade.cards_a or []):
-                uc = session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first()
-                if not uc:
-                    return {"success": False, "error": f"Initiator no longer owns {card_id}"}
-                uc.quantity -= 1
-                if uc.quantity <= 0:
-                    session.delete(uc)
-                ex = session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first()
-                if ex:
-                    ex.quantity += 1
-                else:
-                    session.add(UserCard(user_id=receiver_id, card_id=card_id, quantity=1,
-                                         acquired_from="trade", acquired_at=datetime.utcnow()))
-
-            # Swap cards B → A
-            for card_id in (trade.cards_b or []):
-                uc = session.query(UserCard).filter_by(user_id=receiver_id, card_id=card_id).first()
-                if not uc:
-                    return {"success": False, "error": f"You no longer own {card_id}"}
-                uc.quantity -= 1
-                if uc.quantity <= 0:
-                    session.delete(uc)
-                ex = session.query(UserCard).filter_by(user_id=initiator_id, card_id=card_id).first()
-                if ex:
-                    ex.quantity += 1
-                else:
-                    session.add(UserCard(user_id=initiator_id, card_id=card_id, quantity=1,
-                                         acquired_from="trade", acquired_at=datetime.utcnow()))
-
-            # Swap gold
-            if trade.gold_a or trade.gold_b:
-                bal_a.gold = max(0, int(bal_a.gold or 0) - int(trade.gold_a or 0) + int(trade.gold_b or 0))
-                bal_b.gold = max(0, int(bal_b.gold or 0) - int(trade.gold_b or 0) + int(trade.gold_a or 0))
+            ok, error = self._settle_trade(
+                session,
+                str(trade.user_a), str(trade.user_b),
+                trade.cards_a or [], trade.cards_b or [],
+                trade.gold_a or 0, trade.gold_b or 0,
+            )
+            if not ok:
+                session.rollback()
+                # The accepting user is the receiver side of the trade
+                error = error.replace("Receiver no longer has", "You no longer have")
+                error = error.replace("Receiver no longer owns", "You no longer own")
+                return {"success": False, "error": error}
 
             trade.status = "completed"
             session.commit()
@@ -2819,29 +3359,9 @@ class Database:
 
     def cancel_trade(self, trade_id: str, user_id: str = None, reason: str = None) -> dict:
         """Cancel a pending trade (only initiator or recipient can cancel)."""
-        import uuid as _uuid
-
-        def _find_pending_trade(session, raw_trade_id: str):
-            tid = str(raw_trade_id)
-            try:
-                return session.query(Trade).filter_by(id=_uuid.UUID(tid), status="pending").first()
-            except (ValueError, TypeError, AttributeError):
-                pass
-            pending_rows = (
-                session.query(Trade)
-                .filter_by(status="pending")
-                .order_by(desc(Trade.created_at))
-                .limit(500)
-                .all()
-            )
-            for row in pending_rows:
-                if str(row.id) == tid:
-                    return row
-            return None
-
         session = self.get_session()
         try:
-            trade = _find_pending_trade(session, trade_id)
+            trade = self._find_pending_trade(session, trade_id)
             if not trade:
                 return {"success": False, "error": "Trade not found or already closed"}
             if user_id is not None:
@@ -2922,76 +3442,239 @@ class Database:
 
     def dust_cards(self, user_id: str, card_ids: List[str]) -> Tuple[bool, str]:
         """Convert cards to dust. Removes one copy of each card and awards dust."""
+        result = self.dust_cards_batch(user_id, card_ids=card_ids)
+        if not result["success"]:
+            return False, result["error"]
+        return True, f"Converted {result['cards_dusted']} card(s) into {result['total_dust']} dust"
+
+    def dust_cards_batch(
+        self,
+        user_id: str,
+        card_ids: Optional[List[str]] = None,
+        quantities: Optional[Dict[str, int]] = None,
+        keep: Optional[int] = None,
+        ledger: str = "balances",
+    ) -> dict:
+        """Dust many cards in a fixed number of round-trips.
+
+        - card_ids: one copy per occurrence (repeat an id to dust several copies)
+        - quantities: {card_id: copies_to_dust}
+        - keep: dust every copy above ``keep`` for the requested cards, or for
+          the whole collection when no cards are named
+        - ledger: "balances" credits user_balances.dust (TMA); "user_dust"
+          credits the Discord dust account that /dust, /craft and /boost spend
+
+        Ownership rows and rarities are loaded with one joined query, the
+        collection and dust balance are updated with bulk statements, and the
+        result carries a per-card breakdown.
+        """
+        from collections import Counter
+        from sqlalchemy import delete as sa_delete, update as sa_update
+
+        user_id = str(user_id)
+        requested: Counter = Counter(card_ids or [])
+        for card_id, qty in (quantities or {}).items():
+            if int(qty) < 0:
+                return {"success": False, "error": f"Invalid quantity for {card_id}"}
+            requested[card_id] += int(qty)
+        if keep is not None and int(keep) < 0:
+            return {"success": False, "error": "keep must be 0 or more"}
+        if not requested and keep is None:
+            return {"success": False, "error": "No cards selected"}
+
         session = self.get_session()
         try:
+            query = (
+                session.query(UserCard, Card.name, Card.rarity)
+                .outerjoin(Card, Card.card_id == UserCard.card_id)
+                .filter(UserCard.user_id == user_id)
+            )
+            if requested:
+                query = query.filter(UserCard.card_id.in_(list(requested)))
+            rows = query.order_by(UserCard.card_id).with_for_update(of=UserCard).all()
+            owned = {uc.card_id: (uc, name, rarity) for uc, name, rarity in rows}
+
+            if keep is not None:
+                targets = requested.keys() if requested else owned.keys()
+                plan = {
+                    cid: max(0, int(owned[cid][0].quantity or 1) - int(keep))
+                    for cid in targets if cid in owned
+                }
+            else:
+                plan = dict(requested)
+
+            breakdown, updates, deletes = [], [], []
             total_dust = 0
-            for card_id in card_ids:
-                uc = session.query(UserCard).filter_by(user_id=user_id, card_id=card_id).first()
-                if not uc:
-                    session.rollback()
-                    return False, f"You don't own card {card_id}"
-                card = session.query(Card).filter_by(card_id=card_id).first()
-                rarity = (card.rarity or "common").lower() if card else "common"
-                total_dust += self._DUST_VALUE.get(rarity, 10)
-                uc.quantity -= 1
-                if uc.quantity <= 0:
-                    session.delete(uc)
+            for card_id, count in plan.items():
+                if count <= 0:
+                    continue
+                if card_id not in owned:
+                    return {"success": False, "error": f"You don't own card {card_id}"}
+                uc, name, rarity = owned[card_id]
+                have = int(uc.quantity or 1)
+                if have < count:
+                    return {"success": False,
+                            "error": f"You only have {have} copies of {name or card_id}"}
+                rarity = (rarity or "common").lower()
+                dust_each = self._DUST_VALUE.get(rarity, 10)
+                total_dust += dust_each * count
+                breakdown.append({
+                    "card_id": card_id, "name": name, "rarity": rarity,
+                    "quantity": count, "dust_each": dust_each,
+                    "dust": dust_each * count, "remaining": have - count,
+                })
+                if have - count <= 0:
+                    deletes.append(card_id)
+                else:
+                    updates.append({"user_id": user_id, "card_id": card_id, "quantity": have - count})
+
+            if not breakdown:
+                return {"success": False, "error": "Nothing to dust"}
+
+            for uc, _, _ in owned.values():
+                session.expunge(uc)
+            if updates:
+                session.execute(sa_update(UserCard), updates)
+            if deletes:
+                session.execute(
+                    sa_delete(UserCard).where(UserCard.user_id == user_id, UserCard.card_id.in_(deletes))
+                )
 
-            b = session.query(UserBalances).filter_by(user_id=user_id).first()
-            if not b:
-                b = UserBalances(user_id=user_id)
-                session.add(b)
-                session.flush()
-            b.dust = (b.dust or 0) + total_dust
+            if ledger == "user_dust":
+                dust_balance = self._credit_user_dust(session, user_id, total_dust, "dust_duplicates")
+            else:
+                b = session.query(UserBalances).filter_by(user_id=user_id).with_for_update().first()
+                if not b:
+                    b = UserBalances(user_id=user_id, dust=0)
+                    session.add(b)
+                b.dust = (b.dust or 0) + total_dust
+                dust_balance = b.dust
             session.commit()
-            return True, f"Converted {len(card_ids)} card(s) into {total_dust} dust"
+            return {
+                "success": True,
+                "total_dust": total_dust,
+                "cards_dusted": sum(item["quantity"] for item in breakdown),
+                "dust_balance": dust_balance,
+                "breakdown": breakdown,
+            }
         except Exception as e:
             session.rollback()
-            logger.error(f"[TMA] dust_cards error: {e}")
-            return False, str(e)
+            logger.error(f"[TMA] dust_cards_batch error: {e}")
+            return {"success": False, "error": str(e)}
         finally:
             session.close()
 
+    def _credit_user_dust(self, session: Session, user_id: str, amount: int, transaction_type: str) -> int:
+        """Credit the user_dust account (services.dust_economy) inside ``session``; returns the new balance"""
+        params = {"user_id": int(user_id), "amount": amount, "type": transaction_type}
+        session.execute(text(
+            "INSERT INTO user_dust (user_id, dust_amount, total_dust_earned) VALUES (:user_id, 0, 0) "
+            "ON CONFLICT (user_id) DO NOTHING"
+        ), params)
+        session.execute(text(
+            "UPDATE user_dust SET dust_amount = dust_amount + :amount, "
+            "total_dust_earned = total_dust_earned + :amount, last_updated = CURRENT_TIMESTAMP "
+            "WHERE user_id = :user_id"
+        ), params)
+        session.execute(text(
+            "INSERT INTO dust_transactions (user_id, amount, transaction_type) VALUES (:user_id, :amount, :type)"
+        ), params)
+        return session.execute(
+            text("SELECT dust_amount FROM user_dust WHERE user_id = :user_id"), params
+        ).scalar() or 0
+
     def craft_card(self, user_id: str, card_id: str) -> Tuple[bool, str]:
         """Craft a card using dust. Deducts craft cost and adds card to collection."""
-        session = self.get_session()
-        try:
-            card = session.query(Card).filter_by(card_id=card_id).first()
-            if not card:
-                return False, "Card not found"
-            rarity = (card.rarity or "common").lower()
-            cost = self._CRAFT_COST.get(rarity, 40)
+        result = self.craft_cards_batch(user_id, {card_id: 1})
+        if not result["success"]:
+            return False, result["error"]
+        item = result["breakdown"][0]
+        return True, f"Crafted {item['name']} for {item['dust']} dust"
 
-            b = session.query(UserBalances).filter_by(user_id=user_id).first()
-            if not b or (b.dust or 0) < cost:
-                have = b.dust or 0 if b else 0
-                return False, f"Need {cost} dust but you only have {have}"
+    def craft_cards_batch(self, user_id: str, quantities: Dict[str, int]) -> dict:
+        """Craft several cards at once: one card lookup, one ownership lookup,
+        one balance update and bulk collection upserts."""
+        from sqlalchemy import insert as sa_insert, update as sa_update
 
-            b.dust = (b.dust or 0) - cost
-            existing = session.query(UserCard).filter_by(user_id=user_id, card_id=card_id).first()
-            if existing:
-                existing.quantity += 1
-            else:
-                session.add(UserCard(
-                    user_id=user_id, card_id=card_id, quantity=1,
-                    acquired_from="craft", acquired_at=datetime.utcnow(),
-                ))
+        user_id = str(user_id)
+        wanted = {cid: int(qty) for cid, qty in (quantities or {}).items() if int(qty) > 0}
+        if not wanted:
+            return {"success": False, "error": "No cards selected"}
+
+        session = self.get_session()
+        try:
+            cards = {c.card_id: c for c in session.query(Card).filter(Card.card_id.in_(list(wanted))).all()}
+            missing = [cid for cid in wanted if cid not in cards]
+            if missing:
+                return {"success": False, "error": "Card not found"}
+
+            breakdown = []
+            total_cost = 0
+            for card_id, count in wanted.items():
+                card = cards[card_id]
+                rarity = (card.rarity or "common").lower()
+                cost_each = self._CRAFT_COST.get(rarity, 40)
+                total_cost += cost_each * count
+                breakdown.append({
+                    "card_id": card_id, "name": card.name, "rarity": rarity,
+                    "quantity": count, "dust_each": cost_each, "dust": cost_each * count,
+                })
+
+            b = session.query(UserBalances).filter_by(user_id=user_id).with_for_update().first()
+            have = (b.dust or 0) if b else 0
+            if have < total_cost:
+                return {"success": False, "error": f"Need {total_cost} dust but you only have {have}"}
+            b.dust = have - total_cost
+
+            rows = (
+                session.query(UserCard)
+                .filter(UserCard.user_id == user_id, UserCard.card_id.in_(list(wanted)))
+                .with_for_update()
+                .all()
+            )
+            owned = {uc.card_id: int(uc.quantity or 0) for uc in rows}
+            for uc in rows:
+                session.expunge(uc)
+            updates = [
+                {"user_id": user_id, "card_id": cid, "quantity": owned[cid] + count}
+                for cid, count in wanted.items() if cid in owned
+            ]
+            inserts = [
+                {"user_id": user_id, "card_id": cid, "quantity": count,
+                 "acquired_from": "craft", "acquired_at": datetime.utcnow()}
+                for cid, count in wanted.items() if cid not in owned
+            ]
+            if updates:
+                session.execute(sa_update(UserCard), updates)
+            if inserts:
+                session.execute(sa_insert(UserCard), inserts)
+            dust_balance = b.dust
             session.commit()
-            return True, f"Crafted {card.name} for {cost} dust"
+            return {
+                "success": True,
+                "total_cost": total_cost,
+                "dust_balance": dust_balance,
+                "breakdown": breakdown,
+            }
         except Exception as e:
             session.rollback()
-            logger.error(f"[TMA] craft_card error: {e}")
-            return False, str(e)
+            logger.error(f"[TMA] craft_cards_batch error: {e}")
+            return {"success": False, "error": str(e)}
         finally:
             session.close()
 
     def close(self):
         """Closes the database connection."""
         if self._engine:
+            # Write out and unregister the write-behind buffers first
+            self._presence_buffer.close()
+            self._inventory_sync_buffer.close()
+            self._battle_history.close()
             self._engine.dispose()
             self._engine = None
             self._Session = None
-            Database._instance = None # Reset the singleton instance
+            if Database._instance is self:
+                Database._instance = None # Reset the singleton instance
 
 def get_db() -> Database:
     """Returns a singleton instance of the Database class."""
@@ -3019,6 +3702,41 @@ if __name__ == "__main__":
 DatabaseManager = Database
 
 
+class _InstrumentedCursor:
+    """DBAPI cursor proxy that reports each execute to query_metrics
+    (raw connections bypass the SQLAlchemy engine events)."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, params) if params is not None else self._cursor.execute(sql)
+        finally:
+            query_metrics.record(sql, time.perf_counter() - started, self._cursor.rowcount)
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_of_params)
+        finally:
+            query_metrics.record(sql, time.perf_counter() - started, self._cursor.rowcount)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._cursor.close()
+        return False
+
+
 class _PgConnectionWrapper:
     """Wraps a raw psycopg2 connection so it can be used as a context manager
     (commits on success, rolls back on error, closes on exit)."""
@@ -3027,7 +3745,7 @@ class _PgConnectionWrapper:
         self._conn = conn
 
     def cursor(self):
-        return self._conn.cursor()
+        return _InstrumentedCursor(self._conn.cursor())
 
     def commit(self):
         self._conn.commit()
@@ -3048,3 +3766,7 @@ class _PgConnectionWrapper:
             self._conn.commit()
         self._conn.close()
         return False
+
+
+# Per-method statement counts and timings (services/query_metrics.py)
+query_metrics.instrument(Database)
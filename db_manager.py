@@ -5,6 +5,7 @@ import os
 import asyncio
 
 from config import settings
+from services.query_metrics import query_metrics
 
 class DatabaseManager:
     """
@@ -69,6 +70,8 @@ class DatabaseManager:
             # Instead, raise the error so it can be fixed
             raise RuntimeError(f"Database initialization failed: {e}. Cannot use in-memory database as it would lose all user data.")
 
+        query_metrics.attach(self._engine)
+
         # Create session factory
         self._session_factory = async_sessionmaker(
             self._engine,
@@ -97,44 +100,6 @@ class DatabaseManager:
             finally:
                 await session.close()
 
-    async def create_marketplace_table(self):
-        """Create marketplace table if it doesn't exist"""
-        import sqlite3
-        database_url = settings.DATABASE_URL
-
-        try:
-            if database_url and ("postgresql://" in database_url or "postgres://" in database_url):
-                import psycopg2
-                from database import _PgConnectionWrapper
-                url = database_url
-                if url.startswith("postgres://"):
-                    url = url.replace("postgres://", "postgresql://", 1)
-                conn = _PgConnectionWrapper(psycopg2.connect(url))
-            else:
-                db_path = "music_legends.db"
-                conn = sqlite3.connect(db_path)
-
-            with conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS marketplace_listings (
-                        card_id TEXT PRIMARY KEY,
-                        seller_id INTEGER NOT NULL,
-                        price INTEGER NOT NULL,
-                        status TEXT DEFAULT 'active',
-                        listed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        buyer_id INTEGER,
-                        sold_at TIMESTAMP,
-                        FOREIGN KEY (seller_id) REFERENCES users(user_id),
-                        FOREIGN KEY (buyer_id) REFERENCES users(user_id)
-                    )
-                """)
-                conn.commit()
-                print("Marketplace table created/verified")
-        except Exception as e:
-            print(f"Error creating marketplace table: {e}")
-            # Don't crash the bot - continue without marketplace
-
     async def close(self):
         """Close the database engine"""
         if self._engine:
@@ -236,5 +201,7 @@ class DatabaseManager:
         
         return False
 
+query_metrics.instrument(DatabaseManager)
+
 # Single global instance
 db_manager = DatabaseManager()
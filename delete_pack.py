@@ -6,6 +6,18 @@ Quick script to delete a specific pack from the database
 import sqlite3
 import sys
 
+def _invalidate_pack_cache(pack_id: str, card_ids):
+    """Tell running bot/API processes to drop the deleted pack.
+
+    This script runs in its own process, so the eviction only reaches the
+    others through the Redis tier (PACK_CACHE_REDIS=1)."""
+    try:
+        from services.pack_cache import pack_cache
+        pack_cache.invalidate_pack(pack_id)
+        pack_cache.invalidate_cards(card_ids)
+    except Exception as e:
+        print(f"⚠️ Could not invalidate pack cache: {e}")
+
 def delete_pack(pack_id: str, owner_id: int = None):
     """Delete a pack and all associated data"""
 
@@ -31,6 +43,9 @@ def delete_pack(pack_id: str, owner_id: int = None):
                 print(f"❌ Permission denied: You are not the owner of this pack")
                 return False
 
+            cursor.execute("SELECT card_id FROM cards WHERE pack_id = ?", (pack_id,))
+            card_ids = [row[0] for row in cursor.fetchall()]
+
             # Delete pack
             cursor.execute("DELETE FROM creator_packs WHERE pack_id = ?", (pack_id,))
             deleted = cursor.rowcount
@@ -53,6 +68,7 @@ def delete_pack(pack_id: str, owner_id: int = None):
                 print(f"   Deleted {cards_deleted} cards from pack")
 
             conn.commit()
+            _invalidate_pack_cache(pack_id, card_ids)
 
             if deleted > 0:
                 print(f"✅ Deleted pack: {pack_id}")
@@ -4,15 +4,81 @@ Handles card creation, formatting, and display
 """
 
 import discord
+import heapq
+from bisect import bisect_right
+from itertools import islice
 from typing import Dict, Optional, List
 from datetime import datetime
 from services.image_cache import safe_image
 
+# Base power by view count: _VIEW_POWER_BASES[bisect_right(_VIEW_THRESHOLDS, views)]
+_VIEW_THRESHOLDS = (10_000_000, 50_000_000, 100_000_000, 500_000_000, 1_000_000_000)
+_VIEW_POWER_BASES = (20, 30, 40, 50, 60, 70)
+
+RARITY_POWER_BONUS = {
+    "common": 0,
+    "rare": 10,
+    "epic": 20,
+    "legendary": 30,
+    "mythic": 40,
+    "ultra_mythic": 50,
+}
+
+RARITY_COLORS = {
+    "common": 0x95a5a6,      # Gray
+    "rare": 0x3498db,        # Blue
+    "epic": 0x9b59b6,        # Purple
+    "legendary": 0xf39c12,   # Gold
+    "mythic": 0xe74c3c,      # Red
+    "ultra_mythic": 0xff1493, # Deep Pink
+}
+
+RARITY_EMOJIS = {
+    "common": "⚪",
+    "rare": "🔵",
+    "epic": "🟣",
+    "legendary": "🟡",
+    "mythic": "🔴",
+    "ultra_mythic": "💎",
+}
+
+
+def _tier_for_power(power: int) -> str:
+    if power >= 90:
+        return "S"
+    elif power >= 75:
+        return "A"
+    elif power >= 60:
+        return "B"
+    elif power >= 45:
+        return "C"
+    return "D"
+
+
+# Every reachable power (20..120) has its tier precomputed
+_MAX_CARD_POWER = _VIEW_POWER_BASES[-1] + max(RARITY_POWER_BONUS.values())
+_TIER_BY_POWER = tuple(_tier_for_power(p) for p in range(_MAX_CARD_POWER + 1))
+
+
+def rarity_emoji(rarity: str) -> str:
+    """Emoji for a rarity name"""
+    return RARITY_EMOJIS.get((rarity or "").lower(), "⚪")
+
+
 class ArtistCard:
     """
     Represents a music artist card
     """
     
+    # Created in bulk for collections and battles, so no per-instance __dict__.
+    # foil / frame_style / foil_effect are optional variant attributes that
+    # stay unset unless a caller assigns them (to_embed checks hasattr).
+    __slots__ = (
+        "card_id", "artist", "song", "youtube_url", "youtube_id", "view_count",
+        "thumbnail", "rarity", "is_hero", "pack_id", "power", "tier",
+        "foil", "frame_style", "foil_effect",
+    )
+    
     def __init__(
         self,
         card_id: str,
@@ -60,70 +126,22 @@ class ArtistCard:
         - Legendary: +30
         - Mythic: +40
         """
-        # Base power from views
-        if self.view_count >= 1_000_000_000:  # 1B+
-            base = 70
-        elif self.view_count >= 500_000_000:  # 500M+
-            base = 60
-        elif self.view_count >= 100_000_000:  # 100M+
-            base = 50
-        elif self.view_count >= 50_000_000:   # 50M+
-            base = 40
-        elif self.view_count >= 10_000_000:   # 10M+
-            base = 30
-        else:
-            base = 20
-        
-        # Rarity bonus
-        rarity_bonuses = {
-            "common": 0,
-            "rare": 10,
-            "epic": 20,
-            "legendary": 30,
-            "mythic": 40,
-            "ultra_mythic": 50,
-        }
-        
-        bonus = rarity_bonuses.get(self.rarity, 0)
-        
-        return base + bonus
+        base = _VIEW_POWER_BASES[bisect_right(_VIEW_THRESHOLDS, self.view_count)]
+        return base + RARITY_POWER_BONUS.get(self.rarity, 0)
     
     def _calculate_tier(self) -> str:
         """Calculate tier letter (S, A, B, C, D)"""
-        if self.power >= 90:
-            return "S"
-        elif self.power >= 75:
-            return "A"
-        elif self.power >= 60:
-            return "B"
-        elif self.power >= 45:
-            return "C"
-        else:
-            return "D"
+        if 0 <= self.power <= _MAX_CARD_POWER:
+            return _TIER_BY_POWER[self.power]
+        return _tier_for_power(self.power)
     
     def get_rarity_color(self) -> int:
         """Get Discord embed color for rarity"""
-        colors = {
-            "common": 0x95a5a6,      # Gray
-            "rare": 0x3498db,        # Blue
-            "epic": 0x9b59b6,        # Purple
-            "legendary": 0xf39c12,   # Gold
-            "mythic": 0xe74c3c,      # Red
-            "ultra_mythic": 0xff1493, # Deep Pink
-        }
-        return colors.get(self.rarity, 0x95a5a6)
+        return RARITY_COLORS.get(self.rarity, 0x95a5a6)
     
     def get_rarity_emoji(self) -> str:
         """Get emoji for rarity"""
-        emojis = {
-            "common": "⚪",
-            "rare": "🔵",
-            "epic": "🟣",
-            "legendary": "🟡",
-            "mythic": "🔴",
-            "ultra_mythic": "💎",
-        }
-        return emojis.get(self.rarity, "⚪")
+        return RARITY_EMOJIS.get(self.rarity, "⚪")
     
     def to_embed(self, show_stats: bool = True, show_variants: bool = True) -> discord.Embed:
         """
@@ -251,6 +269,8 @@ class Pack:
     Represents a pack of cards
     """
     
+    __slots__ = ("pack_id", "pack_type", "creator_id", "cards", "buy_price", "created_at", "hero_card")
+    
     def __init__(
         self,
         pack_id: str,
@@ -334,74 +354,177 @@ class Pack:
         return f"<Pack: {self.pack_type} ({len(self.cards)} cards, ${self.buy_price})>"
 
 
+class _CollectionIndex:
+    """Lookup structures for a CardCollection, built on first use.
+
+    Cards are kept by sequence number in insertion order, so removal is a dict
+    pop; card_id, rarity and artist map to the sequence numbers of their cards,
+    and the rarity breakdown and a max-power heap are updated on add/remove."""
+
+    __slots__ = ("order", "by_id", "by_rarity", "by_artist", "rarity_counts", "power_heap", "seq")
+
+    def __init__(self, cards: List[ArtistCard]):
+        # seq -> card, insertion ordered
+        self.order: Dict[int, ArtistCard] = {}
+        # card_id -> [seq] in insertion order (a user can own duplicates)
+        self.by_id: Dict[str, List[int]] = {}
+        # rarity / lowercased artist -> {seq: card}, insertion ordered
+        self.by_rarity: Dict[str, Dict[int, ArtistCard]] = {}
+        self.by_artist: Dict[str, Dict[int, ArtistCard]] = {}
+        self.rarity_counts: Dict[str, int] = {}
+        # (-power, seq, card); entries whose seq was removed are skipped lazily
+        self.power_heap: List[tuple] = []
+        self.seq = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card: ArtistCard):
+        self.seq += 1
+        seq = self.seq
+        self.order[seq] = card
+        self.by_id.setdefault(card.card_id, []).append(seq)
+        self.by_rarity.setdefault(card.rarity, {})[seq] = card
+        self.by_artist.setdefault((card.artist or "").lower(), {})[seq] = card
+        self.rarity_counts[card.rarity] = self.rarity_counts.get(card.rarity, 0) + 1
+        heapq.heappush(self.power_heap, (-card.power, seq, card))
+
+    def remove(self, card_id: str) -> Optional[ArtistCard]:
+        seqs = self.by_id.get(card_id)
+        if not seqs:
+            return None
+        seq = seqs.pop(0)
+        if not seqs:
+            del self.by_id[card_id]
+
+        card = self.order.pop(seq)
+        self._drop(self.by_rarity, card.rarity, seq)
+        self._drop(self.by_artist, (card.artist or "").lower(), seq)
+        self.rarity_counts[card.rarity] -= 1
+        if not self.rarity_counts[card.rarity]:
+            del self.rarity_counts[card.rarity]
+
+        # Lazy heap deletion; rebuild once stale entries dominate
+        if len(self.power_heap) > 2 * len(self.order) + 16:
+            self.power_heap = [entry for entry in self.power_heap if entry[1] in self.order]
+            heapq.heapify(self.power_heap)
+        return card
+
+    @staticmethod
+    def _drop(index: Dict[str, Dict[int, ArtistCard]], name: str, seq: int):
+        bucket = index.get(name)
+        if bucket is not None:
+            bucket.pop(seq, None)
+            if not bucket:
+                del index[name]
+
+    def best(self) -> Optional[ArtistCard]:
+        heap = self.power_heap
+        while heap:
+            _, seq, card = heap[0]
+            if seq in self.order:
+                return card
+            heapq.heappop(heap)
+        return None
+
+
 class CardCollection:
     """
     Represents a user's card collection
+    
+    Cards keep their insertion order (for paging). The first lookup, summary
+    or removal builds an index (_CollectionIndex) that is then kept up to date,
+    so a collection that is only built and paged costs no more than a list.
+    Treat .cards as read-only; go through add_card/remove_card.
     """
     
+    __slots__ = ("user_id", "_cards", "_index")
+    
     def __init__(self, user_id: str, cards: Optional[List[ArtistCard]] = None):
         self.user_id = user_id
-        self.cards = cards or []
+        # The store until the index is built; from then on the index holds the cards
+        self._cards: Optional[List[ArtistCard]] = list(cards) if cards else []
+        self._index: Optional[_CollectionIndex] = None
+    
+    def _indexed(self) -> _CollectionIndex:
+        if self._index is None:
+            self._index = _CollectionIndex(self._cards)
+            self._cards = None
+        return self._index
+    
+    @property
+    def cards(self) -> List[ArtistCard]:
+        if self._index is None:
+            return self._cards
+        return list(self._index.order.values())
+    
+    def __len__(self):
+        if self._index is None:
+            return len(self._cards)
+        return len(self._index.order)
     
     def add_card(self, card: ArtistCard):
         """Add card to collection"""
-        self.cards.append(card)
+        if self._index is None:
+            self._cards.append(card)
+        else:
+            self._index.add(card)
     
     def remove_card(self, card_id: str) -> Optional[ArtistCard]:
         """Remove card from collection"""
-        for i, card in enumerate(self.cards):
-            if card.card_id == card_id:
-                return self.cards.pop(i)
-        return None
+        return self._indexed().remove(card_id)
     
     def get_card(self, card_id: str) -> Optional[ArtistCard]:
         """Get card by ID"""
-        return next((c for c in self.cards if c.card_id == card_id), None)
+        index = self._indexed()
+        seqs = index.by_id.get(card_id)
+        return index.order[seqs[0]] if seqs else None
     
     def get_best_card(self) -> Optional[ArtistCard]:
-        """Get highest power card"""
-        if not self.cards:
-            return None
-        return max(self.cards, key=lambda c: c.power)
+        """Get highest power card (earliest added wins ties)"""
+        return self._indexed().best()
     
     def get_cards_by_rarity(self, rarity: str) -> List[ArtistCard]:
         """Get all cards of specific rarity"""
-        return [c for c in self.cards if c.rarity == rarity.lower()]
+        return list(self._indexed().by_rarity.get(rarity.lower(), {}).values())
     
     def get_cards_by_artist(self, artist: str) -> List[ArtistCard]:
         """Get all cards by specific artist"""
-        return [c for c in self.cards if c.artist.lower() == artist.lower()]
+        return list(self._indexed().by_artist.get(artist.lower(), {}).values())
     
     def total_cards(self) -> int:
         """Get total card count"""
-        return len(self.cards)
+        return len(self)
     
     def rarity_breakdown(self) -> Dict[str, int]:
         """Get count of each rarity"""
-        breakdown = {}
-        for card in self.cards:
-            breakdown[card.rarity] = breakdown.get(card.rarity, 0) + 1
-        return breakdown
+        return dict(self._indexed().rarity_counts)
+    
+    def get_page(self, page: int = 1, per_page: int = 10) -> List[ArtistCard]:
+        """Cards on a 1-based page, in insertion order"""
+        start_idx = (page - 1) * per_page
+        if self._index is None:
+            return self._cards[start_idx:start_idx + per_page]
+        return list(islice(self._index.order.values(), start_idx, start_idx + per_page))
     
     def to_embed(self, page: int = 1, per_page: int = 10) -> discord.Embed:
         """Create Discord embed showing collection"""
         
-        total_pages = (len(self.cards) - 1) // per_page + 1 if self.cards else 1
+        total = len(self)
+        total_pages = (total - 1) // per_page + 1 if total else 1
         start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
         
-        page_cards = self.cards[start_idx:end_idx]
+        page_cards = self.get_page(page, per_page)
         
         embed = discord.Embed(
             title=f"🎴 Card Collection",
-            description=f"**Total Cards:** {len(self.cards)}\n**Page:** {page}/{total_pages}",
+            description=f"**Total Cards:** {total}\n**Page:** {page}/{total_pages}",
             color=0x9b59b6
         )
         
         # Show rarity breakdown
         breakdown = self.rarity_breakdown()
         breakdown_text = "\n".join([
-            f"{ArtistCard(None, None, None, None, None, 0, None, rarity=r).get_rarity_emoji()} {r.title()}: {count}"
+            f"{rarity_emoji(r)} {r.title()}: {count}"
             for r, count in breakdown.items()
         ])
         
@@ -430,4 +553,4 @@ class CardCollection:
         return embed
     
     def __repr__(self):
-        return f"<CardCollection: {self.user_id} ({len(self.cards)} cards)>"
+        return f"<CardCollection: {self.user_id} ({len(self)} cards)>"
@@ -1,13 +1,11 @@
 # drop_system.py
-import asyncio
 import time
-import sqlite3
-from typing import Dict, Optional, List
+from typing import Dict, Optional
 from dataclasses import dataclass
-from scheduler import scheduler
 from action_queue import action_queue, Task
 from card_economy import CardEconomyManager
 from database import DatabaseManager
+from services.drop_engine import DropEngine, get_drop_engine
 
 @dataclass
 class DropConfig:
@@ -15,37 +13,48 @@ class DropConfig:
     CLAIM_WINDOW: int = 30000    # 30 seconds in milliseconds
     MAX_RETRIES: int = 3
     QUEUE_POLL: int = 50        # 50ms poll interval
+    ACTIVITY_CACHE_TTL: int = 300  # seconds an activity level is trusted
 
 class DropTimer:
-    def __init__(self, db_manager: DatabaseManager):
+    """Per-server drop cooldowns, held in the drop engine's cooldown cache.
+
+    Drop attempts never read the database: the cooldown is started in the
+    cache when a drop spawns, with a length from the server's activity level
+    (cached for ACTIVITY_CACHE_TTL). server_drop_cooldowns is only written.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, engine: Optional[DropEngine] = None):
         self.db = db_manager
+        self.engine = engine or get_drop_engine()
         self.config = DropConfig()
-        
-    def can_drop(self, server_id: int) -> bool:
-        """Check if server can drop based on cooldown"""
+        self._activity: Dict[int, tuple] = {}  # server_id -> (activity_level, read at)
+
+    def _activity_level(self, server_id: int) -> int:
+        cached = self._activity.get(server_id)
+        if cached and time.time() - cached[1] < self.config.ACTIVITY_CACHE_TTL:
+            return cached[0]
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT last_drop_time, activity_level FROM server_drop_cooldowns 
+                SELECT activity_level FROM server_drop_cooldowns 
                 WHERE server_id = ?
             """, (server_id,))
             result = cursor.fetchone()
-            
-            if not result:
-                return True  # First drop
-            
-            last_drop, activity_level = result
-            if not last_drop:
-                return True
-            
-            # Cooldown based on activity level (1-5)
-            cooldown_minutes = max(1, 30 - (activity_level * 6))  # 30 min to 1 min
-            cooldown_time = time.time() - (cooldown_minutes * 60)
-            
-            return float(last_drop) < cooldown_time
+        level = (result[0] if result else 0) or 0
+        self._activity[server_id] = (level, time.time())
+        return level
+
+    def cooldown_for(self, server_id: int) -> int:
+        """Cooldown in seconds based on activity level (1-5): 30 min to 1 min"""
+        cooldown_minutes = max(1, 30 - (self._activity_level(server_id) * 6))
+        return cooldown_minutes * 60
+        
+    def can_drop(self, server_id: int) -> bool:
+        """Check if server can drop based on cooldown"""
+        return not self.engine.on_cooldown(server_id)
     
     def update_cooldown(self, server_id: int):
-        """Update server cooldown after drop"""
+        """Record a drop for the server (the cooldown itself starts in the cache)"""
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -58,16 +67,18 @@ class DropTimer:
             conn.commit()
 
 class DropSystem:
-    def __init__(self, bot, db_manager: DatabaseManager, economy_manager: CardEconomyManager):
+    def __init__(self, bot, db_manager: DatabaseManager, economy_manager: CardEconomyManager,
+                 engine: Optional[DropEngine] = None):
         self.bot = bot
         self.db = db_manager
         self.economy = economy_manager
-        self.timer = DropTimer(db_manager)
-        self.active_drops: Dict[int, Dict] = {}  # channel_id -> drop_data
+        self.engine = engine or get_drop_engine()
+        self.timer = DropTimer(db_manager, self.engine)
         self.config = DropConfig()
-        
-        # Start scheduler
-        scheduler.start()
+
+    async def start(self):
+        """Start expiring drops on the scheduler"""
+        await self.engine.start_expiry()
     
     async def create_drop(self, channel_id: int, server_id: int, initiator_id: int, drop_type: str = 'standard') -> Dict:
         """Create a new drop with queue protection"""
@@ -93,39 +104,24 @@ class DropSystem:
             if not cards:
                 return {'success': False, 'error': 'Failed to generate cards'}
             
-            # Create drop record
-            import uuid
-            drop_id = str(uuid.uuid4())
-            expires_at = time.time() + (self.config.CLAIM_WINDOW / 1000)
-            
-            # Store drop data
-            drop_data = {
-                'drop_id': drop_id,
-                'channel_id': channel_id,
-                'server_id': server_id,
-                'initiator_id': initiator_id,
-                'cards': cards,
-                'drop_type': drop_type,
-                'expires_at': expires_at,
-                'created_at': time.time()
-            }
-            
-            self.active_drops[channel_id] = drop_data
+            # Starting the cooldown is atomic: of two racing drops in a server one wins
+            drop = self.engine.spawn(
+                server_id, channel_id,
+                {'cards': cards, 'initiator_id': initiator_id, 'drop_type': drop_type},
+                ttl=self.config.CLAIM_WINDOW / 1000,
+                cooldown=self.timer.cooldown_for(server_id),
+            )
+            if drop is None:
+                return {'success': False, 'error': 'Drop on cooldown'}
             
             # Update cooldown
             self.timer.update_cooldown(server_id)
             
-            # Schedule expiration
-            scheduler.schedule('expireDrop', {
-                'channel_id': channel_id,
-                'drop_id': drop_id
-            }, self.config.CLAIM_WINDOW)
-            
             return {
                 'success': True,
-                'drop_id': drop_id,
+                'drop_id': drop['drop_id'],
                 'cards': cards,
-                'expires_at': expires_at
+                'expires_at': drop['expires_at']
             }
         
         # Run with queue protection
@@ -135,106 +131,49 @@ class DropSystem:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    async def wait_for_reactions(self, channel_id: int, drop_id: str) -> Optional[Dict]:
-        """Wait for reactions within claim window"""
-        if channel_id not in self.active_drops:
-            return None
-        
-        drop_data = self.active_drops[channel_id]
-        if drop_data['drop_id'] != drop_id:
-            return None
-        
-        # Wait for claim window
-        remaining_time = drop_data['expires_at'] - time.time()
-        if remaining_time > 0:
-            await asyncio.sleep(min(remaining_time, self.config.CLAIM_WINDOW / 1000))
-        
-        # Check if drop was claimed
-        if channel_id in self.active_drops:
-            return self.active_drops[channel_id]
-        else:
-            return None  # Expired or claimed
-    
     async def resolve_drop(self, channel_id: int, user_id: int, reaction_number: int) -> Dict:
-        """Resolve a drop claim — uses channel-level lock to prevent double claims"""
-        # Use channel-level lock so only one claim can process at a time per channel
-        task_key = f"drop_claim_{channel_id}"
-
-        async def claim_task():
-            if channel_id not in self.active_drops:
-                return {'success': False, 'error': 'No active drop'}
-
-            drop_data = self.active_drops[channel_id]
+        """Resolve a drop claim — compare-and-set on the drop record, one winner per drop"""
+        drop = self.engine.channel_drop(channel_id)
+        if not drop:
+            return {'success': False, 'error': 'No active drop'}
 
-            # Check if expired
-            if time.time() > drop_data['expires_at']:
-                del self.active_drops[channel_id]
-                return {'success': False, 'error': 'Drop expired'}
+        cards = drop['payload']['cards']
+        if reaction_number < 1 or reaction_number > len(cards):
+            return {'success': False, 'error': 'Invalid card number'}
 
-            # Check if valid reaction number
-            if reaction_number < 1 or reaction_number > len(drop_data['cards']):
-                return {'success': False, 'error': 'Invalid card number'}
-
-            # Get the card
-            card = drop_data['cards'][reaction_number - 1]
-
-            # Award card to user
-            self.economy._award_card_to_user(user_id, card)
-
-            # Remove from active drops (inside lock, prevents double claim)
-            del self.active_drops[channel_id]
-
-            return {
-                'success': True,
-                'card': card,
-                'drop_id': drop_data['drop_id']
-            }
+        claim = self.engine.claim(drop['drop_id'], user_id)
+        if not claim['success']:
+            return {'success': False, 'error': 'Drop expired' if claim['reason'] == 'expired' else 'No active drop'}
 
+        card = cards[reaction_number - 1]
         try:
-            task = Task(key=task_key, action=claim_task)
-            result = await action_queue.run(task)
-            
-            # Schedule cooldown reset
-            scheduler.schedule('resetCooldown', {
-                'server_id': drop_data['server_id'],
-                'channel_id': channel_id
-            }, self.config.DROP_COOLDOWN * 1000)  # Convert to milliseconds
-            
-            return result
-            
+            card_id = card.get('card_id') if isinstance(card, dict) else card
+            self.economy._award_card_to_user(user_id, card_id)
         except Exception as e:
+            self.engine.release(drop['drop_id'], user_id)
             return {'success': False, 'error': str(e)}
-    
-    async def expire_drop(self, channel_id: int, drop_id: str):
-        """Handle drop expiration"""
-        if channel_id in self.active_drops:
-            drop_data = self.active_drops[channel_id]
-            if drop_data['drop_id'] == drop_id:
-                del self.active_drops[channel_id]
-                print(f"Drop {drop_id} expired in channel {channel_id}")
-    
-    def get_active_drops(self) -> List[Dict]:
-        """Get all active drops"""
-        return list(self.active_drops.values())
+
+        return {
+            'success': True,
+            'card': card,
+            'drop_id': drop['drop_id']
+        }
     
     def get_drop_status(self, channel_id: int) -> Optional[Dict]:
         """Get status of a specific drop"""
-        if channel_id not in self.active_drops:
+        drop = self.engine.channel_drop(channel_id)
+        if not drop:
             return None
         
-        drop = self.active_drops[channel_id]
         remaining_time = max(0, drop['expires_at'] - time.time())
         
         return {
             'drop_id': drop['drop_id'],
             'expires_in': remaining_time,
-            'card_count': len(drop['cards']),
-            'initiator_id': drop['initiator_id']
+            'card_count': len(drop['payload']['cards']),
+            'initiator_id': drop['payload'].get('initiator_id')
         }
 
-# Import sqlite3 for database operations
-import sqlite3
-
 # Global drop system instance
 drop_system = None
 
@@ -1,8 +1,12 @@
 import os
 import sys
 import discord
+from discord import app_commands
 from discord.ext import commands
 from config import settings
+from services.query_metrics import query_metrics
+from services.startup import PREWARM, StartupProfile
+from services.sharding import get_leadership, shard_config, shard_metrics
 
 # Set UTF-8 encoding for Windows console
 if sys.platform == "win32":
@@ -30,14 +34,49 @@ intents.members = True
 intents.presences = True  # Enable presence intent
 intents.reactions = True  # Enable reaction intent
 
-class Bot(commands.Bot):
+# Production cogs (global user-facing command surface)
+COGS = [
+    'cogs.start_game',                # Start game command
+    'cogs.game_info',                 # /post_game_info — branded game guide
+    'cogs.gameplay',                  # Drop, collection, viewing commands
+    'cogs.card_game',                 # Collection and pack creation commands
+    'cogs.menu_system',               # Persistent menu system (User Hub + Dev Panel)
+    'cogs.marketplace',               # Marketplace commands
+    'cogs.admin_commands',            # Admin commands (all servers)
+    'cogs.battle_commands',           # Battle system (/battle, /battle_stats)
+    'cogs.battlepass_commands',       # Battle Pass + Daily Quests
+    'cogs.trade_commands',            # /trade and /trade_history
+]
+ADDITIONAL_COGS = ['cogs.dust_commands']
+# Dev/test cogs, loaded only when ENABLE_DEV_COMMANDS is set
+DEV_COGS = [
+    'cogs.admin_bulk_import',
+    'cogs.dev_webhook_commands',
+    'cogs.dev_supply_commands',
+]
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that groups DB query metrics by slash command"""
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        name = (interaction.data or {}).get("name", "?")
+        with query_metrics.scope(f"discord:/{name}"):
+            await super()._call(interaction)
+
+
+class Bot(commands.AutoShardedBot):
     def __init__(self):
+        # SHARD_COUNT / SHARD_IDS pick this process's shards; unset runs them all here
         super().__init__(
             command_prefix="!",
             help_command=None,
             intents=intents,
-            application_id=settings.DISCORD_APPLICATION_ID
+            application_id=settings.DISCORD_APPLICATION_ID,
+            tree_cls=InstrumentedCommandTree,
+            **shard_config(),
         )
+        self.leadership = get_leadership()
+        shard_metrics.attach(self)
 
         # Flag to prevent on_ready from running multiple times
         self._ready_once = False
@@ -47,6 +86,14 @@ class Bot(commands.Bot):
         print("🚀🚀🚀🚀🚀 BOT RESTARTING - USER REQUESTED RESTART 🚀🚀🚀🚀🚀")
         print("🔥🔥🔥 TIMESTAMP:", __import__('datetime').datetime.now())
         print("🔥🔥🔥 FORCING COMPLETE RESTART - ALL SYSTEMS RELOADING")
+        profile = StartupProfile()
+
+        # Singleton work (cron jobs, seeding, announcements) runs only on the elected leader
+        import asyncio
+        leader = await asyncio.to_thread(self.leadership.campaign)
+        self.leadership.start()
+        print(f"👑 Process {self.leadership.identity} is {'leader' if leader else 'a follower'} "
+              f"({self.leadership.backend} election)")
         
         # Initialize database with persistent storage
         # When PostgreSQL is active (DATABASE_URL set), skip db_manager entirely.
@@ -63,9 +110,6 @@ class Bot(commands.Bot):
 
             db_manager.init_engine()
 
-            # Create marketplace table (SQLite only — PostgreSQL version is in _init_postgresql)
-            await db_manager.create_marketplace_table()
-
             # Check for database restore if needed (SQLite only)
             restored = await db_manager.restore_database_if_needed()
             if restored:
@@ -115,8 +159,8 @@ class Bot(commands.Bot):
             
             while True:
                 try:
-                    # Check if bot is active (has guilds and is ready)
-                    if hasattr(self, 'guilds') and len(self.guilds) > 0:
+                    # Check if bot is active (has guilds and is ready) and the one backing up
+                    if self.leadership.is_leader and hasattr(self, 'guilds') and len(self.guilds) > 0:
                         from services.backup_service import backup_service
                         backup_path = await backup_service.backup_periodic()
                         if backup_path:
@@ -133,58 +177,48 @@ class Bot(commands.Bot):
         # asyncio.create_task(periodic_backup_loop())  # DISABLED - causing hanging issues
         print("⏰ Periodic backups DISABLED (was causing hanging issues)")
         
-        # Load production cogs (global user-facing command surface)
-        cogs = [
-            'cogs.start_game',                # Start game command
-            'cogs.game_info',                 # /post_game_info — branded game guide
-            'cogs.gameplay',                  # Drop, collection, viewing commands
-            'cogs.card_game',                 # Collection and pack creation commands
-            'cogs.menu_system',               # Persistent menu system (User Hub + Dev Panel)
-            'cogs.marketplace',               # Marketplace commands
-            'cogs.admin_commands',            # Admin commands (all servers)
-            'cogs.battle_commands',           # Battle system (/battle, /battle_stats)
-            'cogs.battlepass_commands',       # Battle Pass + Daily Quests
-            'cogs.trade_commands',            # /trade and /trade_history
-        ]
-        
-        print(f"📦 Attempting to load {len(cogs)} cogs...")
+        profile.mark("database")
+
+        # STARTUP_PREWARM=1: import what the cogs depend on concurrently first
+        if PREWARM:
+            to_load = COGS + ADDITIONAL_COGS + (DEV_COGS if settings.ENABLE_DEV_COMMANDS else [])
+            warmed = await profile.prewarm(to_load)
+            print(f"🔥 Pre-imported {warmed} cog dependencies in {profile.mark('prewarm'):.2f}s")
+
+        print(f"📦 Attempting to load {len(COGS)} cogs...")
         
-        for cog in cogs:
+        for cog in COGS:
             try:
                 print(f"🔄 Loading {cog}...")
-                await self.load_extension(cog)
-                print(f'✅ Loaded extension: {cog}')
+                await profile.load_extension(self, cog)
+                print(f'✅ Loaded extension: {cog} ({profile.cogs[cog]:.2f}s)')
             except Exception as e:
                 print(f'❌ Failed to load extension {cog}: {e}')
                 print(f'⚠️ Continuing without {cog} - bot will still run')
                 # Continue loading other cogs - don't break the whole bot
         
         # Load additional cogs with error handling
-        additional_cogs = ['cogs.dust_commands']
-        for cog in additional_cogs:
+        for cog in ADDITIONAL_COGS:
             try:
-                await self.load_extension(cog)
-                print(f'✅ Loaded extension: {cog}')
+                await profile.load_extension(self, cog)
+                print(f'✅ Loaded extension: {cog} ({profile.cogs[cog]:.2f}s)')
             except Exception as e:
                 print(f'⚠️ Could not load {cog}: {e}')
 
         # Load dev/test cogs only when explicitly enabled.
-        dev_cogs = [
-            'cogs.admin_bulk_import',
-            'cogs.dev_webhook_commands',
-            'cogs.dev_supply_commands',
-        ]
         if settings.ENABLE_DEV_COMMANDS:
             print("🧪 ENABLE_DEV_COMMANDS=true — loading dev command cogs")
-            for cog in dev_cogs:
+            for cog in DEV_COGS:
                 try:
-                    await self.load_extension(cog)
+                    await profile.load_extension(self, cog)
                     print(f'✅ Loaded dev extension: {cog}')
                 except Exception as e:
                     print(f'⚠️ Could not load dev extension {cog}: {e}')
         else:
             print("🧹 Dev command cogs disabled (ENABLE_DEV_COMMANDS=false)")
         
+        profile.mark("cogs")
+
         print("🔍 Checking loaded commands...")
         loaded_commands = []
         for cog_name in self.cogs:
@@ -218,6 +252,10 @@ class Bot(commands.Bot):
             print(f'❌ Unexpected error during sync: {e}')
             import traceback
             traceback.print_exc()
+        profile.mark("sync")
+
+        print(f"⏱️ {profile.summary()}")
+        profile.record()
 
     async def on_ready(self):
         """Called when bot is ready (and on reconnects)"""
@@ -238,12 +276,16 @@ class Bot(commands.Bot):
         print("🎯 First ready event - running startup tasks")
 
         # Refund wagers for any battles that were active when the bot last died.
-        # active_battles rows are written when a battle starts (after wager deduction)
-        # and deleted on completion. Any remaining rows = interrupted mid-battle.
+        # Battles are recorded when they start (after wager deduction) and removed
+        # on completion; anything left was interrupted mid-battle. With a shared
+        # battle store that record is this shard's set in Redis, otherwise the
+        # active_battles table.
         try:
             from database import get_db
+            from battle_engine import get_battle_manager
             db = get_db()
-            stuck = db.get_all_active_battles()
+            manager = get_battle_manager()
+            stuck = manager.recover() if manager.durable else db.get_all_active_battles()
             if stuck:
                 print(f"[BATTLE] Found {len(stuck)} interrupted battle(s) — refunding wagers")
                 for b in stuck:
@@ -276,18 +318,22 @@ class Bot(commands.Bot):
             print(f"⚠️ Bot logger init failed (non-critical): {e}")
 
         # Seed packs synchronously — cleanup + insert runs in < 1 second
-        # (API calls disabled, all songs are hardcoded in FALLBACK_SONGS)
+        # (API calls disabled, all songs are hardcoded in FALLBACK_SONGS).
+        # Shared database, so only the leader process seeds.
         import asyncio
-        try:
-            print("[SEED] Starting seed_packs_into_db...")
-            from services.seed_packs import seed_packs_into_db
-            result = await asyncio.to_thread(seed_packs_into_db)
-            print(f"[SEED] Done: {result.get('inserted', 0)} inserted, "
-                  f"{result.get('skipped', 0)} skipped, {result.get('failed', 0)} failed")
-        except Exception as e:
-            print(f"[SEED] ERROR: {e}")
-            import traceback
-            traceback.print_exc()
+        if not self.leadership.is_leader:
+            print("[SEED] Skipped — another process is leader")
+        else:
+            try:
+                print("[SEED] Starting seed_packs_into_db...")
+                from services.seed_packs import seed_packs_into_db
+                result = await asyncio.to_thread(seed_packs_into_db)
+                print(f"[SEED] Done: {result.get('inserted', 0)} inserted, "
+                      f"{result.get('skipped', 0)} skipped, {result.get('failed', 0)} failed")
+            except Exception as e:
+                print(f"[SEED] ERROR: {e}")
+                import traceback
+                traceback.print_exc()
 
         # Send any pending restart alerts that were queued during startup
         try:
@@ -325,6 +371,8 @@ class Bot(commands.Bot):
             print(f"⚠️ Startup notice error: {e}")
 
         # Send security changelog via webhook (reliable path — same as all bot alerts)
+        if not self.leadership.is_leader:
+            return
         try:
             from monitor.alerts import send_econ
             changelog_text = (
@@ -344,6 +392,12 @@ class Bot(commands.Bot):
     async def close(self):
         """Cleanup when bot shuts down"""
         print("🔄 Cleaning up...")
+
+        # Hand leadership to another process straight away instead of after the lease TTL
+        try:
+            await self.leadership.resign()
+        except Exception as e:
+            print(f"⚠️ Leadership resign error (non-critical): {e}")
         
         # Create backup before shutdown
         try:
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Schema migration entry point.
+
+Run once per deploy, before run_bot.py and the TMA API start (both only check
+that the schema is at head when they boot, see services/schema.py):
+
+  python migrate.py            # upgrade DATABASE_URL to the head revision
+  python migrate.py --check    # exit 1 if the schema is behind, change nothing
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("migrate")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Upgrade the database schema to head")
+    parser.add_argument("--check", action="store_true", help="only report whether the schema is at head")
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    from config import settings
+    from services import schema
+
+    engine = create_engine(settings.DATABASE_URL)
+    head = schema.head_revision()
+    try:
+        with engine.connect() as conn:
+            current = schema.current_revision(conn)
+        if args.check:
+            logger.info(f"[MIGRATE] schema at {current or 'unversioned'}, head is {head}")
+            return 0 if current == head else 1
+        if current == head:
+            logger.info(f"[MIGRATE] schema already at head ({head})")
+            return 0
+        before, after = schema.upgrade(engine)
+        logger.info(f"[MIGRATE] schema upgraded {before or 'unversioned'} -> {after}")
+        return 0
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
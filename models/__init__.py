@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Text, Float, ForeignKey, Index
+from sqlalchemy import case, event, func
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.types import TypeDecorator, CHAR
 from sqlalchemy.dialects import postgresql
@@ -205,6 +206,18 @@ class ServerActivity(Base):
     server_id = Column(Integer, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+class GuildActivity(Base):
+    """Rolling activity score per guild (services/drop_spawner.py): a message
+    count decayed with a half-life, flushed periodically instead of one
+    server_activity row per message."""
+    __tablename__ = "guild_activity"
+
+    server_id = Column(String, primary_key=True)
+    score = Column(Float, default=0.0)
+    channel_id = Column(String)  # most active channel, where drops go
+    messages = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class MarketplaceListings(Base):
     __tablename__ = "marketplace_listings"
 
@@ -294,6 +307,7 @@ class Card(Base):
     longevity = Column(Integer)
     culture = Column(Integer)
     hype = Column(Integer)
+    power = Column(Integer)  # cached compute_card_power(), kept in sync on insert/update
     serial_number = Column(String)
     print_number = Column(Integer, default=1)
     quality = Column(String, default='standard')
@@ -303,6 +317,12 @@ class Card(Base):
     created_by_user_id = Column(String, ForeignKey('users.user_id'))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # rarity / tier hold canonical lowercase values (cards_config.normalize_*)
+    __table_args__ = (
+        Index("idx_cards_rarity", "rarity"),
+        Index("idx_cards_tier", "tier"),
+    )
+
     def to_dict(self):
         return {
             "card_id": self.card_id,
@@ -321,6 +341,7 @@ class Card(Base):
             "longevity": self.longevity,
             "culture": self.culture,
             "hype": self.hype,
+            "power": self.power,
             "serial_number": self.serial_number,
             "print_number": self.print_number,
             "quality": self.quality,
@@ -334,6 +355,32 @@ class Card(Base):
     creator_pack = relationship("CreatorPacks", back_populates="cards")
     created_by_user = relationship("User")
 
+
+@event.listens_for(Card, "before_insert")
+@event.listens_for(Card, "before_update")
+def _sync_card_power(mapper, connection, target):
+    from cards_config import compute_card_power, normalize_rarity, normalize_tier
+    target.rarity = normalize_rarity(target.rarity)
+    target.tier = normalize_tier(target.tier)
+    target.power = compute_card_power({
+        "impact": target.impact, "skill": target.skill, "longevity": target.longevity,
+        "culture": target.culture, "hype": target.hype, "rarity": target.rarity,
+    })
+
+
+def card_power_sql():
+    """SQL equivalent of cards_config.compute_card_power, for rows written
+    outside the ORM (raw seeders) and for backfilling Card.power."""
+    from cards_config import RARITY_BONUS
+    stats = [func.coalesce(func.nullif(col, 0), 50)
+             for col in (Card.impact, Card.skill, Card.longevity, Card.culture, Card.hype)]
+    bonus = case(
+        {rarity: value for rarity, value in RARITY_BONUS.items()},
+        value=func.lower(Card.rarity),
+        else_=0,
+    )
+    return (stats[0] + stats[1] + stats[2] + stats[3] + stats[4]) // 5 + bonus
+
 class CreatorPacks(Base):
     __tablename__ = "creator_packs"
 
@@ -344,12 +391,16 @@ class CreatorPacks(Base):
     price = Column(Integer, default=0)
     card_count = Column(Integer, default=0)
     cards_data = Column(JSONType) # Added cards_data
-    pack_tier = Column(String) # Added pack_tier
+    pack_tier = Column(String, default="community") # Added pack_tier
     genre = Column(String) # Added genre
     cover_image_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_public = Column(Boolean, default=False)
 
+    __table_args__ = (
+        Index("idx_creator_packs_public_tier", "is_public", "pack_tier"),
+    )
+
     creator = relationship("User")
     cards = relationship("Card", back_populates="creator_pack")
     pack_cards = relationship("CreatorPackCards", back_populates="pack")
@@ -399,6 +450,47 @@ class BattleLog(Base):
     battle_data = Column(Text)  # JSON blob of the battle replay
     battle_timestamp = Column(DateTime, default=datetime.utcnow)
 
+class BattleHistoryEntry(Base):
+    """One resolved battle (services/battle_history.py). Rows older than the
+    retention window are folded into BattleDailyStats and deleted."""
+    __tablename__ = "battle_history"
+
+    battle_id = Column(String, primary_key=True)
+    player1_id = Column(String, nullable=False)
+    player2_id = Column(String, nullable=False)
+    player1_card_id = Column(String)
+    player2_card_id = Column(String)
+    winner = Column(Integer)  # 0 = tie, 1 = player1, 2 = player2
+    player1_power = Column(Integer)
+    player2_power = Column(Integer)
+    player1_critical = Column(Boolean, default=False)
+    player2_critical = Column(Boolean, default=False)
+    wager_tier = Column(String)
+    wager_amount = Column(Integer, default=0)
+    player1_gold_reward = Column(Integer, default=0)
+    player2_gold_reward = Column(Integer, default=0)
+    player1_xp_reward = Column(Integer, default=0)
+    player2_xp_reward = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # A player's history is read newest-first from either side
+    __table_args__ = (
+        Index("idx_battle_history_p1_created", "player1_id", "created_at"),
+        Index("idx_battle_history_p2_created", "player2_id", "created_at"),
+    )
+
+class BattleDailyStats(Base):
+    """Per-user, per-day battle totals for history past the retention window."""
+    __tablename__ = "battle_daily_stats"
+
+    user_id = Column(String, primary_key=True)
+    day = Column(String, primary_key=True)  # YYYY-MM-DD (UTC)
+    wins = Column(Integer, default=0)
+    losses = Column(Integer, default=0)
+    ties = Column(Integer, default=0)
+    gold_earned = Column(Integer, default=0)
+    xp_earned = Column(Integer, default=0)
+
 class UserBalances(Base):
     __tablename__ = "user_balances"
 
@@ -3,6 +3,7 @@ import aiohttp
 import asyncio
 from datetime import datetime
 from config.monitor import MONITOR, ALERT_COLORS
+from services.send_queue import ALERT, route_for, send_queue
 
 
 async def send_ops(title, message, level="info"):
@@ -18,20 +19,47 @@ async def send_econ(title, message, level="info"):
 
 
 async def _send(url, title, message, color):
-    """Send webhook with embed"""
+    """Send webhook with embed; repeats of the same alert within DIGEST_WINDOW go out as one digest"""
     if not url:
         return  # fail safe
 
-    embed = {
-        "title": title,
+    entry = {
         "description": message,
         "color": color,
         "timestamp": datetime.utcnow().isoformat()
     }
 
+    future = send_queue.post_digest(
+        (url, title), entry, lambda entries: _post_webhook(url, title, entries),
+        priority=ALERT, route=route_for(url)
+    )
+    if future is not None:
+        try:
+            await future
+        except Exception as e:
+            # Fail silently to avoid infinite loops
+            print(f"Webhook failed: {e}")
+
+
+async def _post_webhook(url, title, entries):
+    """POST one embed, a digest when several alerts were folded together"""
+    last = entries[-1]
+    embed = {
+        "title": title,
+        "description": last["description"],
+        "color": last["color"],
+        "timestamp": last["timestamp"]
+    }
+    if len(entries) > 1:
+        embed["title"] = f"{title} (×{len(entries)})"
+        embed["description"] = "\n".join(f"• {e['description']}" for e in entries)[:4000]
+        embed["footer"] = {"text": f"{len(entries)} alerts since {entries[0]['timestamp'][:19]}"}
+
     async with aiohttp.ClientSession() as session:
         try:
-            await session.post(url, json={"embeds": [embed]}, timeout=5)
+            # The response goes back to the send queue, which reads its rate-limit headers
+            async with session.post(url, json={"embeds": [embed]}, timeout=5) as response:
+                return response
         except Exception as e:
             # Fail silently to avoid infinite loops
             print(f"Webhook failed: {e}")
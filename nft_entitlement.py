@@ -50,7 +50,6 @@ class NFTEntitlementManager:
     def __init__(self, db_path: str = "music_legends.db"):
         self.db_path = db_path
         self.alchemy_api_key = settings.ALCHEMY_API_KEY
-        self.init_entitlement_tables()
 
     def _get_connection(self):
         database_url = settings.DATABASE_URL
@@ -62,66 +61,6 @@ class NFTEntitlementManager:
         import sqlite3
         return sqlite3.connect(self.db_path)
 
-    def init_entitlement_tables(self):
-        """Initialize entitlement tracking tables"""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Wallet linking (one-time)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS wallet_links (
-                    discord_user_id INTEGER PRIMARY KEY,
-                    wallet_address TEXT NOT NULL UNIQUE,
-                    signature TEXT NOT NULL,
-                    nonce TEXT NOT NULL,
-                    verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT DEFAULT 'active'
-                )
-            """)
-            
-            # NFT snapshot cache (updated every 24h)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS nft_snapshots (
-                    snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    discord_user_id INTEGER NOT NULL,
-                    wallet_address TEXT NOT NULL,
-                    collection_key TEXT NOT NULL,
-                    nft_count INTEGER DEFAULT 0,
-                    snapshot_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    verification_method TEXT,
-                    FOREIGN KEY (discord_user_id) REFERENCES wallet_links(discord_user_id)
-                )
-            """)
-            
-            # Cached entitlement records (used during purchases)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS entitlement_cache (
-                    discord_user_id INTEGER PRIMARY KEY,
-                    wallet_address TEXT NOT NULL,
-                    eligible_nfts INTEGER DEFAULT 0,
-                    revenue_share_percent REAL DEFAULT 0.10,
-                    last_verified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    verification_status TEXT DEFAULT 'active',
-                    freeze_reason TEXT,
-                    FOREIGN KEY (discord_user_id) REFERENCES wallet_links(discord_user_id)
-                )
-            """)
-            
-            # Snapshot refresh log
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS snapshot_refresh_log (
-                    refresh_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    refresh_type TEXT NOT NULL,
-                    discord_user_id INTEGER,
-                    success BOOLEAN,
-                    nfts_found INTEGER,
-                    error_message TEXT,
-                    refresh_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            conn.commit()
-    
     def generate_nonce(self) -> str:
         """Generate a unique nonce for wallet signature"""
         return secrets.token_hex(32)
@@ -1,41 +1,244 @@
 # queue/locks.py
-import redis
+import logging
+import threading
 import time
-from contextlib import contextmanager
 import uuid
-from config import settings
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+from rq_queue.redis_connection import get_redis_connection
+
+# Compare-and-delete: only the holder may release, and waiters are woken
+# through the lock's release channel instead of polling.
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('del', KEYS[1])
+    redis.call('publish', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Compare-and-extend for lock renewal on long-running jobs
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Upper bound on a single pub/sub wait so a lost release message (or a lock
+# that simply expired) never stalls a waiter for long.
+MAX_WAIT_SLICE = 1.0
+
+
+class LockMetrics:
+    """Process-wide contention counters, grouped by lock namespace (user, trade, ...)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _bucket(self, key: str) -> Dict[str, float]:
+        # "lock:user:123" -> "user"
+        parts = key.split(":")
+        namespace = parts[1] if len(parts) > 2 else key
+        bucket = self._stats.get(namespace)
+        if bucket is None:
+            bucket = self._stats[namespace] = {
+                'acquired': 0, 'contended': 0, 'timeouts': 0,
+                'renewals': 0, 'lost': 0,
+                'total_wait': 0.0, 'max_wait': 0.0,
+            }
+        return bucket
+
+    def record_acquire(self, key: str, waited: float, contended: bool):
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket['acquired'] += 1
+            bucket['total_wait'] += waited
+            bucket['max_wait'] = max(bucket['max_wait'], waited)
+            if contended:
+                bucket['contended'] += 1
+
+    def record(self, key: str, field: str):
+        with self._lock:
+            self._bucket(key)[field] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for namespace, bucket in self._stats.items():
+                acquired = bucket['acquired']
+                result[namespace] = {
+                    **bucket,
+                    'avg_wait_ms': round(bucket['total_wait'] / acquired * 1000, 2) if acquired else 0.0,
+                    'max_wait_ms': round(bucket['max_wait'] * 1000, 2),
+                    'contention_rate': round(bucket['contended'] / acquired, 3) if acquired else 0.0,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+lock_metrics = LockMetrics()
+
+
+def get_lock_metrics() -> Dict[str, Dict[str, Any]]:
+    """Get lock contention metrics per namespace"""
+    return lock_metrics.snapshot()
+
 
 class RedisLock:
-    def __init__(self, key, ttl=10):
+    """Distributed lock on the shared Redis pool.
+
+    Acquisition uses ``SET NX PX``; when the lock is held the caller blocks on
+    the lock's release channel rather than spinning. Release is an atomic
+    compare-and-delete. Pass ``auto_renew=True`` for jobs that may outlive the
+    TTL; a background thread extends the lock every ``ttl / 3`` seconds.
+    """
+
+    def __init__(self, key, ttl=10, timeout: Optional[float] = None,
+                 auto_renew: bool = False, connection=None):
         self.key = f"lock:{key}"
+        self.channel = f"lock_released:{key}"
         self.ttl = ttl
-        redis_url = settings.REDIS_URL
-        self.redis = redis.from_url(redis_url, decode_responses=True)
+        self.timeout = ttl if timeout is None else timeout
+        self.auto_renew = auto_renew
+        self.redis = connection or get_redis_connection()
         self.identifier = str(uuid.uuid4())
+        self._release = self.redis.register_script(_RELEASE_SCRIPT)
+        self._renew = self.redis.register_script(_RENEW_SCRIPT)
+        self._renew_stop: Optional[threading.Event] = None
+        self._renew_thread: Optional[threading.Thread] = None
+
+    def _try_acquire(self) -> bool:
+        return bool(self.redis.set(self.key, self.identifier, nx=True, px=int(self.ttl * 1000)))
+
+    def acquire(self) -> bool:
+        """Acquire the lock, waiting up to ``timeout`` seconds"""
+        start = time.monotonic()
+        if self._try_acquire():
+            lock_metrics.record_acquire(self.key, 0.0, contended=False)
+            self._start_renewal()
+            return True
+
+        deadline = start + self.timeout
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            # Subscribe before retrying so a release between the failed SET
+            # and the subscription cannot be missed.
+            pubsub.subscribe(self.channel)
+            while True:
+                if self._try_acquire():
+                    waited = time.monotonic() - start
+                    lock_metrics.record_acquire(self.key, waited, contended=True)
+                    self._start_renewal()
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                # Wake on release, or when the holder's TTL runs out
+                pttl = self.redis.pttl(self.key)
+                wait = min(remaining, MAX_WAIT_SLICE)
+                if pttl and pttl > 0:
+                    wait = min(wait, pttl / 1000)
+                pubsub.get_message(timeout=max(wait, 0.001))
+        finally:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+        lock_metrics.record(self.key, 'timeouts')
+        raise TimeoutError(f"Could not acquire lock {self.key} within {self.timeout}s")
+
+    def release(self) -> bool:
+        """Release the lock if we still own it"""
+        self._stop_renewal()
+        released = bool(self._release(keys=[self.key, self.channel], args=[self.identifier]))
+        if not released:
+            # Our TTL ran out and someone else may have taken the lock
+            lock_metrics.record(self.key, 'lost')
+            logging.warning(f"Lock {self.key} expired before release")
+        return released
+
+    def extend(self, ttl: Optional[float] = None) -> bool:
+        """Reset the lock TTL if we still own it"""
+        ttl_ms = int((ttl or self.ttl) * 1000)
+        extended = bool(self._renew(keys=[self.key], args=[self.identifier, ttl_ms]))
+        if extended:
+            lock_metrics.record(self.key, 'renewals')
+        return extended
+
+    def _start_renewal(self):
+        if not self.auto_renew:
+            return
+        self._renew_stop = threading.Event()
+        self._renew_thread = threading.Thread(
+            target=self._renew_loop, name=f"renew-{self.key}", daemon=True
+        )
+        self._renew_thread.start()
+
+    def _renew_loop(self):
+        interval = max(self.ttl / 3, 0.1)
+        while not self._renew_stop.wait(interval):
+            try:
+                if not self.extend():
+                    logging.warning(f"Lost lock {self.key} during renewal")
+                    return
+            except Exception as e:
+                logging.error(f"Error renewing lock {self.key}: {e}")
+
+    def _stop_renewal(self):
+        if self._renew_stop:
+            self._renew_stop.set()
+            self._renew_thread.join(timeout=1)
+            self._renew_stop = None
+            self._renew_thread = None
 
     def __enter__(self):
-        # Try to acquire lock with timeout
-        end_time = time.time() + self.ttl
-        while time.time() < end_time:
-            # Use SET with NX and EX for atomic lock
-            if self.redis.set(self.key, self.identifier, nx=True, ex=self.ttl):
-                return True
-            time.sleep(0.05)  # Wait 50ms before retry
-        raise TimeoutError(f"Could not acquire lock {self.key} within {self.ttl}s")
+        return self.acquire()
 
     def __exit__(self, *args):
-        # Only delete if we still own the lock
-        current_value = self.redis.get(self.key)
-        if current_value == self.identifier:
-            self.redis.delete(self.key)
+        self.release()
+
+
+@contextmanager
+def multi_lock(keys: Iterable[str], ttl: int = 10, timeout: Optional[float] = None,
+               auto_renew: bool = False, connection=None):
+    """Acquire several locks in sorted key order to avoid deadlocks"""
+    locks = [RedisLock(key, ttl, timeout=timeout, auto_renew=auto_renew, connection=connection)
+             for key in sorted(set(keys))]
+    acquired = []
+    try:
+        for lock in locks:
+            lock.acquire()
+            acquired.append(lock)
+        yield True
+    finally:
+        for lock in reversed(acquired):
+            try:
+                lock.release()
+            except Exception as e:
+                logging.error(f"Error releasing lock {lock.key}: {e}")
 
 def user_lock(user_id: int, ttl: int = 10):
     """Create a user-specific lock"""
     return RedisLock(f"user:{user_id}", ttl)
 
+def users_lock(*user_ids, ttl: int = 30, connection=None):
+    """Lock both sides of a two-party action (trades) in a deadlock-free order"""
+    return multi_lock([f"user:{user_id}" for user_id in user_ids], ttl, auto_renew=True,
+                      connection=connection)
+
 def trade_lock(trade_id: str, ttl: int = 30):
     """Create a trade-specific lock"""
-    return RedisLock(f"trade:{trade_id}", ttl)
+    return RedisLock(f"trade:{trade_id}", ttl, auto_renew=True)
 
 def card_lock(card_id: str, ttl: int = 10):
     """Create a card-specific lock"""
@@ -0,0 +1,298 @@
+# rq_queue/supervisor.py
+"""
+Worker supervisor: runs one pool of RQ worker processes per queue group
+(config/workers.py), scales each pool on queue depth, drains gracefully on
+shutdown and reports per-queue latency and throughput.
+
+Run with: python -m rq_queue.supervisor
+"""
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from config.workers import WORKER_POOLS, AUTOSCALE
+
+
+def _run_pool_worker(pool_name: str, queue_names: List[str]):
+    """Entry point of a single worker process"""
+    from rq import Worker
+    from rq_queue.locks import get_lock_metrics
+    from rq_queue.redis_connection import get_redis_connection, QUEUES
+
+    logging.basicConfig(level=logging.INFO)
+    worker = Worker(
+        queues=[QUEUES[name] for name in queue_names],
+        connection=get_redis_connection(),
+        name=f"{pool_name}-{os.getpid()}",
+        default_worker_ttl=43200,  # 12 hours
+        job_monitoring_interval=10,
+    )
+    # RQ handles SIGTERM as a warm shutdown: the current job finishes first
+    worker.work(with_scheduler=True)
+    # Lock contention seen by this worker's jobs over its lifetime
+    for namespace, stats in get_lock_metrics().items():
+        logging.info(
+            f"[locks:{namespace}] {worker.name} acquired={stats['acquired']} "
+            f"contended={stats['contention_rate']:.0%} timeouts={stats['timeouts']} "
+            f"lost={stats['lost']} wait avg={stats['avg_wait_ms']}ms max={stats['max_wait_ms']}ms"
+        )
+
+
+def desired_workers(depth: int, pool: Dict[str, Any], jobs_per_worker: int) -> int:
+    """Number of workers a pool should run for the given backlog"""
+    wanted = math.ceil(depth / jobs_per_worker) if depth > 0 else 0
+    return max(pool["min"], min(pool["max"], wanted))
+
+
+def _seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if not start or not end:
+        return None
+    return (end - start).total_seconds()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class WorkerSupervisor:
+    """Keeps each worker pool sized to its queue backlog"""
+
+    def __init__(self, queues=None, pools: Dict[str, Dict[str, Any]] = None,
+                 autoscale: Dict[str, Any] = None, connection=None):
+        if queues is None or connection is None:
+            from rq_queue.redis_connection import get_redis_connection, QUEUES
+            queues = queues or QUEUES
+            connection = connection or get_redis_connection()
+        self.queues = queues
+        self.connection = connection
+        self.pools = pools or WORKER_POOLS
+        self.autoscale = {**AUTOSCALE, **(autoscale or {})}
+
+        self.processes: Dict[str, List[multiprocessing.Process]] = {name: [] for name in self.pools}
+        self._draining: List[multiprocessing.Process] = []
+        self._low_checks: Dict[str, int] = {name: 0 for name in self.pools}
+        self._last_counts: Dict[str, Dict[str, float]] = {}
+        self._running = False
+
+    # ------------------------------------------------------------------
+    # Process management
+    # ------------------------------------------------------------------
+
+    def _spawn(self, pool_name: str):
+        process = multiprocessing.Process(
+            target=_run_pool_worker,
+            args=(pool_name, self.pools[pool_name]["queues"]),
+            name=f"rq-{pool_name}",
+            daemon=False,
+        )
+        process.start()
+        self.processes[pool_name].append(process)
+        logging.info(f"Started {pool_name} worker pid={process.pid}")
+
+    def _retire(self, pool_name: str):
+        """Ask the newest worker in a pool to finish its job and exit"""
+        process = self.processes[pool_name].pop()
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGTERM)
+        self._draining.append(process)
+        logging.info(f"Retiring {pool_name} worker pid={process.pid}")
+
+    def _reap(self):
+        """Drop exited processes so crashed workers get replaced"""
+        for pool_name, processes in self.processes.items():
+            alive = [p for p in processes if p.is_alive()]
+            for process in processes:
+                if not process.is_alive():
+                    logging.warning(f"{pool_name} worker pid={process.pid} exited "
+                                    f"with code {process.exitcode}")
+            self.processes[pool_name] = alive
+        self._draining = [p for p in self._draining if p.is_alive()]
+
+    # ------------------------------------------------------------------
+    # Scaling
+    # ------------------------------------------------------------------
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Jobs waiting per queue (same counts as HealthChecker.check_queue_sizes)"""
+        depths = {}
+        for name, queue in self.queues.items():
+            try:
+                depths[name] = len(queue)
+            except Exception as e:
+                logging.error(f"Failed to read depth of queue '{name}': {e}")
+                depths[name] = 0
+        return depths
+
+    def scale(self, depths: Optional[Dict[str, int]] = None):
+        """Bring each pool to its desired size"""
+        depths = depths if depths is not None else self.queue_depths()
+        self._reap()
+
+        for pool_name, pool in self.pools.items():
+            backlog = sum(depths.get(queue, 0) for queue in pool["queues"])
+            target = desired_workers(backlog, pool, self.autoscale["JOBS_PER_WORKER"])
+            current = len(self.processes[pool_name])
+
+            if target > current:
+                self._low_checks[pool_name] = 0
+                for _ in range(target - current):
+                    self._spawn(pool_name)
+            elif target < current:
+                # Scale down slowly so a short lull doesn't thrash the pool
+                self._low_checks[pool_name] += 1
+                if self._low_checks[pool_name] >= self.autoscale["SCALE_DOWN_AFTER"]:
+                    self._low_checks[pool_name] = 0
+                    self._retire(pool_name)
+            else:
+                self._low_checks[pool_name] = 0
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def collect_stats(self) -> Dict[str, Any]:
+        """Per-queue depth, wait/run latency and throughput since the last call"""
+        from rq.job import Job
+
+        now = time.monotonic()
+        utc_now = datetime.now(timezone.utc)
+        stats: Dict[str, Any] = {"queues": {}, "pools": {}}
+
+        for name, queue in self.queues.items():
+            try:
+                finished = queue.finished_job_registry.count
+                failed = queue.failed_job_registry.count
+
+                oldest_wait = 0.0
+                head = queue.get_jobs(0, 1)
+                if head and head[0].enqueued_at:
+                    enqueued = head[0].enqueued_at
+                    if enqueued.tzinfo is None:
+                        enqueued = enqueued.replace(tzinfo=timezone.utc)
+                    oldest_wait = max(0.0, (utc_now - enqueued).total_seconds())
+
+                sample = self.autoscale["LATENCY_SAMPLE"]
+                job_ids = queue.finished_job_registry.get_job_ids(-sample, -1)
+                waits, runs = [], []
+                for job in Job.fetch_many(job_ids, connection=self.connection):
+                    if job is None:
+                        continue
+                    wait = _seconds(job.enqueued_at, job.started_at)
+                    run = _seconds(job.started_at, job.ended_at)
+                    if wait is not None:
+                        waits.append(wait)
+                    if run is not None:
+                        runs.append(run)
+
+                previous = self._last_counts.get(name)
+                throughput = failure_rate = 0.0
+                if previous and now > previous["at"]:
+                    minutes = (now - previous["at"]) / 60
+                    # Registries expire old entries, so clamp negative deltas
+                    throughput = max(0, finished - previous["finished"]) / minutes
+                    failure_rate = max(0, failed - previous["failed"]) / minutes
+                self._last_counts[name] = {"finished": finished, "failed": failed, "at": now}
+
+                stats["queues"][name] = {
+                    "depth": len(queue),
+                    "oldest_wait_s": round(oldest_wait, 2),
+                    "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                    "p95_wait_ms": round(_percentile(waits, 95) * 1000, 1),
+                    "avg_run_ms": round(sum(runs) / len(runs) * 1000, 1) if runs else 0.0,
+                    "p95_run_ms": round(_percentile(runs, 95) * 1000, 1),
+                    "finished_per_min": round(throughput, 2),
+                    "failed_per_min": round(failure_rate, 2),
+                }
+            except Exception as e:
+                logging.error(f"Failed to collect stats for queue '{name}': {e}")
+
+        for pool_name, processes in self.processes.items():
+            stats["pools"][pool_name] = {
+                "workers": len(processes),
+                "min": self.pools[pool_name]["min"],
+                "max": self.pools[pool_name]["max"],
+            }
+        stats["draining"] = len(self._draining)
+        return stats
+
+    def report(self):
+        stats = self.collect_stats()
+        for name, queue_stats in stats["queues"].items():
+            logging.info(
+                f"[queue:{name}] depth={queue_stats['depth']} "
+                f"wait_p95={queue_stats['p95_wait_ms']}ms run_p95={queue_stats['p95_run_ms']}ms "
+                f"done/min={queue_stats['finished_per_min']} failed/min={queue_stats['failed_per_min']}"
+            )
+        pools = ", ".join(f"{name}={pool['workers']}" for name, pool in stats["pools"].items())
+        logging.info(f"[supervisor] workers: {pools} draining={stats['draining']}")
+        return stats
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def _handle_signal(self, signum, frame):
+        logging.info(f"Supervisor received signal {signum}, draining workers...")
+        self._running = False
+
+    def run(self):
+        """Supervise worker pools until SIGTERM/SIGINT"""
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        self._running = True
+        self.scale()
+        last_report = time.monotonic()
+
+        try:
+            while self._running:
+                time.sleep(self.autoscale["CHECK_INTERVAL"])
+                if not self._running:
+                    break
+                try:
+                    self.scale()
+                    if time.monotonic() - last_report >= self.autoscale["REPORT_INTERVAL"]:
+                        self.report()
+                        last_report = time.monotonic()
+                except Exception as e:
+                    logging.error(f"Supervisor tick failed: {e}")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """Warm-stop every worker, then force-kill anything left after the drain timeout"""
+        for pool_name in list(self.processes):
+            while self.processes[pool_name]:
+                self._retire(pool_name)
+
+        deadline = time.monotonic() + self.autoscale["DRAIN_TIMEOUT"]
+        for process in self._draining:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+
+        for process in self._draining:
+            if process.is_alive():
+                logging.warning(f"Worker pid={process.pid} did not drain in time, killing")
+                process.kill()
+                process.join(timeout=5)
+        self._draining = []
+        logging.info("All workers stopped")
+
+
+def start_supervisor():
+    """Start the worker supervisor"""
+    logging.basicConfig(level=logging.INFO)
+    logging.info("Starting RQ worker supervisor...")
+    WorkerSupervisor().run()
+
+
+if __name__ == "__main__":
+    start_supervisor()
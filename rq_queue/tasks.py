@@ -1,15 +1,13 @@
 # queue/tasks.py
 import logging
 from rq import get_current_job
-import redis
-from config import settings
-from rq_queue.locks import user_lock, trade_lock, card_lock
+from rq_queue.locks import user_lock, users_lock, card_lock
 from typing import Optional
 from database import get_db, DatabaseManager # Keep DatabaseManager for now if still used directly somewhere else
 from card_economy import CardEconomyManager
 from drop_system import DropSystem
 from uuid import uuid4
-from rq_queue.redis_connection import QUEUES
+from rq_queue.redis_connection import QUEUES, get_redis_connection
 
 # Initialize services within functions to prevent premature database connections
 
@@ -78,14 +76,18 @@ def task_finalize_trade(trade_id: str):
     
     logging.info(f"Finalizing trade {trade_id}, job {job_id}")
     
-    with trade_lock(trade_id):
+    trade_data = _get_trade_data(trade_id)
+    if not trade_data:
+        return {'success': False, 'error': 'Trade not found', 'job_id': job_id}
+    
+    # Lock both traders in a fixed order, so two trades sharing a user can't deadlock
+    with users_lock(trade_data['user_a'], trade_data['user_b']):
         # Check if duplicate
         if _is_duplicate_job('finalize_trade', trade_id):
             logging.warning(f"Duplicate trade finalization detected for trade {trade_id}")
             return {'success': False, 'error': 'Duplicate trade finalization', 'job_id': job_id}
         
-        # Get trade data from database
-        # This would need to be implemented based on your trade system
+        # Re-read under the lock
         trade_data = _get_trade_data(trade_id)
         
         if not trade_data:
@@ -205,22 +207,15 @@ def _is_duplicate_job(action: str, *args) -> bool:
     # Create job signature
     job_signature = f"{action}:{args}"
     
-    # Check in Redis if this job was recently processed
+    # Atomically mark this job as processed (TTL 5 minutes) on the shared pool;
+    # if the key already existed, a recent job got here first
     key = f"job_cache:{job_signature}"
-    redis_url = settings.REDIS_URL
-    redis_conn = redis.from_url(redis_url, decode_responses=True)
-    recent_job = redis_conn.get(key)
-    
-    if recent_job:
-        return True
-    
-    # Mark this job as processed (with TTL of 5 minutes)
-    redis_conn.setex(key, 300, job.id)
-    return False
+    redis_conn = get_redis_connection()
+    return not redis_conn.set(key, job.id, nx=True, ex=300)
 
 def _get_trade_data(trade_id: str) -> dict:
     """Get trade data from database"""
-    # This would need to be implemented based on your trade system
+    db = get_db()
     with db._get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM trades WHERE trade_id = ?", (trade_id,))
@@ -243,6 +238,7 @@ def _process_trade_transfer(trade_data: dict) -> dict:
 
 def _update_trade_status(trade_id: str, status: str):
     """Update trade status in database"""
+    db = get_db()
     with db._get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
@@ -13,11 +13,20 @@ class AsyncCronService:
         self.running = False
         self.jobs = {}
         
-    def safe(self, job_key: str):
-        """Decorator for safe job execution with Redis locks"""
+    def safe(self, job_key: str, singleton: bool = True):
+        """Decorator for safe job execution with Redis locks.
+
+        Singleton jobs run only in the elected leader process; per-shard jobs
+        (singleton=False) run in every process, each for its own guilds.
+        """
         def decorator(func):
             async def wrapper(*args, **kwargs):
-                with RedisLock(f"cron:{job_key}", ttl=30):
+                from services.sharding import is_leader, process_name
+                if singleton and not is_leader():
+                    logging.debug(f"Skipping {job_key}: not the leader process")
+                    return None
+                lock_key = f"cron:{job_key}" if singleton else f"cron:{job_key}:{process_name()}"
+                with RedisLock(lock_key, ttl=30):
                     return await func(*args, **kwargs)
             return wrapper
         return decorator
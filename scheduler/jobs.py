@@ -26,8 +26,8 @@ async def job_daily_rewards():
         logging.error(f"Daily rewards job failed: {e}")
         raise
 
-# Auto drops job - runs every 60 seconds
-@cron.safe("drops")
+# Auto drops job - runs every 60 seconds in every process, for its own shards' guilds
+@cron.safe("drops", singleton=False)
 async def job_auto_drops():
     """Spawn activity-based drops"""
     logging.info("Running auto drops job")
@@ -14,32 +14,12 @@ class RewardsService:
         """Reset all daily rewards"""
         logging.info("Resetting all daily rewards")
         
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Reset daily claim status for all users
-            cursor.execute("""
-                UPDATE user_inventory 
-                SET last_daily = NULL
-                WHERE last_daily IS NOT NULL
-            """)
-            
-            # Grant daily rewards to active users
-            cursor.execute("""
-                UPDATE user_inventory 
-                SET gold = COALESCE(gold, 0) + 50,
-                    dust = COALESCE(dust, 0) + 25,
-                    tickets = COALESCE(tickets, 0) + 5
-                WHERE user_id IN (
-                    SELECT DISTINCT user_id FROM user_cards 
-                    WHERE acquired_at >= datetime('now', '-7 days')
-                )
-            """)
-            
-            conn.commit()
+        # One set-based UPDATE on user_balances: expired streaks are cleared and
+        # users active in the last 7 days get the daily bonus.
+        users_reset = self.db.reset_daily_rewards()
         
-        logging.info("Daily rewards reset completed")
-        return {'success': True, 'users_reset': 'all'}
+        logging.info(f"Daily rewards reset completed ({users_reset} users)")
+        return {'success': True, 'users_reset': users_reset}
     
     async def grant_daily_reward(self, user_id: int):
         """Grant daily reward to specific user"""
@@ -109,7 +89,6 @@ class RewardsService:
 
 # services/drops.py
 import logging
-import random
 from datetime import datetime, timedelta
 from database import DatabaseManager
 from card_economy import CardEconomyManager
@@ -123,49 +102,15 @@ class DropsService:
     async def activity_spawn(self):
         """Spawn drops based on server activity"""
         logging.info("Checking for activity-based drops")
-        
-        # Get active servers with recent activity
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get servers with activity in last hour
-            cursor.execute("""
-                SELECT server_id, COUNT(*) as message_count
-                FROM server_activity 
-                WHERE timestamp >= datetime('now', '-1 hour')
-                GROUP BY server_id
-                HAVING message_count >= 10
-                ORDER BY message_count DESC
-                LIMIT 5
-            """)
-            
-            active_servers = cursor.fetchall()
-            
-            drops_spawned = 0
-            for server_id, message_count in active_servers:
-                # Calculate drop chance based on activity
-                drop_chance = min(0.8, message_count / 100)  # Max 80% chance
-                
-                if random.random() < drop_chance:
-                    # Spawn a drop in this server
-                    await self._spawn_server_drop(server_id)
-                    drops_spawned += 1
-            
-            logging.info(f"Spawned {drops_spawned} activity-based drops")
-            return {'success': True, 'drops_spawned': drops_spawned}
-    
-    async def _spawn_server_drop(self, server_id: int):
-        """Spawn a drop in a specific server"""
-        # This would integrate with your drop system
-        # For now, just log the event
-        logging.info(f"Spawning activity drop in server {server_id}")
-        
-        # In production, this would:
-        # 1. Create drop in most active channel
-        # 2. Queue drop resolution
-        # 3. Notify users
-        
-        return {'server_id': server_id, 'type': 'activity_drop'}
+
+        # Rolling per-guild scores live in memory (flushed to guild_activity);
+        # the spawner picks guilds from its priority queue within the tick's
+        # budget, for this process's shards only
+        from services.drop_spawner import get_drop_spawner
+        result = await get_drop_spawner().tick()
+
+        logging.info(f"Spawned {result['drops_spawned']} activity-based drops")
+        return result
 
 # services/trades.py
 import logging
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Battle balance simulator / benchmark.
+
+Runs services.battle_sim over synthetic matchups and prints:
+  - a team-power band win-rate matrix (row team vs column team),
+  - how much crits move those win rates,
+  - per wager tier: outcome rates, net gold EV per player and gold minted
+    into the economy per battle (and per day with --battles-per-day),
+  - simulator throughput next to the one-at-a-time BattleEngine.execute_battle.
+
+Usage:
+  python scripts/bench_battle_sim.py                        # defaults, seed 42
+  python scripts/bench_battle_sim.py --battles 5000000 --seed 7
+  python scripts/bench_battle_sim.py --battles-per-day 20000
+  python scripts/bench_battle_sim.py --json results.json    # also dump raw numbers
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services import battle_sim  # noqa: E402
+
+
+def print_matrix(title: str, labels, rows):
+    print(f"\n{title}")
+    width = max(len(label) for label in labels) + 2
+    print(" " * width + "".join(label.rjust(width) for label in labels))
+    for label, row in zip(labels, rows):
+        print(label.ljust(width) + "".join(f"{value * 100:.1f}%".rjust(width) for value in row))
+
+
+def bench_throughput(battles: int, seed: int) -> dict:
+    """Battles/second of the vectorized simulator vs the scalar engine"""
+    import numpy as np
+    from battle_engine import BattleEngine
+
+    rng = np.random.default_rng(seed)
+    p1 = rng.integers(30, 136, battles)
+    p2 = rng.integers(30, 136, battles)
+
+    start = time.perf_counter()
+    battle_sim.simulate(p1, p2, "standard", rng=rng)
+    vector_s = time.perf_counter() - start
+
+    # The scalar path is far slower; time a slice and extrapolate
+    scalar_n = min(battles, 100_000)
+    random.seed(seed)
+    start = time.perf_counter()
+    for a, b in zip(p1[:scalar_n].tolist(), p2[:scalar_n].tolist()):
+        BattleEngine.execute_battle(None, None, "standard", p1_override=a, p2_override=b)
+    scalar_s = time.perf_counter() - start
+
+    return {
+        "battles": battles,
+        "vectorized_per_s": round(battles / vector_s) if vector_s else None,
+        "scalar_per_s": round(scalar_n / scalar_s) if scalar_s else None,
+        "speedup": round((battles / vector_s) / (scalar_n / scalar_s), 1) if vector_s and scalar_s else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Battle balance simulator")
+    parser.add_argument("--battles", type=int, default=1_000_000,
+                        help="matchups for gold-flow projections and the throughput benchmark")
+    parser.add_argument("--per-cell", type=int, default=20_000,
+                        help="battles per win-rate matrix cell")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--battles-per-day", type=int, default=0,
+                        help="project gold minted per day at this battle volume")
+    parser.add_argument("--json", help="write all results to this file")
+    parser.add_argument("--skip-bench", action="store_true", help="skip the throughput benchmark")
+    args = parser.parse_args()
+
+    if not battle_sim.NUMPY_AVAILABLE:
+        print("numpy is required: pip install numpy")
+        return 1
+
+    import numpy as np
+
+    results = {"seed": args.seed}
+
+    matrix = battle_sim.win_rate_matrix(battles_per_cell=args.per_cell, seed=args.seed)
+    no_crit = battle_sim.win_rate_matrix(battles_per_cell=args.per_cell, seed=args.seed, crit_chance=0.0)
+    results["win_rate_matrix"] = matrix
+    results["win_rate_matrix_no_crits"] = no_crit
+
+    print_matrix("Win rate (row team vs column team)", matrix["bands"], matrix["win"])
+    print_matrix("Tie rate", matrix["bands"], matrix["tie"])
+    crit_delta = (np.array(matrix["win"]) - np.array(no_crit["win"])).tolist()
+    print_matrix("Crit impact on win rate (with crits - without)", matrix["bands"], crit_delta)
+
+    # Gold flow over a random mix of matchups across the whole power range
+    rng = np.random.default_rng(args.seed)
+    p1 = rng.integers(30, 136, args.battles)
+    p2 = rng.integers(30, 136, args.battles)
+    flows = battle_sim.gold_flow(p1, p2, seed=args.seed, battles_per_day=args.battles_per_day)
+    results["gold_flow"] = flows
+
+    print(f"\nGold flow per wager tier ({args.battles:,} random matchups)")
+    header = f"{'tier':<10}{'wager':>7}{'p1 win':>9}{'tie':>8}{'p1 net EV':>11}{'minted/battle':>15}"
+    if args.battles_per_day:
+        header += f"{'minted/day':>13}"
+    print(header)
+    for tier, flow in flows.items():
+        line = (f"{tier:<10}{flow['wager_cost']:>7}{flow['p1_win'] * 100:>8.1f}%"
+                f"{flow['tie'] * 100:>7.1f}%{flow['p1_net_gold_ev']:>11.2f}{flow['minted_per_battle']:>15.2f}")
+        if args.battles_per_day:
+            line += f"{flow['minted_per_day']:>13,}"
+        print(line)
+
+    if not args.skip_bench:
+        bench = bench_throughput(args.battles, args.seed)
+        results["throughput"] = bench
+        print(f"\nThroughput: {bench['vectorized_per_s']:,} battles/s vectorized, "
+              f"{bench['scalar_per_s']:,} battles/s execute_battle ({bench['speedup']}x)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Bot startup benchmark and import-time profiler.
+
+Benchmark (default): in fresh interpreters (best of --repeats), measures
+  - importing main,
+  - with --prewarm, pre-warming the cogs' dependencies (services.startup),
+  - importing each production cog (what load_extension executes),
+and compares the totals against a baseline JSON file. Recorded bot boots
+(logs/startup_history.jsonl, written by setup_hook) are listed so deploys can
+be compared over time.
+
+Profile (--profile): runs the same imports under `python -X importtime` and
+reports the modules with the highest self / cumulative import cost. A log
+captured from a real boot (PYTHONPROFILEIMPORTTIME=1, stderr) can be read
+with --importtime-file instead.
+
+Usage:
+  python scripts/bench_startup.py                         # compare to baseline
+  python scripts/bench_startup.py --prewarm
+  python scripts/bench_startup.py --write-baseline        # refresh baseline
+  python scripts/bench_startup.py --profile --top 30
+  python scripts/bench_startup.py --importtime-file boot.err
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "scripts", "bench_startup_baseline.json")
+
+# Runs in a fresh interpreter; prints one JSON line
+CHILD = """
+import asyncio, importlib, json, sys, time
+start = time.perf_counter()
+import main
+import_main = time.perf_counter() - start
+from services.startup import StartupProfile
+cogs = main.COGS + main.ADDITIONAL_COGS
+profile = StartupProfile()
+warmed = asyncio.run(profile.prewarm(cogs)) if {prewarm} else 0
+prewarm = profile.mark("prewarm")
+per_cog = {{}}
+for cog in cogs:
+    t = time.perf_counter()
+    try:
+        importlib.import_module(cog)
+    except Exception as e:
+        print(f"{{cog}} failed: {{e}}", file=sys.stderr)
+    per_cog[cog] = time.perf_counter() - t
+print(json.dumps({{
+    "import_main_s": import_main, "prewarm_s": prewarm, "warmed": warmed,
+    "cogs": per_cog, "total_s": time.perf_counter() - start,
+}}))
+"""
+
+PROFILE_CHILD = "import main\nfor cog in main.COGS + main.ADDITIONAL_COGS:\n    __import__(cog)\n"
+
+
+def child_env(db_url: str) -> dict:
+    """Environment for a child interpreter; config needs a token to import"""
+    env = dict(os.environ)
+    env.setdefault("DISCORD_TOKEN", "bench")
+    env.setdefault("DISCORD_APPLICATION_ID", "1")
+    env["DATABASE_URL"] = db_url
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def run_once(env: dict, prewarm: bool) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD.format(prewarm=prewarm)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300,
+    )
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"startup child failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def run(env: dict, repeats: int, prewarm: bool) -> dict:
+    """Best-of-N by total; per-cog numbers come from the best run"""
+    best = None
+    for _ in range(repeats):
+        result = run_once(env, prewarm)
+        if best is None or result["total_s"] < best["total_s"]:
+            best = result
+    return {
+        "total_s": round(best["total_s"], 3),
+        "import_main_s": round(best["import_main_s"], 3),
+        "prewarm_s": round(best["prewarm_s"], 3),
+        "warmed": best["warmed"],
+        "cogs": {name: round(secs, 3) for name, secs in best["cogs"].items()},
+    }
+
+
+def print_report(results: dict, baseline: dict = None):
+    def vs(key):
+        base = (baseline or {}).get(key)
+        return f"  (x{results[key] / base:.2f} vs baseline)" if base else ""
+
+    print(f"import main      {results['import_main_s']:>8.3f}s{vs('import_main_s')}")
+    print(f"prewarm          {results['prewarm_s']:>8.3f}s  ({results['warmed']} modules)")
+    for name, secs in sorted(results["cogs"].items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<28}{secs:>8.3f}s")
+    print(f"total            {results['total_s']:>8.3f}s{vs('total_s')}")
+
+
+def print_history(last: int):
+    from services.startup import read_history
+    entries = read_history(last=last)
+    if not entries:
+        return
+    print(f"\nLast {len(entries)} recorded boots:")
+    for entry in entries:
+        phases = ", ".join(f"{k} {v:.2f}s" for k, v in entry.get("phases", {}).items())
+        print(f"  {entry['at']}  {entry['total_s']:>7.2f}s  {phases}")
+
+
+# ----------------------------------------------------------------------
+# -X importtime profile
+# ----------------------------------------------------------------------
+
+def parse_importtime(text: str):
+    """[(self_us, cumulative_us, module)] from -X importtime output"""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, module = line[len("import time:"):].split("|")
+            rows.append((int(self_us), int(cumulative_us), module.strip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def print_profile(rows, top: int):
+    by_package = defaultdict(int)
+    for self_us, _, module in rows:
+        by_package[module.split(".")[0]] += self_us
+    total = sum(self_us for self_us, _, _ in rows)
+
+    print(f"{len(rows)} modules, {total / 1000:.0f} ms import time\n")
+    print(f"{'self ms':>9}{'cumul ms':>10}  module")
+    for self_us, cumulative_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {module}")
+    print(f"\n{'self ms':>9}  top-level package")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{self_us / 1000:>9.1f}  {package}")
+
+
+def profile(env: dict, top: int):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"profile child failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+    print_profile(parse_importtime(proc.stderr), top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot startup benchmark / import profiler")
+    parser.add_argument("--repeats", type=int, default=3, help="fresh interpreters (best is kept)")
+    parser.add_argument("--prewarm", action="store_true", help="pre-warm cog dependencies (STARTUP_PREWARM=1)")
+    parser.add_argument("--db", default="", help="DATABASE_URL for the child (default: temp SQLite)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--history", type=int, default=10, help="recorded boots to list")
+    parser.add_argument("--profile", action="store_true", help="per-module -X importtime report")
+    parser.add_argument("--importtime-file", default="", help="report on a captured importtime log")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.importtime_file:
+        with open(args.importtime_file, encoding="utf-8", errors="replace") as f:
+            print_profile(parse_importtime(f.read()), args.top)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmpdir:
+        env = child_env(args.db or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}")
+        if args.profile:
+            profile(env, args.top)
+            return 0
+        results = run(env, args.repeats, prewarm=args.prewarm)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.write_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    print_history(args.history)
+
+    if args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+TMA API load test / benchmark.
+
+Seeds a local database with synthetic users, cards, packs, listings and
+trades, then drives a weighted mix of read and write endpoints through the
+real FastAPI app with HMAC-signed Telegram initData (validated by
+tma.api.auth.validate_init_data, no dependency overrides).
+
+Reports p50/p95/p99 latency, throughput and SQL statements per request per
+endpoint, and compares the run against a baseline JSON file.
+
+Usage:
+  python scripts/bench_tma_api.py                           # SQLite temp file
+  python scripts/bench_tma_api.py --db postgresql://...     # existing Postgres
+  python scripts/bench_tma_api.py --requests 2000 --concurrency 8
+  python scripts/bench_tma_api.py --write-baseline          # refresh baseline
+  python scripts/bench_tma_api.py --check                   # exit 1 on regression
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_BOT_TOKEN = "123456:BENCHMARK-TOKEN"
+DEFAULT_BASELINE = os.path.join(ROOT, "scripts", "bench_tma_baseline.json")
+
+# (name, weight) — roughly the production mix seen from the Mini App
+SCENARIOS = [
+    ("cards", 35),
+    ("marketplace", 20),
+    ("battle_updates", 20),
+    ("leaderboard", 15),
+    ("pack_open", 10),
+]
+
+TG_ID_BASE = 700_000_000
+
+
+# ─────────────────────────────────────────────
+# initData signing (mirror of Telegram's scheme)
+# ─────────────────────────────────────────────
+
+def sign_init_data(user: dict, bot_token: str, auth_date: int = None) -> str:
+    """Build a raw initData string signed exactly like Telegram does."""
+    params = {
+        "auth_date": str(auth_date or int(time.time())),
+        "query_id": f"AAH{uuid.uuid4().hex[:12]}",
+        "user": json.dumps(user, separators=(",", ":")),
+    }
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(params.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    params["hash"] = hmac.new(secret_key, check_string.encode(), hashlib.sha256).hexdigest()
+    return urllib.parse.urlencode(params)
+
+
+# ─────────────────────────────────────────────
+# Seeding
+# ─────────────────────────────────────────────
+
+def seed(db, users: int, cards: int, packs: int, rng: random.Random) -> dict:
+    """Populate the database with a synthetic but realistic data set."""
+    from models import (
+        User, UserBalances, Card, UserCard, CreatorPacks, CreatorPackCards,
+        PackPurchase, MarketplaceListings, PendingTmaBattle, UserBattleStats,
+    )
+    from models.trade import Trade
+
+    rarities = ["common"] * 60 + ["rare"] * 25 + ["epic"] * 10 + ["legendary"] * 4 + ["mythic"]
+    session = db.get_session()
+    try:
+        user_ids = [str(db._TG_OFFSET + TG_ID_BASE + i) for i in range(users)]
+        for i, uid in enumerate(user_ids):
+            session.add(User(user_id=uid, username=f"bench_{i}", discord_tag=f"bench_{i}"))
+            session.add(UserBalances(user_id=uid, gold=rng.randint(0, 20_000), dust=rng.randint(0, 2_000)))
+            session.add(UserBattleStats(user_id=uid, wins=rng.randint(0, 200), losses=rng.randint(0, 200)))
+        session.flush()
+
+        card_ids = [f"bench_card_{i}" for i in range(cards)]
+        for cid in card_ids:
+            session.add(Card(
+                card_id=cid, name=f"Artist {cid[-4:]}", artist_name=f"Artist {cid[-4:]}",
+                title="Track", rarity=rng.choice(rarities), tier="community",
+                impact=rng.randint(20, 99), skill=rng.randint(20, 99),
+                longevity=rng.randint(20, 99), culture=rng.randint(20, 99), hype=rng.randint(20, 99),
+            ))
+        session.flush()
+
+        pack_ids = []
+        for i in range(packs):
+            pid = f"bench_pack_{i}"
+            pack_ids.append(pid)
+            members = rng.sample(card_ids, min(5, len(card_ids)))
+            session.add(CreatorPacks(
+                pack_id=pid, name=f"Bench Pack {i}", creator_id=user_ids[0],
+                card_count=len(members), pack_tier=rng.choice(["community", "gold", "platinum"]),
+                is_public=True, price=500,
+            ))
+            session.flush()
+            for cid in members:
+                session.add(CreatorPackCards(pack_id=pid, card_id=cid))
+        session.flush()
+
+        # Collections follow a long tail: a few whales, many small collectors
+        owned_packs = {}
+        for uid in user_ids:
+            size = min(len(card_ids), int(rng.paretovariate(1.2) * 15))
+            for cid in rng.sample(card_ids, size):
+                session.add(UserCard(user_id=uid, card_id=cid, quantity=rng.randint(1, 4),
+                                     acquired_from="bench"))
+            owned_packs[uid] = rng.sample(pack_ids, min(3, len(pack_ids)))
+            for pid in owned_packs[uid]:
+                session.add(PackPurchase(buyer_id=uid, pack_id=pid, cards_received=None))
+        session.flush()
+
+        for _ in range(users):
+            session.add(MarketplaceListings(
+                seller_id=rng.choice(user_ids), card_id=rng.choice(card_ids),
+                price=rng.randint(50, 5_000), is_active=True,
+            ))
+
+        now = datetime.utcnow()
+        for i in range(users * 2):
+            a, b = rng.sample(user_ids, 2)
+            status = rng.choice(["waiting", "complete", "complete"])
+            session.add(PendingTmaBattle(
+                battle_id=f"bench_battle_{i}", challenger_id=a, opponent_id=b,
+                challenger_pack=json.dumps(rng.sample(card_ids, 5)),
+                wager_tier="casual", status=status,
+                result_json=json.dumps({"winner": 1}) if status == "complete" else None,
+                created_at=now - timedelta(minutes=rng.randint(0, 600)),
+                expires_at=now + timedelta(minutes=10),
+            ))
+
+        for i in range(users):
+            a, b = rng.sample(user_ids, 2)
+            session.add(Trade(
+                trade_id=i + 1, user_a=int(a), user_b=int(b),
+                cards_a=rng.sample(card_ids, 2), cards_b=rng.sample(card_ids, 1),
+                status="pending", expires_at=now + timedelta(minutes=10),
+            ))
+        session.commit()
+        return {"user_ids": user_ids, "card_ids": card_ids, "pack_ids": pack_ids,
+                "owned_packs": owned_packs}
+    finally:
+        session.close()
+
+
+# ─────────────────────────────────────────────
+# Query counting
+# ─────────────────────────────────────────────
+
+class QueryCounter:
+    """Counts SQL statements via SQLAlchemy engine events.
+
+    Sync endpoints run on Starlette's worker threads, so the count is global;
+    per-request numbers are only exact when requests run one at a time.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self._lock = threading.Lock()
+        self._count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self._count += 1
+
+    def reset(self):
+        with self._lock:
+            self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+
+# ─────────────────────────────────────────────
+# Load driver
+# ─────────────────────────────────────────────
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_load(client, data: dict, counter: QueryCounter, total: int, concurrency: int,
+             rng: random.Random) -> dict:
+    names = [name for name, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    user_ids = data["user_ids"]
+    tg_ids = [int(uid) - 9_000_000_000 for uid in user_ids]
+    headers_by_user = {
+        tg_id: {"Authorization": "tma " + sign_init_data(
+            {"id": tg_id, "username": f"bench_{tg_id - TG_ID_BASE}", "first_name": "Bench"},
+            BENCH_BOT_TOKEN,
+        )}
+        for tg_id in tg_ids
+    }
+    # pack_open only samples packs the user bought, so it measures opens, not 403s
+    owned_by_tg = {tg_id: data["owned_packs"][uid] for tg_id, uid in zip(tg_ids, user_ids)}
+    plan = []
+    for _ in range(total):
+        tg_id = rng.choice(tg_ids)
+        plan.append((rng.choices(names, weights)[0], tg_id, rng.choice(owned_by_tg[tg_id])))
+
+    results = {name: {"latencies": [], "queries": [], "errors": 0} for name in names}
+    lock = threading.Lock()
+
+    def _request(step, record=True):
+        scenario, tg_id, pack_id = step
+        headers = headers_by_user[tg_id]
+        counter.reset()
+        started = time.perf_counter()
+        if scenario == "cards":
+            resp = client.get("/api/cards", headers=headers)
+        elif scenario == "marketplace":
+            resp = client.get("/api/marketplace", headers=headers)
+        elif scenario == "battle_updates":
+            resp = client.get("/api/battle/updates", headers=headers)
+        elif scenario == "leaderboard":
+            resp = client.get("/api/leaderboard", headers=headers)
+        else:
+            resp = client.post(f"/api/packs/{pack_id}/open", headers=headers)
+        elapsed = time.perf_counter() - started
+        queries = counter.count
+        if not record:
+            return queries
+        ok = resp.status_code < 400
+        with lock:
+            bucket = results[scenario]
+            bucket["latencies"].append(elapsed)
+            bucket["queries"].append(queries)
+            if not ok:
+                bucket["errors"] += 1
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        for step in plan:
+            _request(step)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(_request, plan))
+    wall = time.perf_counter() - started
+
+    if concurrency > 1:
+        # Concurrent runs can't attribute statements to requests; measure
+        # queries/request on a short sequential sample instead.
+        for name in names:
+            sample = [step for step in plan if step[0] == name][:10]
+            results[name]["queries"] = [_request(step, record=False) for step in sample]
+
+    report = {"total_requests": total, "wall_seconds": round(wall, 3),
+              "throughput_rps": round(total / wall, 1) if wall else 0.0, "endpoints": {}}
+    for name, bucket in results.items():
+        lat = bucket["latencies"]
+        if not lat:
+            continue
+        report["endpoints"][name] = {
+            "requests": len(lat),
+            "errors": bucket["errors"],
+            "p50_ms": round(_percentile(lat, 50) * 1000, 2),
+            "p95_ms": round(_percentile(lat, 95) * 1000, 2),
+            "p99_ms": round(_percentile(lat, 99) * 1000, 2),
+            "queries_per_request": round(statistics.mean(bucket["queries"]), 2) if bucket["queries"] else 0.0,
+        }
+    return report
+
+
+# ─────────────────────────────────────────────
+# Baseline comparison
+# ─────────────────────────────────────────────
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Return human-readable regressions of report vs baseline."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms > baseline {base['p95_ms']}ms")
+        # Query counts are deterministic for a given seed — any increase is a regression
+        if current["queries_per_request"] > base["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{name}: {current['queries_per_request']} queries/request "
+                f"> baseline {base['queries_per_request']}"
+            )
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors > baseline {base.get('errors', 0)}")
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"\n{'endpoint':<16}{'reqs':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>8}")
+    print("-" * 66)
+    for name, ep in report["endpoints"].items():
+        print(f"{name:<16}{ep['requests']:>7}{ep['errors']:>5}{ep['p50_ms']:>10}"
+              f"{ep['p95_ms']:>10}{ep['p99_ms']:>10}{ep['queries_per_request']:>8}")
+    print("-" * 66)
+    print(f"{report['total_requests']} requests in {report['wall_seconds']}s "
+          f"→ {report['throughput_rps']} req/s\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the TMA FastAPI backend")
+    parser.add_argument("--db", default="", help="Database URL (default: temp SQLite file)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--cards", type=int, default=1000)
+    parser.add_argument("--packs", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the run regresses")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p95 slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--json", default="", help="Write the report to this path")
+    args = parser.parse_args(argv)
+
+    os.environ["TELEGRAM_BOT_TOKEN"] = BENCH_BOT_TOKEN
+    os.environ.pop("TMA_SKIP_HMAC", None)
+
+    tmpdir = None
+    db_url = args.db
+    if not db_url:
+        tmpdir = tempfile.mkdtemp(prefix="bench_tma_")
+        db_url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from database import Database
+    from fastapi.testclient import TestClient
+
+    db = Database(test_database_url=db_url)
+    Database._instance = db  # route get_db() to the benchmark database
+
+    rng = random.Random(args.seed)
+    print(f"[BENCH] seeding {args.users} users / {args.cards} cards / {args.packs} packs into {db_url}")
+    t0 = time.perf_counter()
+    data = seed(db, args.users, args.cards, args.packs, rng)
+    print(f"[BENCH] seeded in {time.perf_counter() - t0:.1f}s")
+
+    from tma.api.main import app
+    counter = QueryCounter(db.engine)
+    # No context manager: skip startup hooks (Telegram webhook registration)
+    client = TestClient(app)
+    report = run_load(client, data, counter, args.requests, args.concurrency, rng)
+
+    report["config"] = {
+        "backend": db.engine.dialect.name, "users": args.users, "cards": args.cards,
+        "packs": args.packs, "requests": args.requests, "concurrency": args.concurrency,
+        "seed": args.seed,
+    }
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[BENCH] baseline written to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}) != report["config"]:
+            print("[BENCH] baseline was recorded with a different config; comparison is approximate")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("[BENCH] ❌ regressions vs baseline:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1 if args.check else 0
+        print("[BENCH] ✅ no regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
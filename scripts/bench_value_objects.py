@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Card / battle value object micro-benchmark.
+
+Measures, for ArtistCard, Pack, CardCollection (discord_cards.py) and
+BattleCard, PlayerState, MatchState (battle_engine.py):
+  - retained memory per object (tracemalloc, object plus its own attributes
+    storage, not shared strings),
+  - construction throughput (objects/second, best of --repeats runs),
+  - to_dict / from_dict round-trip throughput.
+
+Results are compared against a baseline JSON file so the effect of a change
+to these classes is visible.
+
+Usage:
+  python scripts/bench_value_objects.py                      # compare to baseline
+  python scripts/bench_value_objects.py --count 200000
+  python scripts/bench_value_objects.py --write-baseline     # refresh baseline
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "scripts", "bench_value_objects_baseline.json")
+
+RARITIES = ["common", "rare", "epic", "legendary", "mythic"]
+VIEWS = [1_500_000_000, 700_000_000, 120_000_000, 60_000_000, 20_000_000, 900_000]
+
+# Field values are created once and shared so only per-object storage is measured
+CARD_ARGS = [
+    (f"card_{i}", "Artist", "Song", "https://youtu.be/x", "x",
+     VIEWS[i % len(VIEWS)], "https://img/x.jpg", RARITIES[i % len(RARITIES)])
+    for i in range(64)
+]
+
+
+def make_card(i):
+    from discord_cards import ArtistCard
+    return ArtistCard(*CARD_ARGS[i % len(CARD_ARGS)])
+
+
+def builders():
+    """name -> build(i, card)"""
+    from battle_engine import BattleCard, MatchState, PlayerState
+    from discord_cards import CardCollection, Pack
+
+    def build_pack(i, card):
+        return Pack("pack", "community", "creator", [card], 4.99)
+
+    def build_match(i, card):
+        return MatchState("m", PlayerState("u1", "One"), PlayerState("u2", "Two"), "casual")
+
+    return {
+        "ArtistCard": lambda i, card: make_card(i),
+        "BattleCard": lambda i, card: BattleCard(card, "u1", "One"),
+        "PlayerState": lambda i, card: PlayerState("u1", "One"),
+        "MatchState": build_match,
+        "Pack": build_pack,
+        "CardCollection": lambda i, card: CardCollection("u1", [card]),
+    }
+
+
+def measure_memory(build, count: int, card) -> float:
+    """Bytes retained per object"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [build(i, card) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # Minus the list holding them
+    retained -= sys.getsizeof(objects)
+    del objects
+    return retained / count
+
+
+def _best_rate(fn, count: int, repeats: int) -> float:
+    """Best-of-N rate, which filters out scheduler noise"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best if best else 0.0
+
+
+def measure_throughput(build, count: int, card, repeats: int) -> float:
+    def loop():
+        for i in range(count):
+            build(i, card)
+    return _best_rate(loop, count, repeats)
+
+
+def measure_roundtrip(count: int, repeats: int) -> float:
+    from discord_cards import ArtistCard
+    cards = [make_card(i) for i in range(len(CARD_ARGS))]
+
+    def loop():
+        for i in range(count):
+            ArtistCard.from_dict(cards[i % len(cards)].to_dict())
+    return _best_rate(loop, count, repeats)
+
+
+def run(count: int, repeats: int) -> dict:
+    card = make_card(0)
+    results = {}
+    for name, build in builders().items():
+        results[name] = {
+            "bytes_per_object": round(measure_memory(build, min(count, 50_000), card), 1),
+            "constructed_per_s": round(measure_throughput(build, count, card, repeats)),
+        }
+    results["ArtistCard"]["roundtrip_per_s"] = round(measure_roundtrip(count, repeats))
+    return results
+
+
+def print_report(results: dict, baseline: dict = None):
+    print(f"{'class':<16}{'bytes/obj':>12}{'built/s':>14}{'vs baseline':>26}")
+    for name, stats in results.items():
+        line = f"{name:<16}{stats['bytes_per_object']:>12.1f}{stats['constructed_per_s']:>14,}"
+        base = (baseline or {}).get(name)
+        if base:
+            mem = stats["bytes_per_object"] / base["bytes_per_object"] if base["bytes_per_object"] else 0
+            speed = stats["constructed_per_s"] / base["constructed_per_s"] if base["constructed_per_s"] else 0
+            line += f"{f'mem x{mem:.2f}, speed x{speed:.2f}':>26}"
+        print(line)
+    roundtrip = results["ArtistCard"]["roundtrip_per_s"]
+    line = f"\nArtistCard to_dict/from_dict: {roundtrip:,}/s"
+    base = (baseline or {}).get("ArtistCard", {}).get("roundtrip_per_s")
+    if base:
+        line += f" (x{roundtrip / base:.2f} vs baseline)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Value object micro-benchmark")
+    parser.add_argument("--count", type=int, default=100_000, help="objects built per class")
+    parser.add_argument("--repeats", type=int, default=5, help="timing runs per class (best is kept)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--write-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.count, args.repeats)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.write_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,35 +38,10 @@ class SeasonSupply:
         return sqlite3.connect(self.db_path)
 
     def init_supply_tracking(self):
-        """Initialize supply tracking table"""
+        """Seed Season 1 caps (season_supply / artist_supply come from migrate.py)"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
-            # Global supply tracking
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS season_supply (
-                    season INTEGER,
-                    tier TEXT,
-                    minted INTEGER DEFAULT 0,
-                    cap INTEGER,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (season, tier)
-                )
-            """)
-            
-            # Artist-specific supply tracking
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS artist_supply (
-                    season INTEGER,
-                    artist_id TEXT,
-                    tier TEXT,
-                    minted INTEGER DEFAULT 0,
-                    cap INTEGER,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (season, artist_id, tier)
-                )
-            """)
-            
             # Initialize Season 1 caps if not exists
             for tier, cap in self.SEASON_1_CAPS.items():
                 cursor.execute("""
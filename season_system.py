@@ -1,14 +1,57 @@
 # season_system.py
 import json
+import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from database import DatabaseManager
+from services.write_behind import WriteBehindBuffer
+
+# Season progress per action: (counter column, XP per unit). unique_artist always
+# counts one artist and a flat 50 XP regardless of amount.
+PROGRESS_ACTIONS = {
+    'card_collected': ('cards_collected', 10),
+    'battle_won': ('battles_won', 25),
+    'trade_completed': ('trades_completed', 15),
+    'unique_artist': ('unique_artists', None),
+}
+UNIQUE_ARTIST_XP = 50
+PROGRESS_COUNTERS = ('cards_collected', 'battles_won', 'trades_completed', 'unique_artists')
+
+# Season rank by total XP (season_level * 100 + season_xp), highest first
+SEASON_RANKS = [(10000, 'Diamond'), (5000, 'Platinum'), (2000, 'Gold'), (500, 'Silver'), (0, 'Bronze')]
+
+
+def season_rank_for(total_xp: int) -> str:
+    """Season rank for a total XP (season_level * 100 + season_xp)"""
+    for min_xp, rank in SEASON_RANKS:
+        if total_xp >= min_xp:
+            return rank
+    return SEASON_RANKS[-1][1]
+
+
+def _rank_sql(total_xp_expr: str) -> str:
+    """SQL CASE mapping a total XP expression to its season rank"""
+    whens = " ".join(f"WHEN {total_xp_expr} >= {xp} THEN '{rank}'" for xp, rank in SEASON_RANKS[:-1])
+    return f"CASE {whens} ELSE '{SEASON_RANKS[-1][1]}' END"
+
 
 class SeasonManager:
+    # Progress events are buffered per user and written with one upsert per user
+    # every _PROGRESS_FLUSH_SECONDS (and at exit / before progress is read).
+    # Level and XP fold exactly: level * 100 + xp only ever grows by the XP gained.
+    _PROGRESS_FLUSH_SECONDS = float(os.environ.get("SEASON_PROGRESS_FLUSH_SECONDS", "5"))
+    _SEASON_CACHE_SECONDS = float(os.environ.get("SEASON_CACHE_SECONDS", "60"))
+
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
         self.current_season = None
+        self._current_season_at = 0.0
         self.season_duration_days = 60  # 60 days per season (synced with battle pass)
+        self._progress_buffer = WriteBehindBuffer(
+            "season-progress", self._write_progress, self._PROGRESS_FLUSH_SECONDS,
+            merge=self._merge_progress,
+        )
         
         # Season 1 Configuration — dates calculated dynamically from now
         season_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -26,100 +69,7 @@ class SeasonManager:
         }
         
     def initialize_season_tables(self):
-        """Create season-related database tables"""
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Seasons table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS seasons (
-                    season_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    season_name TEXT NOT NULL,
-                    season_number INTEGER NOT NULL,
-                    start_date TIMESTAMP NOT NULL,
-                    end_date TIMESTAMP NOT NULL,
-                    is_active BOOLEAN DEFAULT FALSE,
-                    theme TEXT,
-                    special_cards TEXT, -- JSON array of special card IDs
-                    season_stats TEXT, -- JSON object with season statistics
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Season-specific card caps
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS season_card_caps (
-                    cap_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    season_id INTEGER,
-                    artist_name TEXT NOT NULL,
-                    tier TEXT NOT NULL,
-                    max_prints INTEGER NOT NULL,
-                    current_prints INTEGER DEFAULT 0,
-                    is_hard_cap BOOLEAN DEFAULT FALSE,
-                    FOREIGN KEY (season_id) REFERENCES seasons(season_id)
-                )
-            """)
-            
-            # Player season progress
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS player_season_progress (
-                    progress_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    season_id INTEGER NOT NULL,
-                    season_level INTEGER DEFAULT 1,
-                    season_xp INTEGER DEFAULT 0,
-                    cards_collected INTEGER DEFAULT 0,
-                    unique_artists INTEGER DEFAULT 0,
-                    battles_won INTEGER DEFAULT 0,
-                    trades_completed INTEGER DEFAULT 0,
-                    season_rank TEXT DEFAULT 'Bronze',
-                    rewards_claimed TEXT DEFAULT '[]', -- JSON array of claimed reward IDs
-                    last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id),
-                    FOREIGN KEY (season_id) REFERENCES seasons(season_id),
-                    UNIQUE(user_id, season_id)
-                )
-            """)
-            
-            # Season rewards
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS season_rewards (
-                    reward_id TEXT PRIMARY KEY,
-                    season_id INTEGER,
-                    reward_type TEXT NOT NULL, -- 'card', 'currency', 'title', 'badge'
-                    reward_name TEXT NOT NULL,
-                    reward_data TEXT, -- JSON object with reward details
-                    required_level INTEGER,
-                    required_xp INTEGER,
-                    required_cards INTEGER,
-                    required_rank TEXT,
-                    is_claimable BOOLEAN DEFAULT TRUE,
-                    is_limited BOOLEAN DEFAULT FALSE,
-                    total_claims INTEGER DEFAULT 0,
-                    max_claims INTEGER,
-                    FOREIGN KEY (season_id) REFERENCES seasons(season_id)
-                )
-            """)
-            
-            # Season prestige tracking
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS card_prestige (
-                    prestige_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    card_id TEXT NOT NULL,
-                    original_season_id INTEGER,
-                    seasons_active INTEGER DEFAULT 1, -- How many seasons this card has been active
-                    prestige_score INTEGER DEFAULT 0,
-                    ownership_history TEXT, -- JSON array of notable owners
-                    notable_events TEXT, -- JSON array of notable events
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (original_season_id) REFERENCES seasons(season_id),
-                    FOREIGN KEY (card_id) REFERENCES cards(card_id)
-                )
-            """)
-            
-            conn.commit()
-        
-        # Initialize Season 1 if no seasons exist
+        """Seed Season 1 if no season exists (tables come from migrate.py)"""
         self.ensure_season_exists()
     
     def ensure_season_exists(self):
@@ -147,6 +97,7 @@ class SeasonManager:
                 
                 season_id = cursor.lastrowid
                 conn.commit()
+                self._invalidate_season_cache()
                 
                 print(f"✅ Season 1 created with ID {season_id}")
                 print(f"📅 Duration: {cfg['start_date'].strftime('%Y-%m-%d')} to {cfg['end_date'].strftime('%Y-%m-%d')}")
@@ -157,6 +108,8 @@ class SeasonManager:
     
     def create_new_season(self, season_name: str, theme: str = None) -> Dict:
         """Create a new season"""
+        # Buffered progress belongs to the season that is ending
+        self.flush_progress()
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
             
@@ -188,6 +141,7 @@ class SeasonManager:
             self._generate_season_rewards(season_id)
             
             conn.commit()
+            self._invalidate_season_cache()
             
             return {
                 'season_id': season_id,
@@ -274,7 +228,10 @@ class SeasonManager:
                 ))
     
     def get_current_season(self) -> Optional[Dict]:
-        """Get the currently active season"""
+        """Get the currently active season (cached for _SEASON_CACHE_SECONDS)"""
+        if self.current_season is not None and time.monotonic() - self._current_season_at < self._SEASON_CACHE_SECONDS:
+            return dict(self.current_season)
+
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -287,12 +244,20 @@ class SeasonManager:
             
             if result:
                 columns = [desc[0] for desc in cursor.description]
-                return dict(zip(columns, result))
+                self.current_season = dict(zip(columns, result))
+                self._current_season_at = time.monotonic()
+                return dict(self.current_season)
             else:
+                self._invalidate_season_cache()
                 return None
+
+    def _invalidate_season_cache(self):
+        self.current_season = None
+        self._current_season_at = 0.0
     
     def get_player_season_progress(self, user_id: int) -> Dict:
         """Get player's progress in current season"""
+        self.flush_progress()
         current_season = self.get_current_season()
         if not current_season:
             return {'error': 'No active season'}
@@ -327,132 +292,75 @@ class SeasonManager:
                 return dict(zip(columns, result))
     
     def update_player_progress(self, user_id: int, action_type: str, amount: int = 1, extra_data: Dict = None):
-        """Update player's season progress based on actions"""
+        """Record a season progress event (card_collected, battle_won,
+        trade_completed, unique_artist). Events are folded into a per-user delta
+        and written by flush_progress()."""
+        action = PROGRESS_ACTIONS.get(action_type)
+        if action is None:
+            return
+        column, xp_per_unit = action
+        if column == 'unique_artists':
+            count, xp = 1, UNIQUE_ARTIST_XP
+        else:
+            count, xp = amount, amount * xp_per_unit
+
+        def fold(delta):
+            delta = delta or dict.fromkeys(PROGRESS_COUNTERS + ('xp',), 0)
+            delta[column] += count
+            delta['xp'] += xp
+            return delta
+
+        self._progress_buffer.update(user_id, fold)
+
+    @staticmethod
+    def _merge_progress(older: Dict[str, int], newer: Dict[str, int]) -> Dict[str, int]:
+        # Deltas are additive, so a failed batch merges with anything recorded since
+        return {key: older[key] + newer[key] for key in older}
+
+    # One statement per user: create the row if needed, add the counters and XP,
+    # carry XP over into levels (100 per level) and recompute the rank, all from
+    # the row's current values so concurrent writers can't lose updates. The
+    # inserted level/xp are those of a fresh row that gained the XP, so the XP
+    # gained is excluded.season_level * 100 + excluded.season_xp - 100.
+    _XP_GAINED = "(excluded.season_level * 100 + excluded.season_xp - 100)"
+    _PROGRESS_UPSERT = f"""
+        INSERT INTO player_season_progress
+        (user_id, season_id, season_level, season_xp, cards_collected, battles_won,
+         trades_completed, unique_artists, season_rank, last_activity)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id, season_id) DO UPDATE SET
+            season_level = player_season_progress.season_level
+                + (player_season_progress.season_xp + {_XP_GAINED}) / 100,
+            season_xp = (player_season_progress.season_xp + {_XP_GAINED}) % 100,
+            cards_collected = player_season_progress.cards_collected + excluded.cards_collected,
+            battles_won = player_season_progress.battles_won + excluded.battles_won,
+            trades_completed = player_season_progress.trades_completed + excluded.trades_completed,
+            unique_artists = player_season_progress.unique_artists + excluded.unique_artists,
+            season_rank = {_rank_sql(f"(player_season_progress.season_level * 100 + player_season_progress.season_xp + {_XP_GAINED})")},
+            last_activity = CURRENT_TIMESTAMP
+    """
+
+    def flush_progress(self) -> int:
+        """Write buffered progress events for the current season. Returns users written."""
+        return self._progress_buffer.flush()
+
+    def _write_progress(self, pending: Dict[int, Dict[str, int]]) -> int:
         current_season = self.get_current_season()
         if not current_season:
-            return
-        
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get current progress
-            progress = self.get_player_season_progress(user_id)
-            
-            # Update based on action type
-            if action_type == 'card_collected':
-                cursor.execute("""
-                    UPDATE player_season_progress 
-                    SET cards_collected = cards_collected + ?, last_activity = CURRENT_TIMESTAMP
-                    WHERE user_id = ? AND season_id = ?
-                """, (amount, user_id, current_season['season_id']))
-                
-                # Add XP for collecting cards
-                xp_gained = amount * 10
-                self._add_season_xp(user_id, current_season['season_id'], xp_gained)
-                
-            elif action_type == 'battle_won':
-                cursor.execute("""
-                    UPDATE player_season_progress 
-                    SET battles_won = battles_won + ?, last_activity = CURRENT_TIMESTAMP
-                    WHERE user_id = ? AND season_id = ?
-                """, (amount, user_id, current_season['season_id']))
-                
-                # Add XP for winning battles
-                xp_gained = amount * 25
-                self._add_season_xp(user_id, current_season['season_id'], xp_gained)
-                
-            elif action_type == 'trade_completed':
-                cursor.execute("""
-                    UPDATE player_season_progress 
-                    SET trades_completed = trades_completed + ?, last_activity = CURRENT_TIMESTAMP
-                    WHERE user_id = ? AND season_id = ?
-                """, (amount, user_id, current_season['season_id']))
-                
-                # Add XP for trading
-                xp_gained = amount * 15
-                self._add_season_xp(user_id, current_season['season_id'], xp_gained)
-                
-            elif action_type == 'unique_artist':
-                # Update unique artist count
-                cursor.execute("""
-                    UPDATE player_season_progress 
-                    SET unique_artists = unique_artists + 1, last_activity = CURRENT_TIMESTAMP
-                    WHERE user_id = ? AND season_id = ?
-                """, (user_id, current_season['season_id']))
-                
-                # Bonus XP for unique artists
-                self._add_season_xp(user_id, current_season['season_id'], 50)
-            
-            # Update season rank based on XP
-            self._update_season_rank(user_id, current_season['season_id'])
-            
-            conn.commit()
-    
-    def _add_season_xp(self, user_id: int, season_id: int, xp_amount: int):
-        """Add XP to player and check for level ups"""
-        with self.db._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get current XP and level
-            cursor.execute("""
-                SELECT season_xp, season_level FROM player_season_progress 
-                WHERE user_id = ? AND season_id = ?
-            """, (user_id, season_id))
-            
-            result = cursor.fetchone()
-            if not result:
-                return
-            
-            current_xp, current_level = result
-            
-            # Add XP
-            new_xp = current_xp + xp_amount
-            
-            # Check for level ups (100 XP per level)
-            new_level = current_level + (new_xp // 100)
-            new_xp = new_xp % 100
-            
-            cursor.execute("""
-                UPDATE player_season_progress 
-                SET season_xp = ?, season_level = ?
-                WHERE user_id = ? AND season_id = ?
-            """, (new_xp, new_level, user_id, season_id))
-    
-    def _update_season_rank(self, user_id: int, season_id: int):
-        """Update player's season rank based on XP and level"""
+            return 0
+
+        season_id = current_season['season_id']
+        rows = [
+            (user_id, season_id, 1 + d['xp'] // 100, d['xp'] % 100,
+             d['cards_collected'], d['battles_won'], d['trades_completed'], d['unique_artists'],
+             season_rank_for(100 + d['xp']))
+            for user_id, d in pending.items()
+        ]
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT season_level, season_xp FROM player_season_progress 
-                WHERE user_id = ? AND season_id = ?
-            """, (user_id, season_id))
-            
-            result = cursor.fetchone()
-            if not result:
-                return
-            
-            level, xp = result
-            total_xp = (level * 100) + xp
-            
-            # Determine rank based on XP
-            if total_xp >= 10000:
-                rank = 'Diamond'
-            elif total_xp >= 5000:
-                rank = 'Platinum'
-            elif total_xp >= 2000:
-                rank = 'Gold'
-            elif total_xp >= 500:
-                rank = 'Silver'
-            else:
-                rank = 'Bronze'
-            
-            cursor.execute("""
-                UPDATE player_season_progress 
-                SET season_rank = ?
-                WHERE user_id = ? AND season_id = ?
-            """, (rank, user_id, season_id))
-    
+            cursor.executemany(self._PROGRESS_UPSERT, rows)
+        return len(rows)
+
     def check_card_cap(self, artist_name: str, tier: str) -> Dict:
         """Check if a card can still be printed this season"""
         current_season = self.get_current_season()
@@ -546,6 +454,7 @@ class SeasonManager:
     
     def claim_reward(self, user_id: int, reward_id: str) -> Dict:
         """Claim a season reward — uses BEGIN IMMEDIATE for atomicity"""
+        self.flush_progress()
         current_season = self.get_current_season()
         if not current_season:
             return {'success': False, 'error': 'No active season'}
@@ -639,6 +548,7 @@ class SeasonManager:
     
     def get_season_leaderboard(self, limit: int = 50) -> List[Dict]:
         """Get the season leaderboard"""
+        self.flush_progress()
         current_season = self.get_current_season()
         if not current_season:
             return []
@@ -678,6 +588,7 @@ class SeasonManager:
     
     def end_season(self, season_id: int) -> Dict:
         """End a season and calculate final rewards"""
+        self.flush_progress()
         with self.db._get_connection() as conn:
             cursor = conn.cursor()
             
@@ -718,6 +629,7 @@ class SeasonManager:
             stats = cursor.fetchone()
             
             conn.commit()
+            self._invalidate_season_cache()
             
             return {
                 'season_id': season_id,
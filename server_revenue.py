@@ -24,7 +24,6 @@ class ServerRevenueManager:
     def __init__(self, db_path: str = "music_legends.db"):
         self.db_path = db_path
         self._database_url = settings.DATABASE_URL
-        self.init_revenue_tables()
 
     def _get_connection(self):
         """Get database connection - PostgreSQL if DATABASE_URL set, else SQLite."""
@@ -38,82 +37,6 @@ class ServerRevenueManager:
         else:
             return sqlite3.connect(self.db_path)
     
-    def init_revenue_tables(self):
-        """Initialize revenue tracking tables"""
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Server owner registration
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS server_owners (
-                    server_id INTEGER PRIMARY KEY,
-                    owner_user_id INTEGER NOT NULL,
-                    owner_discord_tag TEXT,
-                    stripe_connect_account_id TEXT,
-                    stripe_connect_status TEXT DEFAULT 'not_connected',
-                    nft_count INTEGER DEFAULT 0,
-                    revenue_share_percentage REAL DEFAULT 0.10,
-                    total_earned_cents INTEGER DEFAULT 0,
-                    pending_payout_cents INTEGER DEFAULT 0,
-                    last_payout_date TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # NFT holdings for server owners
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS server_nft_holdings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    server_id INTEGER NOT NULL,
-                    owner_user_id INTEGER NOT NULL,
-                    nft_collection TEXT NOT NULL,
-                    nft_token_id TEXT NOT NULL,
-                    wallet_address TEXT NOT NULL,
-                    verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    verification_status TEXT DEFAULT 'verified',
-                    FOREIGN KEY (server_id) REFERENCES server_owners(server_id),
-                    UNIQUE(nft_collection, nft_token_id)
-                )
-            """)
-            
-            # Revenue transactions
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS server_revenue_transactions (
-                    transaction_id TEXT PRIMARY KEY,
-                    server_id INTEGER NOT NULL,
-                    owner_user_id INTEGER NOT NULL,
-                    purchase_type TEXT NOT NULL,
-                    total_amount_cents INTEGER NOT NULL,
-                    server_share_cents INTEGER NOT NULL,
-                    platform_share_cents INTEGER NOT NULL,
-                    revenue_share_percentage REAL NOT NULL,
-                    nft_boost_applied INTEGER DEFAULT 0,
-                    stripe_payment_intent_id TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    payout_status TEXT DEFAULT 'pending',
-                    payout_date TIMESTAMP,
-                    FOREIGN KEY (server_id) REFERENCES server_owners(server_id)
-                )
-            """)
-            
-            # Payout history
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS server_payouts (
-                    payout_id TEXT PRIMARY KEY,
-                    server_id INTEGER NOT NULL,
-                    owner_user_id INTEGER NOT NULL,
-                    amount_cents INTEGER NOT NULL,
-                    stripe_transfer_id TEXT,
-                    payout_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT DEFAULT 'completed',
-                    transaction_ids TEXT,
-                    FOREIGN KEY (server_id) REFERENCES server_owners(server_id)
-                )
-            """)
-            
-            conn.commit()
-    
     def register_server_owner(self, server_id: int, owner_user_id: int, owner_discord_tag: str) -> Dict:
         """Register a server owner for revenue sharing"""
         with self._get_connection() as conn:
@@ -0,0 +1,317 @@
+# services/battle_history.py
+"""
+Battle History Store
+Write-buffered, indexed battle history with daily rollups.
+
+Resolved battles are queued in a write-behind buffer (services/write_behind.py)
+and written to battle_history in one bulk INSERT every FLUSH_SECONDS (or as
+soon as MAX_BUFFER battles are waiting, and at exit). Reads flush first, so a
+player always sees their own latest battle.
+
+A player's history is read newest-first with keyset pagination over the
+(player1_id, created_at) and (player2_id, created_at) indexes: one bounded
+query per side, merged. Battles older than RETENTION_DAYS are folded into
+battle_daily_stats (wins / losses / ties / gold / XP per user per day) and
+deleted, so the table only holds recent detail while lifetime records stay
+exact.
+"""
+
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from models import BattleDailyStats, BattleHistoryEntry
+from services.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+# Store settings
+FLUSH_SECONDS = float(os.environ.get("BATTLE_HISTORY_FLUSH_SECONDS", "2"))
+MAX_BUFFER = 500
+MAX_FLUSH_RETRIES = 5
+RETENTION_DAYS = int(os.environ.get("BATTLE_HISTORY_RETENTION_DAYS", "90"))
+COMPACT_INTERVAL = 6 * 3600
+MAX_PAGE_SIZE = 50
+
+
+def _side_columns(side: int) -> Dict[str, object]:
+    """Columns of battle_history as seen by player `side` (1 or 2)"""
+    me, them = (1, 2) if side == 1 else (2, 1)
+    t = BattleHistoryEntry
+    return {
+        "player": getattr(t, f"player{me}_id"),
+        "gold": getattr(t, f"player{me}_gold_reward"),
+        "xp": getattr(t, f"player{me}_xp_reward"),
+        "win": side,
+        "loss": them,
+    }
+
+
+def _is_tie():
+    """winner is 0 for a draw; rows without a winner count as ties too (see _entry)"""
+    t = BattleHistoryEntry
+    return or_(t.winner == 0, t.winner.is_(None))
+
+
+class BattleHistoryStore:
+    """Battle history for one Database (session factory + dialect name)"""
+
+    def __init__(self, session_factory: Callable, dialect: str = "sqlite"):
+        self._session_factory = session_factory
+        self._dialect = dialect
+        self._buffer = WriteBehindBuffer(
+            "battle-history", self._write, FLUSH_SECONDS, max_retries=MAX_FLUSH_RETRIES,
+            on_tick=self._maybe_compact,
+        )
+        self._last_compacted = 0.0
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _row(battle_data: Dict) -> dict:
+        return {
+            "battle_id": battle_data.get("battle_id") or f"battle_{uuid.uuid4().hex[:8]}",
+            "player1_id": str(battle_data.get("player1_id", "")),
+            "player2_id": str(battle_data.get("player2_id", "")),
+            "player1_card_id": battle_data.get("player1_card_id"),
+            "player2_card_id": battle_data.get("player2_card_id"),
+            "winner": battle_data.get("winner"),
+            "player1_power": battle_data.get("player1_power"),
+            "player2_power": battle_data.get("player2_power"),
+            "player1_critical": bool(battle_data.get("player1_critical", False)),
+            "player2_critical": bool(battle_data.get("player2_critical", False)),
+            "wager_tier": battle_data.get("wager_tier"),
+            "wager_amount": battle_data.get("wager_amount", 0),
+            "player1_gold_reward": battle_data.get("player1_gold_reward", 0),
+            "player2_gold_reward": battle_data.get("player2_gold_reward", 0),
+            "player1_xp_reward": battle_data.get("player1_xp_reward", 0),
+            "player2_xp_reward": battle_data.get("player2_xp_reward", 0),
+            "created_at": battle_data.get("created_at") or datetime.utcnow(),
+        }
+
+    def record(self, battle_data: Dict) -> bool:
+        """Queue a resolved battle for the next bulk insert"""
+        row = self._row(battle_data)
+        if self._buffer.update(row["battle_id"], lambda _: row) >= MAX_BUFFER:
+            self.flush()
+        return True
+
+    def _maybe_compact(self):
+        if time.monotonic() - self._last_compacted >= COMPACT_INTERVAL:
+            self._last_compacted = time.monotonic()
+            try:
+                self.compact()
+            except Exception as e:
+                logger.warning(f"[BATTLE] history compaction failed: {e}")
+
+    def flush(self) -> int:
+        """Write buffered battles with one bulk INSERT. Returns rows written."""
+        return self._buffer.flush()
+
+    def close(self) -> int:
+        """Write what is buffered and stop flushing this store"""
+        return self._buffer.close()
+
+    def _write(self, pending: Dict[str, dict]) -> int:
+        rows = list(pending.values())
+        session = self._session_factory()
+        try:
+            session.execute(insert(BattleHistoryEntry), rows)
+            session.commit()
+            return len(rows)
+        except IntegrityError:
+            session.rollback()
+            # One bad row (e.g. a battle_id already written) must not hold back
+            # the batch: insert row by row and drop the ones that still fail
+            written = 0
+            for row in rows:
+                try:
+                    session.execute(insert(BattleHistoryEntry), [row])
+                    session.commit()
+                    written += 1
+                except IntegrityError as e:
+                    session.rollback()
+                    logger.warning(f"[BATTLE] dropping battle {row['battle_id']}: {e.orig}")
+            return written
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cursor(row) -> str:
+        return f"{row.created_at.isoformat()}|{row.battle_id}"
+
+    @staticmethod
+    def _parse_cursor(before: str) -> Tuple[datetime, str]:
+        created_at, _, battle_id = before.partition("|")
+        return datetime.fromisoformat(created_at), battle_id
+
+    @staticmethod
+    def _entry(row, user_id: str) -> dict:
+        """A battle from user_id's point of view"""
+        me, them = (1, 2) if row.player1_id == user_id else (2, 1)
+        if row.winner == 0 or row.winner is None:
+            result = "tie"
+        else:
+            result = "win" if row.winner == me else "loss"
+        return {
+            "battle_id": row.battle_id,
+            "opponent_id": getattr(row, f"player{them}_id"),
+            "result": result,
+            "power": getattr(row, f"player{me}_power"),
+            "opponent_power": getattr(row, f"player{them}_power"),
+            "card_id": getattr(row, f"player{me}_card_id"),
+            "opponent_card_id": getattr(row, f"player{them}_card_id"),
+            "critical": bool(getattr(row, f"player{me}_critical")),
+            "wager_tier": row.wager_tier,
+            "wager_amount": row.wager_amount or 0,
+            "gold_reward": getattr(row, f"player{me}_gold_reward") or 0,
+            "xp_reward": getattr(row, f"player{me}_xp_reward") or 0,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+
+    def page(self, user_id, limit: int = 10, before: Optional[str] = None) -> Dict:
+        """Newest-first battles for user_id.
+
+        Returns {"battles": [...], "next_cursor": str | None}; pass next_cursor
+        back as `before` for the next page.
+        """
+        self.flush()
+        user_id = str(user_id)
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        t = BattleHistoryEntry
+        session = self._session_factory()
+        try:
+            rows = {}
+            for player_col in (t.player1_id, t.player2_id):
+                query = session.query(t).filter(player_col == user_id)
+                if before:
+                    at, battle_id = self._parse_cursor(before)
+                    query = query.filter(or_(t.created_at < at, and_(t.created_at == at, t.battle_id < battle_id)))
+                for row in query.order_by(t.created_at.desc(), t.battle_id.desc()).limit(limit + 1):
+                    rows[row.battle_id] = row
+            ordered = sorted(rows.values(), key=lambda r: (r.created_at, r.battle_id), reverse=True)
+            battles = ordered[:limit]
+            return {
+                "battles": [self._entry(row, user_id) for row in battles],
+                "next_cursor": self._cursor(battles[-1]) if len(ordered) > limit else None,
+            }
+        finally:
+            session.close()
+
+    def record_for(self, user_id) -> Dict:
+        """Lifetime wins / losses / ties / gold / XP: recent rows plus rollups"""
+        self.flush()
+        user_id = str(user_id)
+        totals = dict.fromkeys(("wins", "losses", "ties", "gold_earned", "xp_earned"), 0)
+        t = BattleHistoryEntry
+        session = self._session_factory()
+        try:
+            for side in (1, 2):
+                cols = _side_columns(side)
+                row = session.query(
+                    func.sum(case((t.winner == cols["win"], 1), else_=0)),
+                    func.sum(case((t.winner == cols["loss"], 1), else_=0)),
+                    func.sum(case((_is_tie(), 1), else_=0)),
+                    func.sum(cols["gold"]),
+                    func.sum(cols["xp"]),
+                ).filter(cols["player"] == user_id).one()
+                for key, value in zip(totals, row):
+                    totals[key] += int(value or 0)
+
+            d = BattleDailyStats
+            row = session.query(
+                func.sum(d.wins), func.sum(d.losses), func.sum(d.ties),
+                func.sum(d.gold_earned), func.sum(d.xp_earned),
+            ).filter(d.user_id == user_id).one()
+            for key, value in zip(totals, row):
+                totals[key] += int(value or 0)
+        finally:
+            session.close()
+
+        totals["total"] = totals["wins"] + totals["losses"] + totals["ties"]
+        decided = totals["wins"] + totals["losses"]
+        totals["win_rate"] = round(totals["wins"] / decided * 100, 1) if decided else 0.0
+        return totals
+
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+
+    def _upsert_daily(self, session, rows: List[dict]):
+        if self._dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(BattleDailyStats)
+        d = BattleDailyStats
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[d.user_id, d.day],
+            set_={
+                col: getattr(d, col) + getattr(stmt.excluded, col)
+                for col in ("wins", "losses", "ties", "gold_earned", "xp_earned")
+            },
+        )
+        session.execute(stmt, rows)
+
+    def compact(self, older_than_days: Optional[int] = None, now: Optional[datetime] = None) -> int:
+        """Fold battles older than the retention window into daily per-user
+        totals and delete them. Returns battles compacted."""
+        self.flush()
+        days = RETENTION_DAYS if older_than_days is None else older_than_days
+        cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+        t = BattleHistoryEntry
+        session = self._session_factory()
+        try:
+            daily: Dict[Tuple[str, str], dict] = {}
+            for side in (1, 2):
+                cols = _side_columns(side)
+                day = func.date(t.created_at)
+                grouped = session.execute(
+                    select(
+                        cols["player"], day,
+                        func.sum(case((t.winner == cols["win"], 1), else_=0)),
+                        func.sum(case((t.winner == cols["loss"], 1), else_=0)),
+                        func.sum(case((_is_tie(), 1), else_=0)),
+                        func.sum(cols["gold"]),
+                        func.sum(cols["xp"]),
+                    ).where(t.created_at < cutoff).group_by(cols["player"], day)
+                )
+                for player, on_day, wins, losses, ties, gold, xp in grouped:
+                    key = (player, str(on_day))
+                    entry = daily.setdefault(key, {
+                        "user_id": player, "day": str(on_day),
+                        "wins": 0, "losses": 0, "ties": 0, "gold_earned": 0, "xp_earned": 0,
+                    })
+                    entry["wins"] += int(wins or 0)
+                    entry["losses"] += int(losses or 0)
+                    entry["ties"] += int(ties or 0)
+                    entry["gold_earned"] += int(gold or 0)
+                    entry["xp_earned"] += int(xp or 0)
+
+            if not daily:
+                return 0
+            self._upsert_daily(session, list(daily.values()))
+            removed = session.execute(delete(t).where(t.created_at < cutoff)).rowcount
+            session.commit()
+            logger.info(f"[BATTLE] compacted {removed} battles into {len(daily)} daily rollups")
+            return removed
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
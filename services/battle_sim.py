@@ -0,0 +1,198 @@
+# services/battle_sim.py
+"""
+Battle Simulator
+Batch version of BattleEngine.execute_battle for balance work.
+
+Resolves many battles at once over NumPy arrays of team powers. The rules are
+read from BattleEngine / BattleWagerConfig rather than copied, so a balance
+change there is picked up here: each side rolls a crit (CRITICAL_HIT_CHANCE,
+power truncated after CRITICAL_MULTIPLIER), a power gap under
+MIN_POWER_ADVANTAGE is a tie, and rewards come from the wager tier table.
+
+Crit rolls are drawn as a (n, 2) array in the same order execute_battle calls
+random.random() (player 1 then player 2, battle by battle), so feeding the
+same rolls to both gives identical results.
+
+NumPy is only needed here and in scripts/bench_battle_sim.py.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from battle_engine import BattleEngine, BattleWagerConfig
+
+# Rewards execute_battle hands out on a tie (not part of the tier table)
+TIE_GOLD = 25
+TIE_XP = 10
+
+# Team power bands used for the default win-rate matrix (lower bound, upper bound)
+DEFAULT_BANDS = [(30, 45), (45, 60), (60, 75), (75, 90), (90, 105), (105, 120), (120, 136)]
+
+
+def _require_numpy():
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy is required for battle simulation (pip install numpy)")
+
+
+def team_powers(champ_powers, support_powers=None):
+    """Vectorized cards_config.compute_team_power.
+
+    champ_powers: shape (n,). support_powers: shape (n, k) with k <= 4, where
+    missing supports are negative (e.g. -1) and skipped like a shorter list.
+    """
+    _require_numpy()
+    champ = np.asarray(champ_powers, dtype=np.int64)
+    if support_powers is None:
+        return champ.copy()
+    supports = np.asarray(support_powers, dtype=np.int64)
+    present = supports >= 0
+    count = present.sum(axis=1)
+    total = np.where(present, supports, 0).sum(axis=1)
+    return np.where(count > 0, (champ * 2 + total) // (2 + count), champ)
+
+
+def roll_crits(n: int, rng=None, seed: Optional[int] = None):
+    """Crit rolls for n battles, shape (n, 2), uniform in [0, 1)"""
+    _require_numpy()
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    return rng.random((n, 2))
+
+
+def simulate(power1, power2, wager_tier: str = "casual", rolls=None,
+             seed: Optional[int] = None, rng=None,
+             crit_chance: Optional[float] = None) -> Dict[str, "np.ndarray"]:
+    """Resolve len(power1) battles the way execute_battle would.
+
+    Returns arrays keyed like the execute_battle result: winner (0 tie, 1, 2),
+    crit1/crit2, final1/final2, gold1/gold2, xp1/xp2. crit_chance overrides
+    BattleEngine.CRITICAL_HIT_CHANCE (e.g. 0 to measure crit impact).
+    """
+    _require_numpy()
+    p1 = np.asarray(power1, dtype=np.int64)
+    p2 = np.asarray(power2, dtype=np.int64)
+    p1, p2 = np.broadcast_arrays(p1, p2)
+    n = p1.shape[0]
+
+    if rolls is None:
+        rolls = roll_crits(n, rng=rng, seed=seed)
+    rolls = np.asarray(rolls, dtype=np.float64)
+    if rolls.shape != (n, 2):
+        raise ValueError(f"rolls must have shape ({n}, 2), got {rolls.shape}")
+
+    chance = BattleEngine.CRITICAL_HIT_CHANCE if crit_chance is None else crit_chance
+    crit1 = rolls[:, 0] < chance
+    crit2 = rolls[:, 1] < chance
+
+    # int(power * multiplier) truncates toward zero
+    multiplier = BattleEngine.CRITICAL_MULTIPLIER
+    final1 = np.where(crit1, np.trunc(p1 * multiplier).astype(np.int64), p1)
+    final2 = np.where(crit2, np.trunc(p2 * multiplier).astype(np.int64), p2)
+
+    diff = np.abs(final1 - final2)
+    winner = np.where(diff < BattleEngine.MIN_POWER_ADVANTAGE, 0, np.where(final1 > final2, 1, 2))
+
+    tier = BattleWagerConfig.get_tier(wager_tier)
+    gold1 = np.select([winner == 1, winner == 2], [tier["winner_gold"], tier["loser_gold"]], TIE_GOLD)
+    gold2 = np.select([winner == 1, winner == 2], [tier["loser_gold"], tier["winner_gold"]], TIE_GOLD)
+    xp1 = np.select([winner == 1, winner == 2], [tier["winner_xp"], tier["loser_xp"]], TIE_XP)
+    xp2 = np.select([winner == 1, winner == 2], [tier["loser_xp"], tier["winner_xp"]], TIE_XP)
+
+    return {
+        "winner": winner,
+        "crit1": crit1,
+        "crit2": crit2,
+        "final1": final1,
+        "final2": final2,
+        "power_difference": diff,
+        "gold1": gold1,
+        "gold2": gold2,
+        "xp1": xp1,
+        "xp2": xp2,
+        "wager": tier["wager_cost"],
+    }
+
+
+def band_labels(bands: Sequence[tuple] = DEFAULT_BANDS) -> List[str]:
+    """Inclusive "low-high" labels for power bands"""
+    return [f"{lo}-{hi - 1}" for lo, hi in bands]
+
+
+def outcome_rates(result: Dict) -> Dict[str, float]:
+    """Player 1 win / tie / loss rates of a simulate() result"""
+    winner = result["winner"]
+    n = max(1, winner.shape[0])
+    return {
+        "p1_win": float((winner == 1).sum() / n),
+        "tie": float((winner == 0).sum() / n),
+        "p2_win": float((winner == 2).sum() / n),
+    }
+
+
+def win_rate_matrix(bands: Sequence[tuple] = DEFAULT_BANDS, battles_per_cell: int = 20_000,
+                    seed: Optional[int] = None, crit_chance: Optional[float] = None) -> Dict:
+    """Win rate of a team drawn from row band against one from column band.
+
+    Powers are drawn uniformly within each [low, high) band. Returns
+    {"bands": [...], "win": [[...]], "tie": [[...]]}; the tier doesn't affect
+    outcomes, only rewards.
+    """
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    size = len(bands)
+    win = np.zeros((size, size))
+    tie = np.zeros((size, size))
+    for i, (lo1, hi1) in enumerate(bands):
+        p1 = rng.integers(lo1, hi1, battles_per_cell)
+        for j, (lo2, hi2) in enumerate(bands):
+            p2 = rng.integers(lo2, hi2, battles_per_cell)
+            rates = outcome_rates(simulate(p1, p2, rng=rng, crit_chance=crit_chance))
+            win[i, j] = rates["p1_win"]
+            tie[i, j] = rates["tie"]
+    return {
+        "bands": band_labels(bands),
+        "win": win.round(4).tolist(),
+        "tie": tie.round(4).tolist(),
+    }
+
+
+def gold_flow(power1, power2, tiers: Optional[Iterable[str]] = None,
+              seed: Optional[int] = None, battles_per_day: int = 0) -> Dict[str, Dict]:
+    """Per-tier gold economics over the given matchups.
+
+    Both players pay the wager up front (cogs/battle_commands.py), so a
+    player's net is reward - wager_cost. "minted_per_battle" is the gold the
+    battle adds to the economy overall (negative = sink).
+    """
+    _require_numpy()
+    tiers = list(tiers or BattleWagerConfig.TIERS)
+    rng = np.random.default_rng(seed)
+    p1 = np.asarray(power1, dtype=np.int64)
+    p2 = np.asarray(power2, dtype=np.int64)
+    # Same crit rolls for every tier so tiers differ only in their reward tables
+    rolls = roll_crits(np.broadcast_shapes(p1.shape, p2.shape)[0], rng=rng)
+
+    flows = {}
+    for tier_name in tiers:
+        result = simulate(p1, p2, tier_name, rolls=rolls)
+        wager = result["wager"]
+        net1 = result["gold1"] - wager
+        net2 = result["gold2"] - wager
+        minted = float((net1 + net2).mean())
+        flows[tier_name] = {
+            "wager_cost": wager,
+            **{k: round(v, 4) for k, v in outcome_rates(result).items()},
+            "p1_net_gold_ev": round(float(net1.mean()), 2),
+            "p2_net_gold_ev": round(float(net2.mean()), 2),
+            "p1_xp_ev": round(float(result["xp1"].mean()), 2),
+            "minted_per_battle": round(minted, 2),
+        }
+        if battles_per_day:
+            flows[tier_name]["minted_per_day"] = round(minted * battles_per_day)
+    return flows
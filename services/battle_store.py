@@ -0,0 +1,405 @@
+# services/battle_store.py
+"""
+Battle State Store
+Where BattleManager keeps active matches.
+
+MemoryBattleStore is the old per-process behaviour: one bot process owns its
+battles and crash refunds come from the active_battles table.
+
+RedisBattleStore (BATTLE_STORE=redis) shares battles between bot shards and
+the TMA API:
+  battle:match:{match_id}   hash of the match, expires MATCH_TTL + EXPIRY_GRACE
+  battle:user:{user_id}     match_id the user is in, expires MATCH_TTL
+  battle:deadlines          zset match_id -> expiry time (unix seconds)
+  battle:owner:{owner}      set of match_ids started by one shard
+
+Creating a match claims both players in one script, so two shards can't put
+the same user in two battles. Accept / card selection are scripts too, so
+both players acting at once on different shards can't lose an update. A
+match that outlives MATCH_TTL frees its players automatically; the expiry
+sweep hands it back (with MatchState.expire() applied) exactly once so its
+wagers can be refunded. Restart recovery reads the shard's owner set, which
+is O(active matches).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from battle_engine import BattleCard, BattleStatus, MatchState
+
+logger = logging.getLogger(__name__)
+
+# Store settings
+MATCH_TTL = int(os.environ.get("BATTLE_MATCH_TTL", "900"))  # a Discord battle takes ~2 minutes
+EXPIRY_GRACE = 24 * 3600        # keep expired matches around long enough to refund them
+KEY_PREFIX = "battle:"
+DEADLINES_KEY = KEY_PREFIX + "deadlines"
+
+# Player fields stored flat in the match hash (prefixed p1_ / p2_)
+_PLAYER_FIELDS = ("user_id", "username", "card", "is_ready", "has_accepted",
+                  "gold_wagered", "gold_reward", "xp_reward", "won")
+_BOOL_FIELDS = {"is_ready", "has_accepted", "won", "is_tie"}
+_INT_FIELDS = {"gold_wagered", "gold_reward", "xp_reward", "power_difference"}
+
+# Claim both players and write the match, or do nothing if either is busy
+_CREATE_SCRIPT = """
+if redis.call('exists', KEYS[2]) == 1 or redis.call('exists', KEYS[3]) == 1 then
+    return 0
+end
+redis.call('hset', KEYS[1], unpack(ARGV, 5))
+redis.call('expire', KEYS[1], ARGV[3])
+redis.call('set', KEYS[2], ARGV[1], 'EX', ARGV[2])
+redis.call('set', KEYS[3], ARGV[1], 'EX', ARGV[2])
+redis.call('zadd', KEYS[4], ARGV[4], ARGV[1])
+redis.call('sadd', KEYS[5], ARGV[1])
+return 1
+"""
+
+# Returns -1 unknown match, -2 not a player, 0 waiting on the other, 1 both done.
+# ARGV: user_id, flag field, flag value field, value, next status, [timestamp field, timestamp]
+_TRANSITION_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return -1
+end
+local slot
+if redis.call('hget', KEYS[1], 'p1_user_id') == ARGV[1] then
+    slot = 'p1_'
+elseif redis.call('hget', KEYS[1], 'p2_user_id') == ARGV[1] then
+    slot = 'p2_'
+else
+    return -2
+end
+redis.call('hset', KEYS[1], slot .. ARGV[2], '1', slot .. ARGV[3], ARGV[4])
+if redis.call('hget', KEYS[1], 'p1_' .. ARGV[2]) == '1' and redis.call('hget', KEYS[1], 'p2_' .. ARGV[2]) == '1' then
+    redis.call('hset', KEYS[1], 'status', ARGV[5])
+    if ARGV[6] then
+        redis.call('hset', KEYS[1], ARGV[6], ARGV[7])
+    end
+    return 1
+end
+return 0
+"""
+
+# Write back a match only while it is still live
+_SAVE_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('hset', KEYS[1], unpack(ARGV))
+return 1
+"""
+
+# Release the players only if they still point at this match
+_REMOVE_SCRIPT = """
+local removed = redis.call('zrem', KEYS[4], ARGV[1])
+redis.call('srem', KEYS[5], ARGV[1])
+redis.call('del', KEYS[1])
+for i = 2, 3 do
+    if redis.call('get', KEYS[i]) == ARGV[1] then
+        redis.call('del', KEYS[i])
+    end
+end
+return removed
+"""
+
+
+class BattleStateStore:
+    """Interface shared by the memory and Redis backends"""
+
+    durable = False
+
+    def create(self, match: MatchState, owner: str) -> bool:
+        """Store a new match; False if either player is already in one"""
+        raise NotImplementedError
+
+    def get(self, match_id: str) -> Optional[MatchState]:
+        raise NotImplementedError
+
+    def get_user_match_id(self, user_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def save(self, match: MatchState):
+        """Write back a match changed outside accept/set_card (results, cancel)"""
+        raise NotImplementedError
+
+    def accept(self, match_id: str, user_id: str, wager: int) -> Optional[bool]:
+        """Atomic MatchState.accept_battle; None if the match/user is unknown"""
+        raise NotImplementedError
+
+    def set_card(self, match_id: str, user_id: str, card: BattleCard) -> Optional[bool]:
+        """Atomic MatchState.set_player_card; None if the match/user is unknown"""
+        raise NotImplementedError
+
+    def remove(self, match_id: str) -> Optional[MatchState]:
+        """Drop a match; returns it only to the caller that actually removed it"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def list_owned(self, owner: str) -> List[MatchState]:
+        raise NotImplementedError
+
+    def pop_expired(self, now: Optional[float] = None, exclude_owner: Optional[str] = None) -> List[MatchState]:
+        """Remove and return matches past their deadline"""
+        raise NotImplementedError
+
+
+class MemoryBattleStore(BattleStateStore):
+    """Per-process store (single bot process)"""
+
+    def __init__(self, ttl: int = MATCH_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._matches: Dict[str, MatchState] = {}
+        self._users: Dict[str, str] = {}
+        self._owners: Dict[str, str] = {}
+        self._deadlines: Dict[str, float] = {}
+
+    def create(self, match: MatchState, owner: str) -> bool:
+        with self._lock:
+            if match.player1.user_id in self._users or match.player2.user_id in self._users:
+                return False
+            self._matches[match.match_id] = match
+            self._users[match.player1.user_id] = match.match_id
+            self._users[match.player2.user_id] = match.match_id
+            self._owners[match.match_id] = owner
+            self._deadlines[match.match_id] = time.time() + self.ttl
+            return True
+
+    def get(self, match_id: str) -> Optional[MatchState]:
+        return self._matches.get(match_id)
+
+    def get_user_match_id(self, user_id: str) -> Optional[str]:
+        return self._users.get(user_id)
+
+    def save(self, match: MatchState):
+        with self._lock:
+            if match.match_id in self._matches:
+                self._matches[match.match_id] = match
+
+    def accept(self, match_id: str, user_id: str, wager: int) -> Optional[bool]:
+        with self._lock:
+            match = self._matches.get(match_id)
+            if not match or user_id not in (match.player1.user_id, match.player2.user_id):
+                return None
+            return match.accept_battle(user_id)
+
+    def set_card(self, match_id: str, user_id: str, card: BattleCard) -> Optional[bool]:
+        with self._lock:
+            match = self._matches.get(match_id)
+            if not match or user_id not in (match.player1.user_id, match.player2.user_id):
+                return None
+            return match.set_player_card(user_id, card)
+
+    def remove(self, match_id: str) -> Optional[MatchState]:
+        with self._lock:
+            match = self._matches.pop(match_id, None)
+            self._owners.pop(match_id, None)
+            self._deadlines.pop(match_id, None)
+            if match:
+                for user_id in (match.player1.user_id, match.player2.user_id):
+                    if self._users.get(user_id) == match_id:
+                        del self._users[user_id]
+            return match
+
+    def count(self) -> int:
+        return len(self._matches)
+
+    def list_owned(self, owner: str) -> List[MatchState]:
+        with self._lock:
+            return [self._matches[mid] for mid, o in self._owners.items() if o == owner]
+
+    def pop_expired(self, now: Optional[float] = None, exclude_owner: Optional[str] = None) -> List[MatchState]:
+        now = now if now is not None else time.time()
+        with self._lock:
+            due = [mid for mid, deadline in self._deadlines.items()
+                   if deadline <= now and self._owners.get(mid) != exclude_owner]
+            expired = [self.remove(mid) for mid in due]
+        for match in expired:
+            match.expire()
+        return expired
+
+    @property
+    def matches(self) -> Dict[str, MatchState]:
+        return self._matches
+
+    @property
+    def users(self) -> Dict[str, str]:
+        return self._users
+
+
+class RedisBattleStore(BattleStateStore):
+    """Shared store for multiple bot shards / the TMA API"""
+
+    durable = True
+
+    def __init__(self, connection=None, ttl: int = MATCH_TTL):
+        if connection is None:
+            from rq_queue.redis_connection import get_redis_connection
+            connection = get_redis_connection()
+        self.redis = connection
+        self.ttl = ttl
+        self._create = self.redis.register_script(_CREATE_SCRIPT)
+        self._transition = self.redis.register_script(_TRANSITION_SCRIPT)
+        self._save = self.redis.register_script(_SAVE_SCRIPT)
+        self._remove = self.redis.register_script(_REMOVE_SCRIPT)
+
+    # ------------------------------------------------------------------
+    # Keys and encoding
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _match_key(match_id: str) -> str:
+        return f"{KEY_PREFIX}match:{match_id}"
+
+    @staticmethod
+    def _user_key(user_id: str) -> str:
+        return f"{KEY_PREFIX}user:{user_id}"
+
+    @staticmethod
+    def _owner_key(owner: str) -> str:
+        return f"{KEY_PREFIX}owner:{owner}"
+
+    @staticmethod
+    def _encode_value(value) -> str:
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, dict):
+            return json.dumps(value, default=str)
+        return str(value)
+
+    @staticmethod
+    def _decode_value(name: str, raw: Optional[str]):
+        if raw is None or raw == "":
+            return 0 if name in _INT_FIELDS else (False if name in _BOOL_FIELDS else None)
+        if name in _BOOL_FIELDS:
+            return raw == "1"
+        if name in _INT_FIELDS:
+            return int(raw)
+        if name == "card":
+            return json.loads(raw)
+        return raw
+
+    def _encode(self, match: MatchState) -> Dict[str, str]:
+        data = match.to_dict()
+        fields = {}
+        for slot in ("player1", "player2"):
+            prefix = "p1_" if slot == "player1" else "p2_"
+            for name in _PLAYER_FIELDS:
+                fields[prefix + name] = self._encode_value(data[slot][name])
+        for name, value in data.items():
+            if name not in ("player1", "player2"):
+                fields[name] = self._encode_value(value)
+        return fields
+
+    def _decode(self, fields: Dict[str, str]) -> Optional[MatchState]:
+        if not fields or "match_id" not in fields:
+            return None
+        data = {
+            name: self._decode_value(name, value)
+            for name, value in fields.items() if not name.startswith(("p1_", "p2_"))
+        }
+        for slot, prefix in (("player1", "p1_"), ("player2", "p2_")):
+            data[slot] = {name: self._decode_value(name, fields.get(prefix + name)) for name in _PLAYER_FIELDS}
+        return MatchState.from_dict(data)
+
+    def _keys(self, match_id: str, p1: str, p2: str, owner: str) -> List[str]:
+        return [self._match_key(match_id), self._user_key(p1), self._user_key(p2),
+                DEADLINES_KEY, self._owner_key(owner)]
+
+    # ------------------------------------------------------------------
+    # Store API
+    # ------------------------------------------------------------------
+
+    def create(self, match: MatchState, owner: str) -> bool:
+        fields = self._encode(match)
+        fields["owner"] = owner
+        args = [match.match_id, self.ttl, self.ttl + EXPIRY_GRACE, int(time.time()) + self.ttl]
+        for name, value in fields.items():
+            args.extend((name, value))
+        keys = self._keys(match.match_id, match.player1.user_id, match.player2.user_id, owner)
+        return bool(self._create(keys=keys, args=args))
+
+    def get(self, match_id: str) -> Optional[MatchState]:
+        return self._decode(self.redis.hgetall(self._match_key(match_id)))
+
+    def get_user_match_id(self, user_id: str) -> Optional[str]:
+        return self.redis.get(self._user_key(user_id))
+
+    def save(self, match: MatchState):
+        args = []
+        for name, value in self._encode(match).items():
+            args.extend((name, value))
+        self._save(keys=[self._match_key(match.match_id)], args=args)
+
+    def _run_transition(self, match_id: str, user_id: str, flag: str, field: str, value: str,
+                        status: BattleStatus, stamp_field: str = None) -> Optional[bool]:
+        args = [user_id, flag, field, value, status.value]
+        if stamp_field:
+            args.extend((stamp_field, datetime.now().isoformat()))
+        result = self._transition(keys=[self._match_key(match_id)], args=args)
+        return None if result < 0 else result == 1
+
+    def accept(self, match_id: str, user_id: str, wager: int) -> Optional[bool]:
+        return self._run_transition(match_id, user_id, "has_accepted", "gold_wagered", str(wager),
+                                    BattleStatus.SELECTING)
+
+    def set_card(self, match_id: str, user_id: str, card: BattleCard) -> Optional[bool]:
+        return self._run_transition(match_id, user_id, "is_ready", "card", json.dumps(card.to_dict(), default=str),
+                                    BattleStatus.IN_PROGRESS, stamp_field="started_at")
+
+    def remove(self, match_id: str) -> Optional[MatchState]:
+        key = self._match_key(match_id)
+        fields = self.redis.hgetall(key)
+        match = self._decode(fields)
+        if not match:
+            self.redis.zrem(DEADLINES_KEY, match_id)
+            return None
+        keys = self._keys(match_id, match.player1.user_id, match.player2.user_id, fields.get("owner", ""))
+        return match if self._remove(keys=keys, args=[match_id]) else None
+
+    def count(self) -> int:
+        return self.redis.zcard(DEADLINES_KEY)
+
+    def list_owned(self, owner: str) -> List[MatchState]:
+        match_ids = sorted(self.redis.smembers(self._owner_key(owner)))
+        if not match_ids:
+            return []
+        pipe = self.redis.pipeline()
+        for match_id in match_ids:
+            pipe.hgetall(self._match_key(match_id))
+        matches = [self._decode(fields) for fields in pipe.execute()]
+        return [m for m in matches if m]
+
+    def pop_expired(self, now: Optional[float] = None, exclude_owner: Optional[str] = None) -> List[MatchState]:
+        now = now if now is not None else time.time()
+        expired = []
+        for match_id in self.redis.zrangebyscore(DEADLINES_KEY, 0, now):
+            key = self._match_key(match_id)
+            if exclude_owner and self.redis.hget(key, "owner") == exclude_owner:
+                continue
+            # remove() only returns the match to the one caller whose ZREM succeeded
+            match = self.remove(match_id)
+            if match:
+                match.expire()
+                expired.append(match)
+        return expired
+
+
+def create_battle_store() -> BattleStateStore:
+    """Backend chosen by BATTLE_STORE (memory | redis)"""
+    backend = os.environ.get("BATTLE_STORE", "memory").lower()
+    if backend == "redis":
+        try:
+            return RedisBattleStore()
+        except Exception as e:
+            logger.warning(f"[BATTLE] Redis battle store unavailable, using memory store: {e}")
+    return MemoryBattleStore()
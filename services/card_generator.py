@@ -21,15 +21,34 @@ class CardGenerator:
         self.artist_image_size = (400, 400)
         self.artist_image_position = (100, 130)
         
-        # Font paths (fallback to default if custom not available)
-        try:
-            self.title_font = ImageFont.truetype("arial.ttf", 36)
-            self.stat_font = ImageFont.truetype("arial.ttf", 24)
-            self.stat_value_font = ImageFont.truetype("arialbd.ttf", 28)
-        except:
-            self.title_font = ImageFont.load_default()
-            self.stat_font = ImageFont.load_default()
-            self.stat_value_font = ImageFont.load_default()
+        # Fonts are loaded on first render, not at import
+        self._fonts = None
+
+    def _load_fonts(self):
+        """Load fonts (fallback to default if custom not available)"""
+        if self._fonts is None:
+            try:
+                self._fonts = (
+                    ImageFont.truetype("arial.ttf", 36),
+                    ImageFont.truetype("arial.ttf", 24),
+                    ImageFont.truetype("arialbd.ttf", 28),
+                )
+            except:
+                default = ImageFont.load_default()
+                self._fonts = (default, default, default)
+        return self._fonts
+
+    @property
+    def title_font(self):
+        return self._load_fonts()[0]
+
+    @property
+    def stat_font(self):
+        return self._load_fonts()[1]
+
+    @property
+    def stat_value_font(self):
+        return self._load_fonts()[2]
     
     async def generate_card(self, card_data: Dict) -> Optional[bytes]:
         """
@@ -9,6 +9,7 @@ from typing import List, Tuple, Dict, Optional, Set
 from datetime import datetime
 from models.creator_pack import CreatorPack
 from models.audit_minimal import AuditLog
+from services.pack_cache import pack_cache
 
 # Business rules
 MAX_ARTISTS = 25
@@ -318,6 +319,7 @@ class CreatorModeration:
             
             # Approve the pack
             pack.approve(reviewer_id, notes)
+            pack_cache.invalidate_pack(pack_id)
             
             # Remove from pending reviews
             self.pending_reviews = [
@@ -369,6 +371,7 @@ class CreatorModeration:
             
             # Reject the pack
             pack.reject(reviewer_id, reason, notes)
+            pack_cache.invalidate_pack(pack_id)
             
             # Remove from pending reviews
             self.pending_reviews = [
@@ -414,6 +417,7 @@ class CreatorModeration:
             
             # Disable the pack
             pack.disable(reviewer_id, reason)
+            pack_cache.invalidate_pack(pack_id)
             
             # Log disabling
             AuditLog.record(
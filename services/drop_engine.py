@@ -0,0 +1,572 @@
+# services/drop_engine.py
+"""
+Drop Engine
+Channel drops: the per-server cooldown, the drop records users race to claim,
+expiry and throughput metrics.
+
+MemoryDropStore keeps everything in this process (one bot process).
+RedisDropStore (DROP_STORE=redis) shares it between shards:
+  drop:cooldown:{server_id}    set while the server is cooling down (PX)
+  drop:record:{drop_id}        hash of the drop; slot:{n} holds slot n's winner
+  drop:channel:{channel_id}    drop_id of the channel's open drop
+  drop:deadlines:{owner}       zset drop_id -> expiry time, per spawning process
+
+Cooldowns are checked and started in one step (SET NX PX), so the database is
+not read on every drop attempt and two messages racing in the same server
+can't both spawn. A claim is a compare-and-set on the drop record: the first
+claim of an open slot wins, every later one sees it taken, and a drop that has
+passed its deadline can't be claimed at all. A winner whose grant fails can
+release() the slot again.
+
+There are no per-drop timers. expire_due() pops the drops past their deadline
+(each exactly once) and runs their on_expire handlers; start_expiry() runs it
+every DROP_SWEEP_INTERVAL seconds as a job on the cron scheduler. Drops are
+swept by the process that spawned them, which is the one running the guild's
+shard and holding its views.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from services.sharding import process_name
+
+logger = logging.getLogger(__name__)
+
+# Engine settings
+DROP_STORE = os.environ.get("DROP_STORE", "memory").lower()  # memory | redis
+DROP_COOLDOWN = int(os.environ.get("DROP_COOLDOWN", "120"))
+DROP_TTL = int(os.environ.get("DROP_TTL", "300"))
+DROP_SWEEP_INTERVAL = int(os.environ.get("DROP_SWEEP_INTERVAL", "5"))
+CLAIMED_RETENTION = 600  # keep claimed drops long enough to answer late clicks
+KEY_PREFIX = "drop:"
+
+# Claim outcomes
+WON = "won"
+TAKEN = "taken"
+EXPIRED = "expired"
+MISSING = "missing"
+INVALID = "invalid"
+
+CLAIM_ERRORS = {
+    TAKEN: "That drop has already been claimed.",
+    EXPIRED: "This drop has expired.",
+    MISSING: "No active drop here.",
+    INVALID: "Invalid card number.",
+}
+
+# ARGV: slot, user_id, now, claimed retention (s). KEYS: record, deadlines, channel
+_CLAIM_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 'missing'
+end
+local slots = tonumber(redis.call('hget', KEYS[1], 'slots'))
+local slot = tonumber(ARGV[1])
+if slot < 0 or slot >= slots then
+    return 'invalid'
+end
+if redis.call('hexists', KEYS[1], 'slot:' .. ARGV[1]) == 1 then
+    return 'taken'
+end
+if tonumber(redis.call('hget', KEYS[1], 'expires_at')) <= tonumber(ARGV[3]) then
+    return 'expired'
+end
+redis.call('hset', KEYS[1], 'slot:' .. ARGV[1], ARGV[2])
+if redis.call('hincrby', KEYS[1], 'claimed', 1) >= slots then
+    local drop_id = redis.call('hget', KEYS[1], 'drop_id')
+    redis.call('zrem', KEYS[2], drop_id)
+    if redis.call('get', KEYS[3]) == drop_id then
+        redis.call('del', KEYS[3])
+    end
+    redis.call('expire', KEYS[1], ARGV[4])
+end
+return 'won'
+"""
+
+# ARGV: slot, user_id, claimed retention (s). KEYS: record, deadlines, channel
+_RELEASE_SCRIPT = """
+if redis.call('hget', KEYS[1], 'slot:' .. ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('hdel', KEYS[1], 'slot:' .. ARGV[1])
+redis.call('hincrby', KEYS[1], 'claimed', -1)
+local expires_at = redis.call('hget', KEYS[1], 'expires_at')
+local drop_id = redis.call('hget', KEYS[1], 'drop_id')
+redis.call('zadd', KEYS[2], expires_at, drop_id)
+redis.call('set', KEYS[3], drop_id, 'NX', 'EX', ARGV[3])
+redis.call('expireat', KEYS[1], math.ceil(tonumber(expires_at)) + tonumber(ARGV[3]))
+return 1
+"""
+
+# Whoever removes the deadline owns the expiry. KEYS: deadlines, record, channel
+_POP_SCRIPT = """
+if redis.call('zrem', KEYS[1], ARGV[1]) == 0 then
+    return false
+end
+local fields = redis.call('hgetall', KEYS[2])
+redis.call('del', KEYS[2])
+if redis.call('get', KEYS[3]) == ARGV[1] then
+    redis.call('del', KEYS[3])
+end
+return fields
+"""
+
+
+def _new_drop(server_id, channel_id, payload: Dict[str, Any], slots: int, ttl: float, owner: str) -> Dict[str, Any]:
+    now = time.time()
+    return {
+        "drop_id": f"drop_{uuid.uuid4().hex[:12]}",
+        "server_id": str(server_id),
+        "channel_id": str(channel_id),
+        "owner": owner,
+        "payload": payload,
+        "slots": slots,
+        "created_at": now,
+        "expires_at": now + ttl,
+        "claims": {},
+    }
+
+
+class DropStore:
+    """Interface shared by the memory and Redis backends"""
+
+    durable = False
+
+    def start_cooldown(self, server_id, seconds: float) -> bool:
+        """Start the server's cooldown; False if it is already cooling down"""
+        raise NotImplementedError
+
+    def cooldown_remaining(self, server_id) -> float:
+        raise NotImplementedError
+
+    def clear_cooldown(self, server_id):
+        raise NotImplementedError
+
+    def create(self, drop: Dict[str, Any]):
+        raise NotImplementedError
+
+    def get(self, drop_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def channel_drop_id(self, channel_id) -> Optional[str]:
+        """The channel's open drop, if any"""
+        raise NotImplementedError
+
+    def claim(self, drop_id: str, user_id, slot: int = 0, now: Optional[float] = None) -> str:
+        """Compare-and-set slot -> user_id. Returns WON / TAKEN / EXPIRED / MISSING / INVALID."""
+        raise NotImplementedError
+
+    def release(self, drop_id: str, user_id, slot: int = 0) -> bool:
+        """Undo user_id's claim of slot (e.g. the grant failed)"""
+        raise NotImplementedError
+
+    def pop_expired(self, owner: str, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Remove and return owner's drops past their deadline with slots left unclaimed"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryDropStore(DropStore):
+    """Per-process store (single bot process)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cooldowns: Dict[str, float] = {}
+        self._drops: Dict[str, Dict[str, Any]] = {}
+        self._channels: Dict[str, str] = {}
+
+    def start_cooldown(self, server_id, seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._cooldowns.get(str(server_id), 0) > now:
+                return False
+            self._cooldowns[str(server_id)] = now + seconds
+            return True
+
+    def cooldown_remaining(self, server_id) -> float:
+        return max(0.0, self._cooldowns.get(str(server_id), 0) - time.time())
+
+    def clear_cooldown(self, server_id):
+        with self._lock:
+            self._cooldowns.pop(str(server_id), None)
+
+    def create(self, drop: Dict[str, Any]):
+        with self._lock:
+            self._drops[drop["drop_id"]] = drop
+            self._channels[drop["channel_id"]] = drop["drop_id"]
+
+    def get(self, drop_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            drop = self._drops.get(drop_id)
+            return dict(drop, claims=dict(drop["claims"])) if drop else None
+
+    def channel_drop_id(self, channel_id) -> Optional[str]:
+        return self._channels.get(str(channel_id))
+
+    def _close(self, drop: Dict[str, Any]):
+        if self._channels.get(drop["channel_id"]) == drop["drop_id"]:
+            del self._channels[drop["channel_id"]]
+
+    def claim(self, drop_id: str, user_id, slot: int = 0, now: Optional[float] = None) -> str:
+        now = now if now is not None else time.time()
+        with self._lock:
+            drop = self._drops.get(drop_id)
+            if drop is None:
+                return MISSING
+            if not 0 <= slot < drop["slots"]:
+                return INVALID
+            if slot in drop["claims"]:
+                return TAKEN
+            if drop["expires_at"] <= now:
+                return EXPIRED
+            drop["claims"][slot] = str(user_id)
+            if len(drop["claims"]) >= drop["slots"]:
+                self._close(drop)
+            return WON
+
+    def release(self, drop_id: str, user_id, slot: int = 0) -> bool:
+        with self._lock:
+            drop = self._drops.get(drop_id)
+            if not drop or drop["claims"].get(slot) != str(user_id):
+                return False
+            del drop["claims"][slot]
+            self._channels.setdefault(drop["channel_id"], drop_id)
+            return True
+
+    def pop_expired(self, owner: str, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = now if now is not None else time.time()
+        expired = []
+        with self._lock:
+            for drop_id, drop in list(self._drops.items()):
+                if drop["owner"] != owner:
+                    continue
+                done = len(drop["claims"]) >= drop["slots"]
+                if done and drop["expires_at"] + CLAIMED_RETENTION <= now:
+                    del self._drops[drop_id]
+                elif not done and drop["expires_at"] <= now:
+                    del self._drops[drop_id]
+                    self._close(drop)
+                    expired.append(drop)
+            # Cooldowns are only read back while running, so forget the finished ones
+            for server_id in [s for s, until in self._cooldowns.items() if until <= now]:
+                del self._cooldowns[server_id]
+        return expired
+
+    def count(self) -> int:
+        with self._lock:
+            return sum(1 for d in self._drops.values() if len(d["claims"]) < d["slots"])
+
+
+class RedisDropStore(DropStore):
+    """Shared store for multiple bot shards"""
+
+    durable = True
+
+    def __init__(self, connection=None):
+        if connection is None:
+            from rq_queue.redis_connection import get_redis_connection
+            connection = get_redis_connection()
+        self.redis = connection
+        self._claim = self.redis.register_script(_CLAIM_SCRIPT)
+        self._release = self.redis.register_script(_RELEASE_SCRIPT)
+        self._pop = self.redis.register_script(_POP_SCRIPT)
+
+    @staticmethod
+    def _cooldown_key(server_id) -> str:
+        return f"{KEY_PREFIX}cooldown:{server_id}"
+
+    @staticmethod
+    def _record_key(drop_id: str) -> str:
+        return f"{KEY_PREFIX}record:{drop_id}"
+
+    @staticmethod
+    def _channel_key(channel_id) -> str:
+        return f"{KEY_PREFIX}channel:{channel_id}"
+
+    @staticmethod
+    def _deadlines_key(owner: str) -> str:
+        return f"{KEY_PREFIX}deadlines:{owner}"
+
+    def _keys(self, drop_id: str, owner: str, channel_id) -> List[str]:
+        return [self._record_key(drop_id), self._deadlines_key(owner), self._channel_key(channel_id)]
+
+    @staticmethod
+    def _decode(fields) -> Optional[Dict[str, Any]]:
+        if isinstance(fields, list):  # HGETALL reply from a script is a flat list
+            fields = dict(zip(fields[::2], fields[1::2]))
+        if not fields:
+            return None
+        return {
+            "drop_id": fields["drop_id"],
+            "server_id": fields["server_id"],
+            "channel_id": fields["channel_id"],
+            "owner": fields["owner"],
+            "payload": json.loads(fields.get("payload") or "{}"),
+            "slots": int(fields["slots"]),
+            "created_at": float(fields["created_at"]),
+            "expires_at": float(fields["expires_at"]),
+            "claims": {int(k[len("slot:"):]): v for k, v in fields.items() if k.startswith("slot:")},
+        }
+
+    def start_cooldown(self, server_id, seconds: float) -> bool:
+        return bool(self.redis.set(self._cooldown_key(server_id), "1", nx=True, px=max(1, int(seconds * 1000))))
+
+    def cooldown_remaining(self, server_id) -> float:
+        ttl_ms = self.redis.pttl(self._cooldown_key(server_id))
+        return ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else 0.0
+
+    def clear_cooldown(self, server_id):
+        self.redis.delete(self._cooldown_key(server_id))
+
+    def create(self, drop: Dict[str, Any]):
+        record, deadlines, channel = self._keys(drop["drop_id"], drop["owner"], drop["channel_id"])
+        ttl = max(1, int(drop["expires_at"] - time.time())) + CLAIMED_RETENTION
+        pipe = self.redis.pipeline()
+        pipe.hset(record, mapping={
+            "drop_id": drop["drop_id"],
+            "server_id": drop["server_id"],
+            "channel_id": drop["channel_id"],
+            "owner": drop["owner"],
+            "payload": json.dumps(drop["payload"]),
+            "slots": drop["slots"],
+            "created_at": drop["created_at"],
+            "expires_at": drop["expires_at"],
+            "claimed": 0,
+        })
+        pipe.expire(record, ttl)
+        pipe.zadd(deadlines, {drop["drop_id"]: drop["expires_at"]})
+        pipe.set(channel, drop["drop_id"], ex=ttl)
+        pipe.execute()
+
+    def get(self, drop_id: str) -> Optional[Dict[str, Any]]:
+        return self._decode(self.redis.hgetall(self._record_key(drop_id)))
+
+    def channel_drop_id(self, channel_id) -> Optional[str]:
+        return self.redis.get(self._channel_key(channel_id))
+
+    def _keys_for(self, drop_id: str) -> Optional[List[str]]:
+        owner, channel_id = self.redis.hmget(self._record_key(drop_id), "owner", "channel_id")
+        return self._keys(drop_id, owner, channel_id) if owner is not None else None
+
+    def claim(self, drop_id: str, user_id, slot: int = 0, now: Optional[float] = None) -> str:
+        keys = self._keys_for(drop_id)
+        if keys is None:
+            return MISSING
+        now = now if now is not None else time.time()
+        result = self._claim(keys=keys, args=[slot, str(user_id), repr(now), CLAIMED_RETENTION])
+        return result.decode() if isinstance(result, bytes) else result
+
+    def release(self, drop_id: str, user_id, slot: int = 0) -> bool:
+        keys = self._keys_for(drop_id)
+        if keys is None:
+            return False
+        return bool(self._release(keys=keys, args=[slot, str(user_id), CLAIMED_RETENTION]))
+
+    def pop_expired(self, owner: str, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = now if now is not None else time.time()
+        deadlines = self._deadlines_key(owner)
+        expired = []
+        for drop_id in self.redis.zrangebyscore(deadlines, 0, now):
+            channel_id = self.redis.hget(self._record_key(drop_id), "channel_id") or ""
+            fields = self._pop(keys=[deadlines, self._record_key(drop_id), self._channel_key(channel_id)],
+                               args=[drop_id])
+            drop = self._decode(fields) if fields else None
+            if drop:
+                expired.append(drop)
+        return expired
+
+    def count(self) -> int:
+        return self.redis.zcard(self._deadlines_key(process_name()))
+
+
+class DropMetrics:
+    """Drops spawned / claimed / expired, in total and over the last minute"""
+
+    EVENTS = ("spawned", "claimed", "expired", "contended", "cooldown_blocked")
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._since = time.monotonic()
+        self._totals = {event: 0 for event in self.EVENTS}
+        self._recent = {event: deque() for event in self.EVENTS}
+        self._claim_latency = 0.0
+
+    def _trim(self, events: deque, now: float):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def record(self, event: str, claim_latency: Optional[float] = None):
+        now = time.monotonic()
+        with self._lock:
+            self._totals[event] += 1
+            recent = self._recent[event]
+            recent.append(now)
+            self._trim(recent, now)
+            if claim_latency is not None:
+                self._claim_latency += claim_latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        minutes = max((now - self._since) / 60, 1e-9)
+        with self._lock:
+            stats: Dict[str, Any] = {"uptime_s": round(now - self._since, 1)}
+            for event in self.EVENTS:
+                self._trim(self._recent[event], now)
+                stats[event] = self._totals[event]
+                stats[f"{event}_last_min"] = len(self._recent[event])
+            stats["spawned_per_min"] = round(self._totals["spawned"] / minutes, 2)
+            stats["claimed_per_min"] = round(self._totals["claimed"] / minutes, 2)
+            claimed = self._totals["claimed"]
+            stats["avg_claim_s"] = round(self._claim_latency / claimed, 2) if claimed else None
+            return stats
+
+    def reset(self):
+        with self._lock:
+            self._since = time.monotonic()
+            self._totals = {event: 0 for event in self.EVENTS}
+            self._recent = {event: deque() for event in self.EVENTS}
+            self._claim_latency = 0.0
+
+
+class DropEngine:
+    """Spawning, claiming and expiring drops on top of a DropStore"""
+
+    def __init__(self, store: Optional[DropStore] = None, metrics: Optional[DropMetrics] = None,
+                 cooldown: float = DROP_COOLDOWN, ttl: float = DROP_TTL, owner: Optional[str] = None):
+        self.store = store or MemoryDropStore()
+        self.metrics = metrics or DropMetrics()
+        self.cooldown = cooldown
+        self.ttl = ttl
+        self.owner = owner or process_name()
+        self._handlers: Dict[str, Callable] = {}
+
+    # ------------------------------------------------------------------
+    # Cooldown
+    # ------------------------------------------------------------------
+
+    def cooldown_remaining(self, server_id) -> float:
+        return self.store.cooldown_remaining(server_id)
+
+    def on_cooldown(self, server_id) -> bool:
+        return self.cooldown_remaining(server_id) > 0
+
+    def start_cooldown(self, server_id, cooldown: Optional[float] = None) -> bool:
+        """Claim the server's next drop: False if it is already cooling down"""
+        if self.store.start_cooldown(server_id, self.cooldown if cooldown is None else cooldown):
+            return True
+        self.metrics.record("cooldown_blocked")
+        return False
+
+    # ------------------------------------------------------------------
+    # Drops
+    # ------------------------------------------------------------------
+
+    def spawn(self, server_id, channel_id, payload: Optional[Dict[str, Any]] = None, slots: int = 1,
+              ttl: Optional[float] = None, cooldown: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Open a drop with `slots` claimable slots; None while the server is cooling down.
+
+        cooldown=0 spawns without touching the server's cooldown (dev / welcome drops)."""
+        cooldown = self.cooldown if cooldown is None else cooldown
+        if cooldown > 0 and not self.start_cooldown(server_id, cooldown):
+            return None
+        drop = _new_drop(server_id, channel_id, payload or {}, slots,
+                         self.ttl if ttl is None else ttl, self.owner)
+        self.store.create(drop)
+        self.metrics.record("spawned")
+        return drop
+
+    def get(self, drop_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(drop_id)
+
+    def channel_drop(self, channel_id) -> Optional[Dict[str, Any]]:
+        """The channel's open drop"""
+        drop_id = self.store.channel_drop_id(channel_id)
+        return self.store.get(drop_id) if drop_id else None
+
+    def claim(self, drop_id: str, user_id, slot: int = 0) -> Dict[str, Any]:
+        """Single-winner claim of one slot"""
+        outcome = self.store.claim(drop_id, user_id, slot)
+        if outcome != WON:
+            if outcome == TAKEN:
+                self.metrics.record("contended")
+            return {"success": False, "reason": outcome, "error": CLAIM_ERRORS.get(outcome, outcome)}
+        drop = self.store.get(drop_id)
+        latency = time.time() - drop["created_at"] if drop else None
+        self.metrics.record("claimed", claim_latency=latency)
+        return {"success": True, "reason": WON, "drop": drop}
+
+    def release(self, drop_id: str, user_id, slot: int = 0) -> bool:
+        return self.store.release(drop_id, user_id, slot)
+
+    # ------------------------------------------------------------------
+    # Expiry
+    # ------------------------------------------------------------------
+
+    def on_expire(self, drop_id: str, handler: Callable):
+        """Call handler(drop) (sync or async) when the drop expires unclaimed"""
+        self._handlers[drop_id] = handler
+
+    async def expire_due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Pop this process's expired drops and run their handlers"""
+        expired = await asyncio.to_thread(self.store.pop_expired, self.owner, now)
+        for drop in expired:
+            self.metrics.record("expired")
+            handler = self._handlers.pop(drop["drop_id"], None)
+            if handler is None:
+                continue
+            try:
+                result = handler(drop)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"[DROP] expiry handler for {drop['drop_id']} failed: {e}")
+        # Handlers of drops that were claimed out are no longer needed
+        for drop_id in list(self._handlers):
+            drop = self.store.get(drop_id)
+            if drop is None or len(drop["claims"]) >= drop["slots"]:
+                self._handlers.pop(drop_id, None)
+        return expired
+
+    async def start_expiry(self, cron=None, interval: int = DROP_SWEEP_INTERVAL):
+        """Run expire_due every `interval` seconds on the cron scheduler"""
+        if cron is None:
+            from scheduler.cron import cron_service as cron
+        if "drop_expiry" not in cron.jobs:
+            cron.add_interval_job(self.expire_due, seconds=interval, job_id="drop_expiry")
+        if not cron.running:
+            await cron.start()
+
+    def status(self) -> Dict[str, Any]:
+        return dict(self.metrics.snapshot(), backend="redis" if self.store.durable else "memory",
+                    active=self.store.count(), owner=self.owner)
+
+
+def create_drop_store() -> DropStore:
+    """Backend chosen by DROP_STORE (memory | redis)"""
+    if DROP_STORE == "redis":
+        try:
+            return RedisDropStore()
+        except Exception as e:
+            logger.warning(f"[DROP] Redis drop store unavailable, using memory store: {e}")
+    return MemoryDropStore()
+
+
+_engine: Optional[DropEngine] = None
+
+
+def get_drop_engine() -> DropEngine:
+    """Process-wide drop engine"""
+    global _engine
+    if _engine is None:
+        _engine = DropEngine(create_drop_store())
+    return _engine
@@ -0,0 +1,334 @@
+# services/drop_spawner.py
+"""
+Activity Drop Spawner
+Spawns drops in the guilds that are chatting the most.
+
+Activity is a rolling score per guild: its message count with exponential
+decay (half-life ACTIVITY_HALF_LIFE). Messages only touch counters in memory;
+every ACTIVITY_FLUSH_INTERVAL the changed guilds are upserted into
+guild_activity (one row per guild) and a restarted process loads them back.
+Scores are stored forward-decayed — relative to a fixed epoch, scaled up by
+2 ** (age / half_life) — so decay never changes their order and the guilds
+sit in a max-heap that is only touched when a guild's score changes.
+
+Each tick pops guilds in score order: a guild below ACTIVITY_MIN_SCORE ends
+the scan; one that is cooling down, or belongs to another process's shard, is
+skipped; the rest get a drop with probability min(SPAWN_MAX_CHANCE, score /
+100), at most DROP_SPAWN_BUDGET per tick. Starting the drop cooldown is the
+claim on a guild, and a guild that got a drop starts over from zero so quieter
+guilds get their turn. Drops are sent through the shared send queue with at
+most DROP_SPAWN_CONCURRENCY of them in flight.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.drop_engine import DropEngine, get_drop_engine
+from services.send_queue import GAMEPLAY, SendQueue, send_queue
+from services.sharding import owns_guild
+
+logger = logging.getLogger(__name__)
+
+# Spawner settings
+ACTIVITY_HALF_LIFE = float(os.environ.get("ACTIVITY_HALF_LIFE", "1800"))
+ACTIVITY_MIN_SCORE = float(os.environ.get("ACTIVITY_MIN_SCORE", "10"))
+ACTIVITY_FLUSH_INTERVAL = int(os.environ.get("ACTIVITY_FLUSH_INTERVAL", "60"))
+DROP_SPAWN_INTERVAL = int(os.environ.get("DROP_SPAWN_INTERVAL", "60"))
+DROP_SPAWN_BUDGET = int(os.environ.get("DROP_SPAWN_BUDGET", "10"))
+DROP_SPAWN_CONCURRENCY = int(os.environ.get("DROP_SPAWN_CONCURRENCY", "3"))
+SPAWN_MAX_CHANCE = 0.8
+MAX_CHANNELS = 8         # channels remembered per guild
+REBASE_FACTOR = 2 ** 64  # renormalise forward-decayed scores past this growth
+
+
+class ActivityTracker:
+    """Decayed message counts per guild, kept in a lazily updated max-heap"""
+
+    def __init__(self, half_life: float = ACTIVITY_HALF_LIFE):
+        self.half_life = half_life
+        self._lock = threading.Lock()
+        self._epoch = time.time()
+        self._scores: Dict[str, float] = {}                 # forward-decayed
+        self._channels: Dict[str, Dict[str, float]] = {}    # forward-decayed per channel
+        self._messages: Dict[str, int] = {}
+        self._heap: List[Tuple[float, str]] = []            # (-score, guild_id); stale entries skipped
+        self._dirty = set()                                 # changed since the last flush
+
+    def _weight(self, now: float) -> float:
+        return 2 ** ((now - self._epoch) / self.half_life)
+
+    def _rebase(self, now: float):
+        factor = self._weight(now)
+        self._epoch = now
+        self._scores = {g: s / factor for g, s in self._scores.items()}
+        self._channels = {g: {c: s / factor for c, s in ch.items()} for g, ch in self._channels.items()}
+        self._heap = [(-s, g) for g, s in self._scores.items()]
+        heapq.heapify(self._heap)
+
+    def _add(self, guild_id: str, channel_id: Optional[str], amount: float, now: float):
+        weight = self._weight(now)
+        if weight > REBASE_FACTOR:
+            self._rebase(now)
+            weight = 1.0
+        score = self._scores.get(guild_id, 0.0) + amount * weight
+        self._scores[guild_id] = score
+        heapq.heappush(self._heap, (-score, guild_id))
+        if channel_id:
+            channels = self._channels.setdefault(guild_id, {})
+            channels[channel_id] = channels.get(channel_id, 0.0) + amount * weight
+            if len(channels) > MAX_CHANNELS:
+                del channels[min(channels, key=channels.get)]
+        self._dirty.add(guild_id)
+        # Every record pushes; drop the stale entries once they dominate
+        if len(self._heap) > 4 * len(self._scores) + 64:
+            self._heap = [(-s, g) for g, s in self._scores.items()]
+            heapq.heapify(self._heap)
+
+    def record(self, guild_id, channel_id=None, count: int = 1, now: Optional[float] = None):
+        """Count `count` messages in a guild (and channel)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            guild_id = str(guild_id)
+            self._messages[guild_id] = self._messages.get(guild_id, 0) + count
+            self._add(guild_id, str(channel_id) if channel_id else None, count, now)
+
+    def score(self, guild_id, now: Optional[float] = None) -> float:
+        now = now if now is not None else time.time()
+        with self._lock:
+            return self._scores.get(str(guild_id), 0.0) / self._weight(now)
+
+    def channel(self, guild_id) -> Optional[str]:
+        """The guild's most active channel"""
+        channels = self._channels.get(str(guild_id))
+        return max(channels, key=channels.get) if channels else None
+
+    def reset(self, guild_id):
+        """Start a guild over from zero (it just got a drop)"""
+        with self._lock:
+            guild_id = str(guild_id)
+            if guild_id in self._scores:
+                self._scores[guild_id] = 0.0
+                self._dirty.add(guild_id)
+
+    def top(self, now: Optional[float] = None):
+        """Yield (guild_id, score) in descending score order.
+
+        Entries popped while iterating are pushed back when the iteration
+        ends, so the heap survives a scan that stops early."""
+        now = now if now is not None else time.time()
+        popped = []
+        try:
+            while True:
+                with self._lock:
+                    if not self._heap:
+                        return
+                    entry = heapq.heappop(self._heap)
+                    neg, guild_id = entry
+                    if self._scores.get(guild_id) != -neg:
+                        continue  # superseded by a newer entry
+                    popped.append(entry)
+                    score = -neg / self._weight(now)
+                yield guild_id, score
+        finally:
+            with self._lock:
+                for neg, guild_id in popped:
+                    if self._scores.get(guild_id) == -neg:
+                        heapq.heappush(self._heap, (neg, guild_id))
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def dirty_rows(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """guild_activity rows for guilds changed since the last flush (clears the set)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            weight = self._weight(now)
+            dirty, self._dirty = self._dirty, set()
+            updated_at = datetime.utcfromtimestamp(now)
+            return [
+                {"server_id": g, "score": self._scores.get(g, 0.0) / weight,
+                 "channel_id": self.channel(g), "messages": self._messages.get(g, 0),
+                 "updated_at": updated_at}
+                for g in dirty
+            ]
+
+    def prune(self, min_score: float = 0.01, now: Optional[float] = None) -> int:
+        """Forget guilds that have gone quiet (after their last flush)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            floor = min_score * self._weight(now)
+            quiet = [g for g, s in self._scores.items() if s < floor and g not in self._dirty]
+            for guild_id in quiet:
+                del self._scores[guild_id]
+                self._channels.pop(guild_id, None)
+                self._messages.pop(guild_id, None)
+            return len(quiet)
+
+    def mark_dirty(self, guild_ids):
+        with self._lock:
+            self._dirty.update(guild_ids)
+
+    def load(self, rows: List[Dict[str, Any]], now: Optional[float] = None):
+        """Restore flushed scores, decayed for the time since they were written"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            for row in rows:
+                updated = row.get("updated_at")  # naive UTC
+                age = max(0.0, now - updated.replace(tzinfo=timezone.utc).timestamp()) if updated else 0.0
+                score = (row.get("score") or 0.0) * 2 ** (-age / self.half_life)
+                guild_id = str(row["server_id"])
+                self._messages[guild_id] = row.get("messages") or 0
+                if score > 0:
+                    self._add(guild_id, row.get("channel_id"), score, now)
+            self._dirty.clear()
+
+
+class DropSpawner:
+    """Turns activity into drops: pick guilds by score, spawn within a budget"""
+
+    def __init__(self, tracker: Optional[ActivityTracker] = None, engine: Optional[DropEngine] = None,
+                 queue: Optional[SendQueue] = None, budget: int = DROP_SPAWN_BUDGET,
+                 concurrency: int = DROP_SPAWN_CONCURRENCY, min_score: float = ACTIVITY_MIN_SCORE,
+                 rng: Optional[random.Random] = None):
+        self.tracker = tracker or ActivityTracker()
+        self.engine = engine or get_drop_engine()
+        self.queue = queue or send_queue
+        self.budget = budget
+        self.concurrency = max(1, concurrency)
+        self.min_score = min_score
+        self.rng = rng or random.Random()
+        self.spawn: Optional[Callable[[str, str], Awaitable[bool]]] = None
+        self.ticks = 0
+        self.spawned = 0
+        self.failed = 0
+
+    def attach(self, bot, spawn: Callable[[str, str], Awaitable[bool]]):
+        """Count the bot's guild messages; spawn(guild_id, channel_id) sends a drop"""
+        self.spawn = spawn
+
+        async def on_message(message):
+            if message.guild is not None and not message.author.bot:
+                self.tracker.record(message.guild.id, message.channel.id)
+
+        bot.add_listener(on_message)
+
+    def select(self, budget: Optional[int] = None, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Guilds to drop in this tick; starts each one's drop cooldown"""
+        budget = self.budget if budget is None else budget
+        chosen = []
+        if budget <= 0:
+            return chosen
+        scan = self.tracker.top(now)
+        try:
+            for guild_id, score in scan:
+                if score < self.min_score:
+                    break  # everything after is quieter still
+                if not owns_guild(guild_id) or self.engine.on_cooldown(guild_id):
+                    continue
+                if self.rng.random() >= min(SPAWN_MAX_CHANCE, score / 100):
+                    continue
+                channel_id = self.tracker.channel(guild_id)
+                if not channel_id or not self.engine.start_cooldown(guild_id):
+                    continue
+                chosen.append({"guild_id": guild_id, "channel_id": channel_id, "score": round(score, 2)})
+                if len(chosen) >= budget:
+                    break
+        finally:
+            scan.close()  # puts the scanned guilds back in the heap
+        for entry in chosen:
+            self.tracker.reset(entry["guild_id"])
+        return chosen
+
+    async def _spawn_one(self, entry: Dict[str, Any], limit: asyncio.Semaphore) -> bool:
+        async with limit:
+            try:
+                return bool(await self.queue.submit(
+                    lambda: self.spawn(entry["guild_id"], entry["channel_id"]),
+                    priority=GAMEPLAY, route=f"channel:{entry['channel_id']}",
+                ))
+            except Exception as e:
+                logger.warning(f"[DROP] activity drop in {entry['guild_id']} failed: {e}")
+                return False
+
+    async def tick(self) -> Dict[str, Any]:
+        """One spawning round"""
+        self.ticks += 1
+        chosen = self.select()
+        if not chosen or self.spawn is None:
+            return {"success": True, "drops_spawned": 0, "selected": len(chosen)}
+        limit = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._spawn_one(entry, limit) for entry in chosen))
+        spawned = sum(results)
+        self.spawned += spawned
+        self.failed += len(results) - spawned
+        logger.info(f"[DROP] activity tick: {spawned}/{len(chosen)} drops spawned "
+                    f"({len(self.tracker)} guilds tracked)")
+        return {"success": True, "drops_spawned": spawned, "selected": len(chosen)}
+
+    async def flush(self, db=None) -> int:
+        """Write changed guild scores to guild_activity"""
+        rows = self.tracker.dirty_rows()
+        self.tracker.prune()
+        if not rows:
+            return 0
+        if db is None:
+            from database import get_db
+            db = get_db()
+        try:
+            return await asyncio.to_thread(db.save_guild_activity, rows)
+        except Exception as e:
+            self.tracker.mark_dirty(row["server_id"] for row in rows)
+            logger.warning(f"[DROP] guild activity flush failed ({len(rows)} guilds): {e}")
+            return 0
+
+    async def load(self, db=None) -> int:
+        """Restore scores written by an earlier process"""
+        if db is None:
+            from database import get_db
+            db = get_db()
+        try:
+            rows = await asyncio.to_thread(db.load_guild_activity)
+        except Exception as e:
+            logger.warning(f"[DROP] could not load guild activity: {e}")
+            return 0
+        self.tracker.load([row for row in rows if owns_guild(row["server_id"])])
+        return len(rows)
+
+    async def start(self, cron=None):
+        """Load scores, then tick and flush on the cron scheduler"""
+        if cron is None:
+            from scheduler.cron import cron_service as cron
+        await self.load()
+        # scheduler.jobs registers "auto_drops" (same tick) when it runs the full job set
+        if "drop_spawn" not in cron.jobs and "auto_drops" not in cron.jobs:
+            cron.add_interval_job(self.tick, seconds=DROP_SPAWN_INTERVAL, job_id="drop_spawn")
+        if "activity_flush" not in cron.jobs:
+            cron.add_interval_job(self.flush, seconds=ACTIVITY_FLUSH_INTERVAL, job_id="activity_flush")
+        if not cron.running:
+            await cron.start()
+
+    def status(self) -> Dict[str, Any]:
+        return {"guilds": len(self.tracker), "ticks": self.ticks, "spawned": self.spawned,
+                "failed": self.failed, "budget": self.budget, "queue": self.queue.status()}
+
+
+_spawner: Optional[DropSpawner] = None
+
+
+def get_drop_spawner() -> DropSpawner:
+    """Process-wide drop spawner"""
+    global _spawner
+    if _spawner is None:
+        _spawner = DropSpawner()
+    return _spawner
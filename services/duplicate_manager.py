@@ -25,7 +25,6 @@ class DuplicateManager:
     def __init__(self, db_path: str = "music_legends.db"):
         self.db_path = db_path
         self._database_url = os.getenv("DATABASE_URL")
-        self._ensure_schema()
 
     def _get_connection(self):
         """Get database connection — uses shared pool via get_db() for PostgreSQL."""
@@ -35,81 +34,6 @@ class DuplicateManager:
         else:
             return sqlite3.connect(self.db_path)
     
-    def _ensure_schema(self):
-        """Ensure duplicate protection schema exists"""
-        try:
-            with self._get_connection() as conn:
-                cursor = conn.cursor()
-
-                # Check if quantity column exists
-                if self._database_url:
-                    # PostgreSQL: query information_schema
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'user_cards'
-                    """)
-                    columns = [col[0] for col in cursor.fetchall()]
-                else:
-                    cursor.execute("PRAGMA table_info(user_cards)")
-                    columns = [col[1] for col in cursor.fetchall()]
-
-                if 'quantity' not in columns:
-                    try:
-                        cursor.execute("ALTER TABLE user_cards ADD COLUMN quantity INTEGER DEFAULT 1")
-                    except Exception as e:
-                        print(f"Warning: Could not add quantity column: {e}")
-
-                if 'first_acquired_at' not in columns:
-                    try:
-                        cursor.execute("ALTER TABLE user_cards ADD COLUMN first_acquired_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-                    except Exception as e:
-                        print(f"Warning: Could not add first_acquired_at column: {e}")
-
-                # Update existing records
-                try:
-                    cursor.execute("UPDATE user_cards SET quantity = 1 WHERE quantity IS NULL")
-                except Exception:
-                    pass
-                
-                # Create dust table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS user_dust (
-                        user_id INTEGER PRIMARY KEY,
-                        dust_amount INTEGER DEFAULT 0,
-                        total_dust_earned INTEGER DEFAULT 0,
-                        total_dust_spent INTEGER DEFAULT 0,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (user_id) REFERENCES users(user_id)
-                    )
-                """)
-                
-                # Create dust transactions table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS dust_transactions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        amount INTEGER,
-                        transaction_type TEXT,
-                        card_id TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (user_id) REFERENCES users(user_id)
-                    )
-                """)
-                
-                # Create index (skip if already exists)
-                try:
-                    cursor.execute("""
-                        CREATE INDEX IF NOT EXISTS idx_user_cards_lookup
-                        ON user_cards(user_id, card_id)
-                    """)
-                except Exception:
-                    # Index or constraint already exists, skip
-                    pass
-                
-                conn.commit()
-        except Exception as e:
-            print(f"⚠️ Error ensuring duplicate protection schema: {e}")
-    
     def check_duplicate(self, user_id: int, card_id: str) -> Tuple[bool, int]:
         """
         Check if user already has this card
@@ -10,6 +10,9 @@ from typing import Dict, Optional, List, Tuple
 from datetime import datetime
 import random
 
+from cards_config import compute_card_power
+from services.pack_cache import pack_cache
+
 
 class DustEconomy:
     """Manages dust economy - crafting, boosting, packs, cosmetics"""
@@ -56,6 +59,9 @@ class DustEconomy:
         'foil': 300
     }
 
+    # Columns compute_card_power reads
+    CARD_POWER_COLUMNS = ('impact', 'skill', 'longevity', 'culture', 'hype', 'rarity')
+
     def __init__(self, db_path: str = "music_legends.db"):
         self.db_path = db_path
         self._database_url = os.getenv("DATABASE_URL")
@@ -226,7 +232,7 @@ class DustEconomy:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT uc.id FROM user_cards uc
+                SELECT 1 FROM user_cards uc
                 WHERE uc.user_id = ? AND uc.card_id = ?
             """, (user_id, card_id))
             
@@ -242,19 +248,18 @@ class DustEconomy:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             
-            # Get current stat value
-            cursor.execute(f"""
-                SELECT {stat_name} FROM cards WHERE card_id = ?
-            """, (card_id,))
-            current_stat = cursor.fetchone()[0]
-            new_stat = min(99, current_stat + boost_amount)  # Cap at 99
+            # Get current stats
+            card = self._card_power_fields(cursor, card_id)
+            new_stat = min(99, card[stat_name] + boost_amount)  # Cap at 99
+            card[stat_name] = new_stat
             
-            # Update stat
+            # Update stat and the stored power the collection sorts by
             cursor.execute(f"""
-                UPDATE cards SET {stat_name} = ? WHERE card_id = ?
-            """, (new_stat, card_id))
+                UPDATE cards SET {stat_name} = ?, power = ? WHERE card_id = ?
+            """, (new_stat, compute_card_power(card), card_id))
             
             conn.commit()
+        pack_cache.invalidate_cards([card_id])
         
         return (True, f"✅ Boosted {stat_name} by +{boost_amount} (now {new_stat}) for {cost} dust!")
     
@@ -276,7 +281,7 @@ class DustEconomy:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT uc.id FROM user_cards uc
+                SELECT 1 FROM user_cards uc
                 WHERE uc.user_id = ? AND uc.card_id = ?
             """, (user_id, card_id))
             
@@ -307,12 +312,14 @@ class DustEconomy:
             'hype': random.randint(min_stat, max_stat)
         }
         
-        # Update card stats
+        # Update card stats and stored power
         with self._get_connection() as conn:
             cursor = conn.cursor()
+            card = self._card_power_fields(cursor, card_id)
+            card.update(new_stats)
             cursor.execute("""
                 UPDATE cards
-                SET impact = ?, skill = ?, longevity = ?, culture = ?, hype = ?
+                SET impact = ?, skill = ?, longevity = ?, culture = ?, hype = ?, power = ?
                 WHERE card_id = ?
             """, (
                 new_stats['impact'],
@@ -320,13 +327,22 @@ class DustEconomy:
                 new_stats['longevity'],
                 new_stats['culture'],
                 new_stats['hype'],
+                compute_card_power(card),
                 card_id
             ))
             conn.commit()
+        pack_cache.invalidate_cards([card_id])
         
         avg = sum(new_stats.values()) // 5
         return (True, f"✅ Rerolled stats for {cost} dust! New average: {avg}", new_stats)
     
+    def _card_power_fields(self, cursor, card_id: str) -> Dict:
+        """A card's stats and rarity, as compute_card_power reads them"""
+        cursor.execute(f"""
+            SELECT {', '.join(self.CARD_POWER_COLUMNS)} FROM cards WHERE card_id = ?
+        """, (card_id,))
+        return dict(zip(self.CARD_POWER_COLUMNS, cursor.fetchone()))
+    
     def add_cosmetic(
         self,
         user_id: int,
@@ -342,7 +358,7 @@ class DustEconomy:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT uc.id FROM user_cards uc
+                SELECT 1 FROM user_cards uc
                 WHERE uc.user_id = ? AND uc.card_id = ?
             """, (user_id, card_id))
             
@@ -9,6 +9,7 @@ from datetime import datetime
 from models.creator_pack import CreatorPack
 from models.card import Card
 from models.audit_minimal import AuditLog
+from services.send_queue import ANNOUNCEMENT, route_for, send_queue
 import discord
 
 class EventNotificationService:
@@ -16,6 +17,11 @@ class EventNotificationService:
     
     def __init__(self, bot=None):
         self.bot = bot
+
+    async def _send(self, target, embed: discord.Embed):
+        """Send through the shared send queue, paced on the target's route"""
+        return await send_queue.submit(lambda: target.send(embed=embed), priority=ANNOUNCEMENT,
+                                       route=route_for(target))
     
     async def notify_pack_approved(self, pack: CreatorPack, admin_id: int):
         """Notify creator that pack was approved"""
@@ -36,7 +42,7 @@ class EventNotificationService:
                 embed.add_field(name="🎮 Next Steps", value="You can now open your pack to collect cards! Use `/creator_dashboard` to manage your packs.", inline=False)
                 embed.add_field(name="📅 Approved At", value=datetime.utcnow().strftime("%Y-%m-%d %H:%M"), inline=True)
                 
-                await creator.send(embed=embed)
+                await self._send(creator, embed)
                 
                 # Log notification
                 AuditLog.record(
@@ -77,7 +83,7 @@ class EventNotificationService:
                 embed.add_field(name="🔄 Next Steps", value="You can edit your pack and resubmit for review. Use `/creator_dashboard` to manage your packs.", inline=False)
                 embed.add_field(name="📅 Rejected At", value=datetime.utcnow().strftime("%Y-%m-%d %H:%M"), inline=True)
                 
-                await creator.send(embed=embed)
+                await self._send(creator, embed)
                 
                 # Log notification
                 AuditLog.record(
@@ -140,7 +146,7 @@ class EventNotificationService:
             embed.add_field(name="🎵 Artists", value=str(len(pack.artist_ids) if pack.artist_ids else 0), inline=True)
             embed.add_field(name="📅 Approved At", value=datetime.utcnow().strftime("%Y-%m-%d %H:%M"), inline=True)
             
-            await admin_channel.send(embed=embed)
+            await self._send(admin_channel, embed)
             
             # Log notification
             AuditLog.record(
@@ -196,7 +202,7 @@ class EventNotificationService:
             embed.add_field(name="📝 Reason", value=reason, inline=False)
             embed.add_field(name="📅 Rejected At", value=datetime.utcnow().strftime("%Y-%m-%d %H:%M"), inline=True)
             
-            await admin_channel.send(embed=embed)
+            await self._send(admin_channel, embed)
             
             # Log notification
             AuditLog.record(
@@ -256,7 +262,7 @@ class EventNotificationService:
             if hasattr(card, 'image_url') and card.image_url:
                 embed.set_thumbnail(url=card.image_url)
             
-            await admin_channel.send(embed=embed)
+            await self._send(admin_channel, embed)
             
             # Log notification
             AuditLog.record(
@@ -296,7 +302,7 @@ class EventNotificationService:
                 embed.add_field(name="❌ Error", value=error, inline=False)
                 embed.add_field(name="🔄 Next Steps", value="Please check your payment method and try again, or contact support if the issue persists.", inline=False)
                 
-                await creator.send(embed=embed)
+                await self._send(creator, embed)
                 
                 # Log notification
                 AuditLog.record(
@@ -334,7 +340,7 @@ class EventNotificationService:
                 embed.add_field(name="👤 Sent By", value=f"<@{admin_id}>", inline=True)
                 embed.add_field(name="📅 Sent At", value=datetime.utcnow().strftime("%Y-%m-%d %H:%M"), inline=True)
                 
-                await creator.send(embed=embed)
+                await self._send(creator, embed)
                 
                 # Log notification
                 AuditLog.record(
@@ -375,7 +381,7 @@ class EventNotificationService:
                 embed.add_field(name="🔄 Next Steps", value="Contact an admin if you believe this was done in error.", inline=False)
                 embed.add_field(name="📅 Disabled At", value=datetime.utcnow().strftime("%Y-%m-%d %H:%M"), inline=True)
                 
-                await creator.send(embed=embed)
+                await self._send(creator, embed)
                 
                 # Log notification
                 AuditLog.record(
@@ -7,16 +7,11 @@ Handles image URL safety and caching for performance
 import time
 import hashlib
 from typing import Optional, Dict, Any
-from pathlib import Path
 
 # Default image for missing/inappropriate images
 # Using placehold.co (more reliable than via.placeholder.com)
 DEFAULT_IMG = "https://placehold.co/300x300/1a1a2e/e0e0e0?text=Music+Legends"
 
-# Cache directory
-CACHE_DIR = Path("cache")
-CACHE_DIR.mkdir(exist_ok=True)
-
 # Cache settings
 CACHE_DURATION = 3600  # 1 hour
 MAX_CACHE_SIZE = 1000  # Maximum number of cached URLs
@@ -8,6 +8,7 @@ import discord
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 from database import DatabaseManager
+from services.send_queue import ANNOUNCEMENT, route_for, send_queue
 
 
 class MarketplaceAnnouncementService:
@@ -194,14 +195,15 @@ class MarketplaceAnnouncementService:
             yesterday_stats = self.generate_daily_summary()
             embed = self.create_announcement_embed(yesterday_stats)
             
-            message = await channel.send(embed=embed)
+            route = route_for(channel)
+            message = await send_queue.submit(lambda: channel.send(embed=embed), priority=ANNOUNCEMENT,
+                                              route=route)
             
-            # Add reactions for engagement
-            try:
-                await message.add_reaction("📦")
-                await message.add_reaction("💎")
-            except:
-                pass
+            # Add reactions for engagement (their own route, behind anything more urgent)
+            reactions = f"reactions:{channel.id}"
+            for emoji in ("📦", "💎"):
+                send_queue.post(lambda emoji=emoji: message.add_reaction(emoji), priority=ANNOUNCEMENT,
+                                route=reactions)
             
             return True
         except Exception as e:
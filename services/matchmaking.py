@@ -0,0 +1,169 @@
+# services/matchmaking.py
+"""
+Matchmaking Index
+In-memory presence index of battle-registered players.
+
+Players are kept in two sorted arrays: by team power (for "find me N
+opponents near my strength") and by lowercased username (for prefix
+search). Lookups are a bisect plus a walk over the k results, so they stay
+O(log n + k) as the registry grows. Entries older than ACTIVE_WINDOW are
+skipped on read and pruned on refresh.
+"""
+
+import bisect
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from cards_config import compute_team_power
+
+# Index settings
+ACTIVE_WINDOW = timedelta(minutes=30)  # how recently a player must have been seen
+POWER_BAND = 10                        # team power points per matchmaking band
+SQUAD_SIZE = 5                         # champion + 4 supports, as in battles
+
+
+def power_band(power: int) -> int:
+    """Matchmaking band a team power falls into"""
+    return int(power) // POWER_BAND
+
+
+def team_power_from_cards(card_powers: Iterable[int]) -> int:
+    """Team power of the strongest squad a player can field"""
+    ordered = sorted((int(p) for p in card_powers), reverse=True)[:SQUAD_SIZE]
+    if not ordered:
+        return 0
+    return compute_team_power(ordered[0], ordered[1:])
+
+
+class MatchmakingIndex:
+    """Presence index keyed by telegram_id"""
+
+    def __init__(self, active_window: timedelta = ACTIVE_WINDOW):
+        self.active_window = active_window
+        self._lock = threading.Lock()
+        self._players: Dict[int, dict] = {}
+        self._by_power: List[tuple] = []   # (power, telegram_id)
+        self._by_name: List[tuple] = []    # (lower username, telegram_id)
+
+    def __len__(self):
+        return len(self._players)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _remove_sorted(items: List[tuple], item: tuple):
+        i = bisect.bisect_left(items, item)
+        if i < len(items) and items[i] == item:
+            del items[i]
+
+    def _drop(self, telegram_id: int):
+        entry = self._players.pop(telegram_id, None)
+        if entry:
+            self._remove_sorted(self._by_power, (entry["power"], telegram_id))
+            self._remove_sorted(self._by_name, (entry["username"].lower(), telegram_id))
+
+    def upsert(self, telegram_id: int, user_id: str, username: str, power: int,
+               last_seen: Optional[datetime] = None):
+        """Add or refresh a player"""
+        telegram_id = int(telegram_id)
+        username = username or f"user_{telegram_id}"
+        power = int(power or 0)
+        entry = {
+            "user_id": str(user_id),
+            "telegram_id": telegram_id,
+            "username": username,
+            "power": power,
+            "power_band": power_band(power),
+            "last_seen": last_seen or datetime.utcnow(),
+        }
+        with self._lock:
+            self._drop(telegram_id)
+            self._players[telegram_id] = entry
+            bisect.insort(self._by_power, (power, telegram_id))
+            bisect.insort(self._by_name, (username.lower(), telegram_id))
+
+    def remove(self, telegram_id: int):
+        with self._lock:
+            self._drop(int(telegram_id))
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop players not seen within the active window"""
+        cutoff = (now or datetime.utcnow()) - self.active_window
+        with self._lock:
+            stale = [tid for tid, p in self._players.items() if p["last_seen"] < cutoff]
+            for tid in stale:
+                self._drop(tid)
+        return len(stale)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, telegram_id: int) -> Optional[dict]:
+        entry = self._players.get(int(telegram_id))
+        return self._public(entry) if entry else None
+
+    @staticmethod
+    def _public(entry: dict) -> dict:
+        out = dict(entry)
+        out["last_seen"] = entry["last_seen"].isoformat()
+        return out
+
+    def nearest(self, power: int, limit: int = 10, exclude: Iterable[int] = ()) -> List[dict]:
+        """Active players closest in team power, nearest first"""
+        excluded = {int(t) for t in exclude}
+        cutoff = datetime.utcnow() - self.active_window
+        out = []
+        with self._lock:
+            items = self._by_power
+            hi = bisect.bisect_left(items, (power,))
+            lo = hi - 1
+            while len(out) < limit and (lo >= 0 or hi < len(items)):
+                # Step towards whichever neighbour is closer in power
+                if hi >= len(items) or (lo >= 0 and power - items[lo][0] <= items[hi][0] - power):
+                    _, tid = items[lo]
+                    lo -= 1
+                else:
+                    _, tid = items[hi]
+                    hi += 1
+                entry = self._players[tid]
+                if tid in excluded or entry["last_seen"] < cutoff:
+                    continue
+                out.append(self._public(entry))
+        return out
+
+    def prefix_search(self, prefix: str, limit: int = 50, exclude: Iterable[int] = ()) -> List[dict]:
+        """Active players whose username starts with prefix (case-insensitive)"""
+        prefix = prefix.lower()
+        excluded = {int(t) for t in exclude}
+        cutoff = datetime.utcnow() - self.active_window
+        out = []
+        with self._lock:
+            i = bisect.bisect_left(self._by_name, (prefix,))
+            while i < len(self._by_name) and len(out) < limit:
+                name, tid = self._by_name[i]
+                if not name.startswith(prefix):
+                    break
+                i += 1
+                entry = self._players[tid]
+                if tid in excluded or entry["last_seen"] < cutoff:
+                    continue
+                out.append(self._public(entry))
+        return out
+
+    def substring_search(self, term: str, limit: int = 50, exclude: Iterable[int] = ()) -> List[dict]:
+        """Fallback: username or telegram id contains term (linear in active players)"""
+        term = term.lower()
+        excluded = {int(t) for t in exclude}
+        cutoff = datetime.utcnow() - self.active_window
+        with self._lock:
+            hits = [
+                p for tid, p in self._players.items()
+                if tid not in excluded and p["last_seen"] >= cutoff
+                and (term in p["username"].lower() or term in str(tid))
+            ]
+        hits.sort(key=lambda p: p["last_seen"], reverse=True)
+        return [self._public(p) for p in hits[:limit]]
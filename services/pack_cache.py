@@ -0,0 +1,268 @@
+# services/pack_cache.py
+"""
+Pack Cache Service
+Read-through cache for pack definitions and master card rows.
+
+Packs and cards practically never change once a pack is live, so readers go
+through this cache instead of re-querying creator_packs / creator_pack_cards /
+cards on every request. Entries are filled lazily by the caller's loader and
+dropped by explicit invalidation from the code paths that write them
+(pack creation, card linking, moderation, deletion, dust boosts/rerolls).
+
+Set PACK_CACHE_REDIS=1 to add a shared Redis tier: values are stored in Redis
+for other processes, and invalidations are broadcast so every process evicts
+its local copy.
+Without it, an invalidation only reaches the process that made the write:
+other processes (shards, the TMA API) keep serving their copy until LOCAL_TTL
+expires, so multi-process deployments should enable the Redis tier.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Cache settings
+LOCAL_MAX_SIZE = 20_000
+LOCAL_TTL = 3600          # safety net; invalidation is the primary mechanism
+STORE_TTL = 60            # store listings also change when packs are created
+REDIS_TTL = 6 * 3600
+REDIS_PREFIX = "pack_cache:"
+INVALIDATE_CHANNEL = "pack_cache:invalidate"
+
+_MISSING = object()
+
+
+class PackCache:
+    """Two-tier (process + optional Redis) read-through cache"""
+
+    def __init__(self, use_redis: Optional[bool] = None, connection=None):
+        self._local = TTLCache(maxsize=LOCAL_MAX_SIZE, ttl=LOCAL_TTL)
+        self._store = TTLCache(maxsize=256, ttl=STORE_TTL)
+        self._lock = threading.RLock()
+        self._stats = {
+            "local_hits": 0, "redis_hits": 0, "misses": 0,
+            "invalidations": 0, "errors": 0,
+        }
+        if use_redis is None:
+            use_redis = os.environ.get("PACK_CACHE_REDIS", "").lower() in ("1", "true", "yes")
+        self._use_redis = use_redis
+        self._redis = connection
+        self._listener: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Redis tier
+    # ------------------------------------------------------------------
+
+    def _get_redis(self):
+        if not self._use_redis:
+            return None
+        if self._redis is None:
+            try:
+                from rq_queue.redis_connection import get_redis_connection
+                self._redis = get_redis_connection()
+            except Exception as e:
+                logger.warning(f"[PACK_CACHE] Redis tier unavailable, using local cache only: {e}")
+                self._use_redis = False
+                return None
+        if self._listener is None:
+            self._listener = threading.Thread(
+                target=self._listen_invalidations, name="pack-cache-invalidate", daemon=True
+            )
+            self._listener.start()
+        return self._redis
+
+    def _listen_invalidations(self):
+        """Evict local entries when another process invalidates them"""
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATE_CHANNEL)
+            for message in pubsub.listen():
+                data = message.get("data")
+                if isinstance(data, bytes):
+                    data = data.decode()
+                keys = json.loads(data) if data else []
+                self._evict_local(keys)
+        except Exception as e:
+            logger.error(f"[PACK_CACHE] invalidation listener stopped: {e}")
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_many(self, keys: Iterable[str], loader: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return {key: value} for keys, calling loader(missing_keys) once for
+        anything not cached. Keys the loader doesn't return are not cached."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                value = self._local.get(key, _MISSING)
+                if value is _MISSING:
+                    missing.append(key)
+                else:
+                    found[key] = value
+                    self._stats["local_hits"] += 1
+
+        redis = self._get_redis() if missing else None
+        if redis is not None:
+            try:
+                raw_values = redis.mget([REDIS_PREFIX + key for key in missing])
+                still_missing = []
+                for key, raw in zip(missing, raw_values):
+                    if raw is None:
+                        still_missing.append(key)
+                        continue
+                    value = json.loads(raw)
+                    found[key] = value
+                    with self._lock:
+                        self._local[key] = value
+                        self._stats["redis_hits"] += 1
+                missing = still_missing
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"[PACK_CACHE] Redis read failed: {e}")
+
+        if missing:
+            with self._lock:
+                self._stats["misses"] += len(missing)
+            loaded = loader(missing) or {}
+            self.set_many(loaded)
+            found.update(loaded)
+
+        # Callers decorate the dicts they get back (power, emoji...), so hand out copies
+        return {key: copy.deepcopy(found[key]) for key in keys if key in found}
+
+    def set_many(self, values: Dict[str, Any]):
+        """Prime entries that a loader fetched as a side effect"""
+        if not values:
+            return
+        with self._lock:
+            for key, value in values.items():
+                self._local[key] = value
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                pipe = redis.pipeline()
+                for key, value in values.items():
+                    pipe.set(REDIS_PREFIX + key, json.dumps(value, default=str), ex=REDIS_TTL)
+                pipe.execute()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"[PACK_CACHE] Redis write failed: {e}")
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Single-key read-through. A loader result of None is not cached."""
+        def load(_missing):
+            value = loader()
+            return {key: value} if value is not None else {}
+        return self.get_many([key], load).get(key)
+
+    def get_store(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Short-lived, process-local cache for store listings"""
+        with self._lock:
+            value = self._store.get(key, _MISSING)
+            if value is not _MISSING:
+                self._stats["local_hits"] += 1
+                return copy.deepcopy(value)
+            self._stats["misses"] += 1
+        value = loader()
+        with self._lock:
+            self._store[key] = value
+        return copy.deepcopy(value)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def _evict_local(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+            # Any pack change can alter what the store shows
+            self._store.clear()
+
+    def invalidate(self, *keys: str):
+        """Drop keys in this process, in Redis and in every other process"""
+        keys = [key for key in keys if key]
+        self._evict_local(keys)
+        with self._lock:
+            self._stats["invalidations"] += 1
+        redis = self._get_redis()
+        if redis is None:
+            return
+        try:
+            if keys:
+                redis.delete(*[REDIS_PREFIX + key for key in keys])
+            redis.publish(INVALIDATE_CHANNEL, json.dumps(keys))
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning(f"[PACK_CACHE] Redis invalidation failed: {e}")
+
+    def invalidate_pack(self, pack_id: str):
+        self.invalidate(pack_key(pack_id), pack_detail_key(pack_id))
+
+    def invalidate_cards(self, card_ids: Iterable[str]):
+        # A card change can move it in or out of the daily reward pool
+        self.invalidate(DAILY_POOL_KEY, *[card_key(card_id) for card_id in card_ids])
+
+    def clear(self):
+        """Drop everything in this process (tests, admin tooling)"""
+        with self._lock:
+            self._local.clear()
+            self._store.clear()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["local_size"] = len(self._local)
+        hits = stats["local_hits"] + stats["redis_hits"]
+        total = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / total, 3) if total else 0.0
+        stats["redis_enabled"] = self._use_redis
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+
+# Card ids eligible for daily rewards (Database._daily_reward_cards)
+DAILY_POOL_KEY = "daily_pool"
+
+
+def pack_key(pack_id: str) -> str:
+    """Card id list of a pack"""
+    return f"pack:{pack_id}"
+
+
+def pack_detail_key(pack_id: str) -> str:
+    """Marketplace detail content (id, name, description, cards, genre) of a LIVE pack"""
+    return f"pack_detail:{pack_id}"
+
+
+def card_key(card_id: str) -> str:
+    """Master card metadata"""
+    return f"card:{card_id}"
+
+
+# Global cache instance
+pack_cache = PackCache()
+
+
+def get_pack_cache_stats() -> Dict[str, Any]:
+    """Get pack/card cache hit-rate metrics"""
+    return pack_cache.get_stats()
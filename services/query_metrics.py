@@ -0,0 +1,325 @@
+# services/query_metrics.py
+"""
+Query Metrics
+Per-method and per-request SQL statement counts, rows and timings.
+
+Statements are counted from two places: SQLAlchemy engine events (sessions,
+engine.connect(), the async db_manager engine) and the instrumented raw
+cursors handed out by Database._get_connection(). Each statement is
+attributed to:
+
+  - the innermost instrumented Database method running (instrument() wraps
+    every public method; a method's totals include the methods it calls),
+  - the current scope, i.e. one TMA request or one Discord interaction
+    (scope() context manager).
+
+A scope that runs the same statement shape N_PLUS_ONE_THRESHOLD times is
+reported as a likely N+1 (logged, and raised as NPlusOneWarning when
+warn_n_plus_one is set, as the test suite does). Statements slower than
+DB_SLOW_QUERY_MS are kept as samples.
+
+Set DB_METRICS=0 to disable all of it.
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import re
+import threading
+import time
+import warnings
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Metrics settings
+ENABLED = os.environ.get("DB_METRICS", "1").lower() not in ("0", "false", "no")
+SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("DB_N_PLUS_ONE_THRESHOLD", "10"))
+SAMPLE_SIZE = 50          # slow query / N+1 samples kept
+SQL_SAMPLE_CHARS = 300
+
+
+class NPlusOneWarning(UserWarning):
+    """The same statement ran many times within one request/interaction"""
+
+
+_current_call: contextvars.ContextVar = contextvars.ContextVar("db_metrics_call", default=None)
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("db_metrics_scope", default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Statement shape: literals and IN-lists collapsed, whitespace normalised"""
+    shape = _LITERALS.sub("?", sql)
+    shape = _PLACEHOLDER_LISTS.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()[:SQL_SAMPLE_CHARS]
+
+
+class _Call:
+    """One running instrumented method call"""
+
+    __slots__ = ("method", "statements", "rows", "sql_time")
+
+    def __init__(self, method: str):
+        self.method = method
+        self.statements = 0
+        self.rows = 0
+        self.sql_time = 0.0
+
+
+class QueryScope:
+    """Statements run during one request / interaction"""
+
+    def __init__(self, name: str, warn: bool = False):
+        self.name = name
+        self.warn = warn
+        self.statements = 0
+        self.rows = 0
+        self.sql_time = 0.0
+        self.wall_time = 0.0
+        self.shapes: Dict[str, int] = {}
+        self.n_plus_one: list = []
+
+
+class QueryMetrics:
+    """Process-wide aggregation of statement metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._attached = set()
+        self.warn_n_plus_one = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._totals = {"statements": 0, "rows": 0, "sql_ms": 0.0}
+            self._methods: Dict[str, Dict[str, float]] = {}
+            self._scopes: Dict[str, Dict[str, float]] = {}
+            self._slow = deque(maxlen=SAMPLE_SIZE)
+            self._n_plus_one = deque(maxlen=SAMPLE_SIZE)
+            self._since = datetime.utcnow()
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+
+    def attach(self, engine):
+        """Count statements executed through a (sync or async) SQLAlchemy engine"""
+        if not ENABLED:
+            return
+        from sqlalchemy import event
+        engine = getattr(engine, "sync_engine", engine)
+        with self._lock:
+            if id(engine) in self._attached:
+                return
+            self._attached.add(id(engine))
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("_metrics_started")
+        elapsed = time.perf_counter() - started.pop() if started else 0.0
+        self.record(statement, elapsed, getattr(cursor, "rowcount", 0))
+
+    def record(self, sql: str, seconds: float, rows: int = 0):
+        """Account one executed statement. rows is the driver's rowcount
+        (PostgreSQL reports it for SELECTs, SQLite only for writes)."""
+        rows = rows if rows and rows > 0 else 0
+        call = _current_call.get()
+        if call is not None:
+            call.statements += 1
+            call.rows += rows
+            call.sql_time += seconds
+
+        scope = _current_scope.get()
+        if scope is not None:
+            scope.statements += 1
+            scope.rows += rows
+            scope.sql_time += seconds
+            shape = fingerprint(sql)
+            seen = scope.shapes[shape] = scope.shapes.get(shape, 0) + 1
+            if seen == N_PLUS_ONE_THRESHOLD:
+                self._flag_n_plus_one(scope, call, shape)
+
+        with self._lock:
+            self._totals["statements"] += 1
+            self._totals["rows"] += rows
+            self._totals["sql_ms"] += seconds * 1000
+            if seconds * 1000 >= SLOW_QUERY_MS:
+                self._slow.append({
+                    "sql": fingerprint(sql),
+                    "ms": round(seconds * 1000, 1),
+                    "method": call.method if call else None,
+                    "scope": scope.name if scope else None,
+                    "at": datetime.utcnow().isoformat(),
+                })
+
+    def _flag_n_plus_one(self, scope: QueryScope, call: Optional[_Call], shape: str):
+        method = call.method if call else "?"
+        message = (f"Possible N+1 in {scope.name}: statement ran {N_PLUS_ONE_THRESHOLD}+ times "
+                   f"(last from {method}): {shape[:160]}")
+        scope.n_plus_one.append(shape)
+        with self._lock:
+            self._n_plus_one.append({"scope": scope.name, "method": method, "sql": shape,
+                                     "at": datetime.utcnow().isoformat()})
+        logger.warning(f"[DB] {message}")
+        if scope.warn or self.warn_n_plus_one:
+            warnings.warn(message, NPlusOneWarning, stacklevel=2)
+
+    # ------------------------------------------------------------------
+    # Attribution
+    # ------------------------------------------------------------------
+
+    def _finish_call(self, call: _Call, parent: Optional[_Call], wall: float):
+        if parent is not None:
+            parent.statements += call.statements
+            parent.rows += call.rows
+            parent.sql_time += call.sql_time
+        with self._lock:
+            stats = self._methods.get(call.method)
+            if stats is None:
+                stats = self._methods[call.method] = {
+                    "calls": 0, "statements": 0, "max_statements": 0, "rows": 0,
+                    "wall_ms": 0.0, "max_wall_ms": 0.0, "sql_ms": 0.0,
+                }
+            stats["calls"] += 1
+            stats["statements"] += call.statements
+            stats["max_statements"] = max(stats["max_statements"], call.statements)
+            stats["rows"] += call.rows
+            stats["wall_ms"] += wall * 1000
+            stats["max_wall_ms"] = max(stats["max_wall_ms"], wall * 1000)
+            stats["sql_ms"] += call.sql_time * 1000
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        """Attribute statements run inside fn (sync or async) to name"""
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                parent = _current_call.get()
+                call = _Call(name)
+                token = _current_call.set(call)
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _current_call.reset(token)
+                    self._finish_call(call, parent, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            parent = _current_call.get()
+            call = _Call(name)
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_call.reset(token)
+                self._finish_call(call, parent, time.perf_counter() - started)
+        return wrapper
+
+    def instrument(self, cls, prefix: Optional[str] = None):
+        """Wrap every public method defined on cls"""
+        if not ENABLED:
+            return cls
+        prefix = prefix or cls.__name__
+        for name, attr in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(attr):
+                continue
+            # Generators and @contextmanager helpers run their body outside the call
+            inner = inspect.unwrap(attr)
+            if inspect.isgeneratorfunction(inner) or inspect.isasyncgenfunction(inner):
+                continue
+            setattr(cls, name, self.wrap(f"{prefix}.{name}", attr))
+        return cls
+
+    @contextmanager
+    def scope(self, name: str, warn: bool = False):
+        """Collect statements for one request / interaction. The scope can be
+        renamed inside the block (e.g. once the route template is known)."""
+        scope = QueryScope(name, warn)
+        if not ENABLED:
+            yield scope
+            return
+        token = _current_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            yield scope
+        finally:
+            _current_scope.reset(token)
+            scope.wall_time = time.perf_counter() - started
+            self._finish_scope(scope)
+
+    def _finish_scope(self, scope: QueryScope):
+        with self._lock:
+            stats = self._scopes.get(scope.name)
+            if stats is None:
+                stats = self._scopes[scope.name] = {
+                    "count": 0, "statements": 0, "max_statements": 0,
+                    "wall_ms": 0.0, "max_wall_ms": 0.0, "sql_ms": 0.0, "n_plus_one": 0,
+                }
+            stats["count"] += 1
+            stats["statements"] += scope.statements
+            stats["max_statements"] = max(stats["max_statements"], scope.statements)
+            stats["wall_ms"] += scope.wall_time * 1000
+            stats["max_wall_ms"] = max(stats["max_wall_ms"], scope.wall_time * 1000)
+            stats["sql_ms"] += scope.sql_time * 1000
+            stats["n_plus_one"] += len(scope.n_plus_one)
+
+    @staticmethod
+    def current_scope() -> Optional[QueryScope]:
+        return _current_scope.get()
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _rank(table: Dict[str, Dict[str, float]], per: str, top: int) -> list:
+        rows = []
+        for name, stats in table.items():
+            n = stats[per] or 1
+            rows.append({
+                "name": name,
+                **{k: round(v, 1) if isinstance(v, float) else v for k, v in stats.items()},
+                "avg_statements": round(stats["statements"] / n, 2),
+                "avg_wall_ms": round(stats["wall_ms"] / n, 2),
+            })
+        rows.sort(key=lambda r: r["statements"], reverse=True)
+        return rows[:top]
+
+    def snapshot(self, top: int = 25) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": ENABLED,
+                "since": self._since.isoformat(),
+                "totals": {k: round(v, 1) if isinstance(v, float) else v for k, v in self._totals.items()},
+                "methods": self._rank(self._methods, "calls", top),
+                "scopes": self._rank(self._scopes, "count", top),
+                "slow_queries": list(self._slow)[-top:],
+                "n_plus_one": list(self._n_plus_one)[-top:],
+                "slow_query_ms": SLOW_QUERY_MS,
+            }
+
+
+# Global metrics instance
+query_metrics = QueryMetrics()
+
+
+def get_query_metrics(top: int = 25) -> Dict[str, Any]:
+    """Get statement metrics by Database method and by request/interaction"""
+    return query_metrics.snapshot(top)
@@ -0,0 +1,482 @@
+# services/schema.py
+"""
+Schema Bootstrap
+Versioned schema management on top of alembic/versions.
+
+All DDL lives in Alembic revisions and runs once per deploy through
+`python migrate.py`, before run_bot.py / the TMA API start. At boot a process
+only compares the database's alembic_version with the head revision
+(ensure_schema) and refuses to start when it is behind, so no table creation,
+ALTER or introspection happens at import time, per instance or in handlers.
+
+  - Empty database: create_runtime_schema() builds everything from the models
+    plus the raw-SQL tables, then the database is stamped at head (the early
+    autogenerated revisions predate most of the models).
+  - Existing database without alembic_version (deployments bootstrapped by
+    the old runtime DDL): stamped at BASELINE_REVISION, then upgraded.
+  - Otherwise: alembic upgrade head.
+
+SQLite databases (local runs, tests) are upgraded in place by ensure_schema;
+elsewhere set SCHEMA_AUTO_MIGRATE=1 to allow that.
+"""
+
+import logging
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(ROOT, "alembic.ini")
+
+# Last revision every runtime-bootstrapped deployment already satisfies
+BASELINE_REVISION = "d74802d31b7e"
+
+_AUTO_MIGRATE = os.environ.get("SCHEMA_AUTO_MIGRATE")
+
+
+class SchemaNotAtHead(RuntimeError):
+    """The database schema is older than the code (run `python migrate.py`)"""
+
+
+# ----------------------------------------------------------------------
+# Alembic plumbing
+# ----------------------------------------------------------------------
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+    cfg = Config(ALEMBIC_INI)
+    cfg.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    if connection is not None:
+        # alembic/env.py runs on this connection instead of opening its own
+        cfg.attributes["connection"] = connection
+    return cfg
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> str:
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection) -> Optional[str]:
+    from alembic.runtime.migration import MigrationContext
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade(engine) -> Tuple[Optional[str], str]:
+    """Bring the database to head. Returns (revision before, head)."""
+    from alembic import command
+
+    with engine.begin() as conn:
+        cfg = alembic_config(conn)
+        before = current_revision(conn)
+        if before is None:
+            if not inspect(conn).get_table_names():
+                logger.info("[MIGRATE] Empty database: creating schema at head")
+                create_runtime_schema(conn)
+                command.stamp(cfg, "head")
+                return before, head_revision()
+            logger.info(f"[MIGRATE] Unversioned database: stamping {BASELINE_REVISION}")
+            command.stamp(cfg, BASELINE_REVISION)
+        command.upgrade(cfg, "head")
+    return before, head_revision()
+
+
+def _auto_migrate(engine) -> bool:
+    if _AUTO_MIGRATE is None:
+        return engine.dialect.name == "sqlite"
+    return _AUTO_MIGRATE.lower() not in ("0", "false", "no")
+
+
+def ensure_schema(engine):
+    """Boot check: one alembic_version read. Upgrades in place when allowed,
+    otherwise raises SchemaNotAtHead."""
+    head = head_revision()
+    with engine.connect() as conn:
+        current = current_revision(conn)
+    if current == head:
+        return
+    if _auto_migrate(engine):
+        upgrade(engine)
+        return
+    raise SchemaNotAtHead(
+        f"Database schema is at {current or 'an unversioned state'}, code expects {head}. "
+        f"Run `python migrate.py` before starting the bot / TMA API."
+    )
+
+
+# ----------------------------------------------------------------------
+# Runtime schema at head (empty databases; frozen copy in f2a7c4e9b1d6)
+# ----------------------------------------------------------------------
+
+# Tables used through raw SQL only. {serial} is the dialect's auto-increment key.
+RAW_TABLES = [
+    """CREATE TABLE IF NOT EXISTS active_battles (
+        match_id TEXT PRIMARY KEY,
+        player1_id TEXT NOT NULL,
+        player2_id TEXT NOT NULL,
+        wager_amount INTEGER NOT NULL DEFAULT 0,
+        tier_key TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # Legacy economy table still used by several Discord cogs
+    """CREATE TABLE IF NOT EXISTS user_inventory (
+        user_id TEXT PRIMARY KEY,
+        gold INTEGER DEFAULT 0,
+        dust INTEGER DEFAULT 0,
+        tickets INTEGER DEFAULT 0,
+        gems INTEGER DEFAULT 0,
+        xp INTEGER DEFAULT 0,
+        level INTEGER DEFAULT 1,
+        total_cards INTEGER DEFAULT 0,
+        last_daily_claim TIMESTAMP,
+        daily_streak INTEGER DEFAULT 0,
+        last_daily TEXT,
+        premium_expires TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS battle_registry (
+        user_id TEXT PRIMARY KEY,
+        telegram_id BIGINT UNIQUE NOT NULL,
+        username TEXT,
+        is_active BOOLEAN DEFAULT TRUE,
+        registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        team_power INTEGER DEFAULT 0
+    )""",
+    # season_system.SeasonManager
+    """CREATE TABLE IF NOT EXISTS seasons (
+        season_id {serial},
+        season_name TEXT NOT NULL,
+        season_number INTEGER NOT NULL,
+        start_date TIMESTAMP NOT NULL,
+        end_date TIMESTAMP NOT NULL,
+        is_active BOOLEAN DEFAULT FALSE,
+        theme TEXT,
+        special_cards TEXT,
+        season_stats TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS season_card_caps (
+        cap_id {serial},
+        season_id INTEGER,
+        artist_name TEXT NOT NULL,
+        tier TEXT NOT NULL,
+        max_prints INTEGER NOT NULL,
+        current_prints INTEGER DEFAULT 0,
+        is_hard_cap BOOLEAN DEFAULT FALSE,
+        FOREIGN KEY (season_id) REFERENCES seasons(season_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS player_season_progress (
+        progress_id {serial},
+        user_id INTEGER NOT NULL,
+        season_id INTEGER NOT NULL,
+        season_level INTEGER DEFAULT 1,
+        season_xp INTEGER DEFAULT 0,
+        cards_collected INTEGER DEFAULT 0,
+        unique_artists INTEGER DEFAULT 0,
+        battles_won INTEGER DEFAULT 0,
+        trades_completed INTEGER DEFAULT 0,
+        season_rank TEXT DEFAULT 'Bronze',
+        rewards_claimed TEXT DEFAULT '[]',
+        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (season_id) REFERENCES seasons(season_id),
+        UNIQUE(user_id, season_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS season_rewards (
+        reward_id TEXT PRIMARY KEY,
+        season_id INTEGER,
+        reward_type TEXT NOT NULL,
+        reward_name TEXT NOT NULL,
+        reward_data TEXT,
+        required_level INTEGER,
+        required_xp INTEGER,
+        required_cards INTEGER,
+        required_rank TEXT,
+        is_claimable BOOLEAN DEFAULT TRUE,
+        is_limited BOOLEAN DEFAULT FALSE,
+        total_claims INTEGER DEFAULT 0,
+        max_claims INTEGER,
+        FOREIGN KEY (season_id) REFERENCES seasons(season_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS card_prestige (
+        prestige_id {serial},
+        card_id TEXT NOT NULL,
+        original_season_id INTEGER,
+        seasons_active INTEGER DEFAULT 1,
+        prestige_score INTEGER DEFAULT 0,
+        ownership_history TEXT,
+        notable_events TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (original_season_id) REFERENCES seasons(season_id),
+        FOREIGN KEY (card_id) REFERENCES cards(card_id)
+    )""",
+    # season_supply.SeasonSupply
+    """CREATE TABLE IF NOT EXISTS season_supply (
+        season INTEGER,
+        tier TEXT,
+        minted INTEGER DEFAULT 0,
+        cap INTEGER,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (season, tier)
+    )""",
+    """CREATE TABLE IF NOT EXISTS artist_supply (
+        season INTEGER,
+        artist_id TEXT,
+        tier TEXT,
+        minted INTEGER DEFAULT 0,
+        cap INTEGER,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (season, artist_id, tier)
+    )""",
+    # server_revenue.ServerRevenueManager
+    """CREATE TABLE IF NOT EXISTS server_owners (
+        server_id INTEGER PRIMARY KEY,
+        owner_user_id INTEGER NOT NULL,
+        owner_discord_tag TEXT,
+        stripe_connect_account_id TEXT,
+        stripe_connect_status TEXT DEFAULT 'not_connected',
+        nft_count INTEGER DEFAULT 0,
+        revenue_share_percentage REAL DEFAULT 0.10,
+        total_earned_cents INTEGER DEFAULT 0,
+        pending_payout_cents INTEGER DEFAULT 0,
+        last_payout_date TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS server_nft_holdings (
+        id {serial},
+        server_id INTEGER NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        nft_collection TEXT NOT NULL,
+        nft_token_id TEXT NOT NULL,
+        wallet_address TEXT NOT NULL,
+        verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        verification_status TEXT DEFAULT 'verified',
+        FOREIGN KEY (server_id) REFERENCES server_owners(server_id),
+        UNIQUE(nft_collection, nft_token_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS server_revenue_transactions (
+        transaction_id TEXT PRIMARY KEY,
+        server_id INTEGER NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        purchase_type TEXT NOT NULL,
+        total_amount_cents INTEGER NOT NULL,
+        server_share_cents INTEGER NOT NULL,
+        platform_share_cents INTEGER NOT NULL,
+        revenue_share_percentage REAL NOT NULL,
+        nft_boost_applied INTEGER DEFAULT 0,
+        stripe_payment_intent_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        payout_status TEXT DEFAULT 'pending',
+        payout_date TIMESTAMP,
+        FOREIGN KEY (server_id) REFERENCES server_owners(server_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS server_payouts (
+        payout_id TEXT PRIMARY KEY,
+        server_id INTEGER NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        stripe_transfer_id TEXT,
+        payout_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'completed',
+        transaction_ids TEXT,
+        FOREIGN KEY (server_id) REFERENCES server_owners(server_id)
+    )""",
+    # services/duplicate_manager.DuplicateManager
+    """CREATE TABLE IF NOT EXISTS user_dust (
+        user_id INTEGER PRIMARY KEY,
+        dust_amount INTEGER DEFAULT 0,
+        total_dust_earned INTEGER DEFAULT 0,
+        total_dust_spent INTEGER DEFAULT 0,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TABLE IF NOT EXISTS dust_transactions (
+        id {serial},
+        user_id INTEGER,
+        amount INTEGER,
+        transaction_type TEXT,
+        card_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+    # nft_entitlement.NFTEntitlementManager
+    """CREATE TABLE IF NOT EXISTS wallet_links (
+        discord_user_id INTEGER PRIMARY KEY,
+        wallet_address TEXT NOT NULL UNIQUE,
+        signature TEXT NOT NULL,
+        nonce TEXT NOT NULL,
+        verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'active'
+    )""",
+    """CREATE TABLE IF NOT EXISTS nft_snapshots (
+        snapshot_id {serial},
+        discord_user_id INTEGER NOT NULL,
+        wallet_address TEXT NOT NULL,
+        collection_key TEXT NOT NULL,
+        nft_count INTEGER DEFAULT 0,
+        snapshot_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        verification_method TEXT,
+        FOREIGN KEY (discord_user_id) REFERENCES wallet_links(discord_user_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS entitlement_cache (
+        discord_user_id INTEGER PRIMARY KEY,
+        wallet_address TEXT NOT NULL,
+        eligible_nfts INTEGER DEFAULT 0,
+        revenue_share_percent REAL DEFAULT 0.10,
+        last_verified TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        verification_status TEXT DEFAULT 'active',
+        freeze_reason TEXT,
+        FOREIGN KEY (discord_user_id) REFERENCES wallet_links(discord_user_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS snapshot_refresh_log (
+        refresh_id {serial},
+        refresh_type TEXT NOT NULL,
+        discord_user_id INTEGER,
+        success BOOLEAN,
+        nfts_found INTEGER,
+        error_message TEXT,
+        refresh_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+]
+
+# Columns older deployments (or model-created tables) lack but raw SQL uses
+LEGACY_COLUMNS = {
+    "active_battles": [("tier_key", "TEXT")],
+    "battle_registry": [("team_power", "INTEGER DEFAULT 0")],
+    "user_inventory": [("last_daily", "TEXT"), ("premium_expires", "TEXT")],
+    "user_cards": [("first_acquired_at", "TIMESTAMP")],
+    # cogs/battlepass_commands keeps claimed tiers and quests next to the pass
+    "season_progress": [
+        ("claimed_tiers", "TEXT DEFAULT '[]'"),
+        ("quest_progress", "TEXT DEFAULT '{}'"),
+        ("last_quest_reset", "TEXT"),
+    ],
+    # Marketplace / seed packs columns (services/seed_packs, cogs/marketplace)
+    "creator_packs": [
+        ("pack_type", "TEXT DEFAULT 'creator'"),
+        ("pack_size", "INTEGER DEFAULT 10"),
+        ("status", "TEXT DEFAULT 'DRAFT'"),
+        ("published_at", "TIMESTAMP"),
+        ("stripe_payment_id", "TEXT"),
+        ("price_cents", "INTEGER DEFAULT 500"),
+        ("price_gold", "INTEGER DEFAULT 500"),
+        ("total_purchases", "INTEGER DEFAULT 0"),
+    ],
+}
+
+RAW_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_battle_registry_active_seen ON battle_registry(is_active, last_seen DESC)",
+    # Username prefix search (matchmaking, trade partners) runs as a range scan
+    "CREATE INDEX IF NOT EXISTS idx_battle_registry_username_lower ON battle_registry(lower(username))",
+    "CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(lower(username))",
+    # Legacy Discord trades are looked up by their numeric trade_id
+    "CREATE INDEX IF NOT EXISTS idx_trades_trade_id ON trades(trade_id)",
+    "CREATE INDEX IF NOT EXISTS idx_user_cards_user_acquired ON user_cards(user_id, acquired_at)",
+    "CREATE INDEX IF NOT EXISTS idx_creator_packs_status_tier ON creator_packs(status, pack_tier)",
+]
+
+
+def create_runtime_schema(conn):
+    """Create every table, column and index the app uses, idempotently.
+
+    Run for empty databases, which are then stamped at head; also used by
+    Database.init_database() to rebuild a scratch database in tests. The
+    baseline revision keeps its own frozen copy of this DDL, so schema changes
+    need a new revision as well as an edit here."""
+    from models import Base, Card, card_power_sql
+    from sqlalchemy import update
+
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        _user_id_to_varchar(conn)
+
+    Base.metadata.create_all(conn)
+    _add_missing_model_columns(conn)
+    # create_all skips the indexes of tables that already existed
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+    serial = "SERIAL PRIMARY KEY" if dialect == "postgresql" else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    for ddl in RAW_TABLES:
+        conn.execute(text(ddl.format(serial=serial)))
+
+    inspector = inspect(conn)
+    for table, columns in LEGACY_COLUMNS.items():
+        existing = {col["name"] for col in inspector.get_columns(table)}
+        for name, definition in columns:
+            if name not in existing:
+                conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {definition}'))
+                logger.info(f"[MIGRATE] Added column {table}.{name}")
+
+    for ddl in RAW_INDEXES:
+        conn.execute(text(ddl))
+
+    # Data fix-ups the old runtime bootstrap applied on every start
+    conn.execute(text("UPDATE user_cards SET quantity = 1 WHERE quantity IS NULL"))
+    conn.execute(update(Card).where(Card.power.is_(None)).values(power=card_power_sql()))
+
+
+def _add_missing_model_columns(conn):
+    """ALTER TABLE ADD COLUMN for model columns missing from existing tables"""
+    from models import Base
+
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for col in table.columns:
+            if col.name in existing:
+                continue
+            col_type = col.type.compile(dialect=conn.dialect)
+            default = ""
+            if col.default is not None and col.default.is_scalar:
+                val = col.default.arg
+                if isinstance(val, bool):
+                    default = " DEFAULT TRUE" if val else " DEFAULT FALSE"
+                elif isinstance(val, (int, float)):
+                    default = f" DEFAULT {val}"
+                elif isinstance(val, str):
+                    default = f" DEFAULT '{val}'"
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}{default}'))
+            logger.info(f"[MIGRATE] Added column {table.name}.{col.name}")
+
+
+def _user_id_to_varchar(conn):
+    """PostgreSQL: convert users.user_id (and the FKs referencing it) from
+    BIGINT to VARCHAR on deployments created before ids became strings."""
+    row = conn.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name='users' AND column_name='user_id' AND table_schema='public'"
+    )).fetchone()
+    if not row or row[0] != "bigint":
+        return
+    logger.info("[MIGRATE] users.user_id is BIGINT — migrating to VARCHAR...")
+
+    fk_rows = conn.execute(text("""
+        SELECT kcu.constraint_name, kcu.table_name AS fk_table, kcu.column_name AS fk_col
+        FROM information_schema.key_column_usage kcu
+        JOIN information_schema.referential_constraints rc
+             ON kcu.constraint_name = rc.constraint_name
+        JOIN information_schema.key_column_usage kcu2
+             ON rc.unique_constraint_name = kcu2.constraint_name
+        WHERE kcu2.table_name = 'users' AND kcu2.column_name = 'user_id'
+    """)).fetchall()
+
+    for fk_name, fk_table, fk_col in fk_rows:
+        conn.execute(text(f'ALTER TABLE "{fk_table}" DROP CONSTRAINT IF EXISTS "{fk_name}"'))
+    for fk_name, fk_table, fk_col in fk_rows:
+        conn.execute(text(
+            f'ALTER TABLE "{fk_table}" ALTER COLUMN "{fk_col}" TYPE VARCHAR USING "{fk_col}"::text'
+        ))
+    conn.execute(text("ALTER TABLE users ALTER COLUMN user_id TYPE VARCHAR USING user_id::text"))
+    for fk_name, fk_table, fk_col in fk_rows:
+        conn.execute(text(
+            f'ALTER TABLE "{fk_table}" ADD CONSTRAINT "{fk_name}" '
+            f'FOREIGN KEY ("{fk_col}") REFERENCES users(user_id)'
+        ))
+    logger.info(f"[MIGRATE] users.user_id → VARCHAR ({len(fk_rows)} foreign keys updated)")
@@ -378,73 +378,6 @@ def seed_packs_into_db(db_path: str = "music_legends.db", force_reseed: bool = F
             print(f"🗑️ [SEED_PACKS] Deleted {deleted_count} existing seed packs")
             conn.commit()
 
-        # Ensure creator_packs table exists with required columns
-        if db_type == "postgresql":
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS creator_packs (
-                    pack_id TEXT PRIMARY KEY,
-                    creator_id INTEGER,
-                    name TEXT NOT NULL,
-                    description TEXT,
-                    pack_type TEXT DEFAULT 'creator',
-                    pack_size INTEGER DEFAULT 10,
-                    status TEXT DEFAULT 'DRAFT',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    published_at TIMESTAMP,
-                    stripe_payment_id TEXT,
-                    price_cents INTEGER DEFAULT 500,
-                    total_purchases INTEGER DEFAULT 0,
-                    cards_data TEXT,
-                    genre TEXT
-                )
-            """)
-            # Ensure extra columns exist on old PostgreSQL tables
-            for col, col_def in [("genre", "TEXT"), ("price_gold", "INTEGER DEFAULT 500"), ("pack_tier", "TEXT DEFAULT 'community'")]:
-                try:
-                    cursor.execute(f"ALTER TABLE creator_packs ADD COLUMN {col} {col_def}")
-                except Exception:
-                    pass  # column already exists
-            conn.commit()
-            # Ensure cards table exists
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS cards (
-                    card_id TEXT PRIMARY KEY,
-                    type TEXT NOT NULL DEFAULT 'artist',
-                    name TEXT NOT NULL,
-                    artist_name TEXT,
-                    title TEXT,
-                    image_url TEXT,
-                    youtube_url TEXT,
-                    rarity TEXT NOT NULL,
-                    tier TEXT,
-                    variant TEXT DEFAULT 'Classic',
-                    era TEXT,
-                    impact INTEGER,
-                    skill INTEGER,
-                    longevity INTEGER,
-                    culture INTEGER,
-                    hype INTEGER,
-                    serial_number TEXT,
-                    print_number INTEGER DEFAULT 1,
-                    quality TEXT DEFAULT 'standard',
-                    effect_type TEXT,
-                    effect_value TEXT,
-                    pack_id TEXT,
-                    created_by_user_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-        else:
-            # SQLite: ensure required columns exist (database.py usually handles this,
-            # but be defensive in case seed_packs runs in isolation)
-            cursor.execute("PRAGMA table_info(creator_packs)")
-            existing_cols = {row[1] for row in cursor.fetchall()}
-            for col, col_def in [("genre", "TEXT"), ("price_gold", "INTEGER DEFAULT 500"), ("pack_tier", "TEXT DEFAULT 'community'")]:
-                if col not in existing_cols:
-                    cursor.execute(f"ALTER TABLE creator_packs ADD COLUMN {col} {col_def}")
-            conn.commit()
-
         # Skip external API calls — all 75 artists have FALLBACK_SONGS with
         # hardcoded song names.  API calls (AudioDB, Last.fm, YouTube) only add
         # thumbnails/URLs and can hang for minutes on Railway, blocking startup.
@@ -761,4 +694,12 @@ def seed_packs_into_db(db_path: str = "music_legends.db", force_reseed: bool = F
     finally:
         conn.close()
 
+    if inserted:
+        # Raw inserts bypass the Card listeners (stored power, canonical rarity/tier)
+        try:
+            from database import get_db
+            get_db().backfill_catalog()
+        except Exception as e:
+            print(f"⚠️ [SEED_PACKS] Catalog backfill failed (non-critical): {e}")
+
     return {"inserted": inserted, "skipped": skipped, "failed": failed}
@@ -0,0 +1,539 @@
+# services/send_queue.py
+"""
+Discord Send Queue
+One outbound queue for messages the bot sends on its own initiative (drops,
+announcements, alerts, DMs, webhook posts), drained in priority order by a
+single dispatcher per event loop.
+
+Callers hand over a zero-argument coroutine function that does the actual
+send: submit() waits for its result, post() fires and forgets (failures are
+logged) and may be called from any thread. Lower priority values go first and
+equal priorities keep their submission order, so a burst of announcements
+can't hold up a drop or an alert. Followups to a user's own command are not
+queued: they go straight out on the interaction's webhook token.
+
+Every send names a route ("channel:<id>", "dm:<user id>", "webhook:<id>",
+"reactions:<channel id>", see route_for()). Each route has a bucket mirroring Discord's per-route rate
+limits: it starts from a default window and is corrected from the
+X-RateLimit-* headers of responses we can see (webhook posts, HTTPExceptions).
+A send whose bucket is empty waits without blocking other routes; a 429 empties
+the bucket for Retry-After and re-queues the send up to SEND_MAX_RETRIES times.
+Bot-authenticated routes also share a global bucket of SEND_GLOBAL_RATE/s.
+
+post_digest() coalesces repeated alerts: the first entry for a key goes out
+straight away, anything else for that key in the next DIGEST_WINDOW seconds is
+sent as one batch when the window closes. When the dispatcher is cancelled
+(the loop shutting down at the end of asyncio.run() or bot close) it sends the
+digests still open, and anything else queued, for up to SEND_SHUTDOWN_TIMEOUT
+seconds before giving up.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes (lower goes first)
+GAMEPLAY = 0      # drops and other game events
+ALERT = 1         # ops / security alerts
+ANNOUNCEMENT = 2  # announcements, summaries, creator DMs
+
+LANES = {GAMEPLAY: "gameplay", ALERT: "alert", ANNOUNCEMENT: "announcement"}
+
+SEND_CONCURRENCY = int(os.environ.get("SEND_CONCURRENCY", "4"))
+SEND_GLOBAL_RATE = int(os.environ.get("SEND_GLOBAL_RATE", "50"))    # requests/s per bot token
+SEND_MAX_RETRIES = int(os.environ.get("SEND_MAX_RETRIES", "3"))     # re-queues after a 429
+DIGEST_WINDOW = float(os.environ.get("DIGEST_WINDOW", "30"))        # seconds
+SEND_SHUTDOWN_TIMEOUT = float(os.environ.get("SEND_SHUTDOWN_TIMEOUT", "5"))  # seconds
+
+# Default (limit, per seconds) until a response tells us the real bucket
+ROUTE_LIMITS = {
+    "channel": (5, 5.0),
+    "dm": (5, 5.0),
+    "webhook": (5, 2.0),
+    "reactions": (1, 0.25),
+}
+DEFAULT_ROUTE_LIMIT = (5, 5.0)
+
+Send = Callable[[], Awaitable[Any]]
+
+_WEBHOOK_ID = re.compile(r"/webhooks/(\d+)")
+
+
+class SendRateLimited(Exception):
+    """A send was still rate limited after SEND_MAX_RETRIES re-queues"""
+
+    def __init__(self, route: Optional[str], retry_after: float):
+        super().__init__(f"rate limited on {route or 'global'} (retry after {retry_after:.1f}s)")
+        self.route = route
+        self.retry_after = retry_after
+
+
+def route_for(target: Any) -> Optional[str]:
+    """Rate-limit route for a channel, user/member, webhook URL or route string"""
+    if target is None:
+        return None
+    if isinstance(target, str):
+        if target.startswith("http"):
+            match = _WEBHOOK_ID.search(target)
+            return f"webhook:{match.group(1) if match else target}"
+        return target
+    if hasattr(target, "create_dm"):  # discord.User / discord.Member
+        return f"dm:{target.id}"
+    return f"channel:{target.id}"
+
+
+class RouteBucket:
+    """Discord-style bucket: `limit` requests per window, `remaining` left until `reset_at`"""
+
+    def __init__(self, limit: int, per: float):
+        self.limit = max(1, limit)
+        self.per = per
+        self.remaining = self.limit
+        self.reset_at = 0.0
+
+    def wait(self, now: float) -> float:
+        """Seconds until a request may go (0 = now)"""
+        if now >= self.reset_at or self.remaining > 0:
+            return 0.0
+        return self.reset_at - now
+
+    def acquire(self, now: float):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        self.remaining -= 1
+
+    def block(self, retry_after: float, now: float):
+        # Retry-After is authoritative, shorter or longer than our own window
+        self.remaining = 0
+        self.reset_at = now + retry_after
+
+    def update(self, headers, now: float):
+        """Adopt the window from X-RateLimit-Limit / -Remaining / -Reset-After"""
+        limit = _header(headers, "X-RateLimit-Limit")
+        remaining = _header(headers, "X-RateLimit-Remaining")
+        reset_after = _header(headers, "X-RateLimit-Reset-After")
+        if limit is not None:
+            self.limit = max(1, int(limit))
+        if reset_after is not None:
+            self.reset_at = now + reset_after
+            if remaining is not None:
+                self.remaining = int(remaining)
+
+
+class GlobalBucket:
+    """Token bucket refilled at `rate` per second"""
+
+    def __init__(self, rate: int):
+        self.rate = max(1, rate)
+        self.tokens = float(self.rate)
+        self.updated = 0.0
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.updated:
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def acquire(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, retry_after: float, now: float):
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+def _header(headers, name: str) -> Optional[float]:
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate_limit_info(obj) -> Optional[Dict[str, Any]]:
+    """Retry-after and scope if `obj` (response or exception) is a 429, else None"""
+    retry_after = getattr(obj, "retry_after", None)  # discord.RateLimited
+    response = getattr(obj, "response", obj)
+    headers = getattr(response, "headers", None)
+    if retry_after is None:
+        if getattr(obj, "status", None) != 429:
+            return None
+        retry_after = _header(headers, "Retry-After")
+        if retry_after is None:
+            retry_after = _header(headers, "X-RateLimit-Reset-After") or 1.0
+    is_global = str((headers or {}).get("X-RateLimit-Global", "")).lower() == "true" \
+        or (headers or {}).get("X-RateLimit-Scope") == "global"
+    return {"retry_after": float(retry_after), "global": is_global}
+
+
+@dataclass
+class _Pending:
+    send: Send
+    route: Optional[str]
+    future: asyncio.Future
+    enqueued: float
+    attempts: int = 0
+    ready_at: float = 0.0
+    priority: int = ANNOUNCEMENT
+    seq: int = 0
+
+
+@dataclass
+class _Digest:
+    send_batch: Callable[[List[Any]], Awaitable[Any]]
+    priority: int
+    route: Optional[str]
+    window: float
+    entries: List[Any] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class SendQueue:
+    """Priority queue of pending sends, paced per route and globally"""
+
+    def __init__(self, concurrency: int = SEND_CONCURRENCY, global_rate: int = SEND_GLOBAL_RATE,
+                 max_retries: int = SEND_MAX_RETRIES, digest_window: float = DIGEST_WINDOW,
+                 clock: Callable[[], float] = time.monotonic,
+                 shutdown_timeout: float = SEND_SHUTDOWN_TIMEOUT):
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.digest_window = digest_window
+        self.clock = clock
+        self.shutdown_timeout = shutdown_timeout
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heap: List = []
+        self._wake: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._digests: Dict[Hashable, _Digest] = {}
+        self._buckets: Dict[str, RouteBucket] = {}
+        self._bucket_keys: Dict[str, str] = {}
+        self._global = GlobalBucket(global_rate)
+        self._waits = deque(maxlen=500)
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.digests = 0
+
+    # ── loop binding ──────────────────────────────────────────────────────
+
+    def _bind(self, loop: asyncio.AbstractEventLoop):
+        if self._loop is loop:
+            return
+        # First use on this event loop (a new loop per asyncio.run in scripts / tests)
+        lost = sum(len(digest.entries) for digest in self._digests.values())
+        if lost:
+            logger.warning(f"[SEND] previous event loop closed without a shutdown; {lost} digest entries dropped")
+        self._loop = loop
+        self._heap = []
+        self._digests = {}
+        self.in_flight = 0
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._dispatcher = loop.create_task(self._dispatch())
+
+    def bind(self):
+        """Bind to the running event loop so threads can post() before anything was sent"""
+        self._bind(asyncio.get_running_loop())
+
+    def _call(self, func: Callable, *args):
+        """Run func(*args) on the queue's loop, from that loop or any other thread"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            self._bind(loop)
+            func(*args)
+            return
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            logger.warning("[SEND] no running event loop to send on; dropped")
+            return
+        loop.call_soon_threadsafe(func, *args)
+
+    # ── buckets ───────────────────────────────────────────────────────────
+
+    def bucket(self, route: str) -> RouteBucket:
+        key = self._bucket_keys.get(route, route)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RouteBucket(*ROUTE_LIMITS.get(route.split(":", 1)[0], DEFAULT_ROUTE_LIMIT))
+        return bucket
+
+    def observe(self, route: Optional[str], headers, now: Optional[float] = None):
+        """Update a route's bucket from Discord rate-limit headers"""
+        if not route or not headers:
+            return
+        now = self.clock() if now is None else now
+        bucket_id = headers.get("X-RateLimit-Bucket") or headers.get("x-ratelimit-bucket")
+        if bucket_id:
+            # Routes sharing a bucket hash share one window
+            key = f"bucket:{bucket_id}"
+            if key not in self._buckets:
+                self._buckets[key] = self.bucket(route)
+            self._bucket_keys[route] = key
+        self.bucket(route).update(headers, now)
+
+    def _wait_for(self, item: _Pending, now: float) -> float:
+        wait = max(0.0, item.ready_at - now)
+        if item.route is not None:
+            wait = max(wait, self.bucket(item.route).wait(now))
+        if not (item.route or "").startswith("webhook:"):
+            wait = max(wait, self._global.wait(now))
+        return wait
+
+    def _acquire(self, item: _Pending, now: float):
+        if item.route is not None:
+            self.bucket(item.route).acquire(now)
+        if not (item.route or "").startswith("webhook:"):
+            self._global.acquire(now)
+
+    # ── dispatch ──────────────────────────────────────────────────────────
+
+    def _push(self, item: _Pending):
+        heapq.heappush(self._heap, (item.priority, item.seq, item))
+        self._idle.clear()
+        self._wake.set()
+
+    def _start_ready(self) -> Optional[float]:
+        """Start every send whose buckets allow it; seconds until the next one might"""
+        now = self.clock()
+        held, next_wait = [], None
+        while self._heap and self.in_flight < self.concurrency:
+            entry = heapq.heappop(self._heap)
+            item = entry[2]
+            if item.future.cancelled():
+                continue
+            wait = self._wait_for(item, now)
+            if wait > 0:
+                held.append(entry)
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+                continue
+            self._acquire(item, now)
+            self.in_flight += 1
+            self._waits.append(now - item.enqueued)
+            self._loop.create_task(self._run(item))
+        for entry in held:
+            heapq.heappush(self._heap, entry)
+        self._check_idle()
+        return next_wait
+
+    async def _dispatch(self):
+        try:
+            while True:
+                await self._step()
+        except asyncio.CancelledError:
+            await self._shutdown()
+            raise
+
+    async def _step(self):
+        self._wake.clear()
+        delay = self._start_ready()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _shutdown(self):
+        """The loop is going away: send the open digests and whatever is still queued"""
+        for key in list(self._digests):
+            self._flush_digest(key, final=True)
+        if self._idle.is_set():
+            return
+
+        async def drain():
+            while not self._idle.is_set():
+                await self._step()
+
+        try:
+            await asyncio.wait_for(drain(), timeout=self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[SEND] shutting down with {self.depth} sends still queued; dropped")
+
+    async def _run(self, item: _Pending):
+        try:
+            try:
+                result = await item.send()
+            except Exception as e:
+                limited = _rate_limit_info(e)
+                if limited is None:
+                    self.failed += 1
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                    return
+                self.observe(item.route, getattr(getattr(e, "response", None), "headers", None))
+                self._retry(item, limited, e)
+                return
+            self.observe(item.route, getattr(result, "headers", None))
+            limited = _rate_limit_info(result) if hasattr(result, "status") else None
+            if limited is not None:
+                self._retry(item, limited, None)
+                return
+            self.sent += 1
+            if not item.future.done():
+                item.future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            self._check_idle()
+            self._wake.set()
+
+    def _retry(self, item: _Pending, limited: Dict[str, Any], error: Optional[Exception]):
+        now = self.clock()
+        self.rate_limited += 1
+        retry_after = limited["retry_after"]
+        if limited["global"] or item.route is None:
+            self._global.block(retry_after, now)
+        else:
+            self.bucket(item.route).block(retry_after, now)
+        logger.warning(f"[SEND] 429 on {item.route or 'global'}, retry after {retry_after:.2f}s "
+                       f"(attempt {item.attempts + 1})")
+        item.attempts += 1
+        if item.attempts > self.max_retries:
+            self.failed += 1
+            if not item.future.done():
+                item.future.set_exception(error or SendRateLimited(item.route, retry_after))
+            return
+        self.retries += 1
+        item.ready_at = now + retry_after
+        self._push(item)
+
+    def _check_idle(self):
+        if not self._heap and self.in_flight == 0:
+            self._idle.set()
+
+    # ── public API ────────────────────────────────────────────────────────
+
+    def _new_item(self, send: Send, priority: int, route: Optional[str]) -> _Pending:
+        with self._lock:
+            seq = next(self._seq)
+        return _Pending(send=send, route=route, future=self._loop.create_future(),
+                        enqueued=self.clock(), priority=priority, seq=seq)
+
+    def _enqueue(self, send: Send, priority: int, route: Optional[str]) -> asyncio.Future:
+        self._bind(asyncio.get_running_loop())
+        item = self._new_item(send, priority, route)
+        self._push(item)
+        return item.future
+
+    async def submit(self, send: Send, priority: int = ANNOUNCEMENT, route: Optional[str] = None) -> Any:
+        """Queue a send and wait for its result (exceptions propagate)"""
+        return await self._enqueue(send, priority, route)
+
+    def post(self, send: Send, priority: int = ANNOUNCEMENT,
+             route: Optional[str] = None) -> Optional[asyncio.Future]:
+        """Queue a send without waiting; a failure is only logged. Safe from any thread
+        (the future is only returned when called on the queue's loop)."""
+        futures = []
+
+        def enqueue():
+            future = self._enqueue(send, priority, route)
+            future.add_done_callback(_log_failure)
+            futures.append(future)
+
+        self._call(enqueue)
+        return futures[0] if futures else None
+
+    def post_digest(self, key: Hashable, entry: Any, send_batch: Callable[[List[Any]], Awaitable[Any]],
+                    priority: int = ALERT, route: Optional[str] = None,
+                    window: Optional[float] = None) -> Optional[asyncio.Future]:
+        """Send `entry` now, or fold it into the digest for `key` if one went out in the last
+        `window` seconds. send_batch(entries) does the send; returns the queued future, or None
+        when coalesced (or called off the loop). Safe from any thread."""
+        window = self.digest_window if window is None else window
+        futures = []
+
+        def add():
+            digest = self._digests.get(key)
+            if digest is not None:
+                digest.entries.append(entry)
+                self.coalesced += 1
+                return
+            digest = self._digests[key] = _Digest(send_batch, priority, route, window)
+            futures.append(self.post(lambda: send_batch([entry]), priority, route))
+            digest.timer = self._loop.call_later(window, self._flush_digest, key)
+
+        self._call(add)
+        return futures[0] if futures else None
+
+    def _flush_digest(self, key: Hashable, final: bool = False):
+        digest = self._digests.pop(key, None)
+        if digest is None:
+            return
+        if digest.timer is not None:
+            digest.timer.cancel()
+        if not digest.entries:
+            return
+        self.digests += 1
+        entries = digest.entries
+        self.post(lambda: digest.send_batch(entries), digest.priority, digest.route)
+        if final:
+            return
+        # Keep folding while the burst lasts: at most one digest per window
+        self._digests[key] = _Digest(digest.send_batch, digest.priority, digest.route, digest.window)
+        self._digests[key].timer = self._loop.call_later(digest.window, self._flush_digest, key)
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def depth_by_lane(self) -> Dict[str, int]:
+        counts = {name: 0 for name in LANES.values()}
+        for priority, _, _ in self._heap:
+            name = LANES.get(priority, str(priority))
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    async def join(self):
+        """Wait until everything queued so far has been sent"""
+        if self._idle is not None and self._loop is asyncio.get_running_loop():
+            await self._idle.wait()
+
+    def status(self) -> Dict[str, Any]:
+        now = self.clock()
+        waits = list(self._waits)
+        limited = sum(1 for bucket in set(self._buckets.values()) if bucket.wait(now) > 0)
+        return {"depth": self.depth, "lanes": self.depth_by_lane(), "in_flight": self.in_flight,
+                "concurrency": self.concurrency, "sent": self.sent, "failed": self.failed,
+                "rate_limited": self.rate_limited, "retries": self.retries,
+                "coalesced": self.coalesced, "digests": self.digests,
+                "pending_digests": sum(len(digest.entries) for digest in self._digests.values()),
+                "buckets": len(set(self._buckets.values())), "buckets_limited": limited,
+                "wait_avg_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "wait_max_ms": round(max(waits) * 1000, 1) if waits else 0.0}
+
+
+def _log_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"[SEND] queued send failed: {future.exception()}")
+
+
+# Global send queue instance
+send_queue = SendQueue()
@@ -0,0 +1,348 @@
+# services/sharding.py
+"""
+Shards and Leadership
+Which Discord shards this process runs, which process runs the singleton
+background jobs, and per-shard gateway metrics.
+
+SHARD_COUNT / SHARD_IDS (config): unset, discord.py picks the shard count and
+this one process runs every shard. With SHARD_IDS set each process runs its
+slice of SHARD_COUNT (e.g. SHARD_COUNT=4 with SHARD_IDS=0,1 and SHARD_IDS=2,3).
+
+A guild's events always arrive on shard (guild_id >> 22) % shard_count, so
+per-guild state (drops, channel views) is local to the process that owns the
+guild: owns_guild() says whether that is us. Battles are shared through the
+battle store (BATTLE_STORE=redis) with process_name() as their owner.
+
+Leader election: one process holds the lease `leader:{name}` in Redis
+(SET NX PX, renewed every ttl / 3 by compare-and-pexpire). Jobs that must run
+once across all processes check is_leader(). A leader that cannot renew stops
+believing it leads when its lease runs out, before anyone else can take it.
+With a single process (or LEADER_ELECTION=local) this process always leads.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Leader election settings
+LEADER_ELECTION = os.environ.get("LEADER_ELECTION", "auto").lower()  # auto | redis | local
+LEADER_TTL = float(os.environ.get("LEADER_TTL", "15"))
+LEADER_KEY_PREFIX = "leader:"
+
+# Extend the lease only while we still hold it
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RESIGN_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# ----------------------------------------------------------------------
+# Shards
+# ----------------------------------------------------------------------
+
+def shard_config() -> Dict[str, Any]:
+    """Keyword arguments for AutoShardedBot (shard_count / shard_ids)"""
+    from config import settings
+    ids = sorted(set(settings.SHARD_IDS or []))
+    count = settings.SHARD_COUNT
+    if ids:
+        if not count:
+            raise ValueError("SHARD_IDS needs SHARD_COUNT")
+        if ids[-1] >= count:
+            raise ValueError(f"SHARD_IDS {ids} out of range for SHARD_COUNT={count}")
+        return {"shard_count": count, "shard_ids": ids}
+    return {"shard_count": count} if count else {}
+
+
+def is_multi_process() -> bool:
+    """True when other processes run the remaining shards"""
+    config = shard_config()
+    return bool(config.get("shard_ids")) and len(config["shard_ids"]) < config["shard_count"]
+
+
+def process_name() -> str:
+    """Stable name of this process: its shard ids, or "0" when it runs them all"""
+    ids = shard_config().get("shard_ids")
+    return "-".join(str(i) for i in ids) if ids else "0"
+
+
+def shard_for_guild(guild_id, shard_count: int) -> int:
+    """Shard Discord delivers a guild's events on"""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def owns_guild(guild_id) -> bool:
+    """Whether this process runs the shard for guild_id"""
+    config = shard_config()
+    if not config.get("shard_ids"):
+        return True
+    return shard_for_guild(guild_id, config["shard_count"]) in config["shard_ids"]
+
+
+# ----------------------------------------------------------------------
+# Leadership
+# ----------------------------------------------------------------------
+
+class LocalLeadership:
+    """Single-process deployment: always the leader"""
+
+    backend = "local"
+
+    def __init__(self, name: str = "bot"):
+        self.name = name
+        self.identity = process_name()
+
+    @property
+    def is_leader(self) -> bool:
+        return True
+
+    def campaign(self) -> bool:
+        return True
+
+    def start(self):
+        pass
+
+    async def resign(self):
+        pass
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "name": self.name, "identity": self.identity,
+                "is_leader": True, "elections_won": 0, "leaderships_lost": 0}
+
+
+class LeaderElection:
+    """Redis lease held by at most one process; campaign() every ttl / 3"""
+
+    backend = "redis"
+
+    def __init__(self, name: str = "bot", ttl: float = LEADER_TTL,
+                 connection=None, identity: Optional[str] = None):
+        if connection is None:
+            from rq_queue.redis_connection import get_redis_connection
+            connection = get_redis_connection()
+        self.redis = connection
+        self.name = name
+        self.key = LEADER_KEY_PREFIX + name
+        self.ttl = ttl
+        self.identity = identity or f"{process_name()}:{uuid.uuid4().hex[:8]}"
+        self._renew = self.redis.register_script(_RENEW_SCRIPT)
+        self._resign = self.redis.register_script(_RESIGN_SCRIPT)
+        self._lock = threading.Lock()
+        self._leader = False
+        self._lease_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.elections_won = 0
+        self.leaderships_lost = 0
+
+    @property
+    def is_leader(self) -> bool:
+        # A lease we could not renew is only trusted until it would have expired
+        return self._leader and time.monotonic() < self._lease_until
+
+    def campaign(self) -> bool:
+        """Renew our lease, or try to take a free one. Returns is_leader."""
+        ttl_ms = int(self.ttl * 1000)
+        started = time.monotonic()
+        with self._lock:
+            try:
+                if self._leader:
+                    held = bool(self._renew(keys=[self.key], args=[self.identity, ttl_ms]))
+                else:
+                    held = bool(self.redis.set(self.key, self.identity, nx=True, px=ttl_ms))
+            except Exception as e:
+                logger.warning(f"[SHARD] leader election for {self.key} failed: {e}")
+                return self.is_leader
+
+            if held:
+                if not self._leader:
+                    self.elections_won += 1
+                    logger.info(f"[SHARD] {self.identity} is now leader of {self.name}")
+                self._leader = True
+                self._lease_until = started + self.ttl
+            elif self._leader:
+                self.leaderships_lost += 1
+                self._leader = False
+                logger.warning(f"[SHARD] {self.identity} lost leadership of {self.name}")
+            return self.is_leader
+
+    async def _campaign_loop(self):
+        interval = max(self.ttl / 3, 0.1)
+        while True:
+            await asyncio.to_thread(self.campaign)
+            await asyncio.sleep(interval)
+
+    def start(self):
+        """Keep campaigning in the background (needs a running loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._campaign_loop())
+
+    async def resign(self):
+        """Stop campaigning and free the lease for another process"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        with self._lock:
+            was_leader, self._leader = self._leader, False
+        if was_leader:
+            try:
+                await asyncio.to_thread(self._resign, keys=[self.key], args=[self.identity])
+            except Exception as e:
+                logger.warning(f"[SHARD] could not resign {self.key}: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        try:
+            holder = self.redis.get(self.key)
+        except Exception:
+            holder = None
+        return {"backend": self.backend, "name": self.name, "identity": self.identity,
+                "is_leader": self.is_leader, "holder": holder,
+                "elections_won": self.elections_won, "leaderships_lost": self.leaderships_lost}
+
+
+_leadership = None
+
+
+def create_leadership(name: str = "bot"):
+    """Backend chosen by LEADER_ELECTION (auto | redis | local).
+
+    auto elects through Redis only when other processes run the remaining
+    shards; a lone process is always leader."""
+    backend = LEADER_ELECTION
+    if backend == "auto":
+        backend = "redis" if is_multi_process() else "local"
+    if backend == "redis":
+        try:
+            return LeaderElection(name)
+        except Exception as e:
+            logger.warning(f"[SHARD] Redis leader election unavailable, running as local leader: {e}")
+    return LocalLeadership(name)
+
+
+def get_leadership():
+    """Process-wide leadership"""
+    global _leadership
+    if _leadership is None:
+        _leadership = create_leadership()
+    return _leadership
+
+
+def is_leader() -> bool:
+    """Whether singleton jobs should run in this process"""
+    return get_leadership().is_leader
+
+
+# ----------------------------------------------------------------------
+# Per-shard metrics
+# ----------------------------------------------------------------------
+
+class ShardMetrics:
+    """Gateway latency, connection churn and event throughput per shard.
+
+    Messages and interactions are attributed to the shard of their guild (DMs
+    arrive on shard 0); all other gateway events are counted per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._since = time.monotonic()
+        self._shards: Dict[int, Dict[str, Any]] = {}
+        self.gateway_events = 0
+
+    def _shard(self, shard_id: int) -> Dict[str, Any]:
+        shard = self._shards.get(shard_id)
+        if shard is None:
+            shard = self._shards[shard_id] = {
+                "events": 0, "connects": 0, "disconnects": 0, "resumes": 0, "last_ready": None,
+            }
+        return shard
+
+    def record(self, shard_id: Optional[int], field: str):
+        with self._lock:
+            self._shard(shard_id or 0)[field] += 1
+
+    def record_gateway_event(self):
+        with self._lock:
+            self.gateway_events += 1
+
+    def mark_ready(self, shard_id: int):
+        with self._lock:
+            self._shard(shard_id)["last_ready"] = time.time()
+
+    def attach(self, bot):
+        """Register listeners on a discord.py bot"""
+
+        async def on_socket_event_type(event_type):
+            self.record_gateway_event()
+
+        async def on_message(message):
+            self.record(getattr(message.guild, "shard_id", 0), "events")
+
+        async def on_interaction(interaction):
+            self.record(getattr(interaction.guild, "shard_id", 0), "events")
+
+        async def on_shard_connect(shard_id):
+            self.record(shard_id, "connects")
+
+        async def on_shard_disconnect(shard_id):
+            self.record(shard_id, "disconnects")
+
+        async def on_shard_resumed(shard_id):
+            self.record(shard_id, "resumes")
+
+        async def on_shard_ready(shard_id):
+            self.mark_ready(shard_id)
+
+        for listener in (on_socket_event_type, on_message, on_interaction, on_shard_connect,
+                         on_shard_disconnect, on_shard_resumed, on_shard_ready):
+            bot.add_listener(listener)
+
+    def snapshot(self, bot=None) -> Dict[str, Any]:
+        """Per-shard counters, with live gateway latency when bot is given"""
+        latencies = {}
+        if bot is not None:
+            for shard_id, latency in getattr(bot, "latencies", None) or [(0, bot.latency)]:
+                latencies[shard_id] = latency
+        minutes = max((time.monotonic() - self._since) / 60, 1e-9)
+        with self._lock:
+            shard_ids = sorted(set(self._shards) | set(latencies))
+            shards = []
+            for shard_id in shard_ids:
+                stats = dict(self._shard(shard_id))
+                latency = latencies.get(shard_id)
+                stats["shard_id"] = shard_id
+                stats["latency_ms"] = round(latency * 1000, 1) if latency is not None and math.isfinite(latency) else None
+                stats["events_per_min"] = round(stats["events"] / minutes, 2)
+                shards.append(stats)
+            return {
+                "process": process_name(),
+                "uptime_s": round(time.monotonic() - self._since, 1),
+                "gateway_events": self.gateway_events,
+                "gateway_events_per_min": round(self.gateway_events / minutes, 2),
+                "shards": shards,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._shards.clear()
+            self.gateway_events = 0
+            self._since = time.monotonic()
+
+
+# Global metrics instance
+shard_metrics = ShardMetrics()
@@ -0,0 +1,172 @@
+# services/startup.py
+"""
+Bot Startup Profile
+Cog loading with import pre-warming, per-phase / per-cog timings and a boot
+history.
+
+discord.py executes every extension module itself (load_extension never
+reuses sys.modules), so cogs are still loaded one at a time on the event
+loop. What can overlap is importing what they depend on: the modules each
+cog imports at top level are found with `ast` and imported from a small
+thread pool first, so the disk reads and module bodies of database, views,
+services, ... are no longer paid serially inside whichever load_extension
+needs them first. A dependency that fails to import in a worker is simply
+left for the cog load to import (and report) on the main thread.
+
+Module bodies hold the GIL, so this only pays off when imports wait on I/O
+(cold volumes, network filesystems); it is off unless STARTUP_PREWARM=1.
+
+Each boot appends one JSON line to STARTUP_HISTORY; scripts/bench_startup.py
+prints the trend and profiles import cost per module.
+"""
+
+import ast
+import asyncio
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PREWARM = os.environ.get("STARTUP_PREWARM", "0").lower() in ("1", "true", "yes")
+PREWARM_WORKERS = int(os.environ.get("STARTUP_PREWARM_WORKERS", "4"))
+STARTUP_HISTORY = os.environ.get("STARTUP_HISTORY", "logs/startup_history.jsonl")
+
+
+def _top_level_imports(tree: ast.Module) -> List[str]:
+    """Absolute modules imported at module level (including inside
+    top-level try / if blocks, not inside functions)"""
+    names: List[str] = []
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level == 0 and node.module:
+                names.append(node.module)
+        elif isinstance(node, (ast.Try, ast.If)):
+            pending[:0] = node.body + node.orelse + getattr(node, "finalbody", []) + [
+                stmt for handler in getattr(node, "handlers", []) for stmt in handler.body
+            ]
+    return names
+
+
+def cog_dependencies(cog: str) -> List[str]:
+    """Modules `cog` imports at top level, in source order"""
+    try:
+        spec = importlib.util.find_spec(cog)
+    except (ImportError, ValueError):
+        return []
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return []
+    with open(spec.origin, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=spec.origin)
+    return list(dict.fromkeys(_top_level_imports(tree)))
+
+
+def _import_quietly(name: str) -> Optional[str]:
+    try:
+        importlib.import_module(name)
+        return None
+    except (Exception, SystemExit) as e:  # a module body calling exit() must not kill a worker
+        return f"{type(e).__name__}: {e}"
+
+
+class StartupProfile:
+    """Timings for one bot boot"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self.phases: Dict[str, float] = {}
+        self.cogs: Dict[str, float] = {}
+        self.failed: List[str] = []
+
+    def mark(self, phase: str) -> float:
+        """End `phase`: the time since the previous mark (or since start)"""
+        now = time.perf_counter()
+        elapsed = now - self._last_mark
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+        self._last_mark = now
+        return elapsed
+
+    async def prewarm(self, cogs: Iterable[str], workers: int = PREWARM_WORKERS) -> int:
+        """Import the cogs' dependencies concurrently. Returns modules imported."""
+        names = []
+        for cog in cogs:
+            names.extend(cog_dependencies(cog))
+        names = [n for n in dict.fromkeys(names) if n not in sys.modules]
+        if not names:
+            return 0
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cog-prewarm") as pool:
+            errors = await asyncio.gather(
+                *(loop.run_in_executor(pool, _import_quietly, name) for name in names)
+            )
+        for name, error in zip(names, errors):
+            if error:
+                logger.debug(f"[STARTUP] prewarm of {name} deferred to cog load: {error}")
+        return len(names)
+
+    async def load_extension(self, bot, cog: str):
+        """bot.load_extension with timing; exceptions propagate"""
+        start = time.perf_counter()
+        try:
+            await bot.load_extension(cog)
+        except Exception:
+            self.failed.append(cog)
+            raise
+        finally:
+            self.cogs[cog] = time.perf_counter() - start
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self, slowest: int = 5) -> str:
+        phases = ", ".join(f"{name} {secs:.2f}s" for name, secs in self.phases.items())
+        cogs = sorted(self.cogs.items(), key=lambda item: item[1], reverse=True)[:slowest]
+        slow = ", ".join(f"{name} {secs:.2f}s" for name, secs in cogs)
+        return f"Startup {self.total:.2f}s ({phases}); slowest cogs: {slow or 'none'}"
+
+    def record(self, path: str = STARTUP_HISTORY) -> dict:
+        """Append this boot to the startup history (best effort)"""
+        entry = {
+            "at": datetime.utcnow().isoformat(timespec="seconds"),
+            "total_s": round(self.total, 3),
+            "phases": {name: round(secs, 3) for name, secs in self.phases.items()},
+            "cogs": {name: round(secs, 3) for name, secs in self.cogs.items()},
+            "failed": self.failed,
+            "prewarm": PREWARM,
+        }
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.warning(f"[STARTUP] could not record startup history: {e}")
+        return entry
+
+
+def read_history(path: str = STARTUP_HISTORY, last: int = 20) -> List[dict]:
+    """The last `last` recorded boots, oldest first"""
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return entries[-last:]
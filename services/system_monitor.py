@@ -323,43 +323,72 @@ class SystemMonitor:
         fields: Dict[str, str] = None,
         color_name: str = 'blue'
     ) -> None:
-        """Post formatted alert to Discord channel"""
+        """Post formatted alert to Discord channel (repeats within DIGEST_WINDOW are folded into one digest)"""
         try:
-            import discord
-            
-            color_map = {
-                'red': discord.Color.red(),
-                'orange': discord.Color.orange(),
-                'yellow': discord.Color.yellow(),
-                'green': discord.Color.green(),
-                'blue': discord.Color.blue(),
-            }
-            
-            embed = discord.Embed(
-                title=title,
-                description=description,
-                color=color_map.get(color_name, discord.Color.blue()),
-                timestamp=datetime.now()
-            )
-            
-            if fields:
-                for field_name, field_value in fields.items():
-                    embed.add_field(name=field_name, value=str(field_value), inline=True)
-            
-            embed.set_footer(text="Music Legends System Monitor")
+            from services.send_queue import ALERT, route_for, send_queue
             
             # Find dev/admin channel
-            if self.bot:
-                for guild in self.bot.guilds:
-                    for channel in guild.channels:
-                        if any(name in channel.name.lower() for name in 
-                               ['dev-logs', 'admin-logs', 'system-logs', 'bot-logs']):
-                            await channel.send(embed=embed)
-                            return
+            channel = self._find_alert_channel()
+            if channel is None:
+                return
+            
+            entry = {
+                'description': description,
+                'fields': fields or {},
+                'color_name': color_name,
+                'timestamp': datetime.now(),
+            }
+            future = send_queue.post_digest(
+                (channel.id, title), entry,
+                lambda entries: channel.send(embed=self._alert_embed(title, entries)),
+                priority=ALERT, route=route_for(channel)
+            )
+            if future is not None:
+                await future
         
         except Exception as e:
             logger.error(f"Error posting alert to channel: {e}")
     
+    def _find_alert_channel(self):
+        """First dev/admin log channel the bot can see"""
+        if self.bot:
+            for guild in self.bot.guilds:
+                for channel in guild.channels:
+                    if any(name in channel.name.lower() for name in 
+                           ['dev-logs', 'admin-logs', 'system-logs', 'bot-logs']):
+                        return channel
+        return None
+    
+    def _alert_embed(self, title: str, entries: list):
+        """Alert embed for the latest entry, marked as a digest when several were coalesced"""
+        import discord
+        
+        color_map = {
+            'red': discord.Color.red(),
+            'orange': discord.Color.orange(),
+            'yellow': discord.Color.yellow(),
+            'green': discord.Color.green(),
+            'blue': discord.Color.blue(),
+        }
+        
+        latest = entries[-1]
+        embed = discord.Embed(
+            title=title if len(entries) == 1 else f"{title} (×{len(entries)})",
+            description=latest['description'],
+            color=color_map.get(latest['color_name'], discord.Color.blue()),
+            timestamp=latest['timestamp']
+        )
+        
+        for field_name, field_value in latest['fields'].items():
+            embed.add_field(name=field_name, value=str(field_value), inline=True)
+        
+        if len(entries) > 1:
+            since = entries[0]['timestamp'].strftime('%H:%M:%S')
+            embed.set_footer(text=f"Music Legends System Monitor · {len(entries)} alerts since {since}")
+        else:
+            embed.set_footer(text="Music Legends System Monitor")
+        return embed
+    
     def _severity_to_color_name(self, severity: str) -> str:
         """Convert severity to color name"""
         return {
@@ -10,7 +10,7 @@ FIXED: All stub functions replaced with actual database operations
 
 All operations are ATOMIC - either all succeed or all fail (no partial trades)
 """
-from rq_queue.locks import RedisLock
+from rq_queue.locks import RedisLock, users_lock
 from models.trade import Trade, TradeSQLite
 from datetime import datetime, timedelta
 from database import get_db
@@ -39,11 +39,9 @@ def finalize(trade_id: str):
         print(f"❌ [TRADE_SERVICE] Trade {trade_id} not found")
         return False
 
-    # Lock BOTH users to prevent concurrent modifications
-    lock_key = f"trade:{trade['initiator_user_id']}:{trade['receiver_user_id']}"
-
+    # Lock BOTH users (in a fixed order) to prevent concurrent modifications
     try:
-        with RedisLock(lock_key):
+        with users_lock(trade['initiator_user_id'], trade['receiver_user_id']):
             # Use database manager's complete_trade method
             # This handles all the card/gold transfers atomically
             result = db.complete_trade(trade_id)
@@ -315,9 +313,7 @@ def finalize_with_db(session, trade_id: str):
         return False
     
     # Lock BOTH users
-    lock_key = f"trade:{trade.user_a}:{trade.user_b}"
-    
-    with RedisLock(lock_key):
+    with users_lock(trade.user_a, trade.user_b):
         # Use database transaction
         try:
             # Get fresh trade data
@@ -0,0 +1,181 @@
+# services/write_behind.py
+"""
+Write-Behind Buffers
+Keyed in-memory buffers whose rows are written in one batch every few seconds
+by a single process-wide flusher thread (and once more at exit).
+
+A buffer holds pending rows by key: update() folds a new event into the row
+for its key, flush() swaps the rows out and hands them to the buffer's write
+function in one call. If the write raises, the rows go back ahead of anything
+recorded since (merged with it when the buffer has a merge function, otherwise
+the newer row wins) and are retried on the next flush, at most max_retries
+times before they are dropped with a warning.
+
+Buffers join the flusher on their first update and leave it on close(), so a
+closed database never gets flushed at exit.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# How often the flusher wakes to look for due buffers
+TICK_SECONDS = 0.5
+
+
+class WriteBehindBuffer:
+    """Pending rows by key, written in batches by the shared flusher"""
+
+    def __init__(self, name: str, write: Callable[[Dict[Hashable, Any]], int], interval: float,
+                 merge: Optional[Callable[[Any, Any], Any]] = None, max_retries: int = 5,
+                 on_tick: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.interval = interval
+        self.max_retries = max_retries
+        self._write = write
+        self._merge = merge
+        self._on_tick = on_tick
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._pending: Dict[Hashable, Any] = {}
+        self._attempts: Dict[Hashable, int] = {}
+        self._registered = False
+        self._closed = False
+        self._next_due = 0.0
+        self.written = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pending
+
+    def update(self, key: Hashable, fold: Callable[[Optional[Any]], Any]) -> int:
+        """pending[key] = fold(pending.get(key)); returns the number of pending rows"""
+        with self._lock:
+            self._pending[key] = fold(self._pending.get(key))
+            size = len(self._pending)
+            register = not self._registered and not self._closed
+            self._registered = True
+        if register:
+            self._next_due = time.monotonic() + self.interval
+            flusher.add(self)
+        return size
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._attempts.pop(key, None)
+
+    def flush(self) -> int:
+        """Write everything pending. Returns rows written."""
+        # Serialised so a failed batch is put back ahead of newer rows
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+            try:
+                written = self._write(pending)
+            except Exception as e:
+                logger.warning(f"[FLUSH] {self.name} flush failed ({len(pending)} rows): {e}")
+                self._restore(pending)
+                return 0
+            with self._lock:
+                for key in pending:
+                    self._attempts.pop(key, None)
+            self.written += written
+            return written
+
+    def _restore(self, pending: Dict[Hashable, Any]):
+        with self._lock:
+            merged: Dict[Hashable, Any] = {}
+            for key, row in pending.items():
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts > self.max_retries:
+                    self._attempts.pop(key, None)
+                    self.dropped += 1
+                    logger.warning(f"[FLUSH] {self.name}: dropping {key!r} after {self.max_retries} failed flushes")
+                    continue
+                self._attempts[key] = attempts
+                merged[key] = row
+            for key, row in self._pending.items():
+                if key in merged and self._merge is not None:
+                    merged[key] = self._merge(merged[key], row)
+                else:
+                    merged[key] = row
+            self._pending = merged
+
+    def tick(self, now: float):
+        """Called by the flusher: flush if the interval has passed"""
+        if now < self._next_due:
+            return
+        self._next_due = now + self.interval
+        self.flush()
+        if self._on_tick is not None:
+            self._on_tick()
+
+    def close(self, flush: bool = True) -> int:
+        """Leave the flusher; write what is pending first unless flush=False"""
+        written = self.flush() if flush else 0
+        with self._lock:
+            self._closed = True
+            if not flush:
+                self._pending = {}
+        flusher.remove(self)
+        return written
+
+
+class _Flusher:
+    """One daemon thread flushing every registered buffer when it is due"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffers = []
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, buffer: WriteBehindBuffer):
+        with self._lock:
+            if buffer not in self._buffers:
+                self._buffers.append(buffer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind-flush", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush_all)
+
+    def remove(self, buffer: WriteBehindBuffer):
+        with self._lock:
+            if buffer in self._buffers:
+                self._buffers.remove(buffer)
+
+    def buffers(self):
+        with self._lock:
+            return list(self._buffers)
+
+    def _run(self):
+        while True:
+            time.sleep(TICK_SECONDS)
+            now = time.monotonic()
+            for buffer in self.buffers():
+                try:
+                    buffer.tick(now)
+                except Exception as e:
+                    logger.warning(f"[FLUSH] {buffer.name} tick failed: {e}")
+
+    def flush_all(self) -> int:
+        written = 0
+        for buffer in self.buffers():
+            try:
+                written += buffer.flush()
+            except Exception as e:
+                logger.warning(f"[FLUSH] {buffer.name} final flush failed: {e}")
+        return written
+
+
+# Process-wide flusher shared by every buffer
+flusher = _Flusher()
@@ -1,17 +1,15 @@
 # services/youtube_client.py
 import os
 import asyncio
+import importlib.util
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 
 YOUTUBE_KEY = os.getenv("YOUTUBE_API_KEY") or os.getenv("YOUTUBE_KEY")
 
-# Import Google API client
-try:
-    from googleapiclient.discovery import build
-    GOOGLE_API_AVAILABLE = True
-except ImportError:
-    GOOGLE_API_AVAILABLE = False
+# Google API client is imported on first use; probing is cheap
+GOOGLE_API_AVAILABLE = importlib.util.find_spec("googleapiclient") is not None
+if not GOOGLE_API_AVAILABLE:
     print("google-api-python-client not installed - using mock data only")
 
 class YouTubeClient:
@@ -19,8 +17,23 @@ class YouTubeClient:
     
     def __init__(self):
         self.api_key = YOUTUBE_KEY
-        self.youtube = None
-        
+        self._youtube = None
+        self._youtube_built = False
+
+    @property
+    def youtube(self):
+        """Google API service object, built on first request (None = mock data)"""
+        if not self._youtube_built:
+            self._youtube_built = True
+            self._youtube = self._build_service()
+        return self._youtube
+
+    @youtube.setter
+    def youtube(self, value):
+        self._youtube = value
+        self._youtube_built = True
+
+    def _build_service(self):
         # Log API key status
         if self.api_key:
             print(f"✅ YouTube API key found (length: {len(self.api_key)})")
@@ -30,15 +43,17 @@ class YouTubeClient:
         # Initialize YouTube client if API available and key configured
         if GOOGLE_API_AVAILABLE and self.api_key:
             try:
-                self.youtube = build("youtube", "v3", developerKey=self.api_key)
+                from googleapiclient.discovery import build
+                service = build("youtube", "v3", developerKey=self.api_key)
                 print("✅ YouTube API client initialized successfully - REAL DATA MODE")
+                return service
             except Exception as e:
                 print(f"❌ Failed to initialize YouTube client: {e}")
-                self.youtube = None
         elif not GOOGLE_API_AVAILABLE:
             print("❌ google-api-python-client not installed")
         else:
             print("⚠️ YouTube API key missing - using MOCK DATA")
+        return None
     
     def _check_api_key(self) -> bool:
         """Check if API key is configured"""
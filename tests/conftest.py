@@ -99,6 +99,16 @@ def _make_sqlite_db(tmp_path_factory):
 # Fixtures
 # ─────────────────────────────────────────────
 
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Treat each test body (not its fixtures' schema setup) as one request for
+    query metrics: a statement shape repeated DB_N_PLUS_ONE_THRESHOLD times
+    raises NPlusOneWarning."""
+    from services.query_metrics import query_metrics
+    with query_metrics.scope(f"test:{item.name}", warn=True):
+        yield
+
+
 def _get_backends(config):
     """Determine which backends to test."""
     use_pg = config.getoption("--pg", default=False)
@@ -8,6 +8,7 @@ import sys
 import json
 import uuid
 import sqlite3
+import time
 import pytest
 
 # Force SQLite mode (no DATABASE_URL)
@@ -261,6 +262,211 @@ class TestBattleEngine:
         finally:
             pass
 
+    def test_artist_card_power_table_boundaries(self):
+        from discord_cards import ArtistCard
+        cases = [(9_999_999, "common", 20, "D"), (10_000_000, "common", 30, "D"),
+                 (50_000_000, "rare", 50, "C"), (100_000_000, "epic", 70, "B"),
+                 (500_000_000, "legendary", 90, "S"), (1_000_000_000, "Mythic", 110, "S"),
+                 (0, "unknown", 20, "D")]
+        for views, rarity, power, tier in cases:
+            card = ArtistCard("c", "A", "S", "", "", views, "", rarity=rarity)
+            assert (card.power, card.tier) == (power, tier)
+        assert not hasattr(card, "__dict__") and not hasattr(card, "foil")
+        roundtrip = ArtistCard.from_dict(card.to_dict())
+        assert roundtrip.to_dict() == card.to_dict()
+
+
+# ─────────────────────────────────────────────
+# 2b. BattleManager — active battle store
+# ─────────────────────────────────────────────
+
+class TestBattleManager:
+
+    def _battle_card(self, owner_id):
+        from battle_engine import BattleCard
+        from discord_cards import ArtistCard
+        card = ArtistCard(card_id=f"card_{owner_id}", artist="Artist", song="Song",
+                          youtube_url="", youtube_id="", view_count=10_000_000,
+                          thumbnail="", rarity="rare")
+        return BattleCard(card, owner_id, f"name_{owner_id}")
+
+    def _run_flow(self, manager):
+        from battle_engine import BattleStatus
+        match = manager.create_match("m1", "u1", "One", "u2", "Two", "standard")
+        assert match is not None
+        # Either player already busy → the claim fails
+        assert manager.create_match("m2", "u2", "Two", "u3", "Three") is None
+        assert manager.is_user_in_battle("u1") and not manager.is_user_in_battle("u3")
+
+        assert manager.accept_battle("m1", "u1") is False
+        assert manager.accept_battle("m1", "u2") is True
+        assert manager.accept_battle("m1", "stranger") is False
+        assert manager.set_player_card("m1", "u1", self._battle_card("u1")) is False
+        assert manager.set_player_card("m1", "u2", self._battle_card("u2")) is True
+
+        stored = manager.get_user_match("u2")
+        assert stored.status == BattleStatus.IN_PROGRESS
+        assert stored.player1.gold_wagered == 100
+        assert stored.player2.card.card.card_id == "card_u2"
+        assert manager.get_active_count() == 1
+
+        assert manager.complete_match("m1") is not None
+        assert manager.complete_match("m1") is None
+        assert not manager.is_user_in_battle("u1")
+        assert manager.get_active_count() == 0
+
+    def test_memory_store_flow(self):
+        from battle_engine import BattleManager
+        from services.battle_store import MemoryBattleStore
+        self._run_flow(BattleManager(store=MemoryBattleStore()))
+
+    def test_redis_store_flow_recovery_and_expiry(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from battle_engine import BattleManager, BattleStatus
+        from services.battle_store import RedisBattleStore
+
+        conn = fakeredis.FakeRedis(decode_responses=True)
+        shard_a = BattleManager(store=RedisBattleStore(conn), owner="a")
+        shard_b = BattleManager(store=RedisBattleStore(conn), owner="b")
+        self._run_flow(shard_a)
+
+        # Battles are visible across shards, and recovery only returns our own
+        shard_a.create_match("m3", "u1", "One", "u2", "Two", "high")
+        shard_b.create_match("m4", "u3", "Three", "u4", "Four")
+        assert shard_b.get_user_match("u1").match_id == "m3"
+        assert [b["match_id"] for b in shard_a.recover()] == ["m3"]
+        assert not shard_b.is_user_in_battle("u1")
+
+        # Past the deadline, another shard sweeps it exactly once
+        expired = shard_a.store.pop_expired(now=time.time() + 10_000, exclude_owner="a")
+        assert [m.match_id for m in expired] == ["m4"]
+        assert expired[0].status == BattleStatus.EXPIRED
+        assert shard_a.expire_stale() == [] and shard_b.get_active_count() == 0
+
+    def test_single_redis_shard_sweeps_its_own_expired_matches(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from battle_engine import BattleManager, BattleStatus
+        from services.battle_store import RedisBattleStore
+
+        manager = BattleManager(store=RedisBattleStore(fakeredis.FakeRedis(decode_responses=True)), owner="0")
+        manager.create_match("m5", "u1", "One", "u2", "Two")
+        assert manager.expire_stale() == []
+        expired = manager.expire_stale(now=time.time() + 10_000)
+        assert [m.match_id for m in expired] == ["m5"] and expired[0].status == BattleStatus.EXPIRED
+        assert manager.expire_stale(now=time.time() + 10_000) == []
+        assert manager.get_active_count() == 0
+
+
+# ─────────────────────────────────────────────
+# 2c. CardCollection — indexes and aggregates
+# ─────────────────────────────────────────────
+
+class TestCardCollection:
+
+    def test_indexes_match_full_scan(self):
+        import random as _random
+        from discord_cards import ArtistCard, CardCollection
+        rng = _random.Random(7)
+        rarities = ["common", "rare", "epic", "legendary", "mythic"]
+        collection = CardCollection("u1")
+        shadow = []
+        for step in range(400):
+            if shadow and rng.random() < 0.35:
+                card_id = rng.choice(shadow).card_id
+                removed = collection.remove_card(card_id)
+                expected = next(c for c in shadow if c.card_id == card_id)
+                assert removed is expected
+                shadow.remove(expected)
+            else:
+                card = ArtistCard(f"c{rng.randrange(60)}", f"Artist{rng.randrange(8)}", "Song",
+                                  "", "", rng.choice([0, 20_000_000, 600_000_000]), "",
+                                  rarity=rng.choice(rarities))
+                collection.add_card(card)
+                shadow.append(card)
+
+            assert collection.cards == shadow
+            assert collection.total_cards() == len(shadow)
+            best = max(shadow, key=lambda c: c.power) if shadow else None
+            assert collection.get_best_card() is best
+            assert collection.get_card("c5") is next((c for c in shadow if c.card_id == "c5"), None)
+            assert collection.get_cards_by_rarity("EPIC") == [c for c in shadow if c.rarity == "epic"]
+            assert collection.get_cards_by_artist("artist3") == [c for c in shadow if c.artist == "Artist3"]
+            breakdown = {}
+            for c in shadow:
+                breakdown[c.rarity] = breakdown.get(c.rarity, 0) + 1
+            assert collection.rarity_breakdown() == breakdown
+
+        assert collection.remove_card("missing") is None
+        assert collection.get_page(2, 5) == shadow[5:10]
+
+    def test_index_built_on_first_lookup(self):
+        from discord_cards import ArtistCard, CardCollection
+        cards = [ArtistCard(f"c{i}", f"Artist{i % 3}", "Song", "", "", 0, "") for i in range(12)]
+        collection = CardCollection("u1", cards)
+        assert collection.get_page(2, 5) == cards[5:10] and collection._index is None
+        collection.add_card(cards[0])
+        assert collection.remove_card("c0") is cards[0] and collection._index is not None
+        assert collection.cards == cards[1:] + [cards[0]]
+        assert collection.get_page(1, 3) == cards[1:4] and len(collection) == 12
+
+
+# ─────────────────────────────────────────────
+# 2d. SeasonManager — batched progress
+# ─────────────────────────────────────────────
+
+class TestSeasonProgress:
+
+    @pytest.fixture
+    def seasons(self, tmp_path):
+        from database import DatabaseManager
+        from season_system import SeasonManager
+        manager = SeasonManager(DatabaseManager(test_database_url=f"sqlite:///{tmp_path / 'season.db'}"))
+        manager.initialize_season_tables()
+        return manager
+
+    def test_batched_progress_matches_per_event_updates(self, seasons):
+        import random as _random
+        from season_system import season_rank_for
+        from services.query_metrics import query_metrics
+        rng = _random.Random(3)
+        xp_for = {"card_collected": 10, "battle_won": 25, "trade_completed": 15}
+        expected = {}
+        for _ in range(300):
+            uid = rng.randrange(4)
+            action = rng.choice(["card_collected", "battle_won", "trade_completed", "unique_artist"])
+            amount = rng.randint(1, 5)
+            seasons.update_player_progress(uid, action, amount)
+            # The old per-event read-modify-write arithmetic
+            row = expected.setdefault(uid, {"level": 1, "xp": 0, "cards_collected": 0, "battles_won": 0,
+                                            "trades_completed": 0, "unique_artists": 0})
+            column = {"card_collected": "cards_collected", "battle_won": "battles_won",
+                      "trade_completed": "trades_completed", "unique_artist": "unique_artists"}[action]
+            row[column] += 1 if action == "unique_artist" else amount
+            gained = row["xp"] + (50 if action == "unique_artist" else amount * xp_for[action])
+            row["level"], row["xp"] = row["level"] + gained // 100, gained % 100
+        seasons.update_player_progress(0, "unknown_action", 99)
+
+        seasons.get_current_season()
+        with query_metrics.scope("flush") as scope:
+            assert seasons.flush_progress() == len(expected)
+        assert scope.statements == 1  # season cached; one batched upsert, a row per user
+        assert seasons.flush_progress() == 0
+
+        for uid, row in expected.items():
+            progress = seasons.get_player_season_progress(uid)
+            assert (progress["season_level"], progress["season_xp"]) == (row["level"], row["xp"])
+            for column in ("cards_collected", "battles_won", "trades_completed", "unique_artists"):
+                assert progress[column] == row[column]
+            assert progress["season_rank"] == season_rank_for(row["level"] * 100 + row["xp"])
+
+    def test_reads_see_buffered_progress(self, seasons):
+        seasons.update_player_progress(9, "battle_won", 80)
+        progress = seasons.get_player_season_progress(9)
+        assert (progress["season_level"], progress["season_xp"], progress["battles_won"]) == (21, 0, 80)
+        assert progress["season_rank"] == "Gold"
+
 
 # ─────────────────────────────────────────────
 # 3. open_pack_for_drop — stat columns
@@ -306,6 +512,17 @@ class TestOpenPackForDrop:
             count = c.fetchone()[0]
         assert count >= 1, "No pack_purchases entry created"
 
+    def test_pack_cards_cached_only_once_committed(self, db, seed_user, seed_creator_pack, seed_card):
+        """A pack without linked cards isn't cached as empty; the cards backfilled
+        from cards_data are cached after the open commits."""
+        from services.pack_cache import pack_key
+        with db.SessionLocal() as session:
+            assert db._load_pack_cards(session, [seed_creator_pack]) == {seed_creator_pack: []}
+        assert pack_key(seed_creator_pack) not in db._pack_cache._local
+
+        assert db.open_pack_for_drop(seed_creator_pack, seed_user)["success"]
+        assert db._pack_cache._local[pack_key(seed_creator_pack)] == [seed_card["card_id"]]
+
     def test_get_user_collection_returns_stats(self, db, seed_user, seed_creator_pack, seed_card):
         """get_user_collection() must return stat columns after drop."""
         db.open_pack_for_drop(seed_creator_pack, seed_user)
@@ -405,6 +622,73 @@ class TestClaimDailyReward:
             assert result.get("pack_name") is not None
 
 
+    def test_reward_pool_cached_until_catalog_change(self, db):
+        """The common/rare pool is loaded once, then served from cache until a card changes."""
+        from models import UserBalances, UserCard
+        from services.query_metrics import query_metrics
+
+        cid = f"card_{uuid.uuid4().hex[:8]}"
+        assert db.add_card_to_master({"card_id": cid, "name": "Daily Artist", "rarity": "COMMON"})
+        uids = [str(uuid.uuid4()) for _ in range(3)]
+        db.claim_daily_reward(uids[0])  # warms the pool
+
+        with query_metrics.scope("test:daily") as scope:
+            result = db.claim_daily_reward(uids[1])
+        assert result["success"]
+        # balance read, balance insert, claim UPDATE, card upsert, commit-time flush
+        assert scope.statements <= 5
+        assert not any(shape.startswith("SELECT cards.") for shape in scope.shapes)
+
+        db.add_card_to_master({"card_id": cid, "name": "Daily Artist", "rarity": "epic"})
+        with query_metrics.scope("test:daily") as scope:
+            result = db.claim_daily_reward(uids[2])
+        assert result["success"]
+        assert any(shape.startswith("SELECT cards.") for shape in scope.shapes)
+        assert cid not in [c["card_id"] for c in result["cards"]]
+
+        with db.SessionLocal() as session:
+            balance = session.query(UserBalances).filter_by(user_id=uids[1]).one()
+            assert balance.gold == result["gold"] and balance.daily_streak == 1
+            owned = session.query(UserCard).filter_by(user_id=uids[1]).count()
+        assert owned >= 1
+
+    def test_inventory_synced_off_hot_path(self, db):
+        """user_inventory is only written when the legacy sync buffer flushes."""
+        uid = str(uuid.uuid4())
+        db.flush_inventory_sync()
+        result = db.claim_daily_reward(uid)
+        assert result["success"]
+        assert uid in db._inventory_sync_buffer
+        assert db.flush_inventory_sync() >= 1
+        assert uid not in db._inventory_sync_buffer
+
+    def test_reset_is_one_statement(self, db):
+        """Expired streaks are cleared in one UPDATE; balances are untouched."""
+        from datetime import datetime, timedelta
+        from models import UserBalances
+        from services.query_metrics import query_metrics
+
+        now = datetime.utcnow()
+        lapsed, current = str(uuid.uuid4()), str(uuid.uuid4())
+        with db.SessionLocal() as session:
+            session.add(UserBalances(user_id=lapsed, gold=0, dust=0, tickets=0, daily_streak=4,
+                                     last_daily_claim=now - timedelta(days=3)))
+            session.add(UserBalances(user_id=current, gold=0, dust=0, tickets=0, daily_streak=2,
+                                     last_daily_claim=now - timedelta(hours=20)))
+            session.commit()
+
+        with query_metrics.scope("test:daily_reset") as scope:
+            updated = db.reset_daily_rewards(now=now)
+        assert updated >= 1
+        assert scope.statements <= 2  # UPDATE + COMMIT
+
+        with db.SessionLocal() as session:
+            lapsed_row = session.query(UserBalances).filter_by(user_id=lapsed).one()
+            current_row = session.query(UserBalances).filter_by(user_id=current).one()
+        assert (lapsed_row.daily_streak, lapsed_row.gold, lapsed_row.dust, lapsed_row.tickets) == (0, 0, 0, 0)
+        assert (current_row.daily_streak, current_row.gold, current_row.dust, current_row.tickets) == (2, 0, 0, 0)
+
+
 # ─────────────────────────────────────────────
 # 6. CollectionView._resolve_image — YouTube thumbnail fallback
 # ─────────────────────────────────────────────
@@ -666,3 +950,610 @@ class TestFallbackImageCycling:
         from cogs.gameplay import CollectionView
         for url in CollectionView._FALLBACK_IMAGES:
             assert url.startswith("https://"), f"Invalid fallback URL: {url}"
+
+
+# ─────────────────────────────────────────────
+# 12. Startup
+# ─────────────────────────────────────────────
+
+class TestStartup:
+
+    def test_cog_dependencies_are_top_level_imports(self):
+        """Module-level imports (incl. try blocks) are found; function-local ones are not."""
+        from services.startup import cog_dependencies
+        deps = cog_dependencies("cogs.card_game")
+        assert "database" in deps and "discord_cards" in deps
+        assert "stripe" not in deps and "stripe_payments" not in deps
+
+    def test_singletons_defer_expensive_setup(self):
+        """Importing the shared clients does not build API clients or load fonts."""
+        from services.youtube_client import youtube_client
+        from services.card_generator import card_generator
+        assert youtube_client._youtube_built is False
+        assert card_generator._fonts is None
+        assert card_generator.title_font is not None
+        assert card_generator._fonts is not None
+
+    def test_profile_times_cogs_and_records_history(self, tmp_path):
+        """Each cog load is timed, failures are kept, and a boot is appended to the history."""
+        import asyncio
+        from services.startup import StartupProfile, read_history
+
+        class FakeBot:
+            async def load_extension(self, name):
+                if name == "cogs.broken":
+                    raise RuntimeError("boom")
+
+        profile = StartupProfile()
+        asyncio.run(profile.load_extension(FakeBot(), "cogs.ok"))
+        with pytest.raises(RuntimeError):
+            asyncio.run(profile.load_extension(FakeBot(), "cogs.broken"))
+        profile.mark("cogs")
+
+        path = str(tmp_path / "history.jsonl")
+        profile.record(path)
+        profile.record(path)
+        history = read_history(path)
+        assert len(history) == 2
+        assert set(history[-1]["cogs"]) == {"cogs.ok", "cogs.broken"}
+        assert history[-1]["failed"] == ["cogs.broken"]
+        assert "cogs" in history[-1]["phases"]
+
+
+# ─────────────────────────────────────────────
+# 13. Sharding and leadership
+# ─────────────────────────────────────────────
+
+class TestSharding:
+
+    def test_guilds_belong_to_one_process(self, monkeypatch):
+        """With SHARD_IDS set, each guild is owned by exactly one process's slice."""
+        from config import settings
+        from services import sharding
+        monkeypatch.setattr(settings, "SHARD_COUNT", 4)
+        guild_ids = [(n << 22) + 7 for n in range(8)]
+        owners = {}
+        for ids in ([0, 1], [2, 3]):
+            monkeypatch.setattr(settings, "SHARD_IDS", ids)
+            assert sharding.is_multi_process()
+            assert sharding.process_name() == "-".join(map(str, ids))
+            for gid in guild_ids:
+                if sharding.owns_guild(gid):
+                    owners.setdefault(gid, []).append(sharding.process_name())
+        assert all(len(v) == 1 for v in owners.values()) and len(owners) == len(guild_ids)
+
+        monkeypatch.setattr(settings, "SHARD_IDS", [])
+        assert sharding.owns_guild(guild_ids[3]) and sharding.process_name() == "0"
+
+    def test_one_leader_and_failover(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        import asyncio
+        from services.sharding import LeaderElection
+
+        conn = fakeredis.FakeRedis(decode_responses=True)
+        a = LeaderElection("jobs", ttl=5, connection=conn, identity="a")
+        b = LeaderElection("jobs", ttl=5, connection=conn, identity="b")
+        assert a.campaign() is True
+        assert b.campaign() is False
+        assert a.campaign() is True and not b.is_leader  # renewal keeps it
+
+        asyncio.run(a.resign())
+        assert not a.is_leader and conn.get("leader:jobs") is None
+        assert b.campaign() is True and a.campaign() is False
+
+        # Someone else took the key (our lease expired): renewal fails, we step down
+        conn.set("leader:jobs", "c")
+        assert b.campaign() is False and b.leaderships_lost == 1
+
+    def test_singleton_cron_jobs_only_run_on_leader(self, monkeypatch):
+        import asyncio
+        from contextlib import nullcontext
+        import scheduler.cron as cron_module
+        from services import sharding
+
+        monkeypatch.setattr(cron_module, "RedisLock", lambda *a, **k: nullcontext())
+        ran = []
+        service = cron_module.AsyncCronService.__new__(cron_module.AsyncCronService)
+
+        @service.safe("daily")
+        async def singleton_job():
+            ran.append("daily")
+
+        @service.safe("drops", singleton=False)
+        async def shard_job():
+            ran.append("drops")
+
+        monkeypatch.setattr(sharding, "is_leader", lambda: False)
+        asyncio.run(singleton_job())
+        asyncio.run(shard_job())
+        assert ran == ["drops"]
+        monkeypatch.setattr(sharding, "is_leader", lambda: True)
+        asyncio.run(singleton_job())
+        assert ran == ["drops", "daily"]
+
+    def test_shard_metrics_snapshot(self):
+        from services.sharding import ShardMetrics
+
+        class FakeBot:
+            latencies = [(0, 0.042), (1, float("inf"))]
+
+        metrics = ShardMetrics()
+        metrics.record(1, "events")
+        metrics.record(1, "events")
+        metrics.record(0, "disconnects")
+        metrics.record_gateway_event()
+        snapshot = metrics.snapshot(FakeBot())
+        shards = {s["shard_id"]: s for s in snapshot["shards"]}
+        assert shards[0]["latency_ms"] == 42.0 and shards[0]["disconnects"] == 1
+        assert shards[1]["events"] == 2 and shards[1]["latency_ms"] is None
+        assert snapshot["gateway_events"] == 1
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 14. Drop engine — cooldown cache, single-winner claims, scheduled expiry
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestDropEngine:
+
+    def _run_flow(self, make_engine):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        engine = make_engine("a")
+        drop = engine.spawn(1, 10, {"pack_id": "p"}, cooldown=60)
+        assert drop and engine.spawn(1, 11, cooldown=60) is None  # server cooling down
+        assert engine.spawn(2, 20, cooldown=60) is not None       # other servers aren't
+        assert engine.channel_drop(10)["drop_id"] == drop["drop_id"]
+
+        # 20 users race for one slot: exactly one wins
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda uid: engine.claim(drop["drop_id"], uid), range(20)))
+        winners = [r for r in results if r["success"]]
+        assert len(winners) == 1
+        assert {r["reason"] for r in results if not r["success"]} == {"taken"}
+        assert engine.channel_drop(10) is None
+
+        # A winner whose grant failed hands the slot back
+        winner = next(uid for uid, r in enumerate(results) if r["success"])
+        assert engine.release(drop["drop_id"], 999) is False
+        assert engine.release(drop["drop_id"], winner) is True
+        assert engine.claim(drop["drop_id"], 999)["success"]
+
+        # Per-card slots, out-of-range slots
+        multi = engine.spawn(3, 30, slots=3, cooldown=0)
+        assert engine.claim(multi["drop_id"], 1, slot=0)["success"]
+        assert engine.claim(multi["drop_id"], 2, slot=0)["reason"] == "taken"
+        assert engine.claim(multi["drop_id"], 2, slot=3)["reason"] == "invalid"
+
+        # Expiry: popped once, by its own process, with the handler run
+        expired = []
+        engine.on_expire(multi["drop_id"], expired.append)
+        later = time.time() + 10_000
+        assert engine.claim(multi["drop_id"], 3, slot=1)["success"]
+        assert engine.store.claim(multi["drop_id"], 3, slot=2, now=later) == "expired"
+        assert make_engine("b").store.pop_expired("b", now=later) == []
+        popped = asyncio.run(engine.expire_due(now=later))
+        assert {d["drop_id"] for d in popped} >= {multi["drop_id"]}
+        assert [d["drop_id"] for d in expired] == [multi["drop_id"]]
+        assert asyncio.run(engine.expire_due(now=later)) == []
+        assert engine.claim(multi["drop_id"], 4, slot=2)["reason"] == "missing"
+
+        stats = engine.metrics.snapshot()
+        assert stats["spawned"] == 3 and stats["spawned_last_min"] == 3
+        assert stats["claimed"] == 4 and stats["contended"] >= 20
+        assert stats["cooldown_blocked"] == 1 and stats["expired"] >= 1
+
+    def test_memory_engine(self):
+        from services.drop_engine import DropEngine, MemoryDropStore
+        store = MemoryDropStore()
+        self._run_flow(lambda owner: DropEngine(store, owner=owner))
+
+    def test_redis_engine(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        from services.drop_engine import DropEngine, RedisDropStore
+
+        conn = fakeredis.FakeRedis(decode_responses=True)
+        self._run_flow(lambda owner: DropEngine(RedisDropStore(conn), owner=owner))
+        assert conn.pttl("drop:cooldown:1") > 0
+
+    def test_card_economy_claims_each_card_once(self, monkeypatch, tmp_path):
+        from services import drop_engine
+        from card_economy import CardEconomyManager
+
+        monkeypatch.setattr(drop_engine, "_engine", drop_engine.DropEngine(drop_engine.MemoryDropStore()))
+        db_path = str(tmp_path / "drops.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE cards (card_id TEXT PRIMARY KEY, name TEXT, title TEXT, rarity TEXT, image_url TEXT);
+            CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT);
+            CREATE TABLE user_cards (user_id INTEGER, card_id TEXT, acquired_from TEXT,
+                                     UNIQUE (user_id, card_id));
+            INSERT INTO cards VALUES ('c1', 'A', 't', 'rare', ''), ('c2', 'B', 't', 'common', '');
+        """)
+        conn.close()
+        economy = CardEconomyManager(db_path)
+        economy._database_url = ""
+
+        assert economy.create_drop(10, 1, 5)["success"]
+        assert "cooldown" in economy.create_drop(11, 1, 5)["error"]
+        assert economy.claim_drop(10, 7, 1)["success"]
+        assert economy.claim_drop(10, 8, 1)["error"] == "That card has already been claimed."
+        assert economy.claim_drop(10, 8, 3)["error"] == "Invalid card number."
+        assert economy.claim_drop(10, 8, 2)["success"]
+        assert economy.claim_drop(10, 9, 2)["error"] == "No active drop in this channel."
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 15. Activity drops — decayed scores, priority selection, spawn budget
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestActivityDrops:
+
+    def _spawner(self, **kwargs):
+        from types import SimpleNamespace
+        from services.drop_engine import DropEngine, MemoryDropStore
+        from services.drop_spawner import ActivityTracker, DropSpawner
+        from services.send_queue import SendQueue
+        return DropSpawner(ActivityTracker(half_life=60), DropEngine(MemoryDropStore()),
+                           SendQueue(concurrency=2), rng=SimpleNamespace(random=lambda: 0.0), **kwargs)
+
+    def test_scores_decay_and_order(self):
+        from services.drop_spawner import ActivityTracker
+
+        tracker = ActivityTracker(half_life=60)
+        now = time.time()
+        tracker.record("a", "a1", count=40, now=now - 60)   # one half-life ago
+        tracker.record("b", "b1", count=30, now=now)
+        tracker.record("b", "b2", count=5, now=now)
+        assert tracker.score("a", now=now) == pytest.approx(20)
+        assert [g for g, _ in tracker.top(now)] == ["b", "a"]
+        assert tracker.channel("b") == "b1"
+        # A scan that stops early leaves the queue intact
+        next(iter(tracker.top(now)))
+        assert [g for g, _ in tracker.top(now)] == ["b", "a"]
+        tracker.reset("b")  # b got a drop: out of the queue until it chats again
+        assert [g for g, _ in tracker.top(now)] == ["a"]
+        tracker.record("b", "b1", count=25, now=now)
+        assert [g for g, _ in tracker.top(now)] == ["b", "a"]
+
+    def test_tick_respects_budget_cooldown_and_concurrency(self):
+        import asyncio
+
+        spawner = self._spawner(budget=3, concurrency=2, min_score=10)
+        for i in range(10):
+            spawner.tracker.record(f"g{i}", f"c{i}", count=200 - i)
+        spawner.tracker.record("quiet", "cq", count=2)
+
+        in_flight, peak, sent = 0, 0, []
+
+        async def spawn(guild_id, channel_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            sent.append(guild_id)
+            return True
+
+        spawner.spawn = spawn
+        result = asyncio.run(spawner.tick())
+        assert result["drops_spawned"] == 3 and sorted(sent) == ["g0", "g1", "g2"]
+        assert peak <= 2
+        # Those guilds are cooling down and start over; the next tick moves on
+        asyncio.run(spawner.tick())
+        assert set(sent[3:]) == {"g3", "g4", "g5"}
+        assert "quiet" not in sent
+
+    def test_activity_flushes_one_row_per_guild(self, db):
+        import asyncio
+        from services.drop_spawner import ActivityTracker
+
+        spawner = self._spawner()
+        for _ in range(50):
+            spawner.tracker.record(111, 5)
+        spawner.tracker.record(222, 6, count=3)
+        assert asyncio.run(spawner.flush(db)) == 2
+        assert asyncio.run(spawner.flush(db)) == 0  # nothing changed since
+        spawner.tracker.record(111, 5)
+        assert asyncio.run(spawner.flush(db)) == 1
+
+        rows = {r["server_id"]: r for r in db.load_guild_activity()}
+        assert rows["111"]["messages"] == 51 and rows["111"]["channel_id"] == "5"
+
+        restored = ActivityTracker(half_life=60)
+        restored.load(db.load_guild_activity())
+        assert restored.score("111") == pytest.approx(51, rel=0.05)
+        assert restored.channel("222") == "6"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 16. Send queue — priority lanes, per-route buckets, 429 retries, digests
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestSendQueue:
+
+    def test_lanes_and_routes(self):
+        import asyncio
+        from services.send_queue import ANNOUNCEMENT, GAMEPLAY, SendQueue
+
+        queue = SendQueue(concurrency=1)
+        order = []
+
+        def send(name):
+            async def run():
+                order.append(name)
+                return name
+            return run
+
+        async def main():
+            # Discord says channel 1 is spent for the next 0.2s; channel 3 shares its bucket
+            headers = {"X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "0",
+                       "X-RateLimit-Reset-After": "0.2", "X-RateLimit-Bucket": "abc"}
+            queue.observe("channel:1", headers)
+            queue.observe("channel:3", headers)
+            assert queue.bucket("channel:3") is queue.bucket("channel:1")
+            blocked = queue.post(send("blocked"), GAMEPLAY, route="channel:1")
+            queue.post(send("announcement"), ANNOUNCEMENT, route="channel:2")
+            queue.post(send("drop"), GAMEPLAY, route="channel:2")
+            assert queue.status()["lanes"] == {"gameplay": 2, "alert": 0, "announcement": 1}
+            await queue.join()
+            assert blocked.result() == "blocked"
+
+        asyncio.run(main())
+        # The spent route waits without holding up the others, which go in lane order
+        assert order == ["drop", "announcement", "blocked"]
+        assert queue.status()["sent"] == 3
+
+    def test_429_requeues_then_gives_up(self):
+        import asyncio
+        from types import SimpleNamespace
+        from services.send_queue import SendQueue
+
+        queue = SendQueue(max_retries=1)
+        calls = []
+
+        async def flaky():
+            calls.append(time.monotonic())
+            status = 429 if len(calls) == 1 else 204
+            return SimpleNamespace(status=status, headers={"Retry-After": "0.05"})
+
+        async def always_limited():
+            error = Exception("Too Many Requests")
+            error.status = 429
+            error.response = SimpleNamespace(headers={"Retry-After": "0.01", "X-RateLimit-Global": "true"})
+            raise error
+
+        async def main():
+            assert (await queue.submit(flaky, route="webhook:1")).status == 204
+            with pytest.raises(Exception, match="Too Many Requests"):
+                await queue.submit(always_limited, route="channel:9")
+
+        asyncio.run(main())
+        assert calls[1] - calls[0] >= 0.04  # waited out Retry-After
+        status = queue.status()
+        assert status["rate_limited"] == 3 and status["retries"] == 2
+        assert status["sent"] == 1 and status["failed"] == 1
+
+    def test_repeated_alerts_become_a_digest(self):
+        import asyncio
+        from services.send_queue import SendQueue
+
+        queue = SendQueue(digest_window=0.05)
+        batches = []
+
+        async def send_batch(entries):
+            batches.append(list(entries))
+
+        async def main():
+            first = queue.post_digest("db-down", 0, send_batch, route="webhook:1")
+            for i in range(1, 4):
+                assert queue.post_digest("db-down", i, send_batch, route="webhook:1") is None
+            # Another thread (the security logger's) posts onto the same loop
+            await asyncio.to_thread(queue.post_digest, "db-down", 4, send_batch, None, "webhook:1")
+            await first
+            await asyncio.sleep(0.1)
+            await queue.join()
+
+        asyncio.run(main())
+        assert batches == [[0], [1, 2, 3, 4]]
+        assert queue.status()["coalesced"] == 4 and queue.status()["digests"] == 1
+
+    def test_open_digest_sent_when_loop_shuts_down(self):
+        import asyncio
+        from services.send_queue import SendQueue
+
+        queue = SendQueue(digest_window=60)
+        batches = []
+
+        async def send_batch(entries):
+            batches.append(list(entries))
+
+        async def main():
+            await queue.post_digest("redis-down", 0, send_batch)
+            queue.post_digest("redis-down", 1, send_batch)
+            queue.post_digest("redis-down", 2, send_batch)
+            assert queue.status()["pending_digests"] == 2
+
+        # asyncio.run() returns long before the window closes
+        asyncio.run(main())
+        assert batches == [[0], [1, 2]]
+        assert queue.status()["pending_digests"] == 0 and queue.status()["digests"] == 1
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 17. Redis locks — release, lease expiry, multi-user ordering
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestRedisLocks:
+
+    def _conn(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return fakeredis.FakeRedis(decode_responses=True)
+
+    def test_release_only_by_holder_and_wakes_waiter(self):
+        from rq_queue.locks import RedisLock
+
+        conn = self._conn()
+        first = RedisLock("user:1", ttl=5, connection=conn)
+        assert first.acquire()
+        with pytest.raises(TimeoutError):
+            RedisLock("user:1", ttl=5, timeout=0.1, connection=conn).acquire()
+        assert first.release()
+        second = RedisLock("user:1", ttl=5, timeout=0.5, connection=conn)
+        assert second.acquire()
+        assert not first.release()  # no longer ours: second's lock survives
+        assert conn.get("lock:user:1") == second.identifier
+        assert second.release() and conn.get("lock:user:1") is None
+
+    def test_lease_expires_when_holder_dies(self):
+        from rq_queue.locks import RedisLock
+
+        conn = self._conn()
+        crashed = RedisLock("trade:9", ttl=0.2, connection=conn)
+        assert crashed.acquire()  # never released
+        start = time.monotonic()
+        waiter = RedisLock("trade:9", ttl=5, timeout=2, connection=conn)
+        assert waiter.acquire()
+        assert 0.1 <= time.monotonic() - start < 2
+        assert not crashed.extend()  # the lease is gone, renewal must not steal it back
+        waiter.release()
+
+    def test_users_lock_orders_keys_and_releases_all(self, monkeypatch):
+        import threading
+        from rq_queue import locks
+
+        conn = self._conn()
+        order = []
+        original = locks.RedisLock.acquire
+
+        def recording_acquire(lock):
+            order.append(lock.key)
+            return original(lock)
+
+        monkeypatch.setattr(locks.RedisLock, "acquire", recording_acquire)
+        with locks.users_lock(7, 3, connection=conn):
+            assert set(conn.keys("lock:*")) == {"lock:user:3", "lock:user:7"}
+        assert order == ["lock:user:3", "lock:user:7"]
+        assert conn.keys("lock:*") == []
+
+        # Opposite argument orders from two threads can't deadlock
+        done = []
+
+        def trade(a, b):
+            for _ in range(5):
+                with locks.users_lock(a, b, ttl=5, connection=conn):
+                    time.sleep(0.005)
+            done.append((a, b))
+
+        threads = [threading.Thread(target=trade, args=args) for args in ((1, 2), (2, 1))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        assert len(done) == 2 and conn.keys("lock:*") == []
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 18. Worker autoscaling — pool sizes from queue depth
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestWorkerAutoscale:
+
+    POOL = {"queues": ["pack"], "min": 1, "max": 4}
+
+    @pytest.mark.parametrize("depth, expected", [
+        (0, 1),     # idle pools keep their minimum
+        (-3, 1),    # a bogus negative depth is treated as empty
+        (1, 1),
+        (10, 1),    # exactly one worker's worth
+        (11, 2),    # one job over rounds up
+        (25, 3),
+        (40, 4),
+        (41, 4),    # capped at max
+        (10_000, 4),
+    ])
+    def test_desired_workers(self, depth, expected):
+        from rq_queue.supervisor import desired_workers
+        assert desired_workers(depth, self.POOL, jobs_per_worker=10) == expected
+
+    @pytest.mark.parametrize("pool, depth, expected", [
+        ({"min": 0, "max": 2}, 0, 0),
+        ({"min": 2, "max": 2}, 0, 2),    # min == max pins the pool
+        ({"min": 2, "max": 2}, 500, 2),
+        ({"min": 3, "max": 5}, 5, 3),    # backlog below min still gets min
+    ])
+    def test_desired_workers_bounds(self, pool, depth, expected):
+        from rq_queue.supervisor import desired_workers
+        assert desired_workers(depth, pool, jobs_per_worker=5) == expected
+
+    def test_scale_up_now_down_slowly(self, monkeypatch):
+        from types import SimpleNamespace
+        from rq_queue.supervisor import WorkerSupervisor
+
+        supervisor = WorkerSupervisor(queues={}, pools={"pack": dict(self.POOL)},
+                                      autoscale={"JOBS_PER_WORKER": 10, "SCALE_DOWN_AFTER": 3},
+                                      connection=object())
+        alive = SimpleNamespace(is_alive=lambda: True)
+        monkeypatch.setattr(supervisor, "_spawn", lambda pool: supervisor.processes[pool].append(alive))
+        monkeypatch.setattr(supervisor, "_retire", lambda pool: supervisor.processes[pool].pop())
+
+        supervisor.scale({"pack": 35})
+        assert len(supervisor.processes["pack"]) == 4
+        for expected in (4, 4, 3, 3, 3, 2):   # one worker per SCALE_DOWN_AFTER quiet checks
+            supervisor.scale({"pack": 0})
+            assert len(supervisor.processes["pack"]) == expected
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 19. Write-behind buffers — merge, retry cap, close
+# ─────────────────────────────────────────────────────────────────────────────
+
+class TestWriteBehind:
+
+    @staticmethod
+    def _buffer(write, **kwargs):
+        from services.write_behind import WriteBehindBuffer
+        return WriteBehindBuffer("test", write, interval=60, **kwargs)
+
+    def test_failed_batch_merges_with_newer_rows(self):
+        fail = [True]
+        written = []
+
+        def write(pending):
+            if fail[0]:
+                raise RuntimeError("db down")
+            written.append(dict(pending))
+            return len(pending)
+
+        buf = self._buffer(write, merge=lambda older, newer: older + newer)
+        buf.update("a", lambda n: (n or 0) + 1)
+        assert buf.flush() == 0
+        buf.update("a", lambda n: (n or 0) + 2)
+        fail[0] = False
+        assert buf.flush() == 1
+        assert written == [{"a": 3}]
+        buf.close()
+
+    def test_rows_dropped_after_max_retries(self):
+        def write(pending):
+            raise RuntimeError("bad row")
+
+        buf = self._buffer(write, max_retries=2)
+        buf.update("a", lambda _: 1)
+        for _ in range(3):
+            buf.flush()
+        assert "a" not in buf and buf.dropped == 1
+        buf.close()
+
+    def test_close_flushes_and_unregisters(self):
+        from services.write_behind import flusher
+        buf = self._buffer(lambda pending: len(pending))
+        buf.update("a", lambda _: 1)
+        assert buf in flusher.buffers()
+        assert buf.close() == 1
+        assert buf not in flusher.buffers()
+        buf.update("b", lambda _: 1)
+        assert buf not in flusher.buffers()
@@ -13,7 +13,9 @@ def db():
     d = DatabaseManager(test_database_url="sqlite:///:memory:")
     Base.metadata.create_all(d.engine)
     yield d
-    Base.metadata.drop_all(d.engine)
+    engine = d.engine
+    d.close()
+    Base.metadata.drop_all(engine)
 
 async def test_pack_spam(db, mocker):
     """Test pack opening spam protection"""
@@ -17,7 +17,9 @@ def db_override():
     print("DEBUG: Tables created in test_tma_battle.py fixture")
     yield test_db  # Provide the test database instance
     print("DEBUG: Tables dropped in test_tma_battle.py fixture")
-    Base.metadata.drop_all(test_db.engine)  # Drop tables after test
+    engine = test_db.engine
+    test_db.close()  # flush and unregister the write-behind buffers first
+    Base.metadata.drop_all(engine)  # Drop tables after test
 
 @pytest.fixture
 def client_a(db_override): # Inject the db_override fixture
@@ -41,3 +43,167 @@ def test_challenge_missing_pack_returns_403(client_a):
 def test_get_nonexistent_battle_returns_404(client_a):
     resp = client_a.get("/api/battle/XXXXXX", headers={"Authorization": "tma fake"})
     assert resp.status_code == 404
+
+
+def test_matchmaking_index_nearest_and_prefix():
+    from datetime import datetime, timedelta
+    from services.matchmaking import MatchmakingIndex
+    index = MatchmakingIndex()
+    for tid, name, power in [(1, "alpha", 40), (2, "alfred", 55), (3, "bravo", 62),
+                             (4, "charlie", 90), (5, "albert", 58)]:
+        index.upsert(tid, f"u{tid}", name, power)
+    index.upsert(6, "u6", "alpine", 57, last_seen=datetime.utcnow() - timedelta(hours=2))
+
+    nearest = index.nearest(57, limit=3, exclude=[5])
+    assert [p["telegram_id"] for p in nearest] == [2, 3, 1]
+    assert [p["username"] for p in index.prefix_search("AL")] == ["albert", "alfred", "alpha"]
+
+    index.upsert(2, "u2", "zed", 10)
+    assert [p["username"] for p in index.prefix_search("al")] == ["albert", "alpha"]
+    assert index.prune() == 1
+    assert len(index) == 5
+
+
+def test_register_feeds_matchmaking_search(db_override):
+    db_override.register_battle_player(2001, "rocker")
+    db_override.register_battle_player(2002, "rockstar")
+    db_override.register_battle_player(2003, "jazzcat")
+
+    found = db_override.search_battle_players("ROCK", exclude_telegram_id=2001)
+    assert [p["telegram_id"] for p in found] == [2002]
+    assert db_override.search_battle_players("2003")[0]["username"] == "jazzcat"
+    suggested = db_override.find_battle_opponents(2001, limit=5)
+    assert {p["telegram_id"] for p in suggested} == {2002, 2003}
+
+
+def test_player_search_substrings_escape_and_db_fallback(db_override):
+    """Substring scans are opt-in: id substrings match, LIKE wildcards are
+    literal, and registered players outside the matchmaking window are found."""
+    from datetime import timedelta
+    db = db_override
+    db.register_battle_player(3456789, "old_timer")
+    db.register_battle_player(3000001, "percent%cat")
+    db._sync_matchmaking()
+    db._matchmaking._players[3456789]["last_seen"] -= db._matchmaking.active_window + timedelta(minutes=1)
+    assert db._matchmaking.prune() == 1  # only battle_registry has old_timer now
+
+    # Default: exact id / prefix lookups, substrings only among recently active players
+    assert db.search_battle_players("timer") == []
+    assert [p["telegram_id"] for p in db.search_battle_players("old")] == [3456789]
+    assert [p["telegram_id"] for p in db.search_battle_players("t%c")] == [3000001]
+    assert db.search_players("45678") == [] and db.search_players("t%c") == []
+    assert [u.username for u in db.search_players("3456789")] == ["old_timer"]
+
+    assert [p["telegram_id"] for p in db.search_battle_players("timer", substring=True)] == [3456789]
+    assert [p["telegram_id"] for p in db.search_battle_players("5678", substring=True)] == [3456789]
+    assert db.search_battle_players("t_c", substring=True) == []
+
+    assert [u.username for u in db.search_players("45678", substring=True)] == ["old_timer"]
+    assert [u.username for u in db.search_players("t%c", substring=True)] == ["percent%cat"]
+    assert db.search_players("t_c", substring=True) == []
+
+
+def test_find_opponents_does_not_rewrite_username(db_override):
+    """A matchmaking miss reads the caller's row without queueing a presence write."""
+    db = db_override
+    db.register_battle_player(4001, "realname")
+    db.register_battle_player(4002, "rival")
+    db.flush_telegram_presence()
+    db._sync_matchmaking()
+    db._matchmaking._drop(4001)  # the caller is a matchmaking miss
+
+    assert [p["telegram_id"] for p in db.find_battle_opponents(4001)] == [4002]
+    db.flush_telegram_presence()
+    assert db.get_telegram_user_by_id(4001)["username"] == "realname"
+
+
+def test_battle_sim_matches_execute_battle(monkeypatch):
+    np = pytest.importorskip("numpy")
+    import battle_engine
+    from battle_engine import BattleEngine
+    from cards_config import compute_team_power
+    from services import battle_sim
+
+    rng = np.random.default_rng(1234)
+    n = 2000
+    p1 = rng.integers(30, 136, n)
+    p2 = p1 + rng.integers(-12, 13, n)  # keep plenty of near-ties
+    rolls = battle_sim.roll_crits(n, rng=rng)
+
+    for tier in ("casual", "extreme", "unknown"):
+        sim = battle_sim.simulate(p1, p2, tier, rolls=rolls)
+        feed = iter(rolls.ravel().tolist())
+        monkeypatch.setattr(battle_engine.random, "random", lambda: next(feed))
+        for i in range(n):
+            ref = BattleEngine.execute_battle(None, None, tier,
+                                              p1_override=int(p1[i]), p2_override=int(p2[i]))
+            assert ref["winner"] == sim["winner"][i]
+            assert ref["player1"]["final_power"] == sim["final1"][i]
+            assert ref["player2"]["gold_reward"] == sim["gold2"][i]
+            assert ref["player1"]["xp_reward"] == sim["xp1"][i]
+
+    supports = np.array([[80, 70, -1, -1], [-1, -1, -1, -1]])
+    assert battle_sim.team_powers([100, 90], supports).tolist() == [
+        compute_team_power(100, [80, 70]), compute_team_power(90, [])]
+
+
+def test_battle_history_pages_and_rollups(db_override):
+    """Buffered battles page newest-first from either side; compaction keeps the record exact."""
+    from datetime import datetime, timedelta
+    from battle_engine import BattleHistory
+    db = db_override
+    start = datetime(2026, 1, 1, 12, 0)
+    for i in range(25):
+        a_first = i % 2 == 0
+        db.record_battle({
+            "battle_id": f"b{i:02d}",
+            "player1_id": "alice" if a_first else "bob",
+            "player2_id": "bob" if a_first else "alice",
+            "winner": i % 3,  # 0 tie, 1 player1, 2 player2
+            "player1_power": 80, "player2_power": 70,
+            "player1_gold_reward": 10, "player2_gold_reward": 5,
+            "wager_tier": "casual",
+            "created_at": start + timedelta(hours=i),
+        })
+
+    seen, cursor = [], None
+    while True:
+        page = db.get_battle_history("alice", limit=10, before=cursor)
+        seen += [b["battle_id"] for b in page["battles"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [f"b{i:02d}" for i in reversed(range(25))]
+
+    before = db.get_battle_record("alice")
+    assert before["total"] == 25
+    assert before["wins"] + before["losses"] + before["ties"] == 25
+    latest = db.get_battle_history("alice", limit=3)["battles"]
+    # b24 tie; b23 alice was player2 and player2 won; b22 alice was player1 and player1 won
+    assert [b["result"] for b in latest] == ["tie", "win", "win"]
+    assert latest[1]["power"] == 70 and latest[1]["opponent_id"] == "bob"
+
+    # Everything but the last day is rolled up; records and the newest battles are unchanged
+    assert db.compact_battle_history(older_than_days=(datetime.utcnow() - start).days) > 0
+    assert db.get_battle_record("alice") == before
+    assert db.get_battle_record("bob")["wins"] == before["losses"]
+    history = BattleHistory.load(db, "alice", recent=3)
+    assert history.total == 25 and len(history.recent_lines()) == 3
+
+
+def test_battle_history_flush_skips_bad_rows(db_override):
+    """A duplicate battle_id is dropped without holding back the rest of the batch;
+    battles without a winner count as ties in the record."""
+    db = db_override
+    battle = {"battle_id": "dup", "player1_id": "carol", "player2_id": "dave", "winner": 1}
+    db.record_battle(battle)
+    assert db.flush_battle_history() == 1
+
+    db.record_battle(battle)
+    db.record_battle({"battle_id": "fresh", "player1_id": "carol", "player2_id": "dave", "winner": None})
+    assert db.flush_battle_history() == 1
+    assert db.flush_battle_history() == 0
+
+    record = db.get_battle_record("carol")
+    assert (record["wins"], record["ties"], record["total"]) == (1, 1, 2)
+    assert [b["result"] for b in db.get_battle_history("carol")["battles"]].count("tie") == 1
@@ -12,7 +12,9 @@ def db(tmp_path):
     Base.metadata.create_all(d.engine)  # Create tables for testing
     print("DEBUG: Tables created in test_tma_db.py fixture")
     yield d
-    Base.metadata.drop_all(d.engine) # Drop tables after tests
+    engine = d.engine
+    d.close()  # flush and unregister the write-behind buffers first
+    Base.metadata.drop_all(engine) # Drop tables after tests
     print("DEBUG: Tables dropped in test_tma_db.py fixture")
 
 
@@ -34,6 +36,28 @@ def test_get_or_create_telegram_user_existing(db):
     assert result["is_new"] is False
 
 
+def test_telegram_presence_is_written_behind(db):
+    """Repeat lookups are served from cache; presence lands on flush."""
+    from models import User
+    created = db.get_or_create_telegram_user(123456, "testuser")
+    again = db.get_or_create_telegram_user(123456, "renamed")
+    assert again["user_id"] == created["user_id"]
+    assert again["username"] == "renamed"
+
+    session = db.get_session()
+    try:
+        assert session.get(User, created["user_id"]).username == "testuser"
+    finally:
+        session.close()
+
+    assert db.flush_telegram_presence() == 1
+    session = db.get_session()
+    try:
+        assert session.get(User, created["user_id"]).username == "renamed"
+    finally:
+        session.close()
+
+
 def test_generate_link_code(db):
     """Link code is 6 chars, stored, retrievable."""
     user = db.get_or_create_telegram_user(111, "linker")
@@ -49,9 +73,372 @@ def test_consume_link_code(db):
     result = db.consume_tma_link_code(code, discord_id=9876543210)
     assert result["success"] is True
     assert result["user_id"] == tg_user["user_id"]
+    assert 222 not in db._tg_identity_cache  # relinked: next lookup re-reads the row
 
 
 def test_consume_link_code_expired(db):
     """Invalid codes fail gracefully."""
     result = db.consume_tma_link_code("XXXXXX", discord_id=999)
     assert result["success"] is False
+
+
+def _seed_trade_cards(db, owners):
+    """Insert master cards and ownership rows: owners = {user_id: {card_id: qty}}."""
+    from models import Card, UserCard
+    session = db.get_session()
+    try:
+        for card_id in {cid for cards in owners.values() for cid in cards}:
+            session.add(Card(card_id=card_id, name=card_id, rarity="common"))
+        for user_id, cards in owners.items():
+            for card_id, qty in cards.items():
+                session.add(UserCard(user_id=user_id, card_id=card_id, quantity=qty))
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_accept_trade_bulk_settlement(db):
+    """Multi-card trade moves every copy and gold in one settlement."""
+    a = db.get_or_create_telegram_user(301, "alice")["user_id"]
+    b = db.get_or_create_telegram_user(302, "bob")["user_id"]
+    _seed_trade_cards(db, {a: {"c1": 2, "c2": 1}, b: {"c3": 1}})
+    db.update_user_economy(a, gold_change=100)
+
+    created = db.create_trade(a, 302, ["c1", "c1", "c2"], ["c3"], offered_gold=40)
+    result = db.accept_trade(created["trade_id"], b)
+    assert result["success"] is True
+
+    assert db.get_user_card_count(a, "c1") == 0
+    assert db.get_user_card_count(b, "c1") == 2
+    assert db.get_user_card_count(b, "c2") == 1
+    assert db.get_user_card_count(a, "c3") == 1
+    assert db.get_user_economy(a)["gold"] == 60
+    assert db.get_user_economy(b)["gold"] == 40
+    assert db.get_settlement_stats()["count"] >= 1
+
+
+def test_accept_trade_rejects_missing_card(db):
+    """Settlement is all-or-nothing when one side lost a card."""
+    a = db.get_or_create_telegram_user(311, "carol")["user_id"]
+    b = db.get_or_create_telegram_user(312, "dave")["user_id"]
+    _seed_trade_cards(db, {a: {"c4": 1}, b: {"c5": 1}})
+    created = db.create_trade(a, 312, ["c4"], ["c5"])
+    db.remove_card_from_collection(b, "c5")
+
+    result = db.accept_trade(created["trade_id"], b)
+    assert result["success"] is False
+    assert "no longer own" in result["error"]
+    assert db.get_user_card_count(a, "c4") == 1
+
+
+def test_accept_trade_by_numeric_trade_id(db):
+    """Legacy numeric trade ids resolve through the indexed trade_id column."""
+    import uuid
+    from models.trade import Trade
+    a = db.get_or_create_telegram_user(321, "erin")["user_id"]
+    b = db.get_or_create_telegram_user(322, "frank")["user_id"]
+    _seed_trade_cards(db, {a: {"c6": 1}})
+    created = db.create_trade(a, 322, ["c6"], [])
+    assert created["success"] is True
+    session = db.get_session()
+    try:
+        numeric_id = (session.query(Trade.trade_id)
+                      .filter(Trade.id == uuid.UUID(created["trade_id"])).scalar())
+    finally:
+        session.close()
+
+    assert db.accept_trade(str(numeric_id), b)["success"] is True
+    assert db.get_user_card_count(b, "c6") == 1
+
+
+def test_dust_cards_batch_keeps_requested_copies(db):
+    """keep=1 dusts every duplicate and reports a per-card breakdown."""
+    u = db.get_or_create_telegram_user(401, "duster")["user_id"]
+    _seed_trade_cards(db, {u: {"d1": 4, "d2": 1, "d3": 2}})
+
+    result = db.dust_cards_batch(u, keep=1)
+    assert result["success"] is True
+    assert result["cards_dusted"] == 4
+    assert result["total_dust"] == 40
+    assert {item["card_id"]: item["quantity"] for item in result["breakdown"]} == {"d1": 3, "d3": 1}
+    assert db.get_user_card_count(u, "d1") == 1
+    assert db.get_user_card_count(u, "d2") == 1
+    assert db.get_dust_balance(u) == 40
+
+
+def test_dust_duplicates_credits_discord_dust_ledger(db, tmp_path):
+    """Discord's /dust_duplicates credits user_dust, the balance /craft and /boost spend."""
+    from services.dust_economy import DustEconomy
+    from services.schema import create_runtime_schema
+    with db.engine.begin() as conn:
+        create_runtime_schema(conn)
+    u = "1234567890"
+    _seed_trade_cards(db, {u: {"d6": 3}})
+
+    result = db.dust_cards_batch(u, keep=1, ledger="user_dust")
+    assert result["success"] is True and result["dust_balance"] == 20
+    assert db.get_dust_balance(u) == 0  # the TMA ledger is untouched
+    economy = DustEconomy(db_path=str(tmp_path / "test.db"))
+    assert economy.get_dust_balance(int(u)) == 20
+    assert economy.spend_dust(int(u), 20, "craft")
+    assert db.get_user_card_count(u, "d6") == 1
+
+
+def test_dust_boost_and_reroll_keep_stored_power(db, tmp_path):
+    """Stat changes made with raw SQL also rewrite cards.power, which the collection
+    sorts by, and drop the card's cached entry."""
+    from sqlalchemy import text
+    from cards_config import compute_card_power
+    from models import Card, UserCard
+    from services.dust_economy import DustEconomy
+    from services.pack_cache import card_key, pack_cache
+    from services.schema import create_runtime_schema
+    with db.engine.begin() as conn:
+        create_runtime_schema(conn)
+    u = "1234567891"
+    session = db.get_session()
+    session.add(Card(card_id="b1", name="b1", rarity="rare",
+                     impact=50, skill=50, longevity=50, culture=50, hype=50))
+    session.add(UserCard(user_id=u, card_id="b1", quantity=1))
+    session.commit()
+    session.close()
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO user_dust (user_id, dust_amount) VALUES (:u, 1000)"), {"u": int(u)})
+
+    def stored():
+        with db.engine.connect() as conn:
+            row = conn.execute(text("SELECT impact, skill, longevity, culture, hype, rarity, power "
+                                    "FROM cards WHERE card_id = 'b1'")).fetchone()
+        card = dict(zip(("impact", "skill", "longevity", "culture", "hype", "rarity"), row[:6]))
+        return card, row[6]
+
+    economy = DustEconomy(db_path=str(tmp_path / "test.db"))
+    pack_cache.set_many({card_key("b1"): {"card_id": "b1", "impact": 50}})
+    ok, _ = economy.boost_card_stat(int(u), "b1", "impact", "large")
+    card, power = stored()
+    assert ok and card["impact"] == 65 and power == compute_card_power(card) == 53 + 5
+    assert pack_cache.get(card_key("b1"), lambda: None) is None  # cached pre-boost stats dropped
+
+    pack_cache.set_many({card_key("b1"): {"card_id": "b1", "impact": 65}})
+    ok, _, new_stats = economy.reroll_card_stats(int(u), "b1", "rare")
+    assert pack_cache.get(card_key("b1"), lambda: None) is None
+    card, power = stored()
+    assert ok and power == compute_card_power(card) and card["skill"] == new_stats["skill"]
+    assert db.query_user_collection(u)["cards"][0]["power"] == power
+
+
+def test_dust_cards_batch_rejects_overdraw(db):
+    """Asking for more copies than owned leaves the collection untouched."""
+    u = db.get_or_create_telegram_user(402, "greedy")["user_id"]
+    _seed_trade_cards(db, {u: {"d4": 1, "d5": 2}})
+
+    result = db.dust_cards_batch(u, quantities={"d4": 1, "d5": 3})
+    assert result["success"] is False
+    assert db.get_user_card_count(u, "d4") == 1
+    assert db.get_dust_balance(u) == 0
+
+    ok, _ = db.dust_cards(u, ["d5", "d5"])
+    assert ok is True
+    assert db.get_user_card_count(u, "d5") == 0
+
+
+def test_query_user_collection_keyset_pages(db):
+    """Pages follow the database power order without gaps or repeats."""
+    from models import Card, UserCard
+    u = db.get_or_create_telegram_user(501, "collector")["user_id"]
+    session = db.get_session()
+    try:
+        for i, rarity in enumerate(["common", "rare", "epic", "legendary", "mythic"] * 2):
+            session.add(Card(card_id=f"p{i}", name=f"P{i}", rarity=rarity, impact=40 + i * 5))
+            session.add(UserCard(user_id=u, card_id=f"p{i}"))
+        session.commit()
+    finally:
+        session.close()
+
+    full = db.get_user_collection(u)
+    powers = [c["power"] for c in full]
+    assert powers == sorted(powers, reverse=True)
+
+    first = db.query_user_collection(u, limit=4, fields=["rarity"])
+    assert first["total"] == 10
+    assert set(first["cards"][0]) == {"card_id", "power", "rarity"}
+    seen, cursor = [c["card_id"] for c in first["cards"]], first["next_cursor"]
+    while cursor:
+        page = db.query_user_collection(u, limit=4, cursor=cursor)
+        seen += [c["card_id"] for c in page["cards"]]
+        cursor = page["next_cursor"]
+    assert seen == [c["card_id"] for c in full]
+
+    mythics = db.query_user_collection(u, rarity=["Mythic"])
+    assert {c["card_id"] for c in mythics["cards"]} == {"p4", "p9"}
+    assert db.get_user_card(u, "p3")["rarity"] == "legendary"
+    assert db.get_user_card(u, "missing") is None
+
+
+def test_purchased_packs_load_cards_in_one_query(db):
+    """Pack cards for every purchase come from a single batched query."""
+    from sqlalchemy import event
+    from models import PackPurchase
+    u = db.get_or_create_telegram_user(601, "opener")["user_id"]
+    pack_ids = []
+    for p in range(3):
+        pack_id = db.create_creator_pack(u, f"Pack {p}")
+        for i in range(p + 1):
+            db.add_card_to_master({"card_id": f"pk{p}_{i}", "name": f"Card {p}.{i}"})
+            db.add_card_to_pack(pack_id, {"card_id": f"pk{p}_{i}"})
+        pack_ids.append(pack_id)
+    session = db.get_session()
+    try:
+        for pack_id in pack_ids + pack_ids[:1]:
+            session.add(PackPurchase(buyer_id=u, pack_id=pack_id))
+        session.commit()
+    finally:
+        session.close()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        packs = db.get_user_purchased_packs(u)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 2
+    assert len(packs) == 4
+    counts = {p["pack_id"]: p["card_count"] for p in packs}
+    assert counts == {pack_ids[0]: 1, pack_ids[1]: 2, pack_ids[2]: 3}
+    assert all(len(p["cards"]) == p["card_count"] for p in packs)
+
+    light = db.get_user_purchased_packs(u, include_cards=False)
+    assert {p["pack_id"]: p["card_count"] for p in light} == counts
+    assert "cards" not in light[0]
+    assert db.user_owns_pack(u, pack_ids[2]) is True
+    assert db.user_owns_pack(u, "pack_missing") is False
+
+
+def test_pack_cards_cached_until_invalidated(db):
+    """Warm pack reads skip the card query; linking a card invalidates the pack."""
+    from sqlalchemy import event
+    from models import PackPurchase
+    u = db.get_or_create_telegram_user(602, "cached")["user_id"]
+    pack_id = db.create_creator_pack(u, "Cached Pack")
+    db.add_card_to_master({"card_id": "cc1", "name": "First"})
+    db.add_card_to_pack(pack_id, {"card_id": "cc1"})
+    session = db.get_session()
+    try:
+        session.add(PackPurchase(buyer_id=u, pack_id=pack_id))
+        session.commit()
+    finally:
+        session.close()
+
+    assert db.get_user_purchased_packs(u)[0]["card_count"] == 1
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        packs = db.get_user_purchased_packs(u)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+    packs[0]["cards"][0]["name"] = "mutated by caller"
+
+    db.add_card_to_master({"card_id": "cc2", "name": "Second"})
+    db.add_card_to_pack(pack_id, {"card_id": "cc2"})
+    names = {c["name"] for c in db.get_user_purchased_packs(u)[0]["cards"]}
+    assert names == {"First", "Second"}
+    assert db.get_pack_cache_stats()["hit_rate"] > 0
+
+
+def test_query_metrics_count_statements_per_method(db):
+    """Each Database method's statements are counted, nested calls roll up, N+1 loops warn."""
+    from services.query_metrics import NPlusOneWarning, query_metrics
+    u = db.get_or_create_telegram_user(603, "metered")["user_id"]
+    query_metrics.reset()
+
+    with query_metrics.scope("batched") as scope:
+        db.get_user_purchased_packs(u)
+    assert scope.statements >= 1
+    methods = {m["name"]: m for m in query_metrics.snapshot()["methods"]}
+    assert methods["Database.get_user_purchased_packs"]["calls"] == 1
+    assert methods["Database.get_user_purchased_packs"]["statements"] == scope.statements
+
+    with pytest.warns(NPlusOneWarning):
+        with query_metrics.scope("looped", warn=True) as looped:
+            for i in range(12):
+                db.get_user_card(u, f"missing_{i}")
+    assert looped.n_plus_one
+    snapshot = query_metrics.snapshot()
+    assert {s["name"] for s in snapshot["scopes"]} >= {"batched", "looped"}
+    assert snapshot["n_plus_one"][-1]["method"] == "Database.get_user_card"
+
+
+def test_rarity_and_tier_lookups_use_indexes(db):
+    """Catalog values are stored canonically, so hot lookups are index searches."""
+    from sqlalchemy import text
+
+    assert db.add_card_to_master({"card_id": "c_norm", "name": "Norm", "rarity": " Legendary", "tier": "Platinum"})
+    pack_id = db.create_creator_pack(creator_id="u_norm", name="Norm Pack", pack_tier="GOLD")
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO cards (card_id, type, name, rarity, tier) "
+                          "VALUES ('c_legacy', 'artist', 'Legacy', 'Epic', 'Gold')"))
+    db.backfill_catalog()  # raw-SQL rows, as after seed_packs
+
+    with db.engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT card_id, rarity || '/' || tier FROM cards")).fetchall())
+        assert rows == {"c_norm": "legendary/platinum", "c_legacy": "epic/gold"}
+
+        def plan(sql):
+            return " ".join(str(r[-1]) for r in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+        before = plan("SELECT * FROM cards WHERE lower(rarity) = 'epic'")
+        after = plan("SELECT * FROM cards WHERE rarity = 'epic'")
+        assert "SCAN" in before and "idx_cards_rarity" not in before
+        assert "idx_cards_rarity" in after
+
+        before = plan("SELECT * FROM creator_packs WHERE is_public = 1 "
+                      "AND lower(coalesce(pack_tier, 'community')) = 'gold'")
+        after = plan("SELECT * FROM creator_packs WHERE is_public = 1 AND pack_tier = 'gold'")
+        assert "idx_creator_packs_public_tier (is_public=?)" in before
+        assert "idx_creator_packs_public_tier (is_public=? AND pack_tier=?)" in after
+
+    pack = db.get_random_live_pack_by_tier("Gold")
+    assert pack["pack_id"] == pack_id and pack["tier"] == "gold"
+    page = db.query_user_collection("u_norm", rarity="EPIC")
+    assert page["cards"] == []
+
+
+def test_null_pack_tier_counts_as_community(db):
+    """Raw INSERTs that skip pack_tier after startup are still found as community packs."""
+    from sqlalchemy import text
+
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO creator_packs (pack_id, creator_id, name, pack_size, status) "
+                          "VALUES ('p_null', 'u_imp', 'Imported', 5, 'LIVE')"))
+    pack = db.get_random_live_pack_by_tier("community")
+    assert pack["pack_id"] == "p_null" and pack["tier"] == "community"
+    assert db.get_random_live_pack_by_tier("gold") is None
+
+
+def test_fresh_database_boots_at_head(tmp_path):
+    """A new database is built and stamped at the alembic head on first boot."""
+    from sqlalchemy import inspect
+    from services import schema
+    d = DatabaseManager(test_database_url=f"sqlite:///{tmp_path / 'fresh.db'}")
+    with d.engine.connect() as conn:
+        assert schema.current_revision(conn) == schema.head_revision()
+    tables = set(inspect(d.engine).get_table_names())
+    assert {"cards", "user_inventory", "season_progress", "nft_snapshots"} <= tables
+
+
+def test_unmigrated_database_is_rejected_without_auto_migrate(tmp_path, monkeypatch):
+    """With auto-migrate off, boot refuses a schema behind head."""
+    from sqlalchemy import create_engine
+    from services import schema
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    monkeypatch.setattr(schema, "_AUTO_MIGRATE", "0")
+    with pytest.raises(schema.SchemaNotAtHead):
+        schema.ensure_schema(engine)
+    monkeypatch.setattr(schema, "_AUTO_MIGRATE", "1")
+    schema.ensure_schema(engine)
+    with engine.connect() as conn:
+        assert schema.current_revision(conn) == schema.head_revision()
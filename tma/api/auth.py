@@ -2,18 +2,69 @@
 Every API request must include: Authorization: tma <raw_init_data>
 
 Set TMA_SKIP_HMAC=true in Railway to bypass signature check (dev only).
+
+Validated initData is cached by its hash until auth_date + TMA_INIT_DATA_TTL
+(default 24h, capped at TMA_INIT_DATA_CACHE_SECONDS), so a Mini App session
+pays for the HMAC check once rather than on every request.
 """
 import hmac
 import hashlib
 import json
 import os
+import threading
+import time
 import urllib.parse
+from functools import lru_cache
+
+from cachetools import TTLCache
 from fastapi import Header, HTTPException
 
+_INIT_DATA_TTL = int(os.environ.get("TMA_INIT_DATA_TTL", "86400"))
+_INIT_DATA_CACHE_SECONDS = int(os.environ.get("TMA_INIT_DATA_CACHE_SECONDS", "3600"))
+
+# (bot token, hash) -> (raw initData, user dict, expires_at)
+_validated_cache: TTLCache = TTLCache(maxsize=50_000, ttl=_INIT_DATA_CACHE_SECONDS)
+_validated_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _derive_secret_key(token: str) -> bytes:
+    return hmac.new(b"WebAppData", token.encode(), hashlib.sha256).digest()
+
 
 def _get_secret_key() -> bytes:
     token = os.environ.get("TELEGRAM_BOT_TOKEN", "").strip()
-    return hmac.new(b"WebAppData", token.encode(), hashlib.sha256).digest()
+    return _derive_secret_key(token)
+
+
+def _cache_validated(key: tuple, raw: str, user: dict, auth_date: str):
+    try:
+        expires_at = int(auth_date) + _INIT_DATA_TTL
+    except (TypeError, ValueError):
+        return
+    if expires_at <= time.time():
+        return
+    with _validated_lock:
+        _validated_cache[key] = (raw, user, expires_at)
+
+
+def _cached_user(key: tuple, raw: str) -> dict | None:
+    with _validated_lock:
+        entry = _validated_cache.get(key)
+    # The full payload must match: the hash alone is never trusted
+    if not entry or entry[0] != raw:
+        return None
+    if entry[2] <= time.time():
+        with _validated_lock:
+            _validated_cache.pop(key, None)
+        return None
+    return dict(entry[1])
+
+
+def clear_init_data_cache():
+    """Drop all cached initData validations (tests / token rotation)."""
+    with _validated_lock:
+        _validated_cache.clear()
 
 
 def validate_init_data(raw: str) -> dict:
@@ -27,15 +78,21 @@ def validate_init_data(raw: str) -> dict:
     token = os.environ.get("TELEGRAM_BOT_TOKEN", "").strip()
     if not token:
         raise ValueError("SERVER_CONFIG: TELEGRAM_BOT_TOKEN not set")
+    cache_key = (token, received_hash)
+    cached = _cached_user(cache_key, raw)
+    if cached is not None:
+        return cached
     check_string = "\n".join(f"{k}={v}" for k, v in sorted(params.items()))
-    secret_key = hmac.new(b"WebAppData", token.encode(), hashlib.sha256).digest()
+    secret_key = _derive_secret_key(token)
     expected = hmac.new(secret_key, check_string.encode(), hashlib.sha256).hexdigest()
     match = hmac.compare_digest(received_hash, expected)
     print(f"[AUTH] token_len={len(token)} hmac_ok={match} user={params.get('user','')[:60]}")
     if not match:
         raise ValueError("BAD_SIGNATURE: HMAC mismatch — check TELEGRAM_BOT_TOKEN in Railway")
     user_raw = params.get("user", "{}")
-    return json.loads(user_raw)
+    user = json.loads(user_raw)
+    _cache_validated(cache_key, raw, user, params.get("auth_date", ""))
+    return user
 
 
 def _synthetic_dev_user(x_forwarded_for: str = "", user_agent: str = "") -> dict:
@@ -5,11 +5,12 @@ import sys, os
 # Make repo root importable so database.py, config/, battle_engine.py all resolve
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../.."))
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from tma.api.routers import users, cards, packs, economy, battle, marketplace, trade, dust, battle_pass, stripe_checkout, telegram_hosts  # noqa: E402
+from tma.api.routers import users, cards, packs, economy, battle, marketplace, trade, dust, battle_pass, stripe_checkout, telegram_hosts, metrics  # noqa: E402
+from services.query_metrics import query_metrics  # noqa: E402
 
 app = FastAPI(title="Music Legends TMA", version="1.0.0", docs_url="/api/docs")
 
@@ -20,12 +21,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── DB query metrics per request ──────────────────────────────────
+@app.middleware("http")
+async def db_query_metrics(request: Request, call_next):
+    # Grouped by route template (/api/users/{id}); static files / 404s share one bucket
+    with query_metrics.scope("tma:other") as scope:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            scope.name = f"tma:{request.method} {route.path}"
+    response.headers["X-DB-Statements"] = str(scope.statements)
+    response.headers["X-DB-Time-Ms"] = f"{scope.sql_time * 1000:.1f}"
+    return response
+
+
 # ── Health ────────────────────────────────────────────────────────
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "tma-api"}
 
 
+@app.on_event("startup")
+def check_schema():
+    # Raises SchemaNotAtHead unless `python migrate.py` ran for this release
+    from database import get_db
+    get_db()
+
+
+@app.on_event("shutdown")
+def flush_presence():
+    # Write out buffered username/last_active updates before the process exits
+    from database import get_db
+    get_db().flush_telegram_presence()
+    get_db().flush_battle_history()
+
+
 # ── Routers ───────────────────────────────────────────────────────
 app.include_router(users.router)
 app.include_router(cards.router)
@@ -38,6 +68,7 @@ app.include_router(dust.router)
 app.include_router(battle_pass.router)
 app.include_router(stripe_checkout.router)
 app.include_router(telegram_hosts.router)
+app.include_router(metrics.router)
 
 # ── Telegram Bot webhook ───────────────────────────────────────────
 from tma.api.bot.handlers import setup_webhook_route  # noqa: E402
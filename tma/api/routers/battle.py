@@ -11,7 +11,7 @@ from tma.api.auth import get_tg_user
 from tma.api.telegram_identity import extract_telegram_id_from_user
 from database import get_db
 from cards_config import compute_card_power, compute_team_power
-from battle_engine import BattleEngine
+from battle_engine import BattleEngine, BattleWagerConfig
 from discord_cards import ArtistCard
 from models import PendingTmaBattle, User
 
@@ -198,6 +198,8 @@ def _run_battle(db, challenger_id: int, opponent_id: int,
         "winner":      result["winner"],
         "is_critical": result.get("is_critical", False),
         "challenger": {
+            "card_id":     c_champ.get("card_id"),
+            "critical":    p1.get("critical_hit", False),
             "name":        c_champ.get("name"),
             "power":       c_power,
             "gold_reward": p1["gold_reward"],
@@ -207,6 +209,8 @@ def _run_battle(db, challenger_id: int, opponent_id: int,
             "rarity":      c_champ.get("rarity"),
         },
         "opponent": {
+            "card_id":     o_champ.get("card_id"),
+            "critical":    p2.get("critical_hit", False),
             "name":        o_champ.get("name"),
             "power":       o_power,
             "gold_reward": p2["gold_reward"],
@@ -319,25 +323,26 @@ def list_registered_opponents(tg: dict = Depends(get_tg_user)):
 @router.get("/opponents/search")
 def search_registered_opponents(
     q: str = Query(default="", max_length=64),
+    contains: bool = Query(default=False),
     tg: dict = Depends(get_tg_user),
 ):
-    """Search battle-registered opponents by username/Telegram ID."""
+    """Search battle-registered opponents by username/Telegram ID
+    (contains=true also scans every registration for substrings)."""
     db = get_db()
     db.get_or_create_telegram_user(tg["id"], tg.get("username", ""), tg.get("first_name", ""))
-    term = (q or "").strip().lower().lstrip("@")
-    rows = db.list_registered_battle_players(exclude_telegram_id=tg["id"], limit=200)
-    if not term:
-        return {"players": rows[:50]}
-
-    out = []
-    for p in rows:
-        uname = str(p.get("username") or "").lower()
-        tid = str(p.get("telegram_id") or "")
-        if term in uname or term in tid:
-            out.append(p)
-    exact = [p for p in out if str(p.get("username") or "").lower() == term or str(p.get("telegram_id") or "") == term]
-    partial = [p for p in out if p not in exact]
-    return {"players": (exact + partial)[:50]}
+    return {"players": db.search_battle_players(q, exclude_telegram_id=tg["id"], limit=50,
+                                                substring=contains)}
+
+
+@router.get("/opponents/suggested")
+def suggested_opponents(
+    limit: int = Query(default=10, ge=1, le=50),
+    tg: dict = Depends(get_tg_user),
+):
+    """Recently active registered players closest to the caller's team power."""
+    db = get_db()
+    players = db.find_battle_opponents(tg["id"], limit=limit)
+    return {"players": players}
 
 
 @router.get("/incoming")
@@ -462,6 +467,22 @@ def battle_updates(tg: dict = Depends(get_tg_user)):
         session.close()
 
 
+@router.get("/history")
+def battle_history(
+    limit: int = Query(10, ge=1, le=50),
+    before: str | None = Query(None, description="next_cursor from the previous page"),
+    tg: dict = Depends(get_tg_user),
+):
+    """Your battles, newest first, plus your lifetime record."""
+    db = get_db()
+    user = db.get_or_create_telegram_user(tg["id"], tg.get("username", ""))
+    try:
+        page = db.get_battle_history(user["user_id"], limit=limit, before=before)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+    return {**page, "record": db.get_battle_record(user["user_id"]) if not before else None}
+
+
 @router.post("/{battle_id}/accept")
 async def accept_challenge(battle_id: str, body: AcceptRequest,
                            tg: dict = Depends(get_tg_user)):
@@ -504,6 +525,26 @@ async def accept_challenge(battle_id: str, body: AcceptRequest,
 
     result = _run_battle(db, battle["challenger_id"], opponent["user_id"],
                          c_pack, o_pack, battle["wager_tier"])
+    if "error" not in result:
+        c, o = result["challenger"], result["opponent"]
+        db.record_battle({
+            "battle_id":           battle_id,
+            "player1_id":          battle["challenger_id"],
+            "player2_id":          opponent["user_id"],
+            "player1_card_id":     c["card_id"],
+            "player2_card_id":     o["card_id"],
+            "winner":              result["winner"],
+            "player1_power":       c["power"],
+            "player2_power":       o["power"],
+            "player1_critical":    c["critical"],
+            "player2_critical":    o["critical"],
+            "wager_tier":          battle["wager_tier"],
+            "wager_amount":        BattleWagerConfig.get_tier(battle["wager_tier"])["wager_cost"],
+            "player1_gold_reward": c["gold_reward"],
+            "player2_gold_reward": o["gold_reward"],
+            "player1_xp_reward":   c["xp_reward"],
+            "player2_xp_reward":   o["xp_reward"],
+        })
 
     session = db.get_session()
     try:
@@ -1,28 +1,59 @@
 """Cards router — user collection."""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from tma.api.auth import get_tg_user
 from database import get_db
-from cards_config import compute_card_power, RARITY_EMOJI
+from cards_config import RARITY_EMOJI
 
 router = APIRouter(prefix="/api/cards", tags=["cards"])
 
 
 def _enrich(card: dict) -> dict:
-    """Add computed power + rarity emoji to a card dict."""
-    card["power"] = compute_card_power(card)
-    card["rarity_emoji"] = RARITY_EMOJI.get((card.get("rarity") or "common").lower(), "⚪")
+    """Add rarity emoji to a card dict (power comes from the database)."""
+    if "rarity" in card:
+        card["rarity_emoji"] = RARITY_EMOJI.get((card.get("rarity") or "common").lower(), "⚪")
     return card
 
 
 @router.get("")
-def list_collection(tg: dict = Depends(get_tg_user)):
-    """Return all cards the user owns, sorted by power descending."""
+def list_collection(
+    sort: str = "power",
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    rarity: Optional[str] = None,
+    tier: Optional[str] = None,
+    q: Optional[str] = None,
+    favorites: bool = False,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    tg: dict = Depends(get_tg_user),
+):
+    """Return the user's cards, sorted by power descending by default.
+
+    Without ``limit`` the whole collection is returned. With ``limit`` the
+    response carries ``next_cursor`` for the following page; ``total`` is
+    only set on the first page. ``rarity`` and ``fields`` take
+    comma-separated lists."""
     db = get_db()
     user = db.get_or_create_telegram_user(tg["id"], tg.get("username", ""))
-    cards = db.get_user_collection(user["user_id"])
-    cards = [_enrich(c) for c in cards]
-    cards.sort(key=lambda c: c["power"], reverse=True)
-    return {"cards": cards, "total": len(cards)}
+    try:
+        page = db.query_user_collection(
+            user["user_id"],
+            sort=sort,
+            descending=order == "desc",
+            rarity=rarity.split(",") if rarity else None,
+            tier=tier,
+            search=q,
+            favorites_only=favorites,
+            fields=fields.split(",") if fields else None,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    cards = [_enrich(c) for c in page["cards"]]
+    return {"cards": cards, "total": page["total"], "next_cursor": page["next_cursor"]}
 
 
 @router.get("/{card_id}")
@@ -30,8 +61,7 @@ def get_card(card_id: str, tg: dict = Depends(get_tg_user)):
     """Return a single card from the user's collection."""
     db = get_db()
     user = db.get_or_create_telegram_user(tg["id"], tg.get("username", ""))
-    cards = db.get_user_collection(user["user_id"])
-    card = next((c for c in cards if c.get("card_id") == card_id), None)
+    card = db.get_user_card(user["user_id"], card_id)
     if not card:
         raise HTTPException(404, "Card not found in your collection")
     return _enrich(card)
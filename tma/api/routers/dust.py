@@ -1,18 +1,25 @@
 """Dust and crafting router."""
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 from tma.api.auth import get_tg_user
 from database import get_db
 
 router = APIRouter(prefix="/api/dust", tags=["dust"])
 
 class DustCardsRequest(BaseModel):
-    card_ids: List[str]
+    card_ids: List[str] = []
+    # {card_id: copies} for dusting several copies of one card
+    quantities: Dict[str, int] = {}
+    # Dust every copy above this count ("dust all duplicates" = 1)
+    keep: Optional[int] = None
 
 class CraftCardRequest(BaseModel):
     card_id: str
 
+class CraftCardsRequest(BaseModel):
+    quantities: Dict[str, int]
+
 @router.get("")
 def get_dust_balance(tg: dict = Depends(get_tg_user)):
     """Get user's dust balance."""
@@ -26,10 +33,17 @@ def dust_cards(body: DustCardsRequest, tg: dict = Depends(get_tg_user)):
     """Convert cards into dust."""
     db = get_db()
     user = db.get_or_create_telegram_user(tg["id"], tg.get("username", ""))
-    success, message = db.dust_cards(user["user_id"], body.card_ids)
-    if not success:
-        raise HTTPException(status_code=400, detail=message)
-    return {"message": message}
+    result = db.dust_cards_batch(
+        user["user_id"], card_ids=body.card_ids, quantities=body.quantities, keep=body.keep,
+    )
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return {
+        "message": f"Converted {result['cards_dusted']} card(s) into {result['total_dust']} dust",
+        "total_dust": result["total_dust"],
+        "dust": result["dust_balance"],
+        "breakdown": result["breakdown"],
+    }
 
 @router.post("/craft_card")
 def craft_card(body: CraftCardRequest, tg: dict = Depends(get_tg_user)):
@@ -40,3 +54,18 @@ def craft_card(body: CraftCardRequest, tg: dict = Depends(get_tg_user)):
     if not success:
         raise HTTPException(status_code=400, detail=message)
     return {"message": message}
+
+@router.post("/craft_cards")
+def craft_cards(body: CraftCardsRequest, tg: dict = Depends(get_tg_user)):
+    """Craft several cards in one request."""
+    db = get_db()
+    user = db.get_or_create_telegram_user(tg["id"], tg.get("username", ""))
+    result = db.craft_cards_batch(user["user_id"], body.quantities)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return {
+        "message": f"Crafted {sum(i['quantity'] for i in result['breakdown'])} card(s) "
+                   f"for {result['total_cost']} dust",
+        "dust": result["dust_balance"],
+        "breakdown": result["breakdown"],
+    }
@@ -0,0 +1,29 @@
+"""Database query metrics (statement counts / latency per method and route). Protected by env METRICS_ADMIN_KEY."""
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+
+from services.query_metrics import get_query_metrics, query_metrics
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+def _check_admin_key(x_admin_key: Optional[str]) -> None:
+    expected = (os.getenv("METRICS_ADMIN_KEY") or "").strip()
+    if not expected or (x_admin_key or "") != expected:
+        raise HTTPException(401, "Invalid admin key")
+
+
+@router.get("/db")
+def db_metrics(
+    top: int = Query(25, ge=1, le=200),
+    reset: bool = False,
+    x_admin_key: Optional[str] = Header(default=None, alias="X-Admin-Key"),
+):
+    """Statements, rows and time by Database method and by route, plus slow / N+1 samples."""
+    _check_admin_key(x_admin_key)
+    snapshot = get_query_metrics(top)
+    if reset:
+        query_metrics.reset()
+    return snapshot
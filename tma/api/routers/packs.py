@@ -1,5 +1,5 @@
 """Packs router — view acquired packs + open them."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from tma.api.auth import get_tg_user
 from database import get_db
 from cards_config import compute_card_power, RARITY_EMOJI
@@ -15,9 +15,9 @@ def list_packs(tg: dict = Depends(get_tg_user)):
     packs = db.get_user_purchased_packs(user["user_id"])
     # Always expose card-based pseudo packs too.
     # Users can own cards from daily/trade/market without a matching purchased pack row.
-    cards = db.get_user_collection(user["user_id"]) or []
+    cards = db.query_user_collection(user["user_id"], limit=50)["cards"]
     pseudo = []
-    for c in cards[:50]:
+    for c in cards:
         cid = str(c.get("card_id") or "")
         if not cid:
             continue
@@ -45,10 +45,19 @@ def list_packs(tg: dict = Depends(get_tg_user)):
 
 
 @router.get("/store")
-def get_store(tg: dict = Depends(get_tg_user)):
-    """Return live packs available in the store."""
+def get_store(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cards: bool = True,
+    tg: dict = Depends(get_tg_user),
+):
+    """Return live packs available in the store.
+
+    Pass ``cards=false`` to get only card counts for a lighter listing."""
     db = get_db()
-    return {"packs": db.get_live_packs(limit=20)}
+    packs = db.get_live_packs_cached(limit=limit, offset=offset, include_cards=cards)
+    next_offset = offset + limit if len(packs) == limit else None
+    return {"packs": packs, "next_offset": next_offset}
 
 
 @router.post("/{pack_id}/purchase")
@@ -69,9 +78,7 @@ def open_pack(pack_id: str, tg: dict = Depends(get_tg_user)):
     user = db.get_or_create_telegram_user(tg["id"], tg.get("username", ""))
 
     # Verify ownership before opening
-    packs = db.get_user_purchased_packs(user["user_id"])
-    owned = {str(p.get("pack_id")) for p in packs}
-    if pack_id not in owned:
+    if not db.user_owns_pack(user["user_id"], pack_id):
         raise HTTPException(403, "You don't own this pack")
 
     result = db.open_pack_for_drop(pack_id, user["user_id"])
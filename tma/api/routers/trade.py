@@ -9,8 +9,6 @@ from typing import List
 from tma.api.auth import get_tg_user
 from tma.api.telegram_identity import extract_telegram_id_from_user
 from database import get_db
-from sqlalchemy import desc
-from models import User
 
 router = APIRouter(prefix="/api/trades", tags=["trades"])
 
@@ -104,70 +102,63 @@ def get_trades(tg: dict = Depends(get_tg_user)):
 @router.get("/partners")
 def search_trade_partners(
     query: str = Query(default="", max_length=64),
+    contains: bool = Query(default=False),
     tg: dict = Depends(get_tg_user),
 ):
-    """Search Telegram users to trade with by username or Telegram ID."""
+    """Search Telegram users to trade with by username or Telegram ID
+    (prefix / exact id; contains=true also matches substrings, a slower scan)."""
     db = get_db()
     me = db.get_or_create_telegram_user(tg["id"], tg.get("username", ""))
     me_user_id = str(me["user_id"])
     q = (query or "").strip().lower().lstrip("@")
 
-    session = db.get_session()
-    try:
-        rows = (
-            session.query(User)
-            .order_by(desc(User.last_active))
-            .limit(500)
-            .all()
-        )
-        out = []
-        for u in rows:
-            if str(u.user_id) == me_user_id:
-                continue
-            tg_id_int = extract_telegram_id_from_user(db, u)
-            if not tg_id_int:
-                continue
-            tg_id = str(tg_id_int)
-            if not tg_id:
-                continue
-
-            username = (u.username or "").strip()
-            if q:
-                hit = (
-                    q in username.lower()
-                    or q in str(tg_id)
-                )
-                if not hit:
-                    continue
-            out.append({
-                "telegram_id": tg_id_int,
-                "username": username or f"user_{tg_id}",
-            })
-
+    rows = db.search_players(q, limit=100, exclude_user_id=me_user_id, substring=contains)
+    out = []
+    for u in rows:
+        if str(u.user_id) == me_user_id:
+            continue
+        tg_id_int = extract_telegram_id_from_user(db, u)
+        if not tg_id_int:
+            continue
+        tg_id = str(tg_id_int)
+        if not tg_id:
+            continue
+
+        username = (u.username or "").strip()
         if q:
-            # Prioritize exact username/id matches at the top.
-            exact = []
-            partial = []
-            for p in out:
-                u = str(p.get("username") or "").lower()
-                tid = str(p.get("telegram_id") or "")
-                if u == q or tid == q:
-                    exact.append(p)
-                else:
-                    partial.append(p)
-            out = exact + partial
-
-        # Live Telegram lookup fallback for typed @username queries.
-        # This helps when the target user isn't yet in local DB search results.
-        if q and not q.isdigit():
-            live = _lookup_telegram_user_live(q)
-            if live and str(live["telegram_id"]) != str(tg["id"]):
-                if all(int(p.get("telegram_id", 0)) != int(live["telegram_id"]) for p in out):
-                    out.insert(0, live)
-
-        return {"partners": out[:25]}
-    finally:
-        session.close()
+            hit = (
+                q in username.lower()
+                or q in str(tg_id)
+            )
+            if not hit:
+                continue
+        out.append({
+            "telegram_id": tg_id_int,
+            "username": username or f"user_{tg_id}",
+        })
+
+    if q:
+        # Prioritize exact username/id matches at the top.
+        exact = []
+        partial = []
+        for p in out:
+            u = str(p.get("username") or "").lower()
+            tid = str(p.get("telegram_id") or "")
+            if u == q or tid == q:
+                exact.append(p)
+            else:
+                partial.append(p)
+        out = exact + partial
+
+    # Live Telegram lookup fallback for typed @username queries.
+    # This helps when the target user isn't yet in local DB search results.
+    if q and not q.isdigit():
+        live = _lookup_telegram_user_live(q)
+        if live and str(live["telegram_id"]) != str(tg["id"]):
+            if all(int(p.get("telegram_id", 0)) != int(live["telegram_id"]) for p in out):
+                out.insert(0, live)
+
+    return {"partners": out[:25]}
 
 
 @router.get("/partners/{partner_telegram_id}/cards")
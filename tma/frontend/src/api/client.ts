@@ -43,6 +43,8 @@ export default api
 export const getMe           = ()                         => api.get('/api/me')
 export const getCards        = ()                         => api.get('/api/cards')
 export const getCard         = (id: string)               => api.get(`/api/cards/${id}`)
+export const getCardsPage    = (params: { sort?: string; order?: 'asc' | 'desc'; rarity?: string; tier?: string; q?: string; favorites?: boolean; fields?: string; limit?: number; cursor?: string }) =>
+  api.get('/api/cards', { params })
 export const getPacks        = ()                         => api.get('/api/packs')
 export const getPackStore    = ()                         => api.get('/api/packs/store')
 export const openPack        = (id: string)               => api.post(`/api/packs/${id}/open`)
@@ -72,6 +74,8 @@ export const searchTradePartners = (query = '')           => api.get(`/api/trade
 export const getPartnerCards = (telegramId: number)       => api.get(`/api/trades/partners/${telegramId}/cards`)
 export const getDust         = ()                         => api.get('/api/dust')
 export const dustCards       = (card_ids: string[])       => api.post('/api/dust/dust_cards', { card_ids })
+export const dustDuplicates  = (keep = 1)                 => api.post('/api/dust/dust_cards', { keep })
+export const craftCards      = (quantities: Record<string, number>) => api.post('/api/dust/craft_cards', { quantities })
 
 export const setReferrerHost = (host_token: string)       => api.post('/api/me/referrer', { host_token })
 export const checkoutTierPack = (tier: string)            => api.post('/api/checkout/tier-pack', { tier })